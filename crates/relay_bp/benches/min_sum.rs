@@ -12,6 +12,7 @@ use criterion::{black_box, criterion_group, criterion_main, Criterion};
 use ndarray::Array2;
 use ndarray_npy::read_npy;
 use relay_bp::bp::min_sum::{MinSumBPDecoder, MinSumDecoderConfig};
+use relay_bp::bp::simd::SimdLevel;
 use relay_bp::decoder::{Bit, Decoder, DecoderRunner};
 use relay_bp::dem::DetectorErrorModel;
 use relay_bp::utilities::test::get_test_data_path;
@@ -44,6 +45,23 @@ fn gross_code_benchmark(c: &mut Criterion) {
     group.bench_function("100_samples_par", |b| {
         b.iter(|| decoder_144_12_12.par_decode_batch(black_box(detectorss_144_12_12.view())))
     });
+
+    // Compare the baseline kernels against those of the detected instruction set.
+    let mut levels = vec![SimdLevel::Scalar, SimdLevel::detect()];
+    levels.dedup();
+    for level in levels {
+        decoder_144_12_12.set_simd_level(level);
+        group.bench_function(format!("100_samples_{level:?}"), |b| {
+            b.iter(|| decoder_144_12_12.decode_batch(black_box(detectorss_144_12_12.view())))
+        });
+        group.bench_function(format!("100_samples_single_shot_{level:?}"), |b| {
+            b.iter(|| {
+                for detectors in detectorss_144_12_12.rows() {
+                    decoder_144_12_12.decode(black_box(detectors));
+                }
+            })
+        });
+    }
 }
 
 criterion_group!(benches, gross_code_benchmark);
@@ -12,7 +12,10 @@ use criterion::{black_box, criterion_group, criterion_main, Criterion};
 use ndarray::Array2;
 use ndarray_npy::read_npy;
 use relay_bp::bp::min_sum::MinSumDecoderConfig;
-use relay_bp::bp::relay::{RelayDecoder, RelayDecoderConfig, StoppingCriterion};
+use relay_bp::bp::relay::{
+    ParallelLegsConfig, RelayDecoder, RelayDecoderConfig, StoppingCriterion,
+};
+use relay_bp::bp::simd::SimdLevel;
 use relay_bp::decoder::{Bit, Decoder, DecoderRunner};
 use relay_bp::dem::DetectorErrorModel;
 use relay_bp::utilities::test::get_test_data_path;
@@ -47,7 +50,7 @@ fn gross_code_benchmark(c: &mut Criterion) {
     let bp_config = Arc::new(bp_config_144_12_12);
     let config = Arc::new(relay_config);
     let mut decoder_144_12_12: RelayDecoder<f32> =
-        RelayDecoder::new(check_matrix, bp_config, config);
+        RelayDecoder::new(check_matrix.clone(), bp_config.clone(), config);
 
     let mut group = c.benchmark_group("relay_144_12_12");
     group.sample_size(10);
@@ -57,6 +60,44 @@ fn gross_code_benchmark(c: &mut Criterion) {
     group.bench_function("100_samples_par", |b| {
         b.iter(|| decoder_144_12_12.par_decode_batch(black_box(detectorss_144_12_12.view())))
     });
+
+    // Compare the baseline kernels against those of the detected instruction set.
+    let mut levels = vec![SimdLevel::Scalar, SimdLevel::detect()];
+    levels.dedup();
+    for level in levels {
+        decoder_144_12_12.set_simd_level(level);
+        group.bench_function(format!("100_samples_{level:?}"), |b| {
+            b.iter(|| decoder_144_12_12.decode_batch(black_box(detectorss_144_12_12.view())))
+        });
+    }
+
+    // Latency of decoding shots one at a time, running the Relay legs
+    // sequentially or across the thread pool.
+    for (name, parallel_legs) in [
+        ("sequential", None),
+        ("parallel_legs", Some(ParallelLegsConfig::default())),
+    ] {
+        let relay_config = RelayDecoderConfig {
+            pre_iter: 120,
+            num_sets: 40,
+            set_max_iter: 150,
+            stopping_criterion: StoppingCriterion::NConv { stop_after: 1 },
+            parallel_legs,
+            ..Default::default()
+        };
+        let mut decoder: RelayDecoder<f32> = RelayDecoder::new(
+            check_matrix.clone(),
+            bp_config.clone(),
+            Arc::new(relay_config),
+        );
+        group.bench_function(format!("100_samples_single_shot_{name}"), |b| {
+            b.iter(|| {
+                for detectors in detectorss_144_12_12.rows() {
+                    decoder.decode(black_box(detectors));
+                }
+            })
+        });
+    }
 }
 
 criterion_group!(benches, gross_code_benchmark);
@@ -11,7 +11,9 @@
 use ndarray::Array2;
 use num_traits::Zero;
 use sprs::{CompressedStorage, CsMat, TriMat};
-use std::ops::Add;
+use std::fmt::Debug;
+use std::ops::{Add, Range};
+use std::sync::Arc;
 
 pub trait BipartiteGraph<N: PartialEq>: PartialEq {
     fn from_dense(array: Array2<N>) -> Self;
@@ -74,6 +76,209 @@ pub fn sparse_bartite_graph_from_dense<N: PartialEq + Clone + Zero + Add<Output
     }
 }
 
+/// Unsigned integer types used to store the topology of a [`CompactBipartiteGraph`].
+pub trait GraphIndex: Copy + Debug + Send + Sync + 'static {
+    /// Largest node or edge count addressable with this type.
+    const MAX: usize;
+    fn from_usize(value: usize) -> Self;
+    fn index(self) -> usize;
+}
+
+macro_rules! impl_graph_index {
+    ($($type: ty),*) => {
+        $(
+            impl GraphIndex for $type {
+                const MAX: usize = <$type>::MAX as usize;
+
+                #[inline(always)]
+                fn from_usize(value: usize) -> Self {
+                    value as $type
+                }
+
+                #[inline(always)]
+                fn index(self) -> usize {
+                    self as usize
+                }
+            }
+        )*
+    };
+}
+
+impl_graph_index!(u16, u32, usize);
+
+/// The topology of a bipartite graph stored with compact indices.
+///
+/// Edges are numbered both in check-major (row/CSR) order and in
+/// variable-major (column/CSC) order. Besides the usual index pointers and
+/// indices for both orders, the positions of every edge in the other order
+/// are cached so that messages can be moved between the two layouts without
+/// a search.
+#[derive(Clone, Debug, PartialEq)]
+pub struct CompactBipartiteGraph<I: GraphIndex> {
+    rows: usize,
+    cols: usize,
+    row_indptr: Vec<I>,
+    row_indices: Vec<I>,
+    col_indptr: Vec<I>,
+    col_indices: Vec<I>,
+    row_to_col_edges: Vec<I>,
+    col_to_row_edges: Vec<I>,
+}
+
+impl<I: GraphIndex> CompactBipartiteGraph<I> {
+    /// Build the topology of the non-zeros of a sparse matrix.
+    ///
+    /// Panics if the graph can not be addressed with `I`.
+    pub fn new<N>(matrix: &CsMat<N>) -> Self
+    where
+        N: Clone + Default,
+    {
+        let (rows, cols) = matrix.shape();
+        let nnz = matrix.nnz();
+        assert!(
+            rows.max(cols).max(nnz) <= I::MAX,
+            "Graph with shape ({rows}, {cols}) and {nnz} edges does not fit the index type"
+        );
+
+        let matrix_csr = matrix.to_csr();
+        let row_indptr = matrix_csr.indptr().raw_storage().to_vec();
+        let row_indices = matrix_csr.indices().to_vec();
+
+        let mut col_indptr = vec![0; cols + 1];
+        for &col in row_indices.iter() {
+            col_indptr[col + 1] += 1;
+        }
+        for col in 0..cols {
+            col_indptr[col + 1] += col_indptr[col];
+        }
+
+        // Rows are visited in ascending order so each column's edges end up
+        // sorted by row index.
+        let mut next_slot = col_indptr[..cols].to_vec();
+        let mut col_indices = vec![0; nnz];
+        let mut row_to_col_edges = vec![0; nnz];
+        let mut col_to_row_edges = vec![0; nnz];
+        for row in 0..rows {
+            for edge in row_indptr[row]..row_indptr[row + 1] {
+                let col_edge = next_slot[row_indices[edge]];
+                col_indices[col_edge] = row;
+                row_to_col_edges[edge] = col_edge;
+                col_to_row_edges[col_edge] = edge;
+                next_slot[row_indices[edge]] += 1;
+            }
+        }
+
+        let compact = |indices: Vec<usize>| indices.into_iter().map(I::from_usize).collect();
+        CompactBipartiteGraph {
+            rows,
+            cols,
+            row_indptr: compact(row_indptr),
+            row_indices: compact(row_indices),
+            col_indptr: compact(col_indptr),
+            col_indices: compact(col_indices),
+            row_to_col_edges: compact(row_to_col_edges),
+            col_to_row_edges: compact(col_to_row_edges),
+        }
+    }
+
+    /// Number of rows (or check nodes)
+    pub fn rows(&self) -> usize {
+        self.rows
+    }
+
+    /// Number of cols (or variable nodes)
+    pub fn cols(&self) -> usize {
+        self.cols
+    }
+
+    /// Number of edges
+    pub fn nnz(&self) -> usize {
+        self.row_indices.len()
+    }
+
+    /// Range of the edges of a row in row order.
+    #[inline(always)]
+    pub fn row_range(&self, row: usize) -> Range<usize> {
+        self.row_indptr[row].index()..self.row_indptr[row + 1].index()
+    }
+
+    /// Range of the edges of a column in column order.
+    #[inline(always)]
+    pub fn col_range(&self, col: usize) -> Range<usize> {
+        self.col_indptr[col].index()..self.col_indptr[col + 1].index()
+    }
+
+    /// Column of every edge in row order.
+    pub fn row_indices(&self) -> &[I] {
+        &self.row_indices
+    }
+
+    /// Row of every edge in column order.
+    pub fn col_indices(&self) -> &[I] {
+        &self.col_indices
+    }
+
+    /// Position in column order of every edge in row order.
+    pub fn row_to_col_edges(&self) -> &[I] {
+        &self.row_to_col_edges
+    }
+
+    /// Position in row order of every edge in column order.
+    pub fn col_to_row_edges(&self) -> &[I] {
+        &self.col_to_row_edges
+    }
+}
+
+/// A [`CompactBipartiteGraph`] stored with the narrowest index type that can
+/// address all of its nodes and edges, falling back to `usize` for graphs too
+/// large for `u32`.
+#[derive(Clone, Debug, PartialEq)]
+pub enum CompactGraph {
+    U16(Arc<CompactBipartiteGraph<u16>>),
+    U32(Arc<CompactBipartiteGraph<u32>>),
+    Usize(Arc<CompactBipartiteGraph<usize>>),
+}
+
+impl CompactGraph {
+    pub fn new<N>(matrix: &CsMat<N>) -> Self
+    where
+        N: Clone + Default,
+    {
+        let (rows, cols) = matrix.shape();
+        let size = rows.max(cols).max(matrix.nnz());
+        if size <= u16::MAX {
+            CompactGraph::U16(Arc::new(CompactBipartiteGraph::new(matrix)))
+        } else if size <= u32::MAX as usize {
+            CompactGraph::U32(Arc::new(CompactBipartiteGraph::new(matrix)))
+        } else {
+            CompactGraph::Usize(Arc::new(CompactBipartiteGraph::new(matrix)))
+        }
+    }
+
+    /// Size in bytes of a single stored index.
+    pub fn index_bytes(&self) -> usize {
+        match self {
+            CompactGraph::U16(_) => std::mem::size_of::<u16>(),
+            CompactGraph::U32(_) => std::mem::size_of::<u32>(),
+            CompactGraph::Usize(_) => std::mem::size_of::<usize>(),
+        }
+    }
+}
+
+/// Evaluate an expression with the concrete [`CompactBipartiteGraph`] held by
+/// a [`CompactGraph`] bound to `$graph`, so that hot loops are monomorphized
+/// for the index type instead of matching on every access.
+macro_rules! with_compact_graph {
+    ($compact_graph: expr, $graph: ident => $body: expr) => {
+        match $compact_graph {
+            $crate::bipartite_graph::CompactGraph::U16($graph) => $body,
+            $crate::bipartite_graph::CompactGraph::U32($graph) => $body,
+            $crate::bipartite_graph::CompactGraph::Usize($graph) => $body,
+        }
+    };
+}
+pub(crate) use with_compact_graph;
+
 #[cfg(test)]
 mod tests {
     use super::*;
@@ -83,4 +288,46 @@ mod tests {
         let graph: SparseBipartiteGraph<f64> = CsMat::eye(100);
         assert_eq!(*graph.get(99, 99).unwrap(), 1.0);
     }
+
+    #[test]
+    fn build_compact_bipartite_graph() {
+        let matrix: SparseBipartiteGraph<u8> = SparseBipartiteGraph::from_dense(ndarray::array![
+            [1, 1, 0, 1],
+            [0, 1, 1, 0],
+            [1, 0, 1, 1]
+        ]);
+        let graph: CompactBipartiteGraph<u16> = CompactBipartiteGraph::new(&matrix);
+
+        assert_eq!(graph.rows(), 3);
+        assert_eq!(graph.cols(), 4);
+        assert_eq!(graph.nnz(), 8);
+        assert_eq!(graph.row_range(1), 3..5);
+        assert_eq!(graph.row_indices(), &[0, 1, 3, 1, 2, 0, 2, 3]);
+        assert_eq!(graph.col_range(1), 2..4);
+        assert_eq!(graph.col_indices(), &[0, 2, 0, 1, 1, 2, 0, 2]);
+
+        let matrix_csc = matrix.to_csc();
+        for col in 0..graph.cols() {
+            for col_edge in graph.col_range(col) {
+                let row = graph.col_indices()[col_edge] as usize;
+                assert_eq!(matrix_csc.nnz_index(row, col).unwrap().0, col_edge);
+                let row_edge = graph.col_to_row_edges()[col_edge] as usize;
+                assert_eq!(matrix.nnz_index(row, col).unwrap().0, row_edge);
+                assert_eq!(graph.row_to_col_edges()[row_edge] as usize, col_edge);
+            }
+        }
+    }
+
+    #[test]
+    fn compact_graph_index_width() {
+        let small: SparseBipartiteGraph<u8> = CsMat::eye(100);
+        let graph = CompactGraph::new(&small);
+        assert!(matches!(graph, CompactGraph::U16(_)));
+        assert_eq!(graph.index_bytes(), 2);
+
+        let large: SparseBipartiteGraph<u8> = CsMat::eye(70_000);
+        let graph = CompactGraph::new(&large);
+        assert!(matches!(graph, CompactGraph::U32(_)));
+        assert_eq!(with_compact_graph!(&graph, graph => graph.nnz()), 70_000);
+    }
 }
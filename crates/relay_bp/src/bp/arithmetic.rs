@@ -0,0 +1,145 @@
+// (C) Copyright IBM 2025
+//
+// This code is licensed under the Apache License, Version 2.0. You may
+// obtain a copy of this license in the LICENSE.txt file in the root directory
+// of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+//
+// Any modifications or derivative works of this code must retain this
+// copyright notice, and modified files need to carry a notice indicating
+// that they have been altered from the originals.
+
+//! Arithmetic on BP messages.
+//!
+//! Integer and fixed point messages saturate symmetrically at
+//! `[-max_value, max_value]` instead of overflowing. The most negative value
+//! of a two's complement type is excluded so that messages can always be
+//! negated and their magnitude taken. Floating point messages use their
+//! ordinary arithmetic.
+
+use fixed::types::extra::LeEqU64;
+use fixed::FixedI64;
+use num_traits::{Bounded, FromPrimitive, Signed};
+
+pub trait MessageArithmetic: Copy {
+    /// Addition saturating at the message bounds.
+    fn add_sat(self, rhs: Self) -> Self;
+    /// Subtraction saturating at the message bounds.
+    fn sub_sat(self, rhs: Self) -> Self;
+    /// Multiplication saturating at the message bounds.
+    fn mul_sat(self, rhs: Self) -> Self;
+}
+
+macro_rules! impl_float_message_arithmetic {
+    ($($type: ty),*) => {
+        $(
+            impl MessageArithmetic for $type {
+                #[inline(always)]
+                fn add_sat(self, rhs: Self) -> Self {
+                    self + rhs
+                }
+
+                #[inline(always)]
+                fn sub_sat(self, rhs: Self) -> Self {
+                    self - rhs
+                }
+
+                #[inline(always)]
+                fn mul_sat(self, rhs: Self) -> Self {
+                    self * rhs
+                }
+            }
+        )*
+    };
+}
+
+macro_rules! impl_int_message_arithmetic {
+    ($($type: ty),*) => {
+        $(
+            impl MessageArithmetic for $type {
+                #[inline(always)]
+                fn add_sat(self, rhs: Self) -> Self {
+                    self.saturating_add(rhs).max(-<$type>::MAX)
+                }
+
+                #[inline(always)]
+                fn sub_sat(self, rhs: Self) -> Self {
+                    self.saturating_sub(rhs).max(-<$type>::MAX)
+                }
+
+                #[inline(always)]
+                fn mul_sat(self, rhs: Self) -> Self {
+                    self.saturating_mul(rhs).max(-<$type>::MAX)
+                }
+            }
+        )*
+    };
+}
+
+impl_float_message_arithmetic!(f32, f64);
+impl_int_message_arithmetic!(i8, i16, i32, i64, isize);
+
+impl<Frac: LeEqU64> MessageArithmetic for FixedI64<Frac> {
+    #[inline(always)]
+    fn add_sat(self, rhs: Self) -> Self {
+        self.saturating_add(rhs).max(-Self::MAX)
+    }
+
+    #[inline(always)]
+    fn sub_sat(self, rhs: Self) -> Self {
+        self.saturating_sub(rhs).max(-Self::MAX)
+    }
+
+    #[inline(always)]
+    fn mul_sat(self, rhs: Self) -> Self {
+        self.saturating_mul(rhs).max(-Self::MAX)
+    }
+}
+
+/// Convert a value to a message, saturating at `[-max_value, max_value]` if
+/// it is not representable by the message type.
+pub fn message_from_f64<N>(value: f64) -> N
+where
+    N: Bounded + FromPrimitive + Signed + PartialOrd + Copy,
+{
+    match N::from_f64(value) {
+        Some(message) if message < -N::max_value() => -N::max_value(),
+        Some(message) => message,
+        None if value > 0. => N::max_value(),
+        None => -N::max_value(),
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use fixed::types::extra::U4;
+
+    #[test]
+    fn integer_messages_saturate_symmetrically() {
+        assert_eq!(100_i8.add_sat(100), 127);
+        assert_eq!((-100_i8).add_sat(-100), -127);
+        assert_eq!((-100_i8).sub_sat(100), -127);
+        assert_eq!(20_i8.mul_sat(-20), -127);
+        assert_eq!(3_i8.mul_sat(-5), -15);
+        assert_eq!(30_000_i16.add_sat(30_000), i16::MAX);
+    }
+
+    #[test]
+    fn messages_from_f64_saturate() {
+        assert_eq!(message_from_f64::<i8>(12.7), 12);
+        assert_eq!(message_from_f64::<i8>(1000.), 127);
+        assert_eq!(message_from_f64::<i8>(-128.), -127);
+        assert_eq!(message_from_f64::<i16>(-1e6), -i16::MAX);
+        assert_eq!(message_from_f64::<f32>(2.5), 2.5);
+    }
+
+    #[test]
+    fn float_and_fixed_messages() {
+        assert_eq!(1.5_f32.add_sat(2.0), 3.5);
+        assert_eq!(1.5_f64.mul_sat(-2.0), -3.0);
+
+        let max = FixedI64::<U4>::MAX;
+        assert_eq!(max.add_sat(max), max);
+        assert_eq!((-max).sub_sat(max), -max);
+    }
+}
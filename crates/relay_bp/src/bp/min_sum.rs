@@ -8,17 +8,32 @@
 // copyright notice, and modified files need to carry a notice indicating
 // that they have been altered from the originals.
 
-use crate::bipartite_graph::SparseBipartiteGraph;
+use super::arithmetic::{message_from_f64, MessageArithmetic};
+use super::min_sum_lanes::{LaneGraph, MinSumLaneEngine};
+use super::simd::{self, SimdKernel, SimdLevel};
+use crate::bipartite_graph::{with_compact_graph, CompactBipartiteGraph, CompactGraph, GraphIndex};
 use crate::decoder::{BPExtraResult, DecodeResult, Decoder, DecoderRunner};
 use crate::decoder::{Bit, SparseBitMatrix};
 use itertools::izip;
 use log::debug;
-use ndarray::{Array1, ArrayView1};
+use ndarray::{Array1, ArrayView1, ArrayView2, ArrayViewMut2, Axis};
 use num_traits::FromPrimitive;
 use num_traits::{Bounded, Signed, ToPrimitive};
-use sprs::CsMatView;
 use std::fmt::Debug;
-use std::sync::Arc;
+use std::sync::{Arc, OnceLock};
+
+/// Message passing schedule of a single BP iteration.
+#[derive(Clone, Copy, PartialEq, Debug, Default)]
+pub enum BPSchedule {
+    /// All check to variable messages are computed from the previous
+    /// iteration's variable messages, followed by all variable to check messages.
+    #[default]
+    Flooding,
+    /// Check rows are processed one at a time in order, and the posteriors
+    /// of a row's variables are updated immediately so that later rows
+    /// already see the fresh beliefs within the same iteration.
+    Layered,
+}
 
 #[derive(Clone, Debug)]
 pub struct MinSumDecoderConfig {
@@ -31,6 +46,7 @@ pub struct MinSumDecoderConfig {
     pub max_data_value: Option<f64>,
     pub int_bits: Option<isize>,
     pub frac_bits: Option<isize>,
+    pub schedule: BPSchedule,
 }
 
 impl Default for MinSumDecoderConfig {
@@ -45,6 +61,7 @@ impl Default for MinSumDecoderConfig {
             max_data_value: None,
             int_bits: None,
             frac_bits: None,
+            schedule: BPSchedule::default(),
         }
     }
 }
@@ -59,10 +76,60 @@ impl MinSumDecoderConfig {
         self.prior_ratios().ln()
     }
 
+    /// The (optionally scaled) min-sum alpha to apply on the given iteration.
+    pub fn scaled_alpha(&self, iteration: usize) -> f64 {
+        let mut alpha = match self.alpha {
+            Some(0.) => {
+                let iteration = (iteration + 1) as f64;
+                1.0 - (2_f64).powf(-(iteration / self.alpha_iteration_scaling_factor))
+            }
+            Some(val) => val,
+            None => 1.0,
+        };
+
+        // Handle case of alpha < 0 defaulting to 1.
+        // This aligns with integer case of ldpc-simulation
+        if alpha < 0. {
+            alpha = 1.
+        }
+        // Scale if needed
+        match self.data_scale_value {
+            Some(scale_val) => scale_val * alpha,
+            None => alpha,
+        }
+    }
+
     pub fn set_max_iter(&mut self, iterations: usize) {
         self.max_iter = iterations;
     }
 
+    /// Choose `(data_scale_value, max_data_value)` for integer messages
+    /// whose largest representable value is `type_max`.
+    ///
+    /// `max_data_value` is chosen to cover `headroom` times the largest
+    /// finite log prior ratio. As the check update multiplies messages by the
+    /// scaled alpha before rescaling, `data_scale_value * max_data_value` is
+    /// kept within `type_max`, and the remaining range goes to resolution.
+    pub fn integer_scaling(&self, type_max: f64, headroom: f64) -> (f64, f64) {
+        let max_log_prior_ratio = self
+            .log_prior_ratios()
+            .iter()
+            .filter(|ratio| ratio.is_finite())
+            .fold(0_f64, |max, ratio| max.max(ratio.abs()));
+        let range = (headroom * max_log_prior_ratio).max(1.);
+        let data_scale_value = (type_max / range).sqrt().floor().max(1.);
+        let max_data_value = (type_max / data_scale_value).floor();
+        (data_scale_value, max_data_value)
+    }
+
+    /// Set `data_scale_value` and `max_data_value` from
+    /// [`MinSumDecoderConfig::integer_scaling`].
+    pub fn calibrate_integer_scaling(&mut self, type_max: f64, headroom: f64) {
+        let (data_scale_value, max_data_value) = self.integer_scaling(type_max, headroom);
+        self.data_scale_value = Some(data_scale_value);
+        self.max_data_value = Some(max_data_value);
+    }
+
     pub fn set_fixed(&mut self, int_bits: isize, frac_bits: isize) {
         self.int_bits = Some(int_bits);
         self.frac_bits = Some(frac_bits);
@@ -70,6 +137,57 @@ impl MinSumDecoderConfig {
     }
 }
 
+/// Zobrist key of a variable for hashing hard decisions.
+///
+/// The hash of a hard decision is the XOR of the keys of its set variables,
+/// so it is updated in constant time whenever a variable flips.
+#[inline]
+pub(crate) fn variable_hash_key(variable: usize) -> u64 {
+    // SplitMix64 finalizer.
+    let mut key = (variable as u64).wrapping_add(0x9E37_79B9_7F4A_7C15);
+    key = (key ^ (key >> 30)).wrapping_mul(0xBF58_476D_1CE4_E5B9);
+    key = (key ^ (key >> 27)).wrapping_mul(0x94D0_49BB_1331_11EB);
+    key ^ (key >> 31)
+}
+
+/// A preallocated copy of the state of a [`MinSumBPDecoder`] needed to build
+/// its [`DecodeResult`] later, so that the best of many runs can be kept
+/// without allocating and only materialized once.
+#[derive(Clone)]
+pub struct MinSumSolution<N: PartialEq + Default + Clone + Copy> {
+    decoding: Array1<Bit>,
+    posterior_ratios: Array1<N>,
+    residual_syndrome: Array1<Bit>,
+    success: bool,
+    decoding_quality: f64,
+    iterations: usize,
+    max_iter: usize,
+}
+
+impl<N: PartialEq + Default + Clone + Copy> MinSumSolution<N> {
+    /// Whether the stored hard decision satisfied the syndrome.
+    pub fn success(&self) -> bool {
+        self.success
+    }
+
+    /// Decoding quality of the stored hard decision, or `f64::MAX` if it
+    /// did not satisfy the syndrome.
+    pub fn decoding_quality(&self) -> f64 {
+        self.decoding_quality
+    }
+}
+
+/// The lane-batched engine of a decoder, kept between batches so that its
+/// message buffers are allocated once. Clones of a slot start empty so that
+/// cloned decoders, which may never decode a batch, do not copy the buffers.
+struct LaneEngineSlot<N: PartialEq + Default + Clone + Copy>(Option<MinSumLaneEngine<N>>);
+
+impl<N: PartialEq + Default + Clone + Copy> Clone for LaneEngineSlot<N> {
+    fn clone(&self) -> Self {
+        LaneEngineSlot(None)
+    }
+}
+
 /// A fast min-sum implementation of BP implemented internally
 /// using a sparse bipartite graph.
 #[derive(Clone)]
@@ -77,17 +195,35 @@ pub struct MinSumBPDecoder<N: PartialEq + Default + Clone + Copy> {
     check_matrix: Arc<SparseBitMatrix>,
     pub config: Arc<MinSumDecoderConfig>,
     log_prior_ratios: Array1<N>,
-    check_to_variable: SparseBipartiteGraph<N>,
-    variable_to_check: SparseBipartiteGraph<N>,
-    // A cache of check to variable data mappings.
-    check_to_variable_nnz_map: Vec<usize>,
-    // A cache of variable to check data mappings.
-    variable_to_check_nnz_map: Vec<usize>,
+    // Unscaled log prior ratios for decoding qualities, shared by clones.
+    log_prior_ratios_f64: Arc<Array1<f64>>,
+    // Topology of the check matrix with compact indices, shared by clones.
+    graph: CompactGraph,
+    // Messages of every edge in check-major (row) order, updated in place.
+    // Between iterations these are the variable to check messages for the
+    // flooding schedule and the check to variable messages for the layered
+    // schedule, i.e. whichever the next iteration consumes first.
+    messages: Vec<N>,
+    // Scratch space holding the messages of a single check or variable.
+    edge_buffer: Vec<N>,
     posterior_ratios: Array1<N>,
     memory_strengths: Array1<N>,
     decoding: Array1<Bit>,
+    // Syndrome of the problem being decoded XOR the syndrome of the current
+    // hard decision, kept up to date as variables flip.
+    residual_syndrome: Array1<Bit>,
+    residual_weight: usize,
+    // Zobrist hash of the current hard decision.
+    decoding_hash: u64,
     max_data_value: Option<N>,
     data_scale_value: Option<N>,
+    // Topology used by the lane-batched engine for batch decoding, built on
+    // the first batch and shared by clones. Restricted decoders of components
+    // only decode single shots and never build it.
+    lane_graph: Arc<OnceLock<Arc<LaneGraph>>>,
+    lane_engine: LaneEngineSlot<N>,
+    // Instruction set the message passing kernels run with.
+    simd_level: SimdLevel,
     pub current_iteration: usize,
 }
 
@@ -111,16 +247,22 @@ where
         + Send
         + Sync
         + std::fmt::Display
+        + MessageArithmetic
         + 'static,
 {
     pub fn new(
         check_matrix: Arc<SparseBitMatrix>,
         config: Arc<MinSumDecoderConfig>,
     ) -> MinSumBPDecoder<N> {
-        let check_to_variable = MinSumBPDecoder::build_check_to_variable(check_matrix.clone());
-        let variable_to_check = MinSumBPDecoder::build_variable_to_check(check_matrix.clone());
-        let (check_to_variable_nnz_map, variable_to_check_nnz_map) =
-            MinSumBPDecoder::build_nnz_maps(check_to_variable.view(), variable_to_check.view());
+        let graph = CompactGraph::new(check_matrix.as_ref());
+        let messages = vec![N::default(); check_matrix.nnz()];
+        let max_degree = with_compact_graph!(&graph, graph => {
+            let max_check_degree = (0..graph.rows()).map(|check| graph.row_range(check).len()).max();
+            let max_variable_degree =
+                (0..graph.cols()).map(|variable| graph.col_range(variable).len()).max();
+            max_check_degree.max(max_variable_degree).unwrap_or(0)
+        });
+        let edge_buffer = vec![N::default(); max_degree];
 
         let max_data_value = match config.max_data_value {
             Some(val) => N::from_f64(val),
@@ -132,7 +274,8 @@ where
             None => None,
         };
 
-        let log_prior_ratios = config.log_prior_ratios().mapv_into_any(|val| {
+        let log_prior_ratios_f64 = Arc::new(config.log_prior_ratios());
+        let log_prior_ratios = log_prior_ratios_f64.mapv(|val| {
             let updated_val = match val {
                 f64::INFINITY => N::max_value(),
                 _ => {
@@ -141,7 +284,7 @@ where
                         Some(scale_value) => scale_value * val,
                         None => val,
                     };
-                    N::from_f64(prior).unwrap()
+                    message_from_f64(prior)
                 }
             };
 
@@ -161,28 +304,115 @@ where
         };
 
         let decoding = Array1::zeros(check_matrix.cols());
+        let residual_syndrome = Array1::zeros(check_matrix.rows());
 
         MinSumBPDecoder::<N> {
             check_matrix,
             config,
             log_prior_ratios,
-            check_to_variable,
-            variable_to_check,
-            check_to_variable_nnz_map,
-            variable_to_check_nnz_map,
+            log_prior_ratios_f64,
+            graph,
+            messages,
+            edge_buffer,
             posterior_ratios,
             memory_strengths,
             decoding,
+            residual_syndrome,
+            residual_weight: 0,
+            decoding_hash: 0,
             max_data_value,
             data_scale_value,
+            lane_graph: Arc::new(OnceLock::new()),
+            lane_engine: LaneEngineSlot(None),
+            simd_level: SimdLevel::detect(),
             current_iteration: 0,
         }
     }
 
+    /// Instruction set the message passing kernels run with.
+    pub fn simd_level(&self) -> SimdLevel {
+        self.simd_level
+    }
+
+    /// Select the instruction set of the message passing kernels, which
+    /// defaults to [`SimdLevel::detect`].
+    ///
+    /// Panics if the running CPU does not support `level`.
+    pub fn set_simd_level(&mut self, level: SimdLevel) {
+        assert!(
+            level.is_supported(),
+            "SIMD level {level:?} is not supported by this CPU"
+        );
+        self.simd_level = level;
+        if let Some(engine) = self.lane_engine.0.as_mut() {
+            engine.set_simd_level(level);
+        }
+    }
+
+    /// This decoder's configuration restricted to a subset of its variables.
+    pub fn restricted_config(&self, variables: &[usize]) -> MinSumDecoderConfig {
+        MinSumDecoderConfig {
+            error_priors: self.config.error_priors.select(Axis(0), variables),
+            ..(*self.config).clone()
+        }
+    }
+
+    /// Build a decoder with this decoder's configuration for the sub-problem
+    /// given by `check_matrix` over a subset of its variables.
+    pub fn restricted(
+        &self,
+        check_matrix: Arc<SparseBitMatrix>,
+        variables: &[usize],
+    ) -> MinSumBPDecoder<N> {
+        MinSumBPDecoder::new(check_matrix, Arc::new(self.restricted_config(variables)))
+    }
+
+    /// Unscaled log prior ratios of the configuration, computed once at
+    /// construction.
+    pub fn log_prior_ratios_f64(&self) -> &Array1<f64> {
+        &self.log_prior_ratios_f64
+    }
+
+    /// Take the lane-batched engine sharing this decoder's graph and priors,
+    /// building it on first use. Hand it back with
+    /// [`MinSumBPDecoder::put_lane_engine`] so that later batches reuse its
+    /// buffers.
+    pub fn take_lane_engine(&mut self) -> MinSumLaneEngine<N> {
+        match self.lane_engine.0.take() {
+            // The configuration is public and may have been replaced.
+            Some(engine) if Arc::ptr_eq(engine.config(), &self.config) => engine,
+            _ => {
+                let lane_graph = self
+                    .lane_graph
+                    .get_or_init(|| Arc::new(LaneGraph::new(&self.check_matrix)))
+                    .clone();
+                let mut engine = MinSumLaneEngine::new(
+                    lane_graph,
+                    self.config.clone(),
+                    self.log_prior_ratios.to_vec(),
+                    self.max_data_value,
+                    self.data_scale_value,
+                );
+                engine.set_simd_level(self.simd_level);
+                engine
+            }
+        }
+    }
+
+    /// Keep an engine taken with [`MinSumBPDecoder::take_lane_engine`] for
+    /// the next batch.
+    pub fn put_lane_engine(&mut self, engine: MinSumLaneEngine<N>) {
+        self.lane_engine.0 = Some(engine);
+    }
+
     pub fn set_log_prior_ratio(&mut self, mut log_prior_ratios: Array1<N>) {
+        // The engine holds a copy of the priors.
+        self.lane_engine.0 = None;
         self.log_prior_ratios = match self.data_scale_value {
             Some(scale_val) => {
-                log_prior_ratios.iter_mut().for_each(|v| *v *= scale_val);
+                log_prior_ratios
+                    .iter_mut()
+                    .for_each(|v| *v = v.mul_sat(scale_val));
                 log_prior_ratios
             }
             None => log_prior_ratios,
@@ -190,11 +420,12 @@ where
     }
 
     pub fn set_log_prior_ratio_f64(&mut self, log_prior_ratios: Array1<f64>) {
+        self.lane_engine.0 = None;
         self.log_prior_ratios = match self.config.data_scale_value {
             Some(scale_val) => {
-                log_prior_ratios.mapv_into_any(|v| N::from_f64(scale_val * v).unwrap())
+                log_prior_ratios.mapv_into_any(|v| message_from_f64::<N>(scale_val * v))
             }
-            None => log_prior_ratios.mapv_into_any(|v| N::from_f64(v).unwrap()),
+            None => log_prior_ratios.mapv_into_any(message_from_f64::<N>),
         };
     }
 
@@ -206,81 +437,49 @@ where
     pub fn set_memory_strengths_f64(&mut self, memory_strengths: Array1<f64>) {
         self.memory_strengths = match self.config.data_scale_value {
             Some(scale_val) => {
-                memory_strengths.mapv_into_any(|v| N::from_f64(scale_val * v).unwrap())
+                memory_strengths.mapv_into_any(|v| message_from_f64::<N>(scale_val * v))
             }
-            None => memory_strengths.mapv_into_any(|v| N::from_f64(v).unwrap()),
+            None => memory_strengths.mapv_into_any(message_from_f64::<N>),
         };
     }
 
+    /// Set external memory strengths from messages that are already scaled.
+    pub fn assign_memory_strengths(&mut self, memory_strengths: ArrayView1<N>) {
+        self.memory_strengths.assign(&memory_strengths);
+    }
+
     /// Set external memory strengths from N. Applies scaling if needed.
     pub fn set_memory_strengths(&mut self, mut memory_strengths: Array1<N>) {
         self.memory_strengths = match self.data_scale_value {
             Some(scale_val) => {
-                memory_strengths.iter_mut().for_each(|v| *v *= scale_val);
+                memory_strengths
+                    .iter_mut()
+                    .for_each(|v| *v = v.mul_sat(scale_val));
                 memory_strengths
             }
             None => memory_strengths,
         };
     }
 
-    // Construct a new check message graph
-    fn build_check_to_variable(check_matrix: Arc<SparseBitMatrix>) -> SparseBipartiteGraph<N> {
-        let check_matrix_csc = check_matrix.to_csc();
-
-        let default_messages: Vec<_> = vec![N::default(); check_matrix_csc.nnz()];
-
-        SparseBipartiteGraph::new_csc(
-            check_matrix_csc.shape(),
-            check_matrix_csc.indptr().raw_storage().to_vec(),
-            check_matrix_csc.indices().to_vec(),
-            default_messages,
-        )
-    }
-
-    // Construct a new variable message graph
-    fn build_variable_to_check(check_matrix: Arc<SparseBitMatrix>) -> SparseBipartiteGraph<N> {
-        let check_matrix_csr = check_matrix.to_csr();
-
-        let default_messages: Vec<_> = vec![N::default(); check_matrix_csr.nnz()];
-
-        SparseBipartiteGraph::new(
-            check_matrix_csr.shape(),
-            check_matrix_csr.indptr().raw_storage().to_vec(),
-            check_matrix_csr.indices().to_vec(),
-            default_messages,
-        )
-    }
-
-    fn build_nnz_maps(
-        check_to_variable: CsMatView<N>,
-        variable_to_check: CsMatView<N>,
-    ) -> (Vec<usize>, Vec<usize>) {
-        let mut check_to_variable_nnz_map: Vec<usize> = Vec::with_capacity(check_to_variable.nnz());
-        for (_, (row, col)) in check_to_variable.view().iter() {
-            check_to_variable_nnz_map.push(variable_to_check.nnz_index(row, col).unwrap().0);
-        }
-        let mut variable_to_check_nnz_map: Vec<usize> = Vec::with_capacity(variable_to_check.nnz());
-        for (_, (row, col)) in variable_to_check.view().iter() {
-            variable_to_check_nnz_map.push(check_to_variable.nnz_index(row, col).unwrap().0);
-        }
-        (check_to_variable_nnz_map, variable_to_check_nnz_map)
-    }
-
     /// Initialize variable message state to the prior
     pub fn initialize_variable_to_check(&mut self) {
-        for mut row_vec in self.variable_to_check.outer_iterator_mut() {
-            row_vec
-                .iter_mut()
-                .for_each(|(col_ind, val)| *val = self.log_prior_ratios[col_ind]);
+        // The layered schedule forms variable messages from the posteriors.
+        if self.config.schedule != BPSchedule::Flooding {
+            return;
         }
+        with_compact_graph!(&self.graph, graph => {
+            for (message, variable) in izip!(&mut self.messages, graph.row_indices()) {
+                *message = self.log_prior_ratios[variable.index()];
+            }
+        })
     }
 
     pub fn initialize_check_to_variable(&mut self) {
-        for mut col_vec in self.check_to_variable.outer_iterator_mut() {
-            col_vec
-                .iter_mut()
-                .for_each(|(_row_ind, val)| *val = N::zero());
+        // The flooding schedule recomputes all check messages before use.
+        if self.config.schedule != BPSchedule::Layered {
+            return;
         }
+        self.messages.fill(N::zero());
     }
 
     pub fn initialize_memory_strengths(&mut self) {
@@ -306,177 +505,57 @@ where
     }
 
     fn alpha(&self) -> N {
-        let mut alpha = match self.config.alpha {
-            Some(0.) => {
-                let iteration = (self.current_iteration + 1) as f64;
-                1.0 - (2_f64).powf(-(iteration / self.config.alpha_iteration_scaling_factor))
-            }
-            Some(val) => val,
-            None => 1.0,
-        };
-
-        // Handle case of alpha < 0 defaulting to 1.
-        // This aligns with integer case of ldpc-simulation
-        if alpha < 0. {
-            alpha = 1.
-        }
-        // Scale if needed
-        alpha = match self.config.data_scale_value {
-            Some(scale_val) => scale_val * alpha,
-            None => alpha,
-        };
-
-        N::from_f64(alpha).unwrap()
-    }
-
-    /// Compute the two smallest magnitudes in a slice of messages.
-    ///
-    /// Uses `LANES` independent accumulators with branchless (select-style)
-    /// updates. Unlike a single running (min, second_min, min_ind) triple,
-    /// the lanes carry no dependency on each other, so the CPU can overlap
-    /// iterations and LLVM can detect the vectorization opportunities.
-    /// This makes uses of the SIMD instructions more efficient.
-    #[inline]
-    fn min_two_magnitudes(messages: &[N]) -> (N, N) {
-        // Fix the number of lanes to 4 since Arm Neon registers are 128 bits wide.
-        // Although AVX2 registers are 256 bits wide, we still stick to 4 lanes since
-        // qLDPC codes typically have a small number of check-node connectivity.
-        // Wider lanes would not provide significant benefits for the typical use case.
-        const LANES: usize = 4;
-        let mut min1 = [N::max_value(); LANES];
-        let mut min2 = [N::max_value(); LANES];
-
-        // Branchless two-smallest update:
-        //   min1' = min(abs_msg, min1)
-        //   min2' = min(max(abs_msg, min1), min2)
-        let mut chunks = messages.chunks_exact(LANES);
-        for chunck in &mut chunks {
-            for k in 0..LANES {
-                let abs_msg = chunck[k].abs();
-                let lo = if abs_msg < min1[k] { abs_msg } else { min1[k] };
-                let hi = if abs_msg < min1[k] { min1[k] } else { abs_msg };
-
-                min1[k] = lo;
-                if hi < min2[k] {
-                    min2[k] = hi;
-                }
-            }
-        }
-
-        for msg in chunks.remainder() {
-            let abs_msg = msg.abs();
-            let lo = if abs_msg < min1[0] { abs_msg } else { min1[0] };
-            let hi = if abs_msg < min1[0] { min1[0] } else { abs_msg };
-            min1[0] = lo;
-            if hi < min2[0] {
-                min2[0] = hi;
-            }
-        }
-
-        // Merge the per-lane results.
-        let mut min_message = N::max_value();
-        let mut second_min_message = N::max_value();
-        for k in 0..LANES {
-            // lo = min(min1[k], min_message)
-            // hi = max(min1[k], min_message)
-            // second_min = min(hi, min2[k], second_min_message)
-
-            let lo = if min1[k] < min_message {
-                min1[k]
-            } else {
-                min_message
-            };
-            let hi = if min1[k] < min_message {
-                min_message
-            } else {
-                min1[k]
-            };
-
-            min_message = lo;
-            if hi < second_min_message {
-                second_min_message = hi;
-            }
-            if min2[k] < second_min_message {
-                second_min_message = min2[k];
-            }
-        }
-        (min_message, second_min_message)
+        message_from_f64(self.config.scaled_alpha(self.current_iteration))
     }
 
     /// Compute check to bit message iteration
-    fn compute_check_to_variable(
+    ///
+    /// Replaces the variable to check messages of every row in place with
+    /// its check to variable messages.
+    #[inline(always)]
+    fn compute_check_to_variable<I: GraphIndex>(
         &mut self,
+        graph: &CompactBipartiteGraph<I>,
         detectors: ArrayView1<Bit>,
-    ) -> &mut SparseBipartiteGraph<N> {
+    ) {
         let alpha = self.alpha();
         let scale = self.data_scale_value;
-        // Field-level borrows: mutable on check_to_variable, immutable on the
-        // rest. These are disjoint fields, so the borrows can coexist.
-        let check_to_variable_data = self.check_to_variable.data_mut();
-        let variable_to_check_nnz_map = &self.variable_to_check_nnz_map;
-
-        for (var_check_row_ind, var_check_row_vec) in
-            self.variable_to_check.outer_iterator().enumerate()
-        {
-            let data_range = self
-                .variable_to_check
-                .indptr()
-                .outer_inds(var_check_row_ind);
-            let messages = &self.variable_to_check.data()[data_range.clone()];
-            let row_nnz_map = &variable_to_check_nnz_map[data_range.clone()];
+
+        for check in 0..graph.rows() {
+            let messages = &mut self.messages[graph.row_range(check)];
 
             if messages.is_empty() {
                 continue;
             }
 
-            // Parity of the message signs. A single XOR per element
-            let mut accumulated_sign = detectors[var_check_row_ind] == 1;
-            for msg in messages {
-                accumulated_sign ^= msg.is_negative();
-            }
-
-            let (min_message, second_min_message) = Self::min_two_magnitudes(messages);
+            let (accumulated_sign, min_message, second_min_message) =
+                simd::check_row_reduce(messages, detectors[check] == 1);
 
-            debug!("Variable messages for row {var_check_row_ind:?}: {var_check_row_vec:?}");
+            debug!("Variable messages for row {check:?}: {messages:?}");
 
             // Every outgoing message of this check takes one of exactly two
-            // magnitudes, so apply alpha -- and the optional fixed-point
-            // rescale, which used to be a separate pass over every nonzero of
-            // the whole matrix -- once per row instead of once per element.
-            // (alpha * mag) / scale element-wise is identical, including
-            // integer truncation, to computing it on the two row constants.
-            let mut out_min = alpha * min_message;
-            let mut out_second_min = alpha * second_min_message;
+            // magnitudes, so apply alpha and the optional fixed-point rescale
+            // once per row instead of once per element. (alpha * mag) / scale
+            // element-wise is identical, including integer truncation, to
+            // computing it on the two row constants.
+            let mut out_min = alpha.mul_sat(min_message);
+            let mut out_second_min = alpha.mul_sat(second_min_message);
             if let Some(scale_val) = scale {
                 out_min /= scale_val;
                 out_second_min /= scale_val;
             }
 
-            // Write the messages. The minimum's position is found by
-            // value instead of by index: an incoming message whose magnitude
-            // equals the minimum receives the second minimum. If the minimum
-            // is duplicated, second_min == min, so every element receives the
-            // same value the index-tracking version produced.
-            for (map_ind, msg) in izip!(row_nnz_map, messages) {
-                let check_to_variable_sign = accumulated_sign ^ msg.is_negative();
-                let mut check_to_variable = if msg.abs() == min_message {
-                    out_second_min
-                } else {
-                    out_min
-                };
-                if check_to_variable_sign {
-                    check_to_variable = check_to_variable.neg();
-                }
-
-                // We directly manipulate the indicies of the check_to_variable_matrix using
-                // the cached value map to avoid the need for a logarithmic insert
-                check_to_variable_data[*map_ind] = check_to_variable;
-            }
+            simd::check_row_write(
+                messages,
+                accumulated_sign,
+                min_message,
+                out_min,
+                out_second_min,
+            );
         }
-
-        &mut self.check_to_variable
     }
 
+    #[inline(always)]
     fn compute_variable_prior(&self, variable: usize) -> N {
         // Apply membp
         if self.config.gamma0.is_some() {
@@ -486,77 +565,153 @@ where
             let scaled_one = self.data_scale_value.unwrap_or(N::one());
             // First divide through denominator before numerator to avoid overflow
             let prior_component = (self.log_prior_ratios[variable] / scaled_one)
-                * (scaled_one - self.memory_strengths[variable]);
-            let posterior_component =
-                (self.posterior_ratios[variable] / scaled_one) * self.memory_strengths[variable];
-            return prior_component + posterior_component;
+                .mul_sat(scaled_one.sub_sat(self.memory_strengths[variable]));
+            let posterior_component = (self.posterior_ratios[variable] / scaled_one)
+                .mul_sat(self.memory_strengths[variable]);
+            return prior_component.add_sat(posterior_component);
         }
         self.log_prior_ratios[variable]
     }
 
     /// Compute bit to check message iteration
-    fn compute_variable_to_check(&mut self) -> &mut SparseBipartiteGraph<N> {
-        for (check_var_col_ind, check_var_col_vec) in
-            self.check_to_variable.outer_iterator().enumerate()
-        {
+    ///
+    /// Gathers the check to variable messages of every variable through the
+    /// graph's column to row edge map and replaces them in place with its
+    /// variable to check messages.
+    #[inline(always)]
+    fn compute_variable_to_check<I: GraphIndex>(&mut self, graph: &CompactBipartiteGraph<I>) {
+        for variable in 0..graph.cols() {
             // Accumulate messages
-            let mut check_to_var_row_sum = self.compute_variable_prior(check_var_col_ind);
+            let mut check_to_var_row_sum = self.compute_variable_prior(variable);
 
-            debug!("Check messages for col {check_var_col_ind:?}: {check_var_col_vec:?}");
+            let col_edges = &graph.col_to_row_edges()[graph.col_range(variable)];
+            let check_messages = &mut self.edge_buffer[..col_edges.len()];
+            for (check_message, row_edge) in izip!(check_messages.iter_mut(), col_edges) {
+                *check_message = self.messages[row_edge.index()];
+            }
 
-            let data_range = self
-                .check_to_variable
-                .indptr()
-                .outer_inds(check_var_col_ind);
+            debug!("Check messages for col {variable:?}: {check_messages:?}");
 
             // Perform iteration in the forward direction to accumulate left to right
-            for (ind, check_var_row_val) in izip!(
-                data_range.clone(),
-                &self.check_to_variable.data()[data_range.clone()]
-            ) {
-                self.variable_to_check.data_mut()[self.check_to_variable_nnz_map[ind]] =
-                    check_to_var_row_sum;
-                check_to_var_row_sum += *check_var_row_val;
+            for (row_edge, check_var_row_val) in izip!(col_edges, check_messages.iter()) {
+                self.messages[row_edge.index()] = check_to_var_row_sum;
+                check_to_var_row_sum = check_to_var_row_sum.add_sat(*check_var_row_val);
             }
 
-            self.posterior_ratios[check_var_col_ind] = check_to_var_row_sum;
+            self.posterior_ratios[variable] = check_to_var_row_sum;
 
             // Now perform iteration in the reverse direction to accumulate right to left
             check_to_var_row_sum = N::zero();
             // Remove each messages contribution
-            for (ind, check_var_row_val) in izip!(
-                data_range.clone(),
-                &self.check_to_variable.data()[data_range.clone()]
-            )
-            .rev()
-            {
-                let map_ind = self.check_to_variable_nnz_map[ind];
-                self.variable_to_check.data_mut()[map_ind] += check_to_var_row_sum;
-                check_to_var_row_sum += *check_var_row_val;
-
-                // We directly manipulate the indicies of the variable_to_check matrix using
-                // the cached value map to avoid the need for a logarithmic insert
-                debug!(
-                    "location ({:?}, {:?}), variable_to_check: {:.32}",
-                    self.check_to_variable.indices()[ind],
-                    check_var_col_ind,
-                    self.variable_to_check.data_mut()[self.check_to_variable_nnz_map[ind]]
-                );
+            for (row_edge, check_var_row_val) in izip!(col_edges, check_messages.iter()).rev() {
+                let message = &mut self.messages[row_edge.index()];
+                *message = message.add_sat(check_to_var_row_sum);
+                check_to_var_row_sum = check_to_var_row_sum.add_sat(*check_var_row_val);
             }
         }
 
         self.bound_magnitudes();
+    }
+
+    /// Run a row-layered iteration.
+    ///
+    /// The posteriors are rebuilt from the (memory) priors and the check
+    /// messages of the previous iteration. Each check row then removes its
+    /// own previous contribution from the posteriors of its variables to form
+    /// the variable messages, computes its new check messages and adds them
+    /// straight back into the posteriors.
+    #[inline(always)]
+    fn compute_layered<I: GraphIndex>(
+        &mut self,
+        graph: &CompactBipartiteGraph<I>,
+        detectors: ArrayView1<Bit>,
+    ) {
+        let alpha = self.alpha();
+        let scale = self.data_scale_value;
+        let max_data_value = self.max_data_value;
+        let bound = |value: N| match max_data_value {
+            Some(max_val) => Self::bound_value_magnitude(value, max_val),
+            None => value,
+        };
+
+        for variable in 0..graph.cols() {
+            let mut posterior = self.compute_variable_prior(variable);
+            for row_edge in &graph.col_to_row_edges()[graph.col_range(variable)] {
+                posterior = posterior.add_sat(self.messages[row_edge.index()]);
+            }
+            self.posterior_ratios[variable] = bound(posterior);
+        }
+
+        for check in 0..graph.rows() {
+            let data_range = graph.row_range(check);
+            if data_range.is_empty() {
+                continue;
+            }
+            let variables = &graph.row_indices()[data_range.clone()];
+            let check_messages = &mut self.messages[data_range];
+            let messages = &mut self.edge_buffer[..variables.len()];
 
-        &mut self.variable_to_check
+            // Variable messages are the posteriors without this row's contribution.
+            for (msg, check_to_variable, variable) in
+                izip!(messages.iter_mut(), check_messages.iter(), variables)
+            {
+                *msg = bound(self.posterior_ratios[variable.index()].sub_sat(*check_to_variable));
+            }
+
+            let (accumulated_sign, min_message, second_min_message) =
+                simd::check_row_reduce(messages, detectors[check] == 1);
+
+            let mut out_min = alpha.mul_sat(min_message);
+            let mut out_second_min = alpha.mul_sat(second_min_message);
+            if let Some(scale_val) = scale {
+                out_min /= scale_val;
+                out_second_min /= scale_val;
+            }
+
+            for (msg, check_message, variable) in
+                izip!(messages.iter(), check_messages.iter_mut(), variables)
+            {
+                let check_to_variable = simd::check_message(
+                    *msg,
+                    accumulated_sign,
+                    min_message,
+                    out_min,
+                    out_second_min,
+                );
+                *check_message = check_to_variable;
+                self.posterior_ratios[variable.index()] = bound(msg.add_sat(check_to_variable));
+            }
+        }
     }
 
     pub fn run_iteration(&mut self, detectors: ArrayView1<Bit>) {
+        simd::dispatch(
+            self.simd_level,
+            IterationKernel {
+                decoder: self,
+                detectors,
+            },
+        );
+    }
+
+    #[inline(always)]
+    fn run_iteration_kernel(&mut self, detectors: ArrayView1<Bit>) {
         debug!("Iteration {:?} start", self.current_iteration);
-        self.compute_check_to_variable(detectors);
-        // Now compute variable to check messages
-        self.compute_variable_to_check();
+        // Dispatch once on the index width so the passes below are
+        // monomorphized for it.
+        let graph = self.graph.clone();
+        with_compact_graph!(&graph, graph => {
+            match self.config.schedule {
+                BPSchedule::Flooding => {
+                    self.compute_check_to_variable(graph, detectors);
+                    // Now compute variable to check messages
+                    self.compute_variable_to_check(graph);
+                }
+                BPSchedule::Layered => self.compute_layered(graph, detectors),
+            }
 
-        self.compute_hard_decision();
+            self.compute_hard_decision(graph);
+        });
         debug!("Iteration {:?} end", self.current_iteration);
     }
 
@@ -569,38 +724,113 @@ where
         DecodeResult {
             decoding: self.decoding.clone(),
             decoded_detectors,
-            posterior_ratios: self.posterior_ratios.clone().mapv_into_any(|val| {
-                let posterior = N::to_f64(&val).unwrap();
-                match self.config.data_scale_value {
-                    Some(scale_val) => posterior / scale_val,
-                    None => posterior,
-                }
-            }),
+            posterior_ratios: self.unscaled_posterior_ratios(&self.posterior_ratios),
             success,
             decoding_quality: if success {
-                self.get_decoding_quality(self.decoding.clone().view())
+                self.decoding_quality()
             } else {
                 f64::MAX
             },
             iterations: self.current_iteration,
             max_iter,
+            budget_exhausted: false,
+            extra: BPExtraResult::None,
+        }
+    }
+
+    fn unscaled_posterior_ratios(&self, posterior_ratios: &Array1<N>) -> Array1<f64> {
+        posterior_ratios.mapv(|val| {
+            let posterior = N::to_f64(&val).unwrap();
+            match self.config.data_scale_value {
+                Some(scale_val) => posterior / scale_val,
+                None => posterior,
+            }
+        })
+    }
+
+    /// Decoding quality of the current hard decision, see
+    /// [`Decoder::get_decoding_quality`].
+    pub fn decoding_quality(&self) -> f64 {
+        let mut decoding_quality: f64 = 0.0;
+        for (bit, log_prior_ratio) in self.decoding.iter().zip(self.log_prior_ratios_f64.iter()) {
+            if *bit == 1 && f64::is_finite(*log_prior_ratio) {
+                decoding_quality += log_prior_ratio;
+            }
+        }
+        decoding_quality
+    }
+
+    /// Allocate a solution buffer for this decoder.
+    pub fn new_solution(&self) -> MinSumSolution<N> {
+        MinSumSolution {
+            decoding: Array1::zeros(self.decoding.len()),
+            posterior_ratios: Array1::zeros(self.posterior_ratios.len()),
+            residual_syndrome: Array1::zeros(self.residual_syndrome.len()),
+            success: false,
+            decoding_quality: f64::MAX,
+            iterations: 0,
+            max_iter: 0,
+        }
+    }
+
+    /// Copy the current state into a solution buffer. The decoding quality
+    /// is computed by the caller as it is usually known already.
+    pub fn store_solution(
+        &self,
+        solution: &mut MinSumSolution<N>,
+        success: bool,
+        decoding_quality: f64,
+        max_iter: usize,
+    ) {
+        solution.decoding.assign(&self.decoding);
+        solution.posterior_ratios.assign(&self.posterior_ratios);
+        solution.residual_syndrome.assign(&self.residual_syndrome);
+        solution.success = success;
+        solution.decoding_quality = if success { decoding_quality } else { f64::MAX };
+        solution.iterations = self.current_iteration;
+        solution.max_iter = max_iter;
+    }
+
+    /// Copy the state relayed between legs of the shot being decoded from a
+    /// decoder of the same problem: the posteriors and the hard decision with
+    /// its residual syndrome. Messages and memory strengths are set per leg.
+    pub fn copy_shot_state(&mut self, other: &MinSumBPDecoder<N>) {
+        self.posterior_ratios.assign(&other.posterior_ratios);
+        self.decoding.assign(&other.decoding);
+        self.residual_syndrome.assign(&other.residual_syndrome);
+        self.residual_weight = other.residual_weight;
+        self.decoding_hash = other.decoding_hash;
+        self.current_iteration = other.current_iteration;
+    }
+
+    /// Build the result of a stored solution for the given syndrome.
+    pub fn solution_result(
+        &self,
+        solution: &MinSumSolution<N>,
+        detectors: ArrayView1<Bit>,
+    ) -> DecodeResult {
+        DecodeResult {
+            decoding: solution.decoding.clone(),
+            decoded_detectors: &detectors ^ &solution.residual_syndrome,
+            posterior_ratios: self.unscaled_posterior_ratios(&solution.posterior_ratios),
+            success: solution.success,
+            decoding_quality: solution.decoding_quality,
+            iterations: solution.iterations,
+            max_iter: solution.max_iter,
+            budget_exhausted: false,
             extra: BPExtraResult::None,
         }
     }
+    #[inline(always)]
     fn bound_magnitudes(&mut self) {
         // Bound magnitudes
         if let Some(max_val) = self.max_data_value {
-            self.variable_to_check
-                .data_mut()
-                .iter_mut()
-                .for_each(|v| *v = Self::bound_value_magnitude(*v, max_val));
-            self.posterior_ratios
-                .iter_mut()
-                .for_each(|v| *v = Self::bound_value_magnitude(*v, max_val));
+            simd::clamp_magnitudes(&mut self.messages, max_val);
+            simd::clamp_magnitudes(self.posterior_ratios.as_slice_mut().unwrap(), max_val);
         }
     }
 
-    fn bound_value_magnitude(value: N, max_val: N) -> N
+    pub(crate) fn bound_value_magnitude(value: N, max_val: N) -> N
     where
         N: std::ops::Add,
     {
@@ -613,18 +843,75 @@ where
         }
     }
 
-    fn compute_hard_decision(&mut self) {
+    #[inline(always)]
+    fn compute_hard_decision<I: GraphIndex>(&mut self, graph: &CompactBipartiteGraph<I>) {
+        let residual_syndrome = &mut self.residual_syndrome;
+        let mut residual_weight = self.residual_weight;
         for (idx, posterior) in self.posterior_ratios.iter().enumerate() {
-            self.decoding[idx] = Bit::from((*posterior) <= N::zero());
+            let bit = Bit::from((*posterior) <= N::zero());
+            if bit == self.decoding[idx] {
+                continue;
+            }
+            self.decoding[idx] = bit;
+            self.decoding_hash ^= variable_hash_key(idx);
+            // Only the checks of a flipped variable change parity.
+            for check in &graph.col_indices()[graph.col_range(idx)] {
+                let check = check.index();
+                residual_syndrome[check] ^= 1;
+                if residual_syndrome[check] == 1 {
+                    residual_weight += 1;
+                } else {
+                    residual_weight -= 1;
+                }
+            }
         }
+        self.residual_weight = residual_weight;
         debug!("Posteriors: {:?}", self.posterior_ratios);
         debug!("Hard decision: {:?}", self.decoding);
     }
 
+    /// Hash of the current hard decision, equal for equal hard decisions.
+    pub fn decoding_hash(&self) -> u64 {
+        self.decoding_hash
+    }
+
     pub fn compute_decoded_detectors(&self) -> Array1<Bit> {
         self.get_detectors(self.decoding.view())
     }
 
+    /// Set the syndrome of the problem being decoded and compute the residual
+    /// syndrome of the current hard decision against it. The residual is then
+    /// maintained incrementally by every iteration.
+    pub fn initialize_residual_syndrome(&mut self, detectors: ArrayView1<Bit>) {
+        self.residual_weight = 0;
+        with_compact_graph!(&self.graph, graph => {
+            for (check, detector) in detectors.iter().enumerate() {
+                let mut residual = *detector;
+                for variable in &graph.row_indices()[graph.row_range(check)] {
+                    residual ^= self.decoding[variable.index()];
+                }
+                self.residual_syndrome[check] = residual;
+                self.residual_weight += residual as usize;
+            }
+        })
+    }
+
+    /// Number of unsatisfied checks of the current hard decision.
+    pub fn residual_weight(&self) -> usize {
+        self.residual_weight
+    }
+
+    /// Whether the current hard decision satisfies the syndrome set with
+    /// [`MinSumBPDecoder::initialize_residual_syndrome`].
+    pub fn residual_converged(&self) -> bool {
+        self.residual_weight == 0
+    }
+
+    /// Syndrome of the current hard decision, recovered from the residual.
+    pub fn residual_decoded_detectors(&self, detectors: ArrayView1<Bit>) -> Array1<Bit> {
+        &detectors ^ &self.residual_syndrome
+    }
+
     // Check the convergence of the problem instance
     pub fn check_convergence(
         &self,
@@ -635,6 +922,43 @@ where
     }
 }
 
+/// A single BP iteration run by [`simd::dispatch`].
+struct IterationKernel<'a, N: PartialEq + Default + Clone + Copy> {
+    decoder: &'a mut MinSumBPDecoder<N>,
+    detectors: ArrayView1<'a, Bit>,
+}
+
+impl<N> SimdKernel for IterationKernel<'_, N>
+where
+    N: PartialEq
+        + Debug
+        + Default
+        + Clone
+        + Copy
+        + Signed
+        + Bounded
+        + FromPrimitive
+        + ToPrimitive
+        + std::cmp::PartialOrd
+        + std::ops::Add
+        + std::ops::AddAssign
+        + std::ops::DivAssign
+        + std::ops::Mul<N>
+        + std::ops::MulAssign
+        + Send
+        + Sync
+        + std::fmt::Display
+        + MessageArithmetic
+        + 'static,
+{
+    type Output = ();
+
+    #[inline(always)]
+    fn run(self) {
+        self.decoder.run_iteration_kernel(self.detectors);
+    }
+}
+
 impl<N> Decoder for MinSumBPDecoder<N>
 where
     N: PartialEq
@@ -655,6 +979,7 @@ where
         + Send
         + Sync
         + std::fmt::Display
+        + MessageArithmetic
         + 'static,
 {
     fn check_matrix(&self) -> Arc<SparseBitMatrix> {
@@ -662,20 +987,29 @@ where
     }
 
     fn log_prior_ratios(&mut self) -> Array1<f64> {
-        self.config.log_prior_ratios()
+        (*self.log_prior_ratios_f64).clone()
+    }
+
+    fn get_decoding_quality(&mut self, errors: ArrayView1<u8>) -> f64 {
+        let mut decoding_quality: f64 = 0.0;
+        for (error, log_prior_ratio) in errors.iter().zip(self.log_prior_ratios_f64.iter()) {
+            if *error == 1 && f64::is_finite(*log_prior_ratio) {
+                decoding_quality += log_prior_ratio;
+            }
+        }
+        decoding_quality
     }
 
     fn decode_detailed(&mut self, detectors: ArrayView1<Bit>) -> DecodeResult {
         // Initialize probability ratios
         self.initialize_decoder();
+        self.initialize_residual_syndrome(detectors);
         let mut success: bool = false;
-        let mut decoded_detectors = Array1::default(detectors.dim());
 
         for _ in 0..self.config.max_iter {
             self.run_iteration(detectors);
             self.current_iteration += 1;
-            decoded_detectors = self.compute_decoded_detectors();
-            success = self.check_convergence(detectors, decoded_detectors.view());
+            success = self.residual_converged();
 
             // If we have converged may now exit
             if success {
@@ -684,8 +1018,30 @@ where
             }
         }
 
+        let decoded_detectors = self.residual_decoded_detectors(detectors);
         self.build_result(success, decoded_detectors, self.config.max_iter)
     }
+
+    fn decode_batch_into(&mut self, detectors: ArrayView2<Bit>, out: ArrayViewMut2<Bit>) {
+        let mut engine = self.take_lane_engine();
+        engine.decode_batch_into(detectors, out, self.config.max_iter);
+        self.put_lane_engine(engine);
+    }
+
+    fn decode_detailed_batch(&mut self, detectors: ArrayView2<Bit>) -> Vec<DecodeResult> {
+        let mut engine = self.take_lane_engine();
+        let results = engine.decode_detailed_batch(detectors, self.config.max_iter);
+        self.put_lane_engine(engine);
+        results
+    }
+
+    fn restricted_decoder(
+        &self,
+        check_matrix: Arc<SparseBitMatrix>,
+        variables: &[usize],
+    ) -> Option<Box<dyn Decoder + Send>> {
+        Some(Box::new(self.restricted(check_matrix, variables)))
+    }
 }
 
 impl<N> DecoderRunner for MinSumBPDecoder<N> where
@@ -707,13 +1063,14 @@ impl<N> DecoderRunner for MinSumBPDecoder<N> where
         + Send
         + Sync
         + std::fmt::Display
+        + MessageArithmetic
         + 'static
 {
 }
 
 #[cfg(test)]
 mod tests {
-    use crate::bipartite_graph::BipartiteGraph;
+    use crate::bipartite_graph::{BipartiteGraph, SparseBipartiteGraph};
 
     use super::*;
     use env_logger;
@@ -728,6 +1085,25 @@ mod tests {
         let _ = env_logger::builder().is_test(true).try_init();
     }
 
+    #[test]
+    fn calibrate_integer_scaling() {
+        let mut config = MinSumDecoderConfig {
+            error_priors: array![0.01, 0.001, 0.],
+            ..Default::default()
+        };
+        // The largest finite log prior ratio is ln(999) ~ 6.9.
+        assert_eq!(config.integer_scaling(i8::MAX as f64, 2.), (3., 42.));
+        config.calibrate_integer_scaling(i16::MAX as f64, 2.);
+        assert_eq!(config.data_scale_value, Some(48.));
+        assert_eq!(config.max_data_value, Some(682.));
+
+        let config = MinSumDecoderConfig {
+            error_priors: array![0.5],
+            ..Default::default()
+        };
+        assert_eq!(config.integer_scaling(i8::MAX as f64, 2.), (11., 11.));
+    }
+
     #[test]
     fn decode_detailed_repetition_code() {
         init();
@@ -915,6 +1291,197 @@ mod tests {
         }
     }
 
+    #[test]
+    fn decode_batch_lanes_match_single_shot_144_12_12() {
+        let resources = get_test_data_path();
+        let code_144_12_12 =
+            DetectorErrorModel::load(resources.join("144_12_12")).expect("Unable to load the code");
+        let detectors_144_12_12: Array2<Bit> =
+            read_npy(resources.join("144_12_12_detectors.npy")).expect("Unable to open file");
+        let check_matrix = Arc::new(code_144_12_12.detector_error_matrix);
+        let bp_config_144_12_12 = MinSumDecoderConfig {
+            error_priors: code_144_12_12.error_priors,
+            alpha: Some(0.),
+            gamma0: Some(0.15),
+            ..Default::default()
+        };
+        let config = Arc::new(bp_config_144_12_12);
+
+        let mut decoder_144_12_12: MinSumBPDecoder<f64> =
+            MinSumBPDecoder::new(check_matrix, config);
+        // Not a multiple of the lane count so that lanes go idle at the end.
+        let num_errors = 37;
+        let detectors_slice = detectors_144_12_12.slice(s![..num_errors, ..]);
+
+        let batch_results = decoder_144_12_12.decode_detailed_batch(detectors_slice);
+        let batch_decodings = decoder_144_12_12.decode_batch(detectors_slice);
+        for (i, detectors) in detectors_slice.axis_iter(Axis(0)).enumerate() {
+            let result = decoder_144_12_12.decode_detailed(detectors);
+            assert_eq!(batch_results[i].decoding, result.decoding);
+            assert_eq!(batch_results[i].posterior_ratios, result.posterior_ratios);
+            assert_eq!(batch_results[i].iterations, result.iterations);
+            assert_eq!(batch_results[i].success, result.success);
+            assert_eq!(batch_decodings.row(i), result.decoding);
+        }
+
+        // The engine is reused between batches, starting from the lanes the
+        // previous batch left idle.
+        let reused_results =
+            decoder_144_12_12.decode_detailed_batch(detectors_slice.slice(s![5.., ..]));
+        for (result, expected) in reused_results.iter().zip(&batch_results[5..]) {
+            assert_eq!(result.decoding, expected.decoding);
+            assert_eq!(result.posterior_ratios, expected.posterior_ratios);
+            assert_eq!(result.iterations, expected.iterations);
+        }
+    }
+
+    #[test]
+    fn simd_levels_match_scalar_144_12_12() {
+        let resources = get_test_data_path();
+        let code_144_12_12 =
+            DetectorErrorModel::load(resources.join("144_12_12")).expect("Unable to load the code");
+        let detectors_144_12_12: Array2<Bit> =
+            read_npy(resources.join("144_12_12_detectors.npy")).expect("Unable to open file");
+        let check_matrix = Arc::new(code_144_12_12.detector_error_matrix);
+        let num_errors = 20;
+        let detectors_slice = detectors_144_12_12.slice(s![..num_errors, ..]);
+
+        for schedule in [BPSchedule::Flooding, BPSchedule::Layered] {
+            let config = Arc::new(MinSumDecoderConfig {
+                error_priors: code_144_12_12.error_priors.clone(),
+                max_iter: 50,
+                gamma0: Some(0.15),
+                schedule,
+                ..Default::default()
+            });
+            let mut scalar_decoder: MinSumBPDecoder<f32> =
+                MinSumBPDecoder::new(check_matrix.clone(), config.clone());
+            scalar_decoder.set_simd_level(SimdLevel::Scalar);
+            let mut decoder: MinSumBPDecoder<f32> =
+                MinSumBPDecoder::new(check_matrix.clone(), config);
+            assert_eq!(decoder.simd_level(), SimdLevel::detect());
+
+            let scalar_results = scalar_decoder.decode_detailed_batch(detectors_slice);
+            let results = decoder.decode_detailed_batch(detectors_slice);
+            for (i, detectors) in detectors_slice.axis_iter(Axis(0)).enumerate() {
+                let scalar_result = scalar_decoder.decode_detailed(detectors);
+                let result = decoder.decode_detailed(detectors);
+                assert_eq!(scalar_result.posterior_ratios, result.posterior_ratios);
+                assert_eq!(
+                    scalar_results[i].posterior_ratios,
+                    results[i].posterior_ratios
+                );
+                assert_eq!(scalar_results[i].decoding, result.decoding);
+            }
+        }
+    }
+
+    #[test]
+    fn residual_syndrome_tracks_decoding_144_12_12() {
+        let resources = get_test_data_path();
+        let code_144_12_12 =
+            DetectorErrorModel::load(resources.join("144_12_12")).expect("Unable to load the code");
+        let detectors_144_12_12: Array2<Bit> =
+            read_npy(resources.join("144_12_12_detectors.npy")).expect("Unable to open file");
+        let check_matrix = Arc::new(code_144_12_12.detector_error_matrix);
+        let bp_config_144_12_12 = MinSumDecoderConfig {
+            error_priors: code_144_12_12.error_priors,
+            max_iter: 5,
+            ..Default::default()
+        };
+        let config = Arc::new(bp_config_144_12_12);
+
+        let mut decoder_144_12_12: MinSumBPDecoder<f64> =
+            MinSumBPDecoder::new(check_matrix, config);
+        for detectors in detectors_144_12_12.axis_iter(Axis(0)).take(20) {
+            let result = decoder_144_12_12.decode_detailed(detectors);
+            let decoded_detectors = decoder_144_12_12.compute_decoded_detectors();
+            assert_eq!(result.decoded_detectors, decoded_detectors);
+            assert_eq!(result.success, decoded_detectors == detectors);
+            assert_eq!(
+                decoder_144_12_12.residual_weight(),
+                izip!(detectors.iter(), decoded_detectors.iter())
+                    .filter(|(a, b)| a != b)
+                    .count()
+            );
+        }
+    }
+
+    #[test]
+    fn stored_solution_matches_result_144_12_12() {
+        let resources = get_test_data_path();
+        let code_144_12_12 =
+            DetectorErrorModel::load(resources.join("144_12_12")).expect("Unable to load the code");
+        let detectors_144_12_12: Array2<Bit> =
+            read_npy(resources.join("144_12_12_detectors.npy")).expect("Unable to open file");
+        let check_matrix = Arc::new(code_144_12_12.detector_error_matrix);
+        let bp_config_144_12_12 = MinSumDecoderConfig {
+            error_priors: code_144_12_12.error_priors,
+            max_iter: 50,
+            gamma0: Some(0.15),
+            ..Default::default()
+        };
+        let config = Arc::new(bp_config_144_12_12);
+
+        let mut decoder_144_12_12: MinSumBPDecoder<f64> =
+            MinSumBPDecoder::new(check_matrix, config);
+        let mut solution = decoder_144_12_12.new_solution();
+        for detectors in detectors_144_12_12.axis_iter(Axis(0)).take(20) {
+            let result = decoder_144_12_12.decode_detailed(detectors);
+            let decoding_quality = decoder_144_12_12.decoding_quality();
+            assert_eq!(
+                decoding_quality,
+                decoder_144_12_12.get_decoding_quality(result.decoding.view())
+            );
+            decoder_144_12_12.store_solution(&mut solution, result.success, decoding_quality, 50);
+            let stored_result = decoder_144_12_12.solution_result(&solution, detectors);
+            assert_eq!(stored_result.decoding, result.decoding);
+            assert_eq!(stored_result.decoded_detectors, result.decoded_detectors);
+            assert_eq!(stored_result.posterior_ratios, result.posterior_ratios);
+            assert_eq!(stored_result.success, result.success);
+            assert_eq!(stored_result.decoding_quality, result.decoding_quality);
+            assert_eq!(stored_result.iterations, result.iterations);
+            assert_eq!(stored_result.max_iter, result.max_iter);
+        }
+    }
+
+    #[test]
+    fn decode_detailed_144_12_12_layered() {
+        let resources = get_test_data_path();
+        let code_144_12_12 =
+            DetectorErrorModel::load(resources.join("144_12_12")).expect("Unable to load the code");
+        let detectors_144_12_12: Array2<Bit> =
+            read_npy(resources.join("144_12_12_detectors.npy")).expect("Unable to open file");
+        let check_matrix = Arc::new(code_144_12_12.detector_error_matrix);
+        let bp_config_144_12_12 = MinSumDecoderConfig {
+            error_priors: code_144_12_12.error_priors,
+            alpha: Some(0.),
+            gamma0: Some(0.15),
+            schedule: BPSchedule::Layered,
+            ..Default::default()
+        };
+        let config = Arc::new(bp_config_144_12_12);
+
+        let mut decoder_144_12_12: MinSumBPDecoder<f64> =
+            MinSumBPDecoder::new(check_matrix, config);
+        let num_errors = 100;
+        let detectors_slice = detectors_144_12_12.slice(s![..num_errors, ..]);
+        let results = decoder_144_12_12.decode_detailed_batch(detectors_slice);
+
+        assert!(
+            results.iter().map(|x| x.success as usize).sum::<usize>() as f64
+                >= (detectors_slice.shape()[0] as f64) * 0.93
+        );
+
+        // The lane-batched engine follows the same layered schedule.
+        for (i, detectors) in detectors_slice.axis_iter(Axis(0)).take(20).enumerate() {
+            let result = decoder_144_12_12.decode_detailed(detectors);
+            assert_eq!(results[i].decoding, result.decoding);
+            assert_eq!(results[i].posterior_ratios, result.posterior_ratios);
+            assert_eq!(results[i].iterations, result.iterations);
+        }
+    }
+
     #[test]
     fn decode_detailed_144_12_12_membp() {
         let resources = get_test_data_path();
@@ -12,7 +12,7 @@ use fixed::{types::extra as fbits, FixedI64};
 
 use crate::bp::min_sum::{MinSumBPDecoder, MinSumDecoderConfig};
 use crate::decoder::{Bit, DecodeResult, Decoder, DecoderRunner, SparseBitMatrix};
-use ndarray::{Array1, ArrayView1};
+use ndarray::{Array1, ArrayView1, ArrayView2, ArrayViewMut2};
 
 use std::sync::Arc;
 
@@ -96,9 +96,25 @@ impl Decoder for MinSumBPDecoderFixed {
         self.decoder.decode_detailed(detectors)
     }
 
+    fn decode_batch_into(&mut self, detectors: ArrayView2<Bit>, out: ArrayViewMut2<Bit>) {
+        self.decoder.decode_batch_into(detectors, out)
+    }
+
+    fn decode_detailed_batch(&mut self, detectors: ArrayView2<Bit>) -> Vec<DecodeResult> {
+        self.decoder.decode_detailed_batch(detectors)
+    }
+
     fn log_prior_ratios(&mut self) -> Array1<f64> {
         self.decoder.log_prior_ratios()
     }
+
+    fn restricted_decoder(
+        &self,
+        check_matrix: Arc<SparseBitMatrix>,
+        variables: &[usize],
+    ) -> Option<Box<dyn Decoder + Send>> {
+        self.decoder.restricted_decoder(check_matrix, variables)
+    }
 }
 
 impl DecoderRunner for MinSumBPDecoderFixed {}
@@ -0,0 +1,817 @@
+// (C) Copyright IBM 2025
+//
+// This code is licensed under the Apache License, Version 2.0. You may
+// obtain a copy of this license in the LICENSE.txt file in the root directory
+// of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+//
+// Any modifications or derivative works of this code must retain this
+// copyright notice, and modified files need to carry a notice indicating
+// that they have been altered from the originals.
+
+//! A lane-batched min-sum engine.
+//!
+//! The engine keeps `LANES` messages per edge of the Tanner graph in a
+//! structure-of-arrays layout (`edge * LANES + lane`) and advances `LANES`
+//! independent shots with a single traversal of the graph. The arithmetic
+//! performed for every lane is exactly that of [`MinSumBPDecoder`], so a shot
+//! decoded in a lane produces the same result as a shot decoded on its own.
+//!
+//! Iterations run through [`simd::dispatch`], so the per-lane loops are
+//! compiled for, and vectorized with, the instruction set selected at
+//! runtime.
+//!
+//! [`MinSumBPDecoder`]: super::min_sum::MinSumBPDecoder
+
+use super::arithmetic::{message_from_f64, MessageArithmetic};
+use super::min_sum::{variable_hash_key, BPSchedule, MinSumDecoderConfig};
+use super::simd::{self, SimdKernel, SimdLevel};
+use crate::decoder::{BPExtraResult, Bit, DecodeResult, SparseBitMatrix, BATCH_LANES};
+use ndarray::{Array1, ArrayView1, ArrayView2, ArrayViewMut1, ArrayViewMut2};
+use num_traits::{Bounded, FromPrimitive, Signed, ToPrimitive};
+use std::fmt::Debug;
+use std::sync::Arc;
+
+/// Number of shots advanced together by the engine.
+///
+/// Chosen as a multiple of the SIMD width for all supported message types
+/// so that the inner per-lane loops map onto full vector registers.
+pub const LANES: usize = BATCH_LANES;
+
+/// Tanner graph topology shared by all lane engines of a decoder.
+///
+/// Edges are numbered in check-major (CSR) order. The variable side is
+/// described by a gather list of edge indices (and their checks), grouped per
+/// variable and ordered by ascending check index (the CSC order of the check
+/// matrix).
+#[derive(Clone, Debug)]
+pub struct LaneGraph {
+    num_checks: usize,
+    num_variables: usize,
+    check_indptr: Vec<usize>,
+    check_indices: Vec<usize>,
+    variable_indptr: Vec<usize>,
+    variable_edges: Vec<usize>,
+    variable_checks: Vec<usize>,
+}
+
+impl LaneGraph {
+    pub fn new(check_matrix: &SparseBitMatrix) -> Self {
+        let check_matrix_csr = check_matrix.to_csr();
+        let num_checks = check_matrix_csr.rows();
+        let num_variables = check_matrix_csr.cols();
+        let check_indptr = check_matrix_csr.indptr().raw_storage().to_vec();
+        let check_indices = check_matrix_csr.indices().to_vec();
+
+        let mut variable_indptr = vec![0; num_variables + 1];
+        for &variable in check_indices.iter() {
+            variable_indptr[variable + 1] += 1;
+        }
+        for variable in 0..num_variables {
+            variable_indptr[variable + 1] += variable_indptr[variable];
+        }
+
+        // Rows are visited in ascending order so each variable's edges end up
+        // sorted by check index.
+        let mut next_slot = variable_indptr[..num_variables].to_vec();
+        let mut variable_edges = vec![0; check_indices.len()];
+        let mut variable_checks = vec![0; check_indices.len()];
+        for check in 0..num_checks {
+            for edge in check_indptr[check]..check_indptr[check + 1] {
+                let variable = check_indices[edge];
+                variable_edges[next_slot[variable]] = edge;
+                variable_checks[next_slot[variable]] = check;
+                next_slot[variable] += 1;
+            }
+        }
+
+        LaneGraph {
+            num_checks,
+            num_variables,
+            check_indptr,
+            check_indices,
+            variable_indptr,
+            variable_edges,
+            variable_checks,
+        }
+    }
+
+    pub fn num_checks(&self) -> usize {
+        self.num_checks
+    }
+
+    pub fn num_variables(&self) -> usize {
+        self.num_variables
+    }
+
+    pub fn nnz(&self) -> usize {
+        self.check_indices.len()
+    }
+}
+
+/// Message state for `LANES` shots decoded in lock-step.
+pub struct MinSumLaneEngine<N: PartialEq + Default + Clone + Copy> {
+    graph: Arc<LaneGraph>,
+    config: Arc<MinSumDecoderConfig>,
+    log_prior_ratios: Vec<N>,
+    max_data_value: Option<N>,
+    data_scale_value: Option<N>,
+    check_to_variable: Vec<N>,
+    variable_to_check: Vec<N>,
+    posterior_ratios: Vec<N>,
+    memory_strengths: Vec<N>,
+    decoding: Vec<Bit>,
+    detectors: Vec<Bit>,
+    // Per lane syndrome XOR the syndrome of the lane's hard decision.
+    residual_syndrome: Vec<Bit>,
+    residual_weight: [usize; LANES],
+    // Per lane Zobrist hash of the hard decision.
+    decoding_hash: [u64; LANES],
+    simd_level: SimdLevel,
+}
+
+impl<N> MinSumLaneEngine<N>
+where
+    N: PartialEq
+        + Debug
+        + Default
+        + Clone
+        + Copy
+        + Signed
+        + Bounded
+        + FromPrimitive
+        + ToPrimitive
+        + std::cmp::PartialOrd
+        + std::ops::Add
+        + std::ops::AddAssign
+        + std::ops::DivAssign
+        + std::ops::Mul<N>
+        + std::ops::MulAssign
+        + Send
+        + Sync
+        + std::fmt::Display
+        + MessageArithmetic
+        + 'static,
+{
+    pub fn new(
+        graph: Arc<LaneGraph>,
+        config: Arc<MinSumDecoderConfig>,
+        log_prior_ratios: Vec<N>,
+        max_data_value: Option<N>,
+        data_scale_value: Option<N>,
+    ) -> Self {
+        let nnz = graph.nnz();
+        let num_checks = graph.num_checks();
+        let num_variables = graph.num_variables();
+        let mut engine = MinSumLaneEngine {
+            graph,
+            config,
+            log_prior_ratios,
+            max_data_value,
+            data_scale_value,
+            check_to_variable: vec![N::zero(); nnz * LANES],
+            variable_to_check: vec![N::zero(); nnz * LANES],
+            posterior_ratios: vec![N::zero(); num_variables * LANES],
+            memory_strengths: vec![N::zero(); num_variables * LANES],
+            decoding: vec![0; num_variables * LANES],
+            detectors: vec![0; num_checks * LANES],
+            residual_syndrome: vec![0; num_checks * LANES],
+            residual_weight: [0; LANES],
+            decoding_hash: [0; LANES],
+            simd_level: SimdLevel::detect(),
+        };
+        for lane in 0..LANES {
+            engine.initialize_lane(lane);
+        }
+        engine
+    }
+
+    pub fn num_variables(&self) -> usize {
+        self.graph.num_variables()
+    }
+
+    pub fn config(&self) -> &Arc<MinSumDecoderConfig> {
+        &self.config
+    }
+
+    /// Select the instruction set of the message passing kernels, which
+    /// defaults to [`SimdLevel::detect`].
+    ///
+    /// Panics if the running CPU does not support `level`.
+    pub fn set_simd_level(&mut self, level: SimdLevel) {
+        assert!(
+            level.is_supported(),
+            "SIMD level {level:?} is not supported by this CPU"
+        );
+        self.simd_level = level;
+    }
+
+    /// Load the syndrome of a shot into a lane.
+    pub fn load_detectors(&mut self, lane: usize, detectors: ArrayView1<Bit>) {
+        for (check, detector) in detectors.iter().enumerate() {
+            self.detectors[check * LANES + lane] = *detector;
+        }
+        self.initialize_lane_residual(lane);
+    }
+
+    /// Load the trivial syndrome into a lane that has no shot assigned.
+    pub fn clear_detectors(&mut self, lane: usize) {
+        for check in 0..self.graph.num_checks() {
+            self.detectors[check * LANES + lane] = 0;
+        }
+        self.initialize_lane_residual(lane);
+    }
+
+    /// Recompute the residual syndrome of a lane after its syndrome changed.
+    fn initialize_lane_residual(&mut self, lane: usize) {
+        self.residual_weight[lane] = 0;
+        for check in 0..self.graph.num_checks {
+            let mut residual = self.detectors[check * LANES + lane];
+            for edge in self.graph.check_indptr[check]..self.graph.check_indptr[check + 1] {
+                residual ^= self.decoding[self.graph.check_indices[edge] * LANES + lane];
+            }
+            self.residual_syndrome[check * LANES + lane] = residual;
+            self.residual_weight[lane] += residual as usize;
+        }
+    }
+
+    /// Update the hard decision of a variable in every lane, toggling the
+    /// residual syndrome of the variable's checks in lanes where it flipped.
+    #[inline(always)]
+    fn compute_hard_decision(&mut self, variable: usize) {
+        let posteriors = lanes(&self.posterior_ratios, variable);
+        let decoding = lanes_mut(&mut self.decoding, variable);
+        let mut flipped = [false; LANES];
+        for lane in 0..LANES {
+            let bit = Bit::from(posteriors[lane] <= N::zero());
+            flipped[lane] = bit != decoding[lane];
+            decoding[lane] = bit;
+        }
+        if !flipped.contains(&true) {
+            return;
+        }
+        let key = variable_hash_key(variable);
+        for lane in 0..LANES {
+            if flipped[lane] {
+                self.decoding_hash[lane] ^= key;
+            }
+        }
+
+        for position in
+            self.graph.variable_indptr[variable]..self.graph.variable_indptr[variable + 1]
+        {
+            let residual = lanes_mut(
+                &mut self.residual_syndrome,
+                self.graph.variable_checks[position],
+            );
+            for lane in 0..LANES {
+                if !flipped[lane] {
+                    continue;
+                }
+                residual[lane] ^= 1;
+                if residual[lane] == 1 {
+                    self.residual_weight[lane] += 1;
+                } else {
+                    self.residual_weight[lane] -= 1;
+                }
+            }
+        }
+    }
+
+    /// Lane equivalent of [`MinSumBPDecoder::initialize_decoder`].
+    ///
+    /// [`MinSumBPDecoder::initialize_decoder`]: super::min_sum::MinSumBPDecoder::initialize_decoder
+    pub fn initialize_lane(&mut self, lane: usize) {
+        let ewa_factor_float = self.config.gamma0.unwrap_or(0.);
+        let ewa_factor = N::from_f64(match self.config.data_scale_value {
+            Some(scale_value) => scale_value * ewa_factor_float,
+            None => ewa_factor_float,
+        })
+        .unwrap();
+        for variable in 0..self.graph.num_variables() {
+            self.memory_strengths[variable * LANES + lane] = ewa_factor;
+        }
+        self.reset_lane_messages(lane);
+        if self.config.gamma0.is_some() {
+            for variable in 0..self.graph.num_variables() {
+                self.posterior_ratios[variable * LANES + lane] = self.log_prior_ratios[variable];
+            }
+        }
+    }
+
+    /// Reset the check and variable messages of a lane while keeping its
+    /// posteriors, as is done between Relay legs.
+    pub fn reset_lane_messages(&mut self, lane: usize) {
+        for (edge, variable) in self.graph.check_indices.iter().enumerate() {
+            self.check_to_variable[edge * LANES + lane] = N::zero();
+            self.variable_to_check[edge * LANES + lane] = self.log_prior_ratios[*variable];
+        }
+    }
+
+    /// Set the memory strengths of a lane from f64. Applies scaling if needed.
+    pub fn set_lane_memory_strengths_f64(
+        &mut self,
+        lane: usize,
+        memory_strengths: ArrayView1<f64>,
+    ) {
+        for (variable, gamma) in memory_strengths.iter().enumerate() {
+            let gamma = match self.config.data_scale_value {
+                Some(scale_val) => scale_val * gamma,
+                None => *gamma,
+            };
+            self.memory_strengths[variable * LANES + lane] = message_from_f64(gamma);
+        }
+    }
+
+    /// Set the memory strengths of a lane from messages that are already
+    /// scaled.
+    pub fn assign_lane_memory_strengths(&mut self, lane: usize, memory_strengths: ArrayView1<N>) {
+        for (variable, gamma) in memory_strengths.iter().enumerate() {
+            self.memory_strengths[variable * LANES + lane] = *gamma;
+        }
+    }
+
+    /// Run a single iteration of the configured schedule on all lanes.
+    /// `iterations` holds the number of iterations each lane has already
+    /// completed for its current shot, which determines the lane's alpha.
+    pub fn run_iteration(&mut self, iterations: &[usize; LANES]) {
+        simd::dispatch(
+            self.simd_level,
+            LaneIterationKernel {
+                engine: self,
+                iterations,
+            },
+        );
+    }
+
+    #[inline(always)]
+    fn run_iteration_kernel(&mut self, iterations: &[usize; LANES]) {
+        let mut alpha = [N::zero(); LANES];
+        for lane in 0..LANES {
+            alpha[lane] = message_from_f64(self.config.scaled_alpha(iterations[lane]));
+        }
+        match self.config.schedule {
+            BPSchedule::Flooding => {
+                self.compute_check_to_variable(&alpha);
+                self.compute_variable_to_check();
+            }
+            BPSchedule::Layered => self.compute_layered(&alpha),
+        }
+    }
+
+    /// Bound the magnitudes of the values of every lane.
+    #[inline(always)]
+    fn bound_lanes(&self, values: &mut [N; LANES]) {
+        if let Some(max_val) = self.max_data_value {
+            simd::clamp_magnitudes(values, max_val);
+        }
+    }
+
+    /// Lane equivalent of the row-layered iteration of [`MinSumBPDecoder`].
+    ///
+    /// [`MinSumBPDecoder`]: super::min_sum::MinSumBPDecoder
+    #[inline(always)]
+    fn compute_layered(&mut self, alpha: &[N; LANES]) {
+        for variable in 0..self.graph.num_variables {
+            let mut posterior = self.compute_variable_priors(variable);
+            for position in
+                self.graph.variable_indptr[variable]..self.graph.variable_indptr[variable + 1]
+            {
+                let edge = self.graph.variable_edges[position];
+                let incoming = lanes(&self.check_to_variable, edge);
+                for lane in 0..LANES {
+                    posterior[lane] = posterior[lane].add_sat(incoming[lane]);
+                }
+            }
+            self.bound_lanes(&mut posterior);
+            *lanes_mut(&mut self.posterior_ratios, variable) = posterior;
+        }
+
+        for check in 0..self.graph.num_checks {
+            let edges = self.graph.check_indptr[check]..self.graph.check_indptr[check + 1];
+            if edges.is_empty() {
+                continue;
+            }
+
+            let mut accumulated_sign = lanes(&self.detectors, check).map(|detector| detector == 1);
+            let mut min_message = [N::max_value(); LANES];
+            let mut second_min_message = [N::max_value(); LANES];
+
+            for edge in edges.clone() {
+                let variable = self.graph.check_indices[edge];
+                let posteriors = lanes(&self.posterior_ratios, variable);
+                let incoming = lanes(&self.check_to_variable, edge);
+                let mut messages = [N::zero(); LANES];
+                for lane in 0..LANES {
+                    messages[lane] = posteriors[lane].sub_sat(incoming[lane]);
+                }
+                self.bound_lanes(&mut messages);
+                *lanes_mut(&mut self.variable_to_check, edge) = messages;
+                for lane in 0..LANES {
+                    accumulated_sign[lane] ^= messages[lane].is_negative();
+                    simd::update_min_two(
+                        &mut min_message[lane],
+                        &mut second_min_message[lane],
+                        messages[lane].abs(),
+                    );
+                }
+            }
+
+            let out_min = scale_check_magnitudes(alpha, &min_message, self.data_scale_value);
+            let out_second_min =
+                scale_check_magnitudes(alpha, &second_min_message, self.data_scale_value);
+
+            for edge in edges {
+                let variable = self.graph.check_indices[edge];
+                let messages = lanes(&self.variable_to_check, edge);
+                let mut outgoing = [N::zero(); LANES];
+                let mut posteriors = [N::zero(); LANES];
+                for lane in 0..LANES {
+                    outgoing[lane] = simd::check_message(
+                        messages[lane],
+                        accumulated_sign[lane],
+                        min_message[lane],
+                        out_min[lane],
+                        out_second_min[lane],
+                    );
+                    posteriors[lane] = messages[lane].add_sat(outgoing[lane]);
+                }
+                self.bound_lanes(&mut posteriors);
+                *lanes_mut(&mut self.check_to_variable, edge) = outgoing;
+                *lanes_mut(&mut self.posterior_ratios, variable) = posteriors;
+            }
+        }
+
+        for variable in 0..self.graph.num_variables {
+            self.compute_hard_decision(variable);
+        }
+    }
+
+    #[inline(always)]
+    fn compute_check_to_variable(&mut self, alpha: &[N; LANES]) {
+        let graph = &self.graph;
+        let variable_to_check = &self.variable_to_check;
+        let check_to_variable = &mut self.check_to_variable;
+
+        for check in 0..graph.num_checks {
+            let edges = graph.check_indptr[check]..graph.check_indptr[check + 1];
+            if edges.is_empty() {
+                continue;
+            }
+
+            let mut accumulated_sign = lanes(&self.detectors, check).map(|detector| detector == 1);
+            let mut min_message = [N::max_value(); LANES];
+            let mut second_min_message = [N::max_value(); LANES];
+
+            for edge in edges.clone() {
+                let messages = lanes(variable_to_check, edge);
+                for lane in 0..LANES {
+                    accumulated_sign[lane] ^= messages[lane].is_negative();
+                    simd::update_min_two(
+                        &mut min_message[lane],
+                        &mut second_min_message[lane],
+                        messages[lane].abs(),
+                    );
+                }
+            }
+
+            let out_min = scale_check_magnitudes(alpha, &min_message, self.data_scale_value);
+            let out_second_min =
+                scale_check_magnitudes(alpha, &second_min_message, self.data_scale_value);
+
+            for edge in edges {
+                let messages = lanes(variable_to_check, edge);
+                let outgoing = lanes_mut(check_to_variable, edge);
+                for lane in 0..LANES {
+                    outgoing[lane] = simd::check_message(
+                        messages[lane],
+                        accumulated_sign[lane],
+                        min_message[lane],
+                        out_min[lane],
+                        out_second_min[lane],
+                    );
+                }
+            }
+        }
+    }
+
+    /// The (memory) priors of a variable in every lane.
+    #[inline(always)]
+    fn compute_variable_priors(&self, variable: usize) -> [N; LANES] {
+        let log_prior_ratio = self.log_prior_ratios[variable];
+        let mut priors = [log_prior_ratio; LANES];
+        if self.config.gamma0.is_some() && log_prior_ratio != N::max_value() {
+            let memory_strengths = lanes(&self.memory_strengths, variable);
+            let posteriors = lanes(&self.posterior_ratios, variable);
+            let scaled_one = self.data_scale_value.unwrap_or(N::one());
+            for lane in 0..LANES {
+                let prior_component = (log_prior_ratio / scaled_one)
+                    .mul_sat(scaled_one.sub_sat(memory_strengths[lane]));
+                let posterior_component =
+                    (posteriors[lane] / scaled_one).mul_sat(memory_strengths[lane]);
+                priors[lane] = prior_component.add_sat(posterior_component);
+            }
+        }
+        priors
+    }
+
+    #[inline(always)]
+    fn compute_variable_to_check(&mut self) {
+        for variable in 0..self.graph.num_variables {
+            let mut row_sum = self.compute_variable_priors(variable);
+
+            let positions =
+                self.graph.variable_indptr[variable]..self.graph.variable_indptr[variable + 1];
+
+            // Forward pass accumulates left to right.
+            for position in positions.clone() {
+                let edge = self.graph.variable_edges[position];
+                let incoming = lanes(&self.check_to_variable, edge);
+                let outgoing = lanes_mut(&mut self.variable_to_check, edge);
+                for lane in 0..LANES {
+                    outgoing[lane] = row_sum[lane];
+                    row_sum[lane] = row_sum[lane].add_sat(incoming[lane]);
+                }
+            }
+
+            *lanes_mut(&mut self.posterior_ratios, variable) = row_sum;
+            let mut row_sum = [N::zero(); LANES];
+
+            // Reverse pass removes each message's own contribution.
+            for position in positions.clone().rev() {
+                let edge = self.graph.variable_edges[position];
+                let incoming = lanes(&self.check_to_variable, edge);
+                let outgoing = lanes_mut(&mut self.variable_to_check, edge);
+                for lane in 0..LANES {
+                    outgoing[lane] = outgoing[lane].add_sat(row_sum[lane]);
+                    row_sum[lane] = row_sum[lane].add_sat(incoming[lane]);
+                }
+            }
+
+            if let Some(max_val) = self.max_data_value {
+                for position in positions {
+                    let edge = self.graph.variable_edges[position];
+                    simd::clamp_magnitudes(lanes_mut(&mut self.variable_to_check, edge), max_val);
+                }
+                simd::clamp_magnitudes(lanes_mut(&mut self.posterior_ratios, variable), max_val);
+            }
+
+            self.compute_hard_decision(variable);
+        }
+    }
+
+    /// Check for every lane whether its hard decision satisfies its syndrome.
+    pub fn check_convergence(&self) -> [bool; LANES] {
+        self.residual_weight.map(|weight| weight == 0)
+    }
+
+    /// Hash of the hard decision of a lane, see
+    /// [`MinSumBPDecoder::decoding_hash`].
+    ///
+    /// [`MinSumBPDecoder::decoding_hash`]: super::min_sum::MinSumBPDecoder::decoding_hash
+    pub fn lane_decoding_hash(&self, lane: usize) -> u64 {
+        self.decoding_hash[lane]
+    }
+
+    /// Copy the hard decision of a lane into `decoding`.
+    pub fn write_lane_decoding(&self, lane: usize, mut decoding: ArrayViewMut1<Bit>) {
+        for (variable, bit) in decoding.iter_mut().enumerate() {
+            *bit = self.decoding[variable * LANES + lane];
+        }
+    }
+
+    pub fn lane_decoding(&self, lane: usize) -> Array1<Bit> {
+        let mut decoding = Array1::zeros(self.graph.num_variables);
+        self.write_lane_decoding(lane, decoding.view_mut());
+        decoding
+    }
+
+    fn lane_decoded_detectors(&self, lane: usize) -> Array1<Bit> {
+        (0..self.graph.num_checks)
+            .map(|check| {
+                self.detectors[check * LANES + lane] ^ self.residual_syndrome[check * LANES + lane]
+            })
+            .collect()
+    }
+
+    /// Decoding quality of the current hard decision of a lane.
+    pub fn lane_decoding_quality(&self, lane: usize, log_prior_ratios: &Array1<f64>) -> f64 {
+        let mut decoding_quality: f64 = 0.0;
+        for (variable, log_prior_ratio) in log_prior_ratios.iter().enumerate() {
+            if self.decoding[variable * LANES + lane] == 1 && f64::is_finite(*log_prior_ratio) {
+                decoding_quality += log_prior_ratio;
+            }
+        }
+        decoding_quality
+    }
+
+    /// Lane equivalent of [`MinSumBPDecoder::build_result`].
+    ///
+    /// [`MinSumBPDecoder::build_result`]: super::min_sum::MinSumBPDecoder::build_result
+    pub fn build_lane_result(
+        &self,
+        lane: usize,
+        success: bool,
+        iterations: usize,
+        max_iter: usize,
+        log_prior_ratios: &Array1<f64>,
+    ) -> DecodeResult {
+        let posterior_ratios = (0..self.graph.num_variables)
+            .map(|variable| {
+                let posterior = N::to_f64(&self.posterior_ratios[variable * LANES + lane]).unwrap();
+                match self.config.data_scale_value {
+                    Some(scale_val) => posterior / scale_val,
+                    None => posterior,
+                }
+            })
+            .collect();
+
+        DecodeResult {
+            decoding: self.lane_decoding(lane),
+            decoded_detectors: self.lane_decoded_detectors(lane),
+            posterior_ratios,
+            success,
+            decoding_quality: if success {
+                self.lane_decoding_quality(lane, log_prior_ratios)
+            } else {
+                f64::MAX
+            },
+            iterations,
+            max_iter,
+            budget_exhausted: false,
+            extra: BPExtraResult::None,
+        }
+    }
+
+    /// Decode a batch of shots with plain (Mem-)BP, refilling lanes with the
+    /// next pending shot as soon as their current shot terminates.
+    ///
+    /// `on_finish` is called once per shot with the engine, the lane holding
+    /// the shot, the shot index, whether it converged and its iteration count.
+    pub fn run_batch<F>(&mut self, detectors: ArrayView2<Bit>, max_iter: usize, mut on_finish: F)
+    where
+        F: FnMut(&Self, usize, usize, bool, usize),
+    {
+        let num_shots = detectors.nrows();
+        if max_iter == 0 {
+            // Nothing to iterate, terminate every shot unconverged.
+            for shot in 0..num_shots {
+                on_finish(self, 0, shot, false, 0);
+            }
+            return;
+        }
+
+        let mut shots: [Option<usize>; LANES] = [None; LANES];
+        let mut iterations = [0; LANES];
+        let mut next_shot = 0;
+
+        // Lanes left idle by an earlier batch kept iterating, so every lane
+        // starts from the initial state as an engine is reused.
+        for (lane, lane_shot) in shots.iter_mut().enumerate() {
+            if next_shot < num_shots {
+                self.load_detectors(lane, detectors.row(next_shot));
+                *lane_shot = Some(next_shot);
+                next_shot += 1;
+            } else {
+                self.clear_detectors(lane);
+            }
+            self.initialize_lane(lane);
+        }
+
+        while shots.iter().any(|shot| shot.is_some()) {
+            self.run_iteration(&iterations);
+            let converged = self.check_convergence();
+
+            for lane in 0..LANES {
+                iterations[lane] += 1;
+                if !(converged[lane] || iterations[lane] >= max_iter) {
+                    continue;
+                }
+                if let Some(shot) = shots[lane] {
+                    on_finish(self, lane, shot, converged[lane], iterations[lane]);
+                }
+                // Refill the lane, idle lanes restart on the trivial syndrome
+                // so their messages never run away.
+                shots[lane] = None;
+                if next_shot < num_shots {
+                    self.load_detectors(lane, detectors.row(next_shot));
+                    shots[lane] = Some(next_shot);
+                    next_shot += 1;
+                } else {
+                    self.clear_detectors(lane);
+                }
+                self.initialize_lane(lane);
+                iterations[lane] = 0;
+            }
+        }
+    }
+
+    /// Decode a batch writing each decoding straight from the lanes into
+    /// its row of `out`.
+    pub fn decode_batch_into(
+        &mut self,
+        detectors: ArrayView2<Bit>,
+        mut out: ArrayViewMut2<Bit>,
+        max_iter: usize,
+    ) {
+        self.run_batch(detectors, max_iter, |engine, lane, shot, _, _| {
+            engine.write_lane_decoding(lane, out.row_mut(shot));
+        });
+    }
+
+    pub fn decode_detailed_batch(
+        &mut self,
+        detectors: ArrayView2<Bit>,
+        max_iter: usize,
+    ) -> Vec<DecodeResult> {
+        let log_prior_ratios = self.config.log_prior_ratios();
+        let mut results: Vec<Option<DecodeResult>> = vec![None; detectors.nrows()];
+        self.run_batch(
+            detectors,
+            max_iter,
+            |engine, lane, shot, success, iterations| {
+                results[shot] = Some(engine.build_lane_result(
+                    lane,
+                    success,
+                    iterations,
+                    max_iter,
+                    &log_prior_ratios,
+                ));
+            },
+        );
+        results.into_iter().map(|result| result.unwrap()).collect()
+    }
+}
+
+/// The `LANES` values of entry `index` of a lane-interleaved array.
+#[inline(always)]
+fn lanes<T>(values: &[T], index: usize) -> &[T; LANES] {
+    values[index * LANES..(index + 1) * LANES]
+        .try_into()
+        .unwrap()
+}
+
+/// The mutable `LANES` values of entry `index` of a lane-interleaved array.
+#[inline(always)]
+fn lanes_mut<T>(values: &mut [T], index: usize) -> &mut [T; LANES] {
+    (&mut values[index * LANES..(index + 1) * LANES])
+        .try_into()
+        .unwrap()
+}
+
+/// Apply alpha, and the optional fixed-point rescale, to a check magnitude
+/// of every lane.
+#[inline(always)]
+fn scale_check_magnitudes<N>(
+    alpha: &[N; LANES],
+    magnitudes: &[N; LANES],
+    data_scale_value: Option<N>,
+) -> [N; LANES]
+where
+    N: Copy + std::ops::DivAssign + MessageArithmetic,
+{
+    let mut scaled = *magnitudes;
+    for lane in 0..LANES {
+        scaled[lane] = alpha[lane].mul_sat(magnitudes[lane]);
+        if let Some(scale_val) = data_scale_value {
+            scaled[lane] /= scale_val;
+        }
+    }
+    scaled
+}
+
+/// A single lane iteration run by [`simd::dispatch`].
+struct LaneIterationKernel<'a, N: PartialEq + Default + Clone + Copy> {
+    engine: &'a mut MinSumLaneEngine<N>,
+    iterations: &'a [usize; LANES],
+}
+
+impl<N> SimdKernel for LaneIterationKernel<'_, N>
+where
+    N: PartialEq
+        + Debug
+        + Default
+        + Clone
+        + Copy
+        + Signed
+        + Bounded
+        + FromPrimitive
+        + ToPrimitive
+        + std::cmp::PartialOrd
+        + std::ops::Add
+        + std::ops::AddAssign
+        + std::ops::DivAssign
+        + std::ops::Mul<N>
+        + std::ops::MulAssign
+        + Send
+        + Sync
+        + std::fmt::Display
+        + MessageArithmetic
+        + 'static,
+{
+    type Output = ();
+
+    #[inline(always)]
+    fn run(self) {
+        self.engine.run_iteration_kernel(self.iterations);
+    }
+}
@@ -8,6 +8,10 @@
 // copyright notice, and modified files need to carry a notice indicating
 // that they have been altered from the originals.
 
+pub mod arithmetic;
 pub mod min_sum;
 pub mod min_sum_fixed;
+pub mod min_sum_lanes;
 pub mod relay;
+pub mod simd;
+pub mod telemetry;
@@ -8,22 +8,30 @@
 // copyright notice, and modified files need to carry a notice indicating
 // that they have been altered from the originals.
 
-use super::min_sum::{MinSumBPDecoder, MinSumDecoderConfig};
+use super::arithmetic::{message_from_f64, MessageArithmetic};
+use super::min_sum::{MinSumBPDecoder, MinSumDecoderConfig, MinSumSolution};
+use super::min_sum_lanes::{MinSumLaneEngine, LANES};
+use super::simd::SimdLevel;
+use super::telemetry::{RelayTelemetry, TelemetryHandle, TelemetryRecorder};
+use crate::components::{
+    ComponentDecoderCache, ComponentDecomposer, ComponentDecompositionConfig, DecompositionScratch,
+};
 use crate::decoder::{Bit, SparseBitMatrix};
-use crate::decoder::{DecodeResult, Decoder, DecoderRunner};
+use crate::decoder::{DecodeResult, Decoder, DecoderRunner, SplitBatch, UnusedBudget};
 use log::debug;
 
-use ndarray::{Array1, Array2, ArrayView1};
+use ndarray::{Array1, Array2, ArrayView1, ArrayView2, ArrayViewMut2, Axis};
 use num_traits::{Bounded, FromPrimitive, Signed, ToPrimitive};
 use std::fmt::Debug;
-use std::fs::File;
-use std::fs::OpenOptions;
-use std::io::{BufWriter, Write};
 //use std::string;
 use rand::distributions::{Distribution, Uniform};
-use rand::SeedableRng;
+use rand::{RngCore, SeedableRng};
+use rayon::prelude::*;
+use std::collections::VecDeque;
 use std::process::exit;
+use std::sync::atomic::{AtomicBool, AtomicUsize, Ordering};
 use std::sync::Arc;
+use std::time::{Duration, Instant};
 
 #[derive(Clone, PartialEq, Debug)]
 pub enum StoppingCriterion {
@@ -38,6 +46,172 @@ impl Default for StoppingCriterion {
     }
 }
 
+/// Early termination of Relay legs that stopped making progress.
+#[derive(Clone, Debug)]
+pub struct StallDetectionConfig {
+    /// Abort a leg once its hard decision has repeated one of its recent
+    /// states for this many consecutive iterations.
+    pub window: usize,
+    /// Longest period of hard decision oscillations detected. A period of
+    /// one is a hard decision that no longer changes.
+    pub max_period: usize,
+    /// Also abort a leg as soon as its hard decision matches one an earlier
+    /// leg of the same shot stalled on.
+    pub abort_on_repeat: bool,
+}
+
+impl Default for StallDetectionConfig {
+    fn default() -> Self {
+        Self {
+            window: 10,
+            max_period: 4,
+            abort_on_repeat: true,
+        }
+    }
+}
+
+/// Tracks the hard decisions of the legs of a shot to detect stalled legs.
+#[derive(Clone, Debug)]
+struct StallDetector {
+    config: StallDetectionConfig,
+    // Hashes of the last `max_period` hard decisions of the current leg.
+    recent: VecDeque<u64>,
+    // Consecutive iterations whose hard decision was in `recent`.
+    repeats: usize,
+    // Hashes of the hard decisions earlier legs of the shot stalled on.
+    stalled_decodings: Vec<u64>,
+}
+
+impl StallDetector {
+    fn new(config: StallDetectionConfig) -> Self {
+        Self {
+            recent: VecDeque::with_capacity(config.max_period),
+            config,
+            repeats: 0,
+            stalled_decodings: Vec::new(),
+        }
+    }
+
+    fn start_shot(&mut self) {
+        self.stalled_decodings.clear();
+        self.start_leg();
+    }
+
+    fn start_leg(&mut self) {
+        self.recent.clear();
+        self.repeats = 0;
+    }
+
+    /// Continue the shot of another detector, avoiding the hard decisions its
+    /// legs stalled on.
+    fn resume_shot(&mut self, other: &StallDetector) {
+        self.stalled_decodings.clear();
+        self.stalled_decodings
+            .extend_from_slice(&other.stalled_decodings);
+        self.start_leg();
+    }
+
+    /// Record the hard decision of an iteration that did not converge and
+    /// return whether the leg should be aborted.
+    fn update(&mut self, decoding_hash: u64) -> bool {
+        if self.config.abort_on_repeat && self.stalled_decodings.contains(&decoding_hash) {
+            return true;
+        }
+        if self.recent.contains(&decoding_hash) {
+            self.repeats += 1;
+        } else {
+            self.repeats = 0;
+        }
+        if self.recent.len() >= self.config.max_period {
+            self.recent.pop_front();
+        }
+        self.recent.push_back(decoding_hash);
+
+        if self.repeats >= self.config.window {
+            self.stalled_decodings.push(decoding_hash);
+            return true;
+        }
+        false
+    }
+}
+
+/// Run the Relay legs of a single shot concurrently to reduce its latency.
+///
+/// Every worker relays the posteriors of the pre-iteration stage through its
+/// own chain of legs, taking every `num_workers`-th leg of the schedule. The
+/// [`StoppingCriterion::NConv`] criterion counts converged legs across all
+/// workers, which stop as soon as enough legs have converged. Which legs ran
+/// then depends on thread timing, so decodings are not reproducible between
+/// runs.
+///
+/// This applies to shots decoded one at a time. Batches are still decoded
+/// with the throughput oriented lane-batched engine where possible.
+#[derive(Clone, Debug, Default)]
+pub struct ParallelLegsConfig {
+    /// Number of concurrent workers, or zero for one per thread of the rayon
+    /// thread pool.
+    pub num_workers: usize,
+}
+
+/// Per-shot limit on the work of the Relay schedule for decoding under a
+/// latency bound.
+///
+/// Once a shot has spent its budget decoding stops and returns the best
+/// converged solution found so far, or else the hard decision of the
+/// pre-iteration stage marked as not converged. Either way the result has
+/// [`DecodeResult::budget_exhausted`] set.
+#[derive(Clone, Debug, Default)]
+pub struct DecodeBudgetConfig {
+    /// Maximum number of BP iterations of a shot over all of its legs.
+    pub max_iterations: Option<usize>,
+    /// Maximum wall-clock time of a shot.
+    pub deadline: Option<Duration>,
+    /// Let every shot of a batch also spend the budget left unused by the
+    /// earlier shots of the batch, so that easy shots hand their budget to
+    /// hard ones while the batch as a whole stays within budget.
+    pub share_unused: bool,
+}
+
+/// Budget of the shot being decoded.
+#[derive(Clone, Copy, Debug)]
+struct ShotBudget {
+    max_iterations: usize,
+    deadline: Option<Instant>,
+}
+
+impl ShotBudget {
+    /// Iterations a leg of at most `max_iter` iterations may run once
+    /// `iterations` have been spent.
+    fn leg_max_iter(&self, max_iter: usize, iterations: usize) -> usize {
+        max_iter.min(self.max_iterations.saturating_sub(iterations))
+    }
+
+    /// Whether the budget is spent once `iterations` have been spent.
+    fn spent(&self, iterations: usize) -> bool {
+        iterations >= self.max_iterations
+            || self
+                .deadline
+                .is_some_and(|deadline| Instant::now() >= deadline)
+    }
+
+    /// Share of the budget of each of the `parts` components of a shot, which
+    /// are decoded concurrently and share its deadline.
+    fn split(&self, parts: usize) -> ShotBudget {
+        ShotBudget {
+            max_iterations: self.max_iterations / parts.max(1),
+            deadline: self.deadline,
+        }
+    }
+
+    /// Budget left once `iterations` have been spent.
+    fn remaining(&self, iterations: usize) -> ShotBudget {
+        ShotBudget {
+            max_iterations: self.max_iterations.saturating_sub(iterations),
+            deadline: self.deadline,
+        }
+    }
+}
+
 #[derive(Clone, Debug)]
 pub struct RelayDecoderConfig {
     pub pre_iter: usize,
@@ -45,9 +219,19 @@ pub struct RelayDecoderConfig {
     pub set_max_iter: usize,
     pub gamma_dist_interval: (f64, f64),
     pub explicit_gammas: Option<Array2<f64>>,
+    /// Draw the gammas of all `num_sets` legs once at construction instead
+    /// of for every leg of every shot. Every shot then sees the same gammas,
+    /// at the cost of storing `num_sets` messages per variable.
+    pub precompute_gammas: bool,
     pub stopping_criterion: StoppingCriterion,
+    /// Record [`RelayTelemetry`] of the legs of every shot decoded on the
+    /// whole graph.
     pub logging: bool,
     pub seed: u64,
+    pub component_decomposition: Option<ComponentDecompositionConfig>,
+    pub stall_detection: Option<StallDetectionConfig>,
+    pub parallel_legs: Option<ParallelLegsConfig>,
+    pub budget: Option<DecodeBudgetConfig>,
 }
 
 impl Default for RelayDecoderConfig {
@@ -58,9 +242,14 @@ impl Default for RelayDecoderConfig {
             set_max_iter: 60,
             gamma_dist_interval: (-0.24, 0.66),
             explicit_gammas: None,
+            precompute_gammas: false,
             stopping_criterion: StoppingCriterion::default(),
             logging: false,
             seed: 0,
+            component_decomposition: None,
+            stall_detection: None,
+            parallel_legs: None,
+            budget: None,
         }
     }
 }
@@ -71,17 +260,76 @@ struct PosteriorUpdateState {
     uniform: rand::distributions::Uniform<f64>,
 }
 
+/// Set, iterations, convergence and decoding quality of a Relay leg.
+type LegRecord = (usize, usize, bool, f64);
+
+/// A worker of the parallel legs of a shot.
+struct LegWorker<N: PartialEq + Default + Clone + Copy> {
+    bp_decoder: MinSumBPDecoder<N>,
+    posterior_update_state: PosteriorUpdateState,
+    stall_detector: Option<StallDetector>,
+    // Legs the worker ran for the current shot, whose sets increase.
+    legs: Vec<LegRecord>,
+    // Best solution of the worker's legs and its set, if any converged.
+    solution: MinSumSolution<N>,
+    best_set: Option<usize>,
+}
+
+/// The workers of the parallel legs, kept between shots so that their
+/// decoders and solution buffers are allocated once. Clones start empty so
+/// that cloned decoders, which may never run parallel legs, do not copy them.
+struct LegWorkers<N: PartialEq + Default + Clone + Copy>(Vec<LegWorker<N>>);
+
+impl<N: PartialEq + Default + Clone + Copy> Clone for LegWorkers<N> {
+    fn clone(&self) -> Self {
+        LegWorkers(Vec::new())
+    }
+}
+
+impl<N: PartialEq + Default + Clone + Copy> Default for LegWorkers<N> {
+    fn default() -> Self {
+        LegWorkers(Vec::new())
+    }
+}
+
+/// Progress of the shot held by one lane of the lane-batched engine.
+#[derive(Default)]
+struct RelayLaneState {
+    shot: Option<usize>,
+    // 0 is the pre-iteration Mem-BP stage, Relay legs are numbered from 1.
+    set: usize,
+    num_conv: usize,
+    min_pm: f64,
+    // Number of legs that found a solution of quality `min_pm` and the first
+    // of them.
+    num_best: usize,
+    best_set: usize,
+    total_iterations: usize,
+    result: Option<DecodeResult>,
+    stall_detector: Option<StallDetector>,
+    budget: Option<ShotBudget>,
+}
+
 /// An ensemble decoder which controls an inner BP min-sum decoder.
 #[derive(Clone)]
 pub struct RelayDecoder<N: PartialEq + Default + Clone + Copy> {
     bp_decoder: MinSumBPDecoder<N>,
     relay_config: Arc<RelayDecoderConfig>,
     posterior_update_state: PosteriorUpdateState,
-    sets_quality: Array1<f64>,
-    sets_iter: Array1<usize>,
-    sets_conv: Array1<bool>,
-    sets_best: Array1<bool>,
-    num_executed_sets: usize,
+    telemetry: Option<TelemetryRecorder>,
+    component_decomposer: Option<Arc<ComponentDecomposer>>,
+    // Restricted decoders of recurring components and the buffers of the
+    // decomposition, reused between shots.
+    component_decoders: ComponentDecoderCache<RelayDecoder<N>>,
+    decomposition_scratch: DecompositionScratch,
+    stall_detector: Option<StallDetector>,
+    // Memory strengths of the legs as scaled messages, one row per leg.
+    gamma_table: Option<Arc<Array2<N>>>,
+    // Best solution of the shot being decoded.
+    best_solution: MinSumSolution<N>,
+    // Batch split between several decoders this decoder decodes chunks of.
+    split_batch: Option<Arc<SplitBatch>>,
+    leg_workers: LegWorkers<N>,
 }
 
 impl<N> RelayDecoder<N>
@@ -104,6 +352,7 @@ where
         + Send
         + Sync
         + std::fmt::Display
+        + MessageArithmetic
         + 'static,
 {
     pub fn new(
@@ -111,35 +360,12 @@ where
         min_sum_config: Arc<MinSumDecoderConfig>,
         relay_config: Arc<RelayDecoderConfig>,
     ) -> RelayDecoder<N> {
-        if relay_config.logging {
-            let log_line = format!(
-                "# pre_iter: {}: sets: {} set_max_iter: {}\n\
-                # gamma_distribution: {:?} # set_idx, num_iter, converged, unique_best_solution\n",
-                relay_config.pre_iter,
+        let telemetry = relay_config.logging.then(|| {
+            TelemetryRecorder::new(
                 relay_config.num_sets,
-                relay_config.set_max_iter,
-                relay_config.gamma_dist_interval,
-            );
-            let mut file =
-                File::create("relay_logging.out").expect("Unable to create file for logging.");
-            file.write_all(log_line.as_bytes())
-                .expect("Unable to write Relay logging data.");
-        }
-
-        // Create logging variables if applicable
-        let (sets_quality, sets_iter, sets_conv, sets_best);
-        if relay_config.logging {
-            sets_quality = Array1::<f64>::from_elem(relay_config.num_sets + 1, f64::MAX);
-            sets_iter =
-                Array1::<usize>::from_elem(relay_config.num_sets + 1, relay_config.set_max_iter);
-            sets_conv = Array1::<bool>::from_elem(relay_config.num_sets + 1, false);
-            sets_best = Array1::<bool>::from_elem(relay_config.num_sets + 1, false);
-        } else {
-            sets_quality = Array1::<f64>::zeros(1);
-            sets_iter = Array1::<usize>::zeros(1);
-            sets_conv = Array1::<bool>::from_elem(1, false);
-            sets_best = Array1::<bool>::from_elem(1, false);
-        }
+                relay_config.pre_iter.max(relay_config.set_max_iter),
+            )
+        });
 
         if let Some(gammas) = relay_config.explicit_gammas.as_ref() {
             let gammas_shape = gammas.shape();
@@ -153,10 +379,20 @@ where
             }
         }
 
-        // The actual number of sets Relay ran, depends on the stopping criterion
-        let num_executed_sets = 0;
+        let component_decomposer = relay_config.component_decomposition.as_ref().map(|config| {
+            Arc::new(ComponentDecomposer::new(
+                &check_matrix,
+                Arc::new(config.clone()),
+            ))
+        });
+
+        let stall_detector = relay_config.stall_detection.clone().map(StallDetector::new);
+
+        let gamma_table =
+            Self::gamma_table(&relay_config, &min_sum_config, check_matrix.cols()).map(Arc::new);
 
         let bp_decoder = MinSumBPDecoder::new(check_matrix, min_sum_config);
+        let best_solution = bp_decoder.new_solution();
 
         let posterior_update_state = Self::init_dismem_state(&relay_config);
 
@@ -164,14 +400,86 @@ where
             bp_decoder,
             relay_config,
             posterior_update_state,
-            sets_quality,
-            sets_iter,
-            sets_conv,
-            sets_best,
-            num_executed_sets,
+            telemetry,
+            component_decomposer,
+            component_decoders: ComponentDecoderCache::default(),
+            decomposition_scratch: DecompositionScratch::default(),
+            stall_detector,
+            gamma_table,
+            best_solution,
+            split_batch: None,
+            leg_workers: LegWorkers::default(),
+        }
+    }
+
+    /// Select the instruction set of the BP message passing kernels, see
+    /// [`MinSumBPDecoder::set_simd_level`].
+    pub fn set_simd_level(&mut self, level: SimdLevel) {
+        self.bp_decoder.set_simd_level(level);
+        for worker in &mut self.leg_workers.0 {
+            worker.bp_decoder.set_simd_level(level);
         }
     }
 
+    /// Handle on the telemetry shared by this decoder and its clones, if
+    /// `logging` is enabled.
+    pub fn telemetry_handle(&self) -> Option<TelemetryHandle> {
+        self.telemetry
+            .as_ref()
+            .map(|telemetry| telemetry.handle().clone())
+    }
+
+    /// Telemetry of the shots decoded by this decoder and its clones so far,
+    /// if `logging` is enabled.
+    pub fn telemetry(&mut self) -> Option<RelayTelemetry> {
+        let telemetry = self.telemetry.as_mut()?;
+        telemetry.flush();
+        Some(telemetry.handle().snapshot())
+    }
+
+    /// Build a Relay decoder with this decoder's configuration for the
+    /// sub-problem given by `check_matrix` over a subset of its variables.
+    pub fn restricted(
+        &self,
+        check_matrix: Arc<SparseBitMatrix>,
+        variables: &[usize],
+    ) -> RelayDecoder<N> {
+        // The restricted decoder takes the columns of this decoder's gamma
+        // table instead of building its own, so the explicit gammas are not
+        // copied.
+        let config = &self.relay_config;
+        let relay_config = RelayDecoderConfig {
+            pre_iter: config.pre_iter,
+            num_sets: config.num_sets,
+            set_max_iter: config.set_max_iter,
+            gamma_dist_interval: config.gamma_dist_interval,
+            explicit_gammas: None,
+            precompute_gammas: false,
+            stopping_criterion: config.stopping_criterion.clone(),
+            logging: false,
+            seed: config.seed,
+            component_decomposition: None,
+            stall_detection: config.stall_detection.clone(),
+            // Components are already decoded in parallel.
+            parallel_legs: None,
+            // Components are handed their share of the budget of the shot.
+            budget: config.budget.as_ref().map(|budget| DecodeBudgetConfig {
+                share_unused: false,
+                ..budget.clone()
+            }),
+        };
+        let mut decoder = RelayDecoder::new(
+            check_matrix,
+            Arc::new(self.bp_decoder.restricted_config(variables)),
+            Arc::new(relay_config),
+        );
+        decoder.gamma_table = self
+            .gamma_table
+            .as_ref()
+            .map(|gamma_table| Arc::new(gamma_table.select(Axis(1), variables)));
+        decoder
+    }
+
     fn init_dismem_state(relay_config: &RelayDecoderConfig) -> PosteriorUpdateState {
         let rng_std: rand::prelude::StdRng = rand::rngs::StdRng::seed_from_u64(relay_config.seed);
         let low = relay_config.gamma_dist_interval.0;
@@ -180,133 +488,443 @@ where
         PosteriorUpdateState { rng_std, uniform }
     }
 
-    fn init_next_set(&mut self, set_idx: usize) {
-        let mut gammas = Array1::zeros(self.check_matrix().cols());
-        if let Some(explicit_gammas) = self.relay_config.explicit_gammas.as_ref() {
-            let gammas_num_sets = explicit_gammas.shape()[0];
-            for (i, gamma_ref) in gammas.iter_mut().enumerate() {
-                *gamma_ref = *explicit_gammas
-                    .get((set_idx % gammas_num_sets, i))
-                    .expect("index within explicit_gammas bounds");
+    /// Tabulate the memory strengths of the legs as scaled messages, from
+    /// the explicit gammas or, with `precompute_gammas`, drawn up front.
+    fn gamma_table(
+        relay_config: &RelayDecoderConfig,
+        min_sum_config: &MinSumDecoderConfig,
+        num_variables: usize,
+    ) -> Option<Array2<N>> {
+        let drawn_gammas;
+        let gammas = match relay_config.explicit_gammas.as_ref() {
+            Some(explicit_gammas) => explicit_gammas.view(),
+            None if relay_config.precompute_gammas => {
+                let mut posterior_update_state = Self::init_dismem_state(relay_config);
+                drawn_gammas = Array2::from_shape_simple_fn(
+                    (relay_config.num_sets.max(1), num_variables),
+                    || {
+                        posterior_update_state
+                            .uniform
+                            .sample(&mut posterior_update_state.rng_std)
+                    },
+                );
+                drawn_gammas.view()
             }
-            self.bp_decoder.set_memory_strengths_f64(gammas);
-            return;
-        }
+            None => return None,
+        };
+        Some(match min_sum_config.data_scale_value {
+            Some(scale_val) => gammas.mapv(|v| message_from_f64::<N>(scale_val * v)),
+            None => gammas.mapv(message_from_f64::<N>),
+        })
+    }
+
+    /// Draw the gammas of a leg when there is no gamma table.
+    fn draw_set_gammas(
+        posterior_update_state: &mut PosteriorUpdateState,
+        num_variables: usize,
+    ) -> Array1<f64> {
+        let mut gammas = Array1::zeros(num_variables);
         for i in 0..gammas.len() {
-            gammas[i] = self
-                .posterior_update_state
+            gammas[i] = posterior_update_state
                 .uniform
-                .sample(&mut self.posterior_update_state.rng_std);
+                .sample(&mut posterior_update_state.rng_std);
         }
-        self.bp_decoder.set_memory_strengths_f64(gammas);
+        gammas
     }
 
-    /// Decode with the inner decoder
-    fn decode_inner(&mut self, detectors: ArrayView1<Bit>, max_iter: usize) -> DecodeResult {
-        let mut success: bool = false;
-        let mut decoded_detectors = Array1::default(detectors.dim());
+    /// Whether the shots of a batch share their unused budget.
+    fn shares_budget(&self) -> bool {
+        self.relay_config
+            .budget
+            .as_ref()
+            .is_some_and(|config| config.share_unused)
+    }
 
-        for _ in 0..max_iter {
-            self.bp_decoder.run_iteration(detectors);
-            self.bp_decoder.current_iteration += 1;
-            decoded_detectors = self.bp_decoder.compute_decoded_detectors();
-            success = self
-                .bp_decoder
-                .check_convergence(detectors, decoded_detectors.view());
+    /// Start a batch, returning the budget its shots may share. A chunk of a
+    /// split batch starts with the budget the earlier chunks left unused.
+    fn start_batch(&self) -> UnusedBudget {
+        match &self.split_batch {
+            Some(split_batch) if self.shares_budget() => split_batch.take_unused_budget(),
+            _ => UnusedBudget::default(),
+        }
+    }
 
-            // If we have converged may now exit
-            if success {
-                debug!(
-                    "Succeeded on iteration {:?}",
-                    self.bp_decoder.current_iteration
-                );
-                break;
+    /// Finish a batch, handing the budget it left unused on to the later
+    /// chunks of the split batch it is part of.
+    fn finish_batch(&self, unused: UnusedBudget) {
+        match &self.split_batch {
+            Some(split_batch) if self.shares_budget() => split_batch.return_unused_budget(unused),
+            _ => {}
+        }
+    }
+
+    /// Start the budget of a new shot, adding the unused budget of earlier
+    /// shots of the batch if it is shared.
+    fn start_budget(&self, unused: &mut UnusedBudget) -> Option<ShotBudget> {
+        let config = self.relay_config.budget.as_ref()?;
+        let unused = if config.share_unused {
+            std::mem::take(unused)
+        } else {
+            UnusedBudget::default()
+        };
+        Some(ShotBudget {
+            max_iterations: config.max_iterations.map_or(usize::MAX, |max_iterations| {
+                max_iterations + unused.iterations
+            }),
+            deadline: config
+                .deadline
+                .map(|deadline| Instant::now() + deadline + unused.time),
+        })
+    }
+
+    /// Add the budget a shot left unused after spending `iterations` to the
+    /// budget of the batch if it is shared.
+    fn settle_budget(
+        &self,
+        unused: &mut UnusedBudget,
+        budget: Option<ShotBudget>,
+        iterations: usize,
+    ) {
+        let Some(budget) = budget else {
+            return;
+        };
+        if !self.shares_budget() {
+            return;
+        }
+        if budget.max_iterations != usize::MAX {
+            unused.iterations += budget.max_iterations.saturating_sub(iterations);
+        }
+        if let Some(deadline) = budget.deadline {
+            unused.time += deadline.saturating_duration_since(Instant::now());
+        }
+    }
+
+    /// Set the memory strengths of leg `set_idx` on a BP decoder, taking them
+    /// from the gamma table if there is one.
+    fn set_leg_gammas(
+        bp_decoder: &mut MinSumBPDecoder<N>,
+        gamma_table: Option<&Array2<N>>,
+        posterior_update_state: &mut PosteriorUpdateState,
+        set_idx: usize,
+    ) {
+        match gamma_table {
+            Some(gamma_table) => {
+                bp_decoder.assign_memory_strengths(gamma_table.row(set_idx % gamma_table.nrows()))
+            }
+            None => {
+                let num_variables = bp_decoder.check_matrix().cols();
+                let gammas = Self::draw_set_gammas(posterior_update_state, num_variables);
+                bp_decoder.set_memory_strengths_f64(gammas);
             }
         }
+    }
 
-        self.bp_decoder
-            .build_result(success, decoded_detectors, max_iter)
+    fn init_next_set(&mut self, set_idx: usize) {
+        Self::set_leg_gammas(
+            &mut self.bp_decoder,
+            self.gamma_table.as_deref(),
+            &mut self.posterior_update_state,
+            set_idx,
+        );
+        Self::start_leg(&mut self.bp_decoder);
     }
 
-    fn write_log(&mut self, file: File) {
-        let mut buf_writer = BufWriter::new(file);
-        for set in 0..self.num_executed_sets {
-            let log_line = format!(
-                "{}, {}, {}, {}\n",
-                (set - 1) as i32,
-                self.sets_iter[set],
-                self.sets_conv[set] as u8,
-                self.sets_best[set] as u8
-            );
-            buf_writer
-                .write_all(log_line.as_bytes())
-                .expect("Unable to write Relay logging data.");
+    /// Prepare a BP decoder whose memory strengths have been set for the
+    /// next Relay leg.
+    fn start_leg(bp_decoder: &mut MinSumBPDecoder<N>) {
+        // Do not completely initialize decoder as we wish to relay
+        // posterior marginals with new memory strengths.
+        bp_decoder.current_iteration = 0;
+        bp_decoder.initialize_check_to_variable();
+        bp_decoder.initialize_variable_to_check();
+    }
+
+    /// Whether batches may be decoded with the lane-batched engine. Logging
+    /// is tied to the sequential per-shot schedule.
+    fn lanes_supported(&self) -> bool {
+        self.component_decomposer.is_none()
+            && self.relay_config.pre_iter > 0
+            && self.relay_config.set_max_iter > 0
+    }
+
+    /// Prepare a lane of the engine for the given set of the Relay schedule.
+    fn start_lane_set(&mut self, engine: &mut MinSumLaneEngine<N>, lane: usize, set: usize) {
+        if set == 0 {
+            engine.initialize_lane(lane);
+        } else {
+            // Do not reset the posteriors as we wish to relay them with new
+            // memory strengths.
+            match self.gamma_table.as_ref() {
+                Some(gamma_table) => engine
+                    .assign_lane_memory_strengths(lane, gamma_table.row(set % gamma_table.nrows())),
+                None => {
+                    let num_variables = self.check_matrix().cols();
+                    let gammas =
+                        Self::draw_set_gammas(&mut self.posterior_update_state, num_variables);
+                    engine.set_lane_memory_strengths_f64(lane, gammas.view());
+                }
+            }
+            engine.reset_lane_messages(lane);
         }
-        buf_writer
-            .flush()
-            .expect("Unable to write Relay logging data.");
     }
-}
 
-impl<N> Decoder for RelayDecoder<N>
-where
-    N: PartialEq
-        + Debug
-        + Default
-        + Clone
-        + Copy
-        + Signed
-        + Bounded
-        + FromPrimitive
-        + ToPrimitive
-        + std::cmp::PartialOrd
-        + std::ops::Add
-        + std::ops::AddAssign
-        + std::ops::DivAssign
-        + std::ops::Mul<N>
-        + std::ops::MulAssign
-        + Send
-        + Sync
-        + std::fmt::Display
-        + 'static,
-{
-    fn check_matrix(&self) -> Arc<SparseBitMatrix> {
-        self.bp_decoder.check_matrix()
+    /// Load the next pending shot into a lane, or leave the lane idle on the
+    /// trivial syndrome if the batch is exhausted.
+    fn load_lane(
+        &mut self,
+        engine: &mut MinSumLaneEngine<N>,
+        lane: usize,
+        state: &mut RelayLaneState,
+        detectors: ArrayView2<Bit>,
+        next_shot: &mut usize,
+        unused: &mut UnusedBudget,
+    ) {
+        // The stall detector is reused between the shots of a lane.
+        let mut stall_detector = state.stall_detector.take().or_else(|| {
+            self.relay_config
+                .stall_detection
+                .clone()
+                .map(StallDetector::new)
+        });
+        if let Some(stall_detector) = stall_detector.as_mut() {
+            stall_detector.start_shot();
+        }
+        *state = RelayLaneState {
+            min_pm: f64::MAX,
+            stall_detector,
+            ..Default::default()
+        };
+        if *next_shot < detectors.nrows() {
+            engine.load_detectors(lane, detectors.row(*next_shot));
+            state.shot = Some(*next_shot);
+            state.budget = self.start_budget(unused);
+            *next_shot += 1;
+        } else {
+            engine.clear_detectors(lane);
+        }
+        self.start_lane_set(engine, lane, 0);
     }
 
-    fn log_prior_ratios(&mut self) -> Array1<f64> {
-        self.bp_decoder.log_prior_ratios()
+    /// Decode a batch with the lane-batched engine. Every lane runs the full
+    /// Relay schedule of [`Decoder::decode_detailed`] for its shot and is
+    /// refilled with the next pending shot once its stopping criterion is met.
+    ///
+    /// With `out`, the best decoding of every shot is written straight from
+    /// its lane into its row of `out` and no results are built or returned.
+    fn decode_lanes(
+        &mut self,
+        detectors: ArrayView2<Bit>,
+        mut out: Option<ArrayViewMut2<Bit>>,
+        unused: &mut UnusedBudget,
+    ) -> Vec<DecodeResult> {
+        let pre_iter = self.relay_config.pre_iter;
+        let set_max_iter = self.relay_config.set_max_iter;
+        let num_sets = self.relay_config.num_sets;
+        let stopping_criterion = self.relay_config.stopping_criterion.clone();
+        let log_prior_ratios = self.bp_decoder.log_prior_ratios();
+
+        let mut engine = self.bp_decoder.take_lane_engine();
+        let mut results: Vec<Option<DecodeResult>> = match out {
+            Some(_) => Vec::new(),
+            None => vec![None; detectors.nrows()],
+        };
+        let mut lanes: [RelayLaneState; LANES] = Default::default();
+        let mut iterations = [0; LANES];
+        let mut next_shot = 0;
+
+        for (lane, state) in lanes.iter_mut().enumerate() {
+            self.load_lane(&mut engine, lane, state, detectors, &mut next_shot, unused);
+        }
+
+        while lanes.iter().any(|state| state.shot.is_some()) {
+            engine.run_iteration(&iterations);
+            let converged = engine.check_convergence();
+
+            for (lane, state) in lanes.iter_mut().enumerate() {
+                iterations[lane] += 1;
+                let set = state.set;
+                let set_iterations = iterations[lane];
+                let max_iter = if set == 0 { pre_iter } else { set_max_iter };
+                let max_iter = state.budget.map_or(max_iter, |budget| {
+                    budget.leg_max_iter(max_iter, state.total_iterations)
+                });
+                // A stalled leg is treated as one that exhausted its iterations.
+                let stalled = !converged[lane]
+                    && state
+                        .stall_detector
+                        .as_mut()
+                        .is_some_and(|detector| detector.update(engine.lane_decoding_hash(lane)));
+                let out_of_time = state.budget.is_some_and(|budget| {
+                    budget
+                        .deadline
+                        .is_some_and(|deadline| Instant::now() >= deadline)
+                });
+                if !(converged[lane] || stalled || out_of_time || set_iterations >= max_iter) {
+                    continue;
+                }
+                iterations[lane] = 0;
+
+                let Some(shot) = state.shot else {
+                    // Idle lanes keep restarting on the trivial syndrome.
+                    self.start_lane_set(&mut engine, lane, 0);
+                    continue;
+                };
+
+                let mut done = false;
+                state.total_iterations += set_iterations;
+                if set == 0 {
+                    let success = converged[lane];
+                    let pm = if success {
+                        engine.lane_decoding_quality(lane, &log_prior_ratios)
+                    } else {
+                        f64::MAX
+                    };
+                    if let Some(telemetry) = self.telemetry.as_mut() {
+                        telemetry.record_leg(0, set_iterations, success, pm);
+                    }
+                    if success {
+                        state.num_conv = 1;
+                        state.min_pm = pm;
+                        state.num_best = 1;
+                        match stopping_criterion {
+                            StoppingCriterion::PreIter => done = true,
+                            StoppingCriterion::NConv { stop_after } => done |= stop_after <= 1,
+                            StoppingCriterion::All => {}
+                        }
+                    }
+                    match out.as_mut() {
+                        Some(out) => engine.write_lane_decoding(lane, out.row_mut(shot)),
+                        None => {
+                            state.result = Some(engine.build_lane_result(
+                                lane,
+                                success,
+                                set_iterations,
+                                pre_iter,
+                                &log_prior_ratios,
+                            ))
+                        }
+                    }
+                } else if converged[lane] {
+                    state.num_conv += 1;
+                    let pm = engine.lane_decoding_quality(lane, &log_prior_ratios);
+                    if let Some(telemetry) = self.telemetry.as_mut() {
+                        telemetry.record_leg(set, set_iterations, true, pm);
+                    }
+                    if pm == state.min_pm {
+                        state.num_best += 1;
+                    }
+                    if pm < state.min_pm {
+                        // Found a new best solution
+                        state.min_pm = pm;
+                        state.num_best = 1;
+                        state.best_set = set;
+                        match out.as_mut() {
+                            Some(out) => engine.write_lane_decoding(lane, out.row_mut(shot)),
+                            None => {
+                                state.result = Some(engine.build_lane_result(
+                                    lane,
+                                    true,
+                                    set_iterations,
+                                    set_max_iter,
+                                    &log_prior_ratios,
+                                ))
+                            }
+                        }
+                    }
+                    if let StoppingCriterion::NConv { stop_after } = stopping_criterion {
+                        done |= state.num_conv >= stop_after;
+                    }
+                } else if let Some(telemetry) = self.telemetry.as_mut() {
+                    telemetry.record_leg(set, set_iterations, false, f64::MAX);
+                }
+
+                // The budget ends the schedule early unless it was complete.
+                let budget_exhausted = !done
+                    && state.budget.is_some_and(|budget| {
+                        budget.spent(state.total_iterations) && (!converged[lane] || set < num_sets)
+                    });
+                done |= set == num_sets || budget_exhausted;
+                if done {
+                    if let Some(telemetry) = self.telemetry.as_mut() {
+                        telemetry.record_shot(
+                            (state.num_best == 1).then_some(state.best_set),
+                            budget_exhausted,
+                        );
+                    }
+                    if let Some(mut result) = state.result.take() {
+                        result.iterations = state.total_iterations;
+                        result.budget_exhausted = budget_exhausted;
+                        results[shot] = Some(result);
+                    }
+                    self.settle_budget(unused, state.budget, state.total_iterations);
+                    self.load_lane(&mut engine, lane, state, detectors, &mut next_shot, unused);
+                } else {
+                    state.set += 1;
+                    if let Some(stall_detector) = state.stall_detector.as_mut() {
+                        stall_detector.start_leg();
+                    }
+                    self.start_lane_set(&mut engine, lane, state.set);
+                }
+            }
+        }
+        self.bp_decoder.put_lane_engine(engine);
+
+        results.into_iter().map(|result| result.unwrap()).collect()
     }
 
-    fn decode_detailed(&mut self, detectors: ArrayView1<Bit>) -> DecodeResult {
+    /// Decode a syndrome on the whole graph with the Relay schedule.
+    ///
+    /// The best solution is kept in the decoder's solution buffer and only
+    /// turned into a [`DecodeResult`] once the schedule has finished or the
+    /// shot has spent its `budget`.
+    fn decode_relay(
+        &mut self,
+        detectors: ArrayView1<Bit>,
+        budget: Option<ShotBudget>,
+    ) -> DecodeResult {
         // Initialization
+        let num_sets = self.relay_config.num_sets;
+        let set_max_iter = self.relay_config.set_max_iter;
+        let deadline = budget.and_then(|budget| budget.deadline);
+        let mut budget_exhausted = false;
         let mut num_conv = 0;
         let mut min_pm = f64::MAX;
         let mut num_sets_best = 0;
         let mut best_set_idx = 0;
         let mut total_iterations: usize = 0;
-        self.num_executed_sets = 0;
         let stopping_criterion = self.relay_config.stopping_criterion.clone();
+        if let Some(stall_detector) = self.stall_detector.as_mut() {
+            stall_detector.start_shot();
+        }
 
         // First Mem-BP
         self.bp_decoder.initialize_decoder();
-        let mut result = self.decode_inner(detectors, self.relay_config.pre_iter);
-        self.num_executed_sets = 1;
-
-        // Create logging variables and log first set if applicable
-        if self.relay_config.logging {
-            self.sets_iter[0] = result.iterations;
-            self.sets_conv[0] = result.success;
+        // The residual syndrome carries over between sets as the posteriors do.
+        self.bp_decoder.initialize_residual_syndrome(detectors);
+        let max_iter = budget.map_or(self.relay_config.pre_iter, |budget| {
+            budget.leg_max_iter(self.relay_config.pre_iter, 0)
+        });
+        let success = self.decode_inner(detectors, max_iter, deadline);
+        let pm = if success {
+            self.bp_decoder.decoding_quality()
+        } else {
+            f64::MAX
+        };
+        self.bp_decoder.store_solution(
+            &mut self.best_solution,
+            success,
+            pm,
+            self.relay_config.pre_iter,
+        );
+        if let Some(telemetry) = self.telemetry.as_mut() {
+            telemetry.record_leg(0, self.bp_decoder.current_iteration, success, pm);
         }
 
         // Check early stopping criteria
-        if result.success {
+        if success {
             num_conv += 1;
-            min_pm = result.decoding_quality;
+            min_pm = pm;
             num_sets_best += 1;
-            if self.relay_config.logging {
-                self.sets_quality[0] = result.decoding_quality
-            };
 
             let mut done = false;
             if stopping_criterion == StoppingCriterion::PreIter {
@@ -316,41 +934,55 @@ where
                     done = true;
                 }
             }
-            // If stopping criterion has been met: Log (if applicable) and return
+            // If stopping criterion has been met: return
             if done {
-                if self.relay_config.logging {
-                    self.sets_best[0] = true;
-                    let file = OpenOptions::new()
-                        .append(true)
-                        .open("relay_logging.out")
-                        .unwrap();
-                    self.write_log(file);
+                if let Some(telemetry) = self.telemetry.as_mut() {
+                    telemetry.record_shot(Some(0), false);
                 }
-                return result;
+                return self
+                    .bp_decoder
+                    .solution_result(&self.best_solution, detectors);
             }
         }
 
         // Init and loop over all Relay sets
-        total_iterations += result.iterations;
-        for set in 1..=self.relay_config.num_sets {
-            // Do not completely initialize decoder as we wish to relay
-            // posterior marginals with new memory strengths.
+        total_iterations += self.bp_decoder.current_iteration;
+        let spent = |total_iterations| budget.is_some_and(|budget| budget.spent(total_iterations));
+        if spent(total_iterations) && (!success || num_sets > 0) {
+            budget_exhausted = true;
+        } else if let Some(parallel_legs) = self.relay_config.parallel_legs.as_ref() {
+            let num_workers = parallel_legs.num_workers;
+            return self.decode_parallel_legs(
+                detectors,
+                num_conv,
+                min_pm,
+                total_iterations,
+                num_workers,
+                budget,
+            );
+        }
+        for set in 1..=num_sets {
+            if budget_exhausted {
+                break;
+            }
+            let max_iter = budget.map_or(set_max_iter, |budget| {
+                budget.leg_max_iter(set_max_iter, total_iterations)
+            });
             self.init_next_set(set);
-            self.bp_decoder.current_iteration = 0;
-            self.bp_decoder.initialize_check_to_variable();
-            self.bp_decoder.initialize_variable_to_check();
-            let temp_result = self.decode_inner(detectors, self.relay_config.set_max_iter);
-
-            self.num_executed_sets += 1;
-            total_iterations += temp_result.iterations;
-            if temp_result.success {
+            let success = self.decode_inner(detectors, max_iter, deadline);
+            let iterations = self.bp_decoder.current_iteration;
+
+            total_iterations += iterations;
+            let pm = if success {
+                self.bp_decoder.decoding_quality()
+            } else {
+                f64::MAX
+            };
+            if let Some(telemetry) = self.telemetry.as_mut() {
+                telemetry.record_leg(set, iterations, success, pm);
+            }
+            if success {
                 num_conv += 1;
-                let pm = temp_result.decoding_quality;
-                if self.relay_config.logging {
-                    self.sets_conv[set] = true;
-                    self.sets_iter[set] = temp_result.iterations;
-                    self.sets_quality[set] = pm;
-                }
                 if pm == min_pm {
                     // Count how often we found the best solution
                     num_sets_best += 1;
@@ -360,7 +992,8 @@ where
                     num_sets_best = 1;
                     best_set_idx = set;
                     min_pm = pm;
-                    result = temp_result;
+                    self.bp_decoder
+                        .store_solution(&mut self.best_solution, true, pm, set_max_iter);
                 }
                 if let StoppingCriterion::NConv { stop_after } = stopping_criterion {
                     if num_conv >= stop_after {
@@ -368,26 +1001,456 @@ where
                     }
                 }
             }
+            // The budget ends the schedule early unless it was complete.
+            budget_exhausted = spent(total_iterations) && (!success || set < num_sets);
+        }
+        if let Some(telemetry) = self.telemetry.as_mut() {
+            telemetry.record_shot(
+                (num_sets_best == 1).then_some(best_set_idx),
+                budget_exhausted,
+            );
+        }
+
+        let mut result = self
+            .bp_decoder
+            .solution_result(&self.best_solution, detectors);
+        result.iterations = total_iterations;
+        result.budget_exhausted = budget_exhausted;
+        result
+    }
+
+    /// Decode the remaining Relay legs of a shot concurrently after the
+    /// pre-iteration stage, whose solution is in the solution buffer, did
+    /// not meet the stopping criterion.
+    fn decode_parallel_legs(
+        &mut self,
+        detectors: ArrayView1<Bit>,
+        num_conv: usize,
+        pre_iter_pm: f64,
+        mut total_iterations: usize,
+        num_workers: usize,
+        budget: Option<ShotBudget>,
+    ) -> DecodeResult {
+        let num_sets = self.relay_config.num_sets;
+        let set_max_iter = self.relay_config.set_max_iter;
+        let stop_after = match self.relay_config.stopping_criterion {
+            StoppingCriterion::NConv { stop_after } => stop_after,
+            _ => usize::MAX,
+        };
+        let num_workers = match num_workers {
+            0 => rayon::current_num_threads(),
+            num_workers => num_workers,
+        }
+        .clamp(1, num_sets.max(1));
+
+        // Workers start from the state of the pre-iteration stage. Without a
+        // gamma table they draw their gammas from their own generators seeded
+        // here so that they are fixed by the decoder seed.
+        let mut workers = std::mem::take(&mut self.leg_workers);
+        while workers.0.len() < num_workers {
+            workers.0.push(LegWorker {
+                bp_decoder: self.bp_decoder.clone(),
+                posterior_update_state: self.posterior_update_state.clone(),
+                stall_detector: self.stall_detector.clone(),
+                legs: Vec::new(),
+                solution: self.bp_decoder.new_solution(),
+                best_set: None,
+            });
+        }
+        for worker in &mut workers.0[..num_workers] {
+            worker.bp_decoder.copy_shot_state(&self.bp_decoder);
+            worker.posterior_update_state.rng_std =
+                rand::rngs::StdRng::seed_from_u64(self.posterior_update_state.rng_std.next_u64());
+            if let (Some(stall_detector), Some(shot_stall_detector)) =
+                (worker.stall_detector.as_mut(), self.stall_detector.as_ref())
+            {
+                stall_detector.resume_shot(shot_stall_detector);
+            }
+            worker.legs.clear();
+            worker.best_set = None;
+        }
+
+        let gamma_table = self.gamma_table.as_deref();
+        let converged_legs = AtomicUsize::new(num_conv);
+        let stop = AtomicBool::new(num_conv >= stop_after);
+        // Workers reserve the iterations of a leg from the shot's budget and
+        // return what the leg did not use.
+        let deadline = budget.and_then(|budget| budget.deadline);
+        let remaining = budget
+            .map(|budget| AtomicUsize::new(budget.max_iterations.saturating_sub(total_iterations)));
+        let budget_hit = AtomicBool::new(false);
+        // Every worker keeps the best solution of its own legs together with
+        // the record of every leg it ran.
+        workers.0[..num_workers]
+            .par_iter_mut()
+            .enumerate()
+            .for_each(|(worker_idx, worker)| {
+                let bp_decoder = &mut worker.bp_decoder;
+                for set in (worker_idx + 1..=num_sets).step_by(num_workers) {
+                    if stop.load(Ordering::Relaxed) {
+                        break;
+                    }
+                    if deadline.is_some_and(|deadline| Instant::now() >= deadline) {
+                        budget_hit.store(true, Ordering::Relaxed);
+                        break;
+                    }
+                    let max_iter = match remaining.as_ref().map(|remaining| {
+                        remaining.fetch_update(Ordering::Relaxed, Ordering::Relaxed, |left| {
+                            (left > 0).then(|| left.saturating_sub(set_max_iter))
+                        })
+                    }) {
+                        None => set_max_iter,
+                        Some(Ok(left)) => left.min(set_max_iter),
+                        Some(Err(_)) => {
+                            budget_hit.store(true, Ordering::Relaxed);
+                            break;
+                        }
+                    };
+                    Self::set_leg_gammas(
+                        bp_decoder,
+                        gamma_table,
+                        &mut worker.posterior_update_state,
+                        set,
+                    );
+                    Self::start_leg(bp_decoder);
+                    let success = Self::run_leg(
+                        bp_decoder,
+                        worker.stall_detector.as_mut(),
+                        Some(&stop),
+                        deadline,
+                        detectors,
+                        max_iter,
+                    );
+                    let iterations = bp_decoder.current_iteration;
+                    if let Some(remaining) = remaining.as_ref() {
+                        remaining.fetch_add(max_iter - iterations, Ordering::Relaxed);
+                    }
+                    if !success {
+                        let truncated = max_iter < set_max_iter && iterations >= max_iter;
+                        let out_of_time =
+                            deadline.is_some_and(|deadline| Instant::now() >= deadline);
+                        if truncated || out_of_time {
+                            budget_hit.store(true, Ordering::Relaxed);
+                        }
+                        worker.legs.push((set, iterations, false, f64::MAX));
+                        continue;
+                    }
+                    if converged_legs.fetch_add(1, Ordering::Relaxed) + 1 >= stop_after {
+                        stop.store(true, Ordering::Relaxed);
+                    }
+                    let pm = bp_decoder.decoding_quality();
+                    worker.legs.push((set, iterations, true, pm));
+                    if worker.best_set.is_none() || pm < worker.solution.decoding_quality() {
+                        worker.best_set = Some(set);
+                        bp_decoder.store_solution(&mut worker.solution, true, pm, set_max_iter);
+                    }
+                }
+            });
+
+        // Choose the best solution as the sequential schedule does, preferring
+        // earlier legs among equally good solutions.
+        let mut best: Option<(usize, &MinSumSolution<N>)> = None;
+        let mut min_pm = pre_iter_pm;
+        let mut num_sets_best = (pre_iter_pm < f64::MAX) as usize;
+        let mut best_set_idx = 0;
+        for worker in &workers.0[..num_workers] {
+            for &(set, iterations, success, pm) in &worker.legs {
+                total_iterations += iterations;
+                if let Some(telemetry) = self.telemetry.as_mut() {
+                    telemetry.record_leg(set, iterations, success, pm);
+                }
+                if !success {
+                    continue;
+                }
+                if pm == min_pm {
+                    num_sets_best += 1;
+                }
+                if pm < min_pm {
+                    num_sets_best = 1;
+                    best_set_idx = set;
+                    min_pm = pm;
+                }
+            }
+            let Some(set) = worker.best_set else {
+                continue;
+            };
+            let solution = &worker.solution;
+            let better = match best {
+                Some((best_set, best_solution)) => {
+                    solution.decoding_quality() < best_solution.decoding_quality()
+                        || (solution.decoding_quality() == best_solution.decoding_quality()
+                            && set < best_set)
+                }
+                None => solution.decoding_quality() < self.best_solution.decoding_quality(),
+            };
+            if better {
+                best = Some((set, solution));
+            }
+        }
+        let budget_exhausted = budget_hit.into_inner() && converged_legs.into_inner() < stop_after;
+        if let Some(telemetry) = self.telemetry.as_mut() {
+            telemetry.record_shot(
+                (num_sets_best == 1).then_some(best_set_idx),
+                budget_exhausted,
+            );
+        }
+
+        let best_solution = best.map_or(&self.best_solution, |(_, solution)| solution);
+        let mut result = self.bp_decoder.solution_result(best_solution, detectors);
+        result.iterations = total_iterations;
+        result.budget_exhausted = budget_exhausted;
+        self.leg_workers = workers;
+        result
+    }
+
+    /// Decode a single shot within its budget.
+    fn decode_shot(
+        &mut self,
+        detectors: ArrayView1<Bit>,
+        unused: &mut UnusedBudget,
+    ) -> DecodeResult {
+        let budget = self.start_budget(unused);
+        let (result, spent) = self.decode_shot_within(detectors, budget);
+        self.settle_budget(unused, budget, spent);
+        result
+    }
+
+    /// Decode a single shot, decomposing it into components if enabled.
+    ///
+    /// The components split the budget between them and a shot that falls
+    /// back to the whole graph only has what they left. Returns the result
+    /// and the iterations spent on the shot over all components and legs.
+    fn decode_shot_within(
+        &mut self,
+        detectors: ArrayView1<Bit>,
+        budget: Option<ShotBudget>,
+    ) -> (DecodeResult, usize) {
+        let mut spent = 0;
+        if let Some(component_decomposer) = self.component_decomposer.clone() {
+            let component_iterations = AtomicUsize::new(0);
+            let mut scratch = std::mem::take(&mut self.decomposition_scratch);
+            let result = component_decomposer.decode(
+                detectors,
+                self.bp_decoder.log_prior_ratios_f64(),
+                &mut scratch,
+                |component, detectors, num_components| {
+                    let mut decoder =
+                        self.component_decoders.take(component).unwrap_or_else(|| {
+                            self.restricted(component.check_matrix.clone(), &component.variables)
+                        });
+                    let (result, spent) = decoder.decode_restricted(
+                        detectors,
+                        budget.map(|budget| budget.split(num_components)),
+                    );
+                    component_iterations.fetch_add(spent, Ordering::Relaxed);
+                    self.component_decoders.put(component, decoder);
+                    Some(result)
+                },
+            );
+            self.decomposition_scratch = scratch;
+            spent = component_iterations.into_inner();
+            if let Some(result) = result {
+                return (result, spent);
+            }
+        }
+        let result = self.decode_relay(detectors, budget.map(|budget| budget.remaining(spent)));
+        spent += result.iterations;
+        (result, spent)
+    }
+
+    /// Decode the syndrome of a component with a decoder built by
+    /// [`Self::restricted`] within the component's share of the budget.
+    fn decode_restricted(
+        &mut self,
+        detectors: ArrayView1<Bit>,
+        budget: Option<ShotBudget>,
+    ) -> (DecodeResult, usize) {
+        // A reused decoder draws the same gammas as a newly built one, so
+        // that decodings do not depend on the shots it decoded before.
+        self.posterior_update_state = Self::init_dismem_state(&self.relay_config);
+        self.decode_shot_within(detectors, budget)
+    }
+
+    /// Decode with the inner decoder and return whether it converged.
+    fn decode_inner(
+        &mut self,
+        detectors: ArrayView1<Bit>,
+        max_iter: usize,
+        deadline: Option<Instant>,
+    ) -> bool {
+        Self::run_leg(
+            &mut self.bp_decoder,
+            self.stall_detector.as_mut(),
+            None,
+            deadline,
+            detectors,
+            max_iter,
+        )
+    }
+
+    /// Run one leg of the Relay schedule on a BP decoder and return whether
+    /// it converged. The leg ends early if it stalls, `stop` is raised by
+    /// another worker or the `deadline` passes.
+    fn run_leg(
+        bp_decoder: &mut MinSumBPDecoder<N>,
+        mut stall_detector: Option<&mut StallDetector>,
+        stop: Option<&AtomicBool>,
+        deadline: Option<Instant>,
+        detectors: ArrayView1<Bit>,
+        max_iter: usize,
+    ) -> bool {
+        if let Some(stall_detector) = stall_detector.as_deref_mut() {
+            stall_detector.start_leg();
+        }
+
+        for _ in 0..max_iter {
+            bp_decoder.run_iteration(detectors);
+            bp_decoder.current_iteration += 1;
+
+            // If we have converged may now exit
+            if bp_decoder.residual_converged() {
+                debug!("Succeeded on iteration {:?}", bp_decoder.current_iteration);
+                return true;
+            }
+
+            if let Some(stall_detector) = stall_detector.as_deref_mut() {
+                if stall_detector.update(bp_decoder.decoding_hash()) {
+                    debug!("Stalled on iteration {:?}", bp_decoder.current_iteration);
+                    break;
+                }
+            }
+            if stop.is_some_and(|stop| stop.load(Ordering::Relaxed)) {
+                break;
+            }
+            if deadline.is_some_and(|deadline| Instant::now() >= deadline) {
+                debug!(
+                    "Deadline passed on iteration {:?}",
+                    bp_decoder.current_iteration
+                );
+                break;
+            }
+        }
+        false
+    }
+}
+
+impl<N> Decoder for RelayDecoder<N>
+where
+    N: PartialEq
+        + Debug
+        + Default
+        + Clone
+        + Copy
+        + Signed
+        + Bounded
+        + FromPrimitive
+        + ToPrimitive
+        + std::cmp::PartialOrd
+        + std::ops::Add
+        + std::ops::AddAssign
+        + std::ops::DivAssign
+        + std::ops::Mul<N>
+        + std::ops::MulAssign
+        + Send
+        + Sync
+        + std::fmt::Display
+        + MessageArithmetic
+        + 'static,
+{
+    fn check_matrix(&self) -> Arc<SparseBitMatrix> {
+        self.bp_decoder.check_matrix()
+    }
+
+    fn log_prior_ratios(&mut self) -> Array1<f64> {
+        self.bp_decoder.log_prior_ratios()
+    }
+
+    fn decode_detailed(&mut self, detectors: ArrayView1<Bit>) -> DecodeResult {
+        // Single shots keep their telemetry local until the next batch, see
+        // [`Decoder::flush_telemetry`].
+        let mut unused = self.start_batch();
+        let result = self.decode_shot(detectors, &mut unused);
+        self.finish_batch(unused);
+        result
+    }
+
+    fn decode_batch_into(&mut self, detectors: ArrayView2<Bit>, mut out: ArrayViewMut2<Bit>) {
+        // Unused budget is only shared between the shots of a batch.
+        let mut unused = self.start_batch();
+        if self.lanes_supported() {
+            self.decode_lanes(detectors, Some(out), &mut unused);
+        } else {
+            for (row, mut decoding) in detectors.axis_iter(Axis(0)).zip(out.axis_iter_mut(Axis(0)))
+            {
+                decoding.assign(&self.decode_shot(row, &mut unused).decoding);
+            }
+        }
+        self.finish_batch(unused);
+        // A split batch merges the telemetry of its chunks once it is done.
+        if self.split_batch.is_none() {
+            self.flush_telemetry();
+        }
+    }
+
+    fn decode_detailed_batch(&mut self, detectors: ArrayView2<Bit>) -> Vec<DecodeResult> {
+        // Unused budget is only shared between the shots of a batch.
+        let mut unused = self.start_batch();
+        let results = if self.lanes_supported() {
+            self.decode_lanes(detectors, None, &mut unused)
+        } else {
+            detectors
+                .axis_iter(Axis(0))
+                .map(|row| self.decode_shot(row, &mut unused))
+                .collect()
+        };
+        self.finish_batch(unused);
+        if self.split_batch.is_none() {
+            self.flush_telemetry();
+        }
+        results
+    }
+
+    fn get_decoding_quality(&mut self, errors: ArrayView1<u8>) -> f64 {
+        self.bp_decoder.get_decoding_quality(errors)
+    }
+
+    fn flush_telemetry(&mut self) {
+        if let Some(telemetry) = self.telemetry.as_mut() {
+            telemetry.flush();
         }
-        result.iterations = total_iterations;
+    }
 
-        // Rest of the function is just logging
-        if self.relay_config.logging {
-            if num_sets_best == 1 {
-                self.sets_best[best_set_idx] = true;
-            }
-            let file = OpenOptions::new()
-                .append(true)
-                .open("relay_logging.out")
-                .unwrap();
-            self.write_log(file);
+    fn join_split_batch(&mut self, batch: &Arc<SplitBatch>) -> bool {
+        if self.split_batch.is_some() {
+            return false;
         }
+        self.split_batch = Some(batch.clone());
+        true
+    }
 
-        result
+    fn leave_split_batch(&mut self) {
+        if self.split_batch.take().is_some() {
+            self.flush_telemetry();
+        }
     }
 
-    fn get_decoding_quality(&mut self, errors: ArrayView1<u8>) -> f64 {
-        self.bp_decoder.get_decoding_quality(errors)
+    fn restricted_decoder(
+        &self,
+        check_matrix: Arc<SparseBitMatrix>,
+        variables: &[usize],
+    ) -> Option<Box<dyn Decoder + Send>> {
+        Some(Box::new(self.restricted(check_matrix, variables)))
+    }
+
+    fn decode_component(
+        &mut self,
+        detectors: ArrayView1<Bit>,
+        num_components: usize,
+    ) -> DecodeResult {
+        let budget = self
+            .start_budget(&mut UnusedBudget::default())
+            .map(|budget| budget.split(num_components));
+        self.decode_restricted(detectors, budget).0
     }
 }
 
@@ -410,6 +1473,7 @@ impl<N> DecoderRunner for RelayDecoder<N> where
         + Send
         + Sync
         + std::fmt::Display
+        + MessageArithmetic
         + 'static
 {
 }
@@ -543,6 +1607,512 @@ mod tests {
         assert_eq!(results[0].decoding.len(), 8785);
     }
 
+    #[test]
+    fn stall_detector_aborts_stalled_legs() {
+        let mut detector = StallDetector::new(StallDetectionConfig {
+            window: 3,
+            max_period: 2,
+            abort_on_repeat: true,
+        });
+        detector.start_shot();
+
+        // A hard decision that changes every iteration is not stalled.
+        assert!(!(0..10).any(|hash| detector.update(hash)));
+
+        // An oscillation of period two stalls after the window.
+        detector.start_leg();
+        let stalled: Vec<bool> = [1, 2, 1, 2, 1]
+            .iter()
+            .map(|h| detector.update(*h))
+            .collect();
+        assert_eq!(stalled, [false, false, false, false, true]);
+
+        // Later legs abort as soon as they reach the stalled state.
+        detector.start_leg();
+        assert!(!detector.update(7));
+        assert!(detector.update(1));
+
+        // But not in the next shot.
+        detector.start_shot();
+        assert!(!detector.update(1));
+    }
+
+    #[test]
+    fn decode_144_12_12_stall_detection() {
+        let resources = get_test_data_path();
+        let code_144_12_12 =
+            DetectorErrorModel::load(resources.join("144_12_12")).expect("Unable to load the code");
+        let detectors_144_12_12: Array2<Bit> =
+            read_npy(resources.join("144_12_12_detectors.npy")).expect("Unable to open file");
+        let bp_config_144_12_12 = MinSumDecoderConfig {
+            error_priors: code_144_12_12.error_priors,
+            max_iter: 200,
+            alpha: None,
+            alpha_iteration_scaling_factor: 0.,
+            gamma0: Some(0.9),
+            ..Default::default()
+        };
+        let relay_config = RelayDecoderConfig {
+            stall_detection: Some(Default::default()),
+            ..Default::default()
+        };
+        let check_matrix = Arc::new(code_144_12_12.detector_error_matrix);
+        let bp_config = Arc::new(bp_config_144_12_12);
+        let config = Arc::new(relay_config);
+        let mut decoder_144_12_12: RelayDecoder<f64> =
+            RelayDecoder::new(check_matrix, bp_config, config);
+        let num_errors = 100;
+        let detectors_slice = detectors_144_12_12.slice(s![..num_errors, ..]);
+
+        let batch_results = decoder_144_12_12.decode_detailed_batch(detectors_slice);
+        let results: Vec<DecodeResult> = detectors_slice
+            .axis_iter(Axis(0))
+            .map(|detectors| decoder_144_12_12.decode_detailed(detectors))
+            .collect();
+        for results in [batch_results, results] {
+            assert!(
+                results.iter().map(|x| x.success as usize).sum::<usize>() as f64
+                    >= (detectors_slice.shape()[0] as f64) * 0.95
+            );
+            for (result, detectors) in results.iter().zip(detectors_slice.axis_iter(Axis(0))) {
+                if result.success {
+                    assert_eq!(
+                        decoder_144_12_12.get_detectors(result.decoding.view()),
+                        detectors
+                    );
+                }
+            }
+        }
+    }
+
+    #[test]
+    fn decode_144_12_12_parallel_legs() {
+        let resources = get_test_data_path();
+        let code_144_12_12 =
+            DetectorErrorModel::load(resources.join("144_12_12")).expect("Unable to load the code");
+        let detectors_144_12_12: Array2<Bit> =
+            read_npy(resources.join("144_12_12_detectors.npy")).expect("Unable to open file");
+        let check_matrix = Arc::new(code_144_12_12.detector_error_matrix);
+        // Few pre-iterations so that most shots reach the Relay legs.
+        let bp_config = Arc::new(MinSumDecoderConfig {
+            error_priors: code_144_12_12.error_priors,
+            max_iter: 10,
+            alpha: None,
+            alpha_iteration_scaling_factor: 0.,
+            gamma0: Some(0.9),
+            ..Default::default()
+        });
+        let num_errors = 100;
+        let detectors_slice = detectors_144_12_12.slice(s![..num_errors, ..]);
+
+        for stopping_criterion in [
+            StoppingCriterion::NConv { stop_after: 3 },
+            StoppingCriterion::All,
+        ] {
+            let relay_config = RelayDecoderConfig {
+                pre_iter: 10,
+                num_sets: 20,
+                stopping_criterion,
+                parallel_legs: Some(ParallelLegsConfig { num_workers: 4 }),
+                ..Default::default()
+            };
+            let mut decoder_144_12_12: RelayDecoder<f64> = RelayDecoder::new(
+                check_matrix.clone(),
+                bp_config.clone(),
+                Arc::new(relay_config),
+            );
+
+            let results: Vec<DecodeResult> = detectors_slice
+                .axis_iter(Axis(0))
+                .map(|detectors| decoder_144_12_12.decode_detailed(detectors))
+                .collect();
+            assert!(
+                results.iter().map(|x| x.success as usize).sum::<usize>()
+                    == (detectors_slice.shape()[0])
+            );
+            for (result, detectors) in results.iter().zip(detectors_slice.axis_iter(Axis(0))) {
+                assert_eq!(
+                    decoder_144_12_12.get_detectors(result.decoding.view()),
+                    detectors
+                );
+            }
+            // The workers are kept for later shots but not copied to clones.
+            assert_eq!(decoder_144_12_12.leg_workers.0.len(), 4);
+            assert!(decoder_144_12_12.clone().leg_workers.0.is_empty());
+        }
+    }
+
+    #[test]
+    fn decode_144_12_12_telemetry() {
+        let resources = get_test_data_path();
+        let code_144_12_12 =
+            DetectorErrorModel::load(resources.join("144_12_12")).expect("Unable to load the code");
+        let detectors_144_12_12: Array2<Bit> =
+            read_npy(resources.join("144_12_12_detectors.npy")).expect("Unable to open file");
+        let check_matrix = Arc::new(code_144_12_12.detector_error_matrix);
+        let bp_config = Arc::new(MinSumDecoderConfig {
+            error_priors: code_144_12_12.error_priors,
+            max_iter: 10,
+            alpha: None,
+            alpha_iteration_scaling_factor: 0.,
+            gamma0: Some(0.9),
+            ..Default::default()
+        });
+        let num_errors = 100;
+        let detectors_slice = detectors_144_12_12.slice(s![..num_errors, ..]);
+
+        for parallel_legs in [None, Some(ParallelLegsConfig { num_workers: 4 })] {
+            let relay_config = RelayDecoderConfig {
+                pre_iter: 10,
+                num_sets: 20,
+                stopping_criterion: StoppingCriterion::NConv { stop_after: 3 },
+                logging: true,
+                parallel_legs,
+                ..Default::default()
+            };
+            let mut decoder_144_12_12: RelayDecoder<f64> = RelayDecoder::new(
+                check_matrix.clone(),
+                bp_config.clone(),
+                Arc::new(relay_config),
+            );
+            let handle = decoder_144_12_12.telemetry_handle().unwrap();
+
+            // Batches merge the telemetry of every clone.
+            let results = decoder_144_12_12.par_decode_detailed_batch(detectors_slice);
+            let telemetry = handle.snapshot();
+            assert_eq!(telemetry.num_shots, num_errors);
+            assert_eq!(telemetry.leg_runs[0], num_errors);
+            assert_eq!(
+                telemetry.leg_iterations.sum(),
+                results
+                    .iter()
+                    .map(|result| result.iterations)
+                    .sum::<usize>()
+            );
+            assert_eq!(
+                telemetry.converged_iterations.sum(),
+                telemetry.leg_converged.sum()
+            );
+            assert!(telemetry.leg_unique_best.sum() <= num_errors);
+            assert!(telemetry.leg_runs.iter().skip(1).any(|runs| *runs > 0));
+
+            handle.reset();
+            for detectors in detectors_slice.axis_iter(Axis(0)) {
+                decoder_144_12_12.decode_detailed(detectors);
+            }
+            let telemetry = decoder_144_12_12.telemetry().unwrap();
+            assert_eq!(telemetry.num_shots, num_errors);
+            assert_eq!(telemetry.leg_runs[0], num_errors);
+        }
+    }
+
+    #[test]
+    fn decode_144_12_12_budget() {
+        let resources = get_test_data_path();
+        let code_144_12_12 =
+            DetectorErrorModel::load(resources.join("144_12_12")).expect("Unable to load the code");
+        let detectors_144_12_12: Array2<Bit> =
+            read_npy(resources.join("144_12_12_detectors.npy")).expect("Unable to open file");
+        let check_matrix = Arc::new(code_144_12_12.detector_error_matrix);
+        let bp_config = Arc::new(MinSumDecoderConfig {
+            error_priors: code_144_12_12.error_priors,
+            max_iter: 10,
+            alpha: None,
+            alpha_iteration_scaling_factor: 0.,
+            gamma0: Some(0.9),
+            ..Default::default()
+        });
+        let num_errors = 100;
+        let detectors_slice = detectors_144_12_12.slice(s![..num_errors, ..]);
+        let max_iterations = 25;
+
+        for share_unused in [false, true] {
+            let relay_config = RelayDecoderConfig {
+                pre_iter: 10,
+                num_sets: 20,
+                set_max_iter: 20,
+                stopping_criterion: StoppingCriterion::NConv { stop_after: 3 },
+                budget: Some(DecodeBudgetConfig {
+                    max_iterations: Some(max_iterations),
+                    deadline: None,
+                    share_unused,
+                }),
+                ..Default::default()
+            };
+            let mut decoder_144_12_12: RelayDecoder<f64> = RelayDecoder::new(
+                check_matrix.clone(),
+                bp_config.clone(),
+                Arc::new(relay_config),
+            );
+
+            // Both the lane-batched engine and single shots keep to the budget.
+            let batch_results = decoder_144_12_12.decode_detailed_batch(detectors_slice);
+            let shot_results: Vec<DecodeResult> = detectors_slice
+                .axis_iter(Axis(0))
+                .map(|detectors| decoder_144_12_12.decode_detailed(detectors))
+                .collect();
+            for results in [&batch_results, &shot_results] {
+                assert!(results.iter().any(|result| result.budget_exhausted));
+                let total_iterations: usize = results.iter().map(|result| result.iterations).sum();
+                assert!(total_iterations <= num_errors * max_iterations);
+                for (result, detectors) in results.iter().zip(detectors_slice.axis_iter(Axis(0))) {
+                    if result.success {
+                        assert_eq!(
+                            decoder_144_12_12.get_detectors(result.decoding.view()),
+                            detectors
+                        );
+                    }
+                }
+            }
+            for result in shot_results.iter() {
+                assert!(result.iterations <= max_iterations);
+            }
+            if !share_unused {
+                for result in batch_results.iter() {
+                    assert!(result.iterations <= max_iterations);
+                }
+            }
+        }
+
+        // A deadline that has always passed stops every shot after its
+        // first iteration.
+        let relay_config = RelayDecoderConfig {
+            pre_iter: 10,
+            num_sets: 20,
+            budget: Some(DecodeBudgetConfig {
+                deadline: Some(Duration::ZERO),
+                ..Default::default()
+            }),
+            ..Default::default()
+        };
+        let mut decoder_144_12_12: RelayDecoder<f64> =
+            RelayDecoder::new(check_matrix, bp_config, Arc::new(relay_config));
+        for results in [
+            decoder_144_12_12.decode_detailed_batch(detectors_slice),
+            decoder_144_12_12.par_decode_detailed_batch(detectors_slice),
+        ] {
+            for result in results.iter() {
+                assert_eq!(result.iterations, 1);
+                assert_eq!(result.budget_exhausted, !result.success);
+            }
+        }
+    }
+
+    #[test]
+    fn budget_shared_across_split_batch() {
+        // No error flips the last check, so a syndrome setting it is never
+        // explained and its shot spends its whole budget.
+        let check_matrix = array![[1, 1, 0], [0, 1, 1], [0, 0, 0]];
+        let check_matrix = Arc::new(SparseBipartiteGraph::from_dense(check_matrix));
+        let bp_config = Arc::new(MinSumDecoderConfig {
+            error_priors: array![0.003, 0.003, 0.003],
+            alpha: Some(1.),
+            ..Default::default()
+        });
+        let relay_config = Arc::new(RelayDecoderConfig {
+            pre_iter: 20,
+            num_sets: 10,
+            set_max_iter: 20,
+            budget: Some(DecodeBudgetConfig {
+                max_iterations: Some(5),
+                share_unused: true,
+                ..Default::default()
+            }),
+            ..Default::default()
+        });
+        let decoder: RelayDecoder<f32> = RelayDecoder::new(check_matrix, bp_config, relay_config);
+        let trivial: Array2<Bit> = Array2::zeros((4, 3));
+        let unexplained: Array2<Bit> = array![[0, 0, 1]];
+
+        // The chunks of a split batch, decoded by clones, hand the budget
+        // they leave unused on to the later chunks.
+        let batch = Arc::default();
+        let mut first = decoder.clone();
+        let mut second = decoder.clone();
+        assert!(first.join_split_batch(&batch));
+        assert!(second.join_split_batch(&batch));
+        assert!(!second.join_split_batch(&Arc::default()));
+        let trivial_results = first.decode_detailed_batch(trivial.view());
+        let results = second.decode_detailed_batch(unexplained.view());
+        for result in trivial_results.iter() {
+            assert!(result.success);
+            assert!(!result.budget_exhausted);
+            assert_eq!(result.iterations, 1);
+        }
+        assert!(results[0].budget_exhausted);
+        assert_eq!(results[0].iterations, 5 + 4 * 4);
+
+        // Otherwise every batch starts with its own budget.
+        decoder.clone().decode_detailed_batch(trivial.view());
+        let results = decoder.clone().decode_detailed_batch(unexplained.view());
+        assert!(results[0].budget_exhausted);
+        assert_eq!(results[0].iterations, 5);
+    }
+
+    #[test]
+    fn decode_144_12_12_precomputed_gammas() {
+        let resources = get_test_data_path();
+        let code_144_12_12 =
+            DetectorErrorModel::load(resources.join("144_12_12")).expect("Unable to load the code");
+        let detectors_144_12_12: Array2<Bit> =
+            read_npy(resources.join("144_12_12_detectors.npy")).expect("Unable to open file");
+        let bp_config_144_12_12 = MinSumDecoderConfig {
+            error_priors: code_144_12_12.error_priors,
+            max_iter: 200,
+            alpha: None,
+            alpha_iteration_scaling_factor: 0.,
+            gamma0: Some(0.9),
+            ..Default::default()
+        };
+        let relay_config = RelayDecoderConfig {
+            precompute_gammas: true,
+            ..Default::default()
+        };
+        let check_matrix = Arc::new(code_144_12_12.detector_error_matrix);
+        let bp_config = Arc::new(bp_config_144_12_12);
+        let config = Arc::new(relay_config);
+        let mut decoder_144_12_12: RelayDecoder<f64> =
+            RelayDecoder::new(check_matrix, bp_config, config);
+        let num_errors = 100;
+        let detectors_slice = detectors_144_12_12.slice(s![..num_errors, ..]);
+
+        let batch_results = decoder_144_12_12.decode_detailed_batch(detectors_slice);
+        assert!(
+            batch_results
+                .iter()
+                .map(|x| x.success as usize)
+                .sum::<usize>()
+                == (detectors_slice.shape()[0])
+        );
+
+        // Decodings written straight from the lanes match the built results.
+        let decodings = decoder_144_12_12.decode_batch(detectors_slice);
+        for (result, decoding) in batch_results.iter().zip(decodings.axis_iter(Axis(0))) {
+            assert_eq!(result.decoding, decoding);
+        }
+
+        // Every shot sees the same gammas, so decoding shots in a different
+        // order does not change their results.
+        let results: Vec<DecodeResult> = detectors_slice
+            .axis_iter(Axis(0))
+            .map(|detectors| decoder_144_12_12.decode_detailed(detectors))
+            .collect();
+        let mut reversed_results: Vec<DecodeResult> = detectors_slice
+            .axis_iter(Axis(0))
+            .rev()
+            .map(|detectors| decoder_144_12_12.decode_detailed(detectors))
+            .collect();
+        reversed_results.reverse();
+        for (result, reversed_result) in results.iter().zip(reversed_results.iter()) {
+            assert_eq!(result.decoding, reversed_result.decoding);
+            assert_eq!(result.iterations, reversed_result.iterations);
+        }
+    }
+
+    #[test]
+    fn decode_144_12_12_components() {
+        let resources = get_test_data_path();
+        let code_144_12_12 =
+            DetectorErrorModel::load(resources.join("144_12_12")).expect("Unable to load the code");
+        let detectors_144_12_12: Array2<Bit> =
+            read_npy(resources.join("144_12_12_detectors.npy")).expect("Unable to open file");
+        let bp_config_144_12_12 = MinSumDecoderConfig {
+            error_priors: code_144_12_12.error_priors,
+            max_iter: 200,
+            alpha: None,
+            alpha_iteration_scaling_factor: 0.,
+            gamma0: Some(0.9),
+            ..Default::default()
+        };
+        let relay_config = RelayDecoderConfig {
+            component_decomposition: Some(Default::default()),
+            ..Default::default()
+        };
+        let check_matrix = Arc::new(code_144_12_12.detector_error_matrix);
+        let bp_config = Arc::new(bp_config_144_12_12);
+        let config = Arc::new(relay_config);
+        let mut decoder_144_12_12: RelayDecoder<f64> =
+            RelayDecoder::new(check_matrix, bp_config, config);
+        let num_errors = 100;
+        let detectors_slice = detectors_144_12_12.slice(s![..num_errors, ..]);
+        let results = decoder_144_12_12.par_decode_detailed_batch(detectors_slice);
+
+        assert!(
+            results.iter().map(|x| x.success as usize).sum::<usize>()
+                == (detectors_slice.shape()[0])
+        );
+        for (result, detectors) in results.iter().zip(detectors_slice.axis_iter(Axis(0))) {
+            assert_eq!(result.decoded_detectors, detectors);
+            assert_eq!(
+                decoder_144_12_12.get_detectors(result.decoding.view()),
+                detectors
+            );
+        }
+
+        // Decoders of recurring components are reused and decode the same
+        // as the newly built ones of a clone, which starts with no cache.
+        for _ in 0..2 {
+            for detectors in detectors_slice.axis_iter(Axis(0)) {
+                let mut fresh = decoder_144_12_12.clone();
+                let result = decoder_144_12_12.decode_detailed(detectors);
+                let expected = fresh.decode_detailed(detectors);
+                assert_eq!(result.decoding, expected.decoding);
+                assert_eq!(result.iterations, expected.iterations);
+            }
+        }
+        assert!(!decoder_144_12_12.component_decoders.is_empty());
+    }
+
+    #[test]
+    fn decode_144_12_12_components_budget() {
+        let resources = get_test_data_path();
+        let code_144_12_12 =
+            DetectorErrorModel::load(resources.join("144_12_12")).expect("Unable to load the code");
+        let detectors_144_12_12: Array2<Bit> =
+            read_npy(resources.join("144_12_12_detectors.npy")).expect("Unable to open file");
+        let bp_config = Arc::new(MinSumDecoderConfig {
+            error_priors: code_144_12_12.error_priors,
+            max_iter: 10,
+            alpha: None,
+            alpha_iteration_scaling_factor: 0.,
+            gamma0: Some(0.9),
+            ..Default::default()
+        });
+        let max_iterations = 25;
+        let relay_config = RelayDecoderConfig {
+            pre_iter: 10,
+            num_sets: 20,
+            set_max_iter: 20,
+            component_decomposition: Some(Default::default()),
+            budget: Some(DecodeBudgetConfig {
+                max_iterations: Some(max_iterations),
+                deadline: None,
+                share_unused: false,
+            }),
+            ..Default::default()
+        };
+        let mut decoder_144_12_12: RelayDecoder<f64> = RelayDecoder::new(
+            Arc::new(code_144_12_12.detector_error_matrix),
+            bp_config,
+            Arc::new(relay_config),
+        );
+
+        // The components of a shot and the whole graph fallback spend the
+        // budget of the shot together rather than one budget each.
+        for detectors in detectors_144_12_12.slice(s![..100, ..]).axis_iter(Axis(0)) {
+            let budget = decoder_144_12_12.start_budget(&mut UnusedBudget::default());
+            let (result, spent) = decoder_144_12_12.decode_shot_within(detectors, budget);
+            assert!(spent <= max_iterations);
+            assert!(result.iterations <= spent);
+            if result.success {
+                assert_eq!(
+                    decoder_144_12_12.get_detectors(result.decoding.view()),
+                    detectors
+                );
+            }
+        }
+    }
+
     // Basic test where Relay runs 40 sets
     #[test]
     fn decode_144_12_12_int() {
@@ -585,4 +2155,48 @@ mod tests {
 
         assert_eq!(results[0].decoding.len(), 8785);
     }
+
+    #[test]
+    fn decode_144_12_12_i16_calibrated() {
+        let resources = get_test_data_path();
+        let code_144_12_12 =
+            DetectorErrorModel::load(resources.join("144_12_12")).expect("Unable to load the code");
+        let detectors_144_12_12: Array2<Bit> =
+            read_npy(resources.join("144_12_12_detectors.npy")).expect("Unable to open file");
+
+        let mut bp_config_144_12_12 = MinSumDecoderConfig {
+            error_priors: code_144_12_12.error_priors,
+            max_iter: 200,
+            alpha: None,
+            alpha_iteration_scaling_factor: 0.,
+            gamma0: Some(0.9),
+            ..Default::default()
+        };
+        bp_config_144_12_12.calibrate_integer_scaling(i16::MAX as f64, 2.);
+        let data_scale_value = bp_config_144_12_12.data_scale_value.unwrap();
+        let max_data_value = bp_config_144_12_12.max_data_value.unwrap();
+        assert!(data_scale_value * max_data_value <= i16::MAX as f64);
+
+        let check_matrix = Arc::new(code_144_12_12.detector_error_matrix);
+        let bp_config = Arc::new(bp_config_144_12_12);
+        let config = Arc::new(RelayDecoderConfig::default());
+        let mut decoder_144_12_12: RelayDecoder<i16> =
+            RelayDecoder::new(check_matrix, bp_config, config);
+        let num_errors = 100;
+        let detectors_slice = detectors_144_12_12.slice(s![..num_errors, ..]);
+        let results = decoder_144_12_12.par_decode_detailed_batch(detectors_slice);
+
+        assert!(
+            results.iter().map(|x| x.success as usize).sum::<usize>() as f64
+                >= (detectors_slice.shape()[0] as f64) * 0.9
+        );
+        for (result, detectors) in results.iter().zip(detectors_slice.axis_iter(Axis(0))) {
+            if result.success {
+                assert_eq!(
+                    decoder_144_12_12.get_detectors(result.decoding.view()),
+                    detectors
+                );
+            }
+        }
+    }
 }
@@ -0,0 +1,357 @@
+// (C) Copyright IBM 2025
+//
+// This code is licensed under the Apache License, Version 2.0. You may
+// obtain a copy of this license in the LICENSE.txt file in the root directory
+// of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+//
+// Any modifications or derivative works of this code must retain this
+// copyright notice, and modified files need to carry a notice indicating
+// that they have been altered from the originals.
+
+//! Runtime-dispatched SIMD kernels for the min-sum message updates.
+//!
+//! The message passing loops are written as branchless, lane-structured
+//! kernels that are generic over the message type. A BP iteration is run
+//! through [`dispatch`], which calls it from a frame compiled for the
+//! instruction set selected at runtime (SSE4.2, AVX2 or AVX-512 on x86-64,
+//! NEON on AArch64). The kernels are `#[inline(always)]` so that they are
+//! instantiated, and vectorized, once per instruction set. A single binary
+//! therefore uses the widest vectors of the machine it runs on for every
+//! message type, including the integer and fixed point instantiations.
+
+use num_traits::{Bounded, Signed};
+use std::sync::OnceLock;
+
+/// Instruction set used by the message passing kernels.
+#[derive(Clone, Copy, PartialEq, Eq, Debug)]
+pub enum SimdLevel {
+    /// The baseline instruction set of the compilation target.
+    Scalar,
+    /// x86-64 SSE4.2 (128-bit vectors).
+    Sse42,
+    /// x86-64 AVX2 (256-bit vectors).
+    Avx2,
+    /// x86-64 AVX-512 F and BW (512-bit vectors).
+    Avx512,
+    /// AArch64 NEON (128-bit vectors).
+    Neon,
+}
+
+impl SimdLevel {
+    /// The widest instruction set supported by the running CPU.
+    ///
+    /// Feature detection runs once per process.
+    pub fn detect() -> SimdLevel {
+        static LEVEL: OnceLock<SimdLevel> = OnceLock::new();
+        *LEVEL.get_or_init(|| {
+            [
+                SimdLevel::Avx512,
+                SimdLevel::Avx2,
+                SimdLevel::Sse42,
+                SimdLevel::Neon,
+            ]
+            .into_iter()
+            .find(|level| level.is_supported())
+            .unwrap_or(SimdLevel::Scalar)
+        })
+    }
+
+    /// Whether the running CPU supports this instruction set.
+    pub fn is_supported(&self) -> bool {
+        match self {
+            SimdLevel::Scalar => true,
+            #[cfg(target_arch = "x86_64")]
+            SimdLevel::Sse42 => is_x86_feature_detected!("sse4.2"),
+            #[cfg(target_arch = "x86_64")]
+            SimdLevel::Avx2 => is_x86_feature_detected!("avx2"),
+            #[cfg(target_arch = "x86_64")]
+            SimdLevel::Avx512 => {
+                is_x86_feature_detected!("avx512f") && is_x86_feature_detected!("avx512bw")
+            }
+            #[cfg(target_arch = "aarch64")]
+            SimdLevel::Neon => std::arch::is_aarch64_feature_detected!("neon"),
+            #[allow(unreachable_patterns)]
+            _ => false,
+        }
+    }
+}
+
+/// A unit of work run by [`dispatch`] under the selected instruction set.
+///
+/// Implementations should mark `run` and everything it calls in its hot
+/// loops `#[inline(always)]`, as only code inlined into the dispatching
+/// frame is compiled for the selected instruction set.
+pub(crate) trait SimdKernel {
+    type Output;
+
+    fn run(self) -> Self::Output;
+}
+
+/// Run `kernel` compiled for the instruction set `level`.
+///
+/// Panics if the running CPU does not support `level`.
+#[inline]
+pub(crate) fn dispatch<K: SimdKernel>(level: SimdLevel, kernel: K) -> K::Output {
+    match level {
+        SimdLevel::Scalar => kernel.run(),
+        // Safety: the instruction set is checked to be supported before the
+        // functions compiled for it are called.
+        #[cfg(target_arch = "x86_64")]
+        SimdLevel::Sse42 if level.is_supported() => unsafe { x86_64::run_sse42(kernel) },
+        #[cfg(target_arch = "x86_64")]
+        SimdLevel::Avx2 if level.is_supported() => unsafe { x86_64::run_avx2(kernel) },
+        #[cfg(target_arch = "x86_64")]
+        SimdLevel::Avx512 if level.is_supported() => unsafe { x86_64::run_avx512(kernel) },
+        #[cfg(target_arch = "aarch64")]
+        SimdLevel::Neon if level.is_supported() => unsafe { aarch64::run_neon(kernel) },
+        _ => panic!("SIMD level {level:?} is not supported by this CPU"),
+    }
+}
+
+#[cfg(target_arch = "x86_64")]
+mod x86_64 {
+    use super::SimdKernel;
+
+    #[target_feature(enable = "sse4.2")]
+    pub(super) unsafe fn run_sse42<K: SimdKernel>(kernel: K) -> K::Output {
+        kernel.run()
+    }
+
+    #[target_feature(enable = "avx2,fma")]
+    pub(super) unsafe fn run_avx2<K: SimdKernel>(kernel: K) -> K::Output {
+        kernel.run()
+    }
+
+    #[target_feature(enable = "avx512f,avx512bw,avx512vl,avx2,fma")]
+    pub(super) unsafe fn run_avx512<K: SimdKernel>(kernel: K) -> K::Output {
+        kernel.run()
+    }
+}
+
+#[cfg(target_arch = "aarch64")]
+mod aarch64 {
+    use super::SimdKernel;
+
+    #[target_feature(enable = "neon")]
+    pub(super) unsafe fn run_neon<K: SimdKernel>(kernel: K) -> K::Output {
+        kernel.run()
+    }
+}
+
+/// Number of independent accumulators of the check row reduction.
+///
+/// Eight lanes fill an AVX2 register of `f32` messages and two NEON/SSE
+/// registers, while staying short enough that the padded tail of the
+/// typically short qLDPC check rows costs little.
+const ROW_LANES: usize = 8;
+
+/// Fold a magnitude into a running minimum and second minimum without
+/// branching.
+#[inline(always)]
+pub(crate) fn update_min_two<N>(min1: &mut N, min2: &mut N, magnitude: N)
+where
+    N: PartialOrd + Copy,
+{
+    let smaller = magnitude < *min1;
+    let lo = if smaller { magnitude } else { *min1 };
+    let hi = if smaller { *min1 } else { magnitude };
+    *min1 = lo;
+    *min2 = if hi < *min2 { hi } else { *min2 };
+}
+
+/// Reduce the messages of a check row to the parity of their signs, XORed
+/// with `parity`, and their two smallest magnitudes.
+///
+/// Every lane keeps a branchless (select-style) running minimum and second
+/// minimum:
+///   min1' = min(abs_msg, min1)
+///   min2' = min(max(abs_msg, min1), min2)
+/// The lanes carry no dependency on each other so they map onto vector
+/// registers. The tail of the row is padded with `N::max_value()`, which is
+/// positive and never smaller than a magnitude, so it does not change the
+/// result.
+#[inline(always)]
+pub(crate) fn check_row_reduce<N>(messages: &[N], parity: bool) -> (bool, N, N)
+where
+    N: Signed + Bounded + PartialOrd + Copy,
+{
+    let mut sign = [false; ROW_LANES];
+    let mut min1 = [N::max_value(); ROW_LANES];
+    let mut min2 = [N::max_value(); ROW_LANES];
+
+    let mut update = |chunk: &[N; ROW_LANES]| {
+        for k in 0..ROW_LANES {
+            sign[k] ^= chunk[k].is_negative();
+            update_min_two(&mut min1[k], &mut min2[k], chunk[k].abs());
+        }
+    };
+
+    let mut chunks = messages.chunks_exact(ROW_LANES);
+    for chunk in &mut chunks {
+        update(chunk.try_into().unwrap());
+    }
+    let remainder = chunks.remainder();
+    if !remainder.is_empty() {
+        let mut padded = [N::max_value(); ROW_LANES];
+        padded[..remainder.len()].copy_from_slice(remainder);
+        update(&padded);
+    }
+
+    // Merge the per-lane results.
+    let mut accumulated_sign = parity;
+    let mut min_message = N::max_value();
+    let mut second_min_message = N::max_value();
+    for k in 0..ROW_LANES {
+        accumulated_sign ^= sign[k];
+        update_min_two(&mut min_message, &mut second_min_message, min1[k]);
+        if min2[k] < second_min_message {
+            second_min_message = min2[k];
+        }
+    }
+    (accumulated_sign, min_message, second_min_message)
+}
+
+/// The outgoing check message of an edge with incoming message `msg`.
+///
+/// The minimum's position is found by value instead of by index: an
+/// incoming message whose magnitude equals the minimum receives the second
+/// minimum. If the minimum is duplicated, `out_second_min == out_min`.
+#[inline(always)]
+pub(crate) fn check_message<N>(
+    msg: N,
+    accumulated_sign: bool,
+    min_message: N,
+    out_min: N,
+    out_second_min: N,
+) -> N
+where
+    N: Signed + Copy,
+{
+    let magnitude = if msg.abs() == min_message {
+        out_second_min
+    } else {
+        out_min
+    };
+    if accumulated_sign ^ msg.is_negative() {
+        magnitude.neg()
+    } else {
+        magnitude
+    }
+}
+
+/// Replace the incoming messages of a check row in place with the outgoing
+/// check messages.
+#[inline(always)]
+pub(crate) fn check_row_write<N>(
+    messages: &mut [N],
+    accumulated_sign: bool,
+    min_message: N,
+    out_min: N,
+    out_second_min: N,
+) where
+    N: Signed + Copy,
+{
+    for msg in messages.iter_mut() {
+        *msg = check_message(*msg, accumulated_sign, min_message, out_min, out_second_min);
+    }
+}
+
+/// Clamp every value to `[-max_value, max_value]`.
+#[inline(always)]
+pub(crate) fn clamp_magnitudes<N>(values: &mut [N], max_value: N)
+where
+    N: Signed + PartialOrd + Copy,
+{
+    let min_value = max_value.neg();
+    for value in values.iter_mut() {
+        let v = *value;
+        let v = if v < min_value { min_value } else { v };
+        *value = if v > max_value { max_value } else { v };
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    struct Reduce<'a>(&'a [f32]);
+
+    impl SimdKernel for Reduce<'_> {
+        type Output = (bool, f32, f32);
+
+        #[inline(always)]
+        fn run(self) -> Self::Output {
+            check_row_reduce(self.0, false)
+        }
+    }
+
+    fn reference_reduce<N: Signed + Bounded + PartialOrd + Copy>(messages: &[N]) -> (bool, N, N) {
+        let mut sign = false;
+        let mut min_message = N::max_value();
+        let mut second_min_message = N::max_value();
+        for msg in messages {
+            sign ^= msg.is_negative();
+            let abs_msg = msg.abs();
+            if abs_msg < min_message {
+                second_min_message = min_message;
+                min_message = abs_msg;
+            } else if abs_msg < second_min_message {
+                second_min_message = abs_msg;
+            }
+        }
+        (sign, min_message, second_min_message)
+    }
+
+    #[test]
+    fn check_row_reduce_matches_reference() {
+        for len in 0..40 {
+            let floats: Vec<f32> = (0..len)
+                .map(|i| ((i * 37 + len * 11) % 23) as f32 - 11.5)
+                .collect();
+            assert_eq!(check_row_reduce(&floats, false), reference_reduce(&floats));
+            let (sign, min, second_min) = reference_reduce(&floats);
+            assert_eq!(check_row_reduce(&floats, true), (!sign, min, second_min));
+
+            let ints: Vec<i16> = (0..len)
+                .map(|i| ((i * 29 + len * 7) % 19) as i16 - 9)
+                .collect();
+            assert_eq!(check_row_reduce(&ints, false), reference_reduce(&ints));
+        }
+        // Negative zero counts as negative, as for the scalar sign test.
+        assert_eq!(check_row_reduce(&[-0.0_f64, 2.0], false), (true, 0.0, 2.0));
+    }
+
+    #[test]
+    fn check_row_write_uses_second_minimum_at_minimum() {
+        let mut messages = [3_i32, -1, 4, -5];
+        let (sign, min, second_min) = check_row_reduce(&messages, true);
+        assert_eq!((sign, min, second_min), (true, 1, 3));
+        check_row_write(&mut messages, sign, min, 2 * min, 2 * second_min);
+        assert_eq!(messages, [-2, 6, -2, 2]);
+    }
+
+    #[test]
+    fn clamp_magnitudes_bounds_values() {
+        let mut values = [-7.0_f64, -2.0, 0.5, 9.0];
+        clamp_magnitudes(&mut values, 3.0);
+        assert_eq!(values, [-3.0, -2.0, 0.5, 3.0]);
+    }
+
+    #[test]
+    fn dispatch_runs_on_every_supported_level() {
+        let messages: Vec<f32> = (0..21).map(|i| (i as f32 - 10.25) * 0.5).collect();
+        let expected = reference_reduce(&messages);
+        assert!(SimdLevel::detect().is_supported());
+        for level in [
+            SimdLevel::Scalar,
+            SimdLevel::Sse42,
+            SimdLevel::Avx2,
+            SimdLevel::Avx512,
+            SimdLevel::Neon,
+        ] {
+            if level.is_supported() {
+                assert_eq!(dispatch(level, Reduce(&messages)), expected);
+            }
+        }
+    }
+}
@@ -0,0 +1,264 @@
+// (C) Copyright IBM 2025
+//
+// This code is licensed under the Apache License, Version 2.0. You may
+// obtain a copy of this license in the LICENSE.txt file in the root directory
+// of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+//
+// Any modifications or derivative works of this code must retain this
+// copyright notice, and modified files need to carry a notice indicating
+// that they have been altered from the originals.
+
+//! In-memory telemetry of the Relay schedule.
+//!
+//! Every decoder records into its own [`RelayTelemetry`] without
+//! synchronization. The records of all clones of a decoder are merged into
+//! a shared [`TelemetryHandle`] once at the end of every batch and when a
+//! clone is dropped, so the telemetry of parallel batches is complete once
+//! they finish. Shots decoded one at a time are merged with the next batch,
+//! or earlier with [`Decoder::flush_telemetry`].
+//!
+//! [`Decoder::flush_telemetry`]: crate::decoder::Decoder::flush_telemetry
+
+use ndarray::Array1;
+use ndarray_npy::{NpzWriter, WriteNpyError, WriteNpzError};
+use std::fs::File;
+use std::path::PathBuf;
+use std::sync::{Arc, Mutex};
+
+/// Statistics of the legs of the Relay schedule accumulated over shots.
+///
+/// Legs are indexed by their position in the schedule: leg 0 is the
+/// pre-iteration stage and the Relay legs are numbered from 1.
+#[derive(Clone, Debug, PartialEq)]
+pub struct RelayTelemetry {
+    /// Number of decoded shots.
+    pub num_shots: usize,
+    /// Number of shots that ran each leg.
+    pub leg_runs: Array1<usize>,
+    /// Total BP iterations run by each leg.
+    pub leg_iterations: Array1<usize>,
+    /// Number of shots for which each leg converged.
+    pub leg_converged: Array1<usize>,
+    /// Sum of the decoding qualities of the converged runs of each leg.
+    pub leg_quality_sum: Array1<f64>,
+    /// Number of shots for which each leg found the best solution and no
+    /// other leg found one equally good.
+    pub leg_unique_best: Array1<usize>,
+    /// Number of converged leg runs by the iteration they converged on.
+    pub converged_iterations: Array1<usize>,
+    /// Number of shots that stopped because they spent their budget.
+    pub budget_exhausted: usize,
+}
+
+impl RelayTelemetry {
+    /// Empty telemetry for a schedule of `num_sets` Relay legs running at
+    /// most `max_iter` iterations each.
+    pub fn new(num_sets: usize, max_iter: usize) -> Self {
+        RelayTelemetry {
+            num_shots: 0,
+            leg_runs: Array1::zeros(num_sets + 1),
+            leg_iterations: Array1::zeros(num_sets + 1),
+            leg_converged: Array1::zeros(num_sets + 1),
+            leg_quality_sum: Array1::zeros(num_sets + 1),
+            leg_unique_best: Array1::zeros(num_sets + 1),
+            converged_iterations: Array1::zeros(max_iter + 1),
+            budget_exhausted: 0,
+        }
+    }
+
+    /// Number of legs of the schedule including the pre-iteration stage.
+    pub fn num_legs(&self) -> usize {
+        self.leg_runs.len()
+    }
+
+    /// Record a run of `leg` for the current shot.
+    pub fn record_leg(
+        &mut self,
+        leg: usize,
+        iterations: usize,
+        converged: bool,
+        decoding_quality: f64,
+    ) {
+        self.leg_runs[leg] += 1;
+        self.leg_iterations[leg] += iterations;
+        if converged {
+            self.leg_converged[leg] += 1;
+            self.leg_quality_sum[leg] += decoding_quality;
+            self.converged_iterations[iterations] += 1;
+        }
+    }
+
+    /// Finish the current shot, whose best solution was found only by
+    /// `unique_best_leg` if it is given.
+    pub fn record_shot(&mut self, unique_best_leg: Option<usize>, budget_exhausted: bool) {
+        self.num_shots += 1;
+        if let Some(leg) = unique_best_leg {
+            self.leg_unique_best[leg] += 1;
+        }
+        self.budget_exhausted += budget_exhausted as usize;
+    }
+
+    /// Add the statistics of `other`, which must have the same shape.
+    pub fn merge(&mut self, other: &RelayTelemetry) {
+        assert_eq!(self.num_legs(), other.num_legs());
+        self.num_shots += other.num_shots;
+        self.leg_runs += &other.leg_runs;
+        self.leg_iterations += &other.leg_iterations;
+        self.leg_converged += &other.leg_converged;
+        self.leg_quality_sum += &other.leg_quality_sum;
+        self.leg_unique_best += &other.leg_unique_best;
+        self.converged_iterations += &other.converged_iterations;
+        self.budget_exhausted += other.budget_exhausted;
+    }
+
+    /// Reset all statistics to zero.
+    pub fn clear(&mut self) {
+        self.num_shots = 0;
+        self.leg_runs.fill(0);
+        self.leg_iterations.fill(0);
+        self.leg_converged.fill(0);
+        self.leg_quality_sum.fill(0.);
+        self.leg_unique_best.fill(0);
+        self.converged_iterations.fill(0);
+        self.budget_exhausted = 0;
+    }
+
+    /// Write the statistics to an `.npz` file with one array per field.
+    pub fn write_npz(&self, p: PathBuf) -> Result<(), WriteNpzError> {
+        let file = File::create(p).map_err(WriteNpyError::from)?;
+        let mut npz = NpzWriter::new(file);
+        let as_u64 = |counts: &Array1<usize>| counts.mapv(|count| count as u64);
+        npz.add_array("num_shots", &Array1::from_elem(1, self.num_shots as u64))?;
+        npz.add_array("leg_runs", &as_u64(&self.leg_runs))?;
+        npz.add_array("leg_iterations", &as_u64(&self.leg_iterations))?;
+        npz.add_array("leg_converged", &as_u64(&self.leg_converged))?;
+        npz.add_array("leg_quality_sum", &self.leg_quality_sum)?;
+        npz.add_array("leg_unique_best", &as_u64(&self.leg_unique_best))?;
+        npz.add_array("converged_iterations", &as_u64(&self.converged_iterations))?;
+        npz.add_array(
+            "budget_exhausted",
+            &Array1::from_elem(1, self.budget_exhausted as u64),
+        )?;
+        npz.finish()?;
+        Ok(())
+    }
+}
+
+/// Shared telemetry of a decoder and all of its clones.
+#[derive(Clone, Debug)]
+pub struct TelemetryHandle(Arc<Mutex<RelayTelemetry>>);
+
+impl TelemetryHandle {
+    /// The telemetry merged so far.
+    pub fn snapshot(&self) -> RelayTelemetry {
+        self.0.lock().unwrap().clone()
+    }
+
+    /// Reset the merged telemetry.
+    pub fn reset(&self) {
+        self.0.lock().unwrap().clear();
+    }
+
+    fn merge(&self, telemetry: &RelayTelemetry) {
+        self.0.lock().unwrap().merge(telemetry);
+    }
+}
+
+/// Telemetry recorded by one decoder, merged into the shared handle on
+/// [`TelemetryRecorder::flush`] and on drop. Clones start empty so that
+/// nothing is counted twice.
+#[derive(Debug)]
+pub(crate) struct TelemetryRecorder {
+    local: RelayTelemetry,
+    handle: TelemetryHandle,
+}
+
+impl TelemetryRecorder {
+    pub(crate) fn new(num_sets: usize, max_iter: usize) -> Self {
+        let local = RelayTelemetry::new(num_sets, max_iter);
+        let handle = TelemetryHandle(Arc::new(Mutex::new(local.clone())));
+        TelemetryRecorder { local, handle }
+    }
+
+    pub(crate) fn handle(&self) -> &TelemetryHandle {
+        &self.handle
+    }
+
+    pub(crate) fn record_leg(
+        &mut self,
+        leg: usize,
+        iterations: usize,
+        converged: bool,
+        decoding_quality: f64,
+    ) {
+        self.local
+            .record_leg(leg, iterations, converged, decoding_quality);
+    }
+
+    pub(crate) fn record_shot(&mut self, unique_best_leg: Option<usize>, budget_exhausted: bool) {
+        self.local.record_shot(unique_best_leg, budget_exhausted);
+    }
+
+    /// Merge the local records into the shared handle.
+    pub(crate) fn flush(&mut self) {
+        if self.local.num_shots > 0 {
+            self.handle.merge(&self.local);
+            self.local.clear();
+        }
+    }
+}
+
+impl Clone for TelemetryRecorder {
+    fn clone(&self) -> Self {
+        let mut local = self.local.clone();
+        local.clear();
+        TelemetryRecorder {
+            local,
+            handle: self.handle.clone(),
+        }
+    }
+}
+
+impl Drop for TelemetryRecorder {
+    fn drop(&mut self) {
+        self.flush();
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    #[test]
+    fn clones_merge_into_shared_handle() {
+        let mut recorder = TelemetryRecorder::new(2, 10);
+        recorder.record_leg(0, 10, false, f64::MAX);
+        recorder.record_leg(1, 4, true, 2.5);
+        recorder.record_shot(Some(1), false);
+
+        {
+            let mut clone = recorder.clone();
+            clone.record_leg(0, 3, true, 1.5);
+            clone.record_shot(Some(0), true);
+            // Unflushed records of a dropped clone are merged.
+        }
+        let telemetry = recorder.handle().snapshot();
+        assert_eq!(telemetry.num_shots, 1);
+        assert_eq!(telemetry.leg_converged, ndarray::array![1, 0, 0]);
+
+        recorder.flush();
+        let telemetry = recorder.handle().snapshot();
+        assert_eq!(telemetry.num_shots, 2);
+        assert_eq!(telemetry.leg_runs, ndarray::array![2, 1, 0]);
+        assert_eq!(telemetry.leg_iterations, ndarray::array![13, 4, 0]);
+        assert_eq!(telemetry.leg_converged, ndarray::array![1, 1, 0]);
+        assert_eq!(telemetry.leg_quality_sum, ndarray::array![1.5, 2.5, 0.]);
+        assert_eq!(telemetry.leg_unique_best, ndarray::array![1, 1, 0]);
+        assert_eq!(telemetry.converged_iterations[3], 1);
+        assert_eq!(telemetry.converged_iterations[4], 1);
+        assert_eq!(telemetry.budget_exhausted, 1);
+
+        recorder.handle().reset();
+        assert_eq!(recorder.handle().snapshot().num_shots, 0);
+    }
+}
@@ -0,0 +1,636 @@
+// (C) Copyright IBM 2025
+//
+// This code is licensed under the Apache License, Version 2.0. You may
+// obtain a copy of this license in the LICENSE.txt file in the root directory
+// of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+//
+// Any modifications or derivative works of this code must retain this
+// copyright notice, and modified files need to carry a notice indicating
+// that they have been altered from the originals.
+
+//! Connected-component decomposition of syndromes.
+//!
+//! At low error rates the active detectors of a shot form a few small
+//! clusters that are far apart in the Tanner graph. Instead of iterating
+//! over the whole check matrix, a region is grown around the active
+//! detectors and split into independent components, each of which is decoded
+//! as its own reduced sub-problem.
+//!
+//! A component only holds the variables all of whose checks lie inside the
+//! grown region. Any correction of a component therefore leaves every check
+//! outside of it untouched, and the stitched corrections of all components
+//! satisfy the full syndrome exactly when every component converges.
+
+use crate::decoder::{BPExtraResult, Bit, DecodeResult, SparseBitMatrix};
+use ndarray::{Array1, ArrayView1};
+use rayon::prelude::*;
+use std::collections::HashMap;
+use std::sync::{Arc, Mutex};
+
+/// Default number of decoders kept by a [`ComponentDecoderCache`].
+pub const COMPONENT_DECODER_CACHE_CAPACITY: usize = 1024;
+
+#[derive(Clone, Debug)]
+pub struct ComponentDecompositionConfig {
+    /// Number of check -> variable -> check growth steps around the active detectors.
+    pub growth_steps: usize,
+    /// Decode the whole graph once the grown region holds more than this
+    /// fraction of all checks.
+    pub max_region_fraction: f64,
+}
+
+impl Default for ComponentDecompositionConfig {
+    fn default() -> Self {
+        Self {
+            growth_steps: 1,
+            max_region_fraction: 0.25,
+        }
+    }
+}
+
+/// An independent sub-problem of a syndrome.
+#[derive(Clone, Debug)]
+pub struct Component {
+    /// Checks of the component in ascending order.
+    pub checks: Vec<usize>,
+    /// Variables of the component in ascending order.
+    pub variables: Vec<usize>,
+    /// The check matrix restricted to the component's checks and variables.
+    pub check_matrix: Arc<SparseBitMatrix>,
+}
+
+impl Component {
+    /// The component's slice of a full syndrome.
+    pub fn detectors(&self, detectors: ArrayView1<Bit>) -> Array1<Bit> {
+        self.checks.iter().map(|check| detectors[*check]).collect()
+    }
+}
+
+/// Buffers of [`ComponentDecomposer::decompose_with`], sized to the check
+/// matrix on first use. Only the entries touched by a syndrome are reset
+/// before the next one. Clones start empty.
+#[derive(Debug, Default)]
+pub struct DecompositionScratch {
+    in_region: Vec<bool>,
+    region: Vec<usize>,
+    visited_variable: Vec<bool>,
+    visited: Vec<usize>,
+    frontier: Vec<usize>,
+    next_frontier: Vec<usize>,
+    parent: Vec<usize>,
+    is_interior: Vec<bool>,
+    interior: Vec<usize>,
+    component_of: Vec<usize>,
+    local_index: Vec<usize>,
+}
+
+impl DecompositionScratch {
+    /// Undo the changes of the previous syndrome.
+    fn reset(&mut self, num_checks: usize, num_variables: usize) {
+        if self.in_region.len() != num_checks || self.visited_variable.len() != num_variables {
+            *self = DecompositionScratch {
+                in_region: vec![false; num_checks],
+                visited_variable: vec![false; num_variables],
+                parent: (0..num_checks).collect(),
+                is_interior: vec![false; num_variables],
+                component_of: vec![usize::MAX; num_checks],
+                local_index: vec![0; num_variables],
+                ..Default::default()
+            };
+            return;
+        }
+        // Only checks of the region are unioned or assigned a component.
+        for &check in self.region.iter() {
+            self.in_region[check] = false;
+            self.parent[check] = check;
+            self.component_of[check] = usize::MAX;
+        }
+        for &variable in self.visited.iter() {
+            self.visited_variable[variable] = false;
+        }
+        for &variable in self.interior.iter() {
+            self.is_interior[variable] = false;
+        }
+        self.region.clear();
+        self.visited.clear();
+        self.frontier.clear();
+        self.next_frontier.clear();
+        self.interior.clear();
+    }
+}
+
+impl Clone for DecompositionScratch {
+    fn clone(&self) -> Self {
+        DecompositionScratch::default()
+    }
+}
+
+/// Decoders of the components decoded so far, keyed by their checks and
+/// variables, so that a component that recurs in later shots reuses its
+/// decoder instead of building a new one. Components are decoded in parallel
+/// so the cache is shared behind a lock. Once it holds `capacity` decoders it
+/// is emptied. Clones start empty.
+pub struct ComponentDecoderCache<D> {
+    decoders: Mutex<CachedDecoders<D>>,
+    capacity: usize,
+}
+
+struct CachedDecoders<D> {
+    by_component: HashMap<(Vec<usize>, Vec<usize>), Vec<D>>,
+    len: usize,
+}
+
+impl<D> ComponentDecoderCache<D> {
+    pub fn new(capacity: usize) -> Self {
+        ComponentDecoderCache {
+            decoders: Mutex::new(CachedDecoders {
+                by_component: HashMap::new(),
+                len: 0,
+            }),
+            capacity,
+        }
+    }
+
+    /// Take a cached decoder of `component`, if there is one.
+    pub fn take(&self, component: &Component) -> Option<D> {
+        let key = (component.checks.clone(), component.variables.clone());
+        let mut decoders = self.decoders.lock().unwrap();
+        let decoder = decoders
+            .by_component
+            .get_mut(&key)
+            .and_then(|decoders| decoders.pop());
+        if decoder.is_some() {
+            decoders.len -= 1;
+        }
+        decoder
+    }
+
+    /// Keep the decoder of `component` for later shots.
+    pub fn put(&self, component: &Component, decoder: D) {
+        let key = (component.checks.clone(), component.variables.clone());
+        let mut decoders = self.decoders.lock().unwrap();
+        if decoders.len >= self.capacity {
+            decoders.by_component.clear();
+            decoders.len = 0;
+        }
+        decoders.by_component.entry(key).or_default().push(decoder);
+        decoders.len += 1;
+    }
+
+    /// Number of cached decoders.
+    pub fn len(&self) -> usize {
+        self.decoders.lock().unwrap().len
+    }
+
+    pub fn is_empty(&self) -> bool {
+        self.len() == 0
+    }
+
+    /// Drop all cached decoders.
+    pub fn clear(&self) {
+        let mut decoders = self.decoders.lock().unwrap();
+        decoders.by_component.clear();
+        decoders.len = 0;
+    }
+}
+
+impl<D> Default for ComponentDecoderCache<D> {
+    fn default() -> Self {
+        Self::new(COMPONENT_DECODER_CACHE_CAPACITY)
+    }
+}
+
+impl<D> Clone for ComponentDecoderCache<D> {
+    fn clone(&self) -> Self {
+        Self::new(self.capacity)
+    }
+}
+
+/// Splits syndromes of a check matrix into independent components.
+#[derive(Clone, Debug)]
+pub struct ComponentDecomposer {
+    config: Arc<ComponentDecompositionConfig>,
+    num_checks: usize,
+    num_variables: usize,
+    check_indptr: Vec<usize>,
+    check_indices: Vec<usize>,
+    variable_indptr: Vec<usize>,
+    variable_indices: Vec<usize>,
+}
+
+impl ComponentDecomposer {
+    pub fn new(check_matrix: &SparseBitMatrix, config: Arc<ComponentDecompositionConfig>) -> Self {
+        let check_matrix_csr = check_matrix.to_csr();
+        let check_matrix_csc = check_matrix.to_csc();
+        ComponentDecomposer {
+            config,
+            num_checks: check_matrix.rows(),
+            num_variables: check_matrix.cols(),
+            check_indptr: check_matrix_csr.indptr().raw_storage().to_vec(),
+            check_indices: check_matrix_csr.indices().to_vec(),
+            variable_indptr: check_matrix_csc.indptr().raw_storage().to_vec(),
+            variable_indices: check_matrix_csc.indices().to_vec(),
+        }
+    }
+
+    fn variables_of(&self, check: usize) -> &[usize] {
+        &self.check_indices[self.check_indptr[check]..self.check_indptr[check + 1]]
+    }
+
+    fn checks_of(&self, variable: usize) -> &[usize] {
+        &self.variable_indices[self.variable_indptr[variable]..self.variable_indptr[variable + 1]]
+    }
+
+    /// Split a syndrome into independent components, one per connected
+    /// cluster of the region grown around its active detectors. Returns
+    /// `None` if the region grows past the configured size threshold and the
+    /// whole graph should be decoded instead.
+    pub fn decompose(&self, detectors: ArrayView1<Bit>) -> Option<Vec<Component>> {
+        self.decompose_with(detectors, &mut DecompositionScratch::default())
+    }
+
+    /// [`Self::decompose`] reusing the buffers of `scratch`, so that only the
+    /// grown region is touched instead of allocating buffers over the whole
+    /// check matrix for every syndrome.
+    pub fn decompose_with(
+        &self,
+        detectors: ArrayView1<Bit>,
+        scratch: &mut DecompositionScratch,
+    ) -> Option<Vec<Component>> {
+        let max_region_checks = self.config.max_region_fraction * self.num_checks as f64;
+
+        scratch.reset(self.num_checks, self.num_variables);
+        let DecompositionScratch {
+            in_region,
+            region,
+            visited_variable,
+            visited,
+            frontier,
+            next_frontier,
+            parent,
+            is_interior,
+            interior,
+            component_of,
+            local_index,
+        } = scratch;
+
+        for (check, detector) in detectors.iter().enumerate() {
+            if *detector == 1 {
+                in_region[check] = true;
+                region.push(check);
+            }
+        }
+        if region.len() as f64 > max_region_checks {
+            return None;
+        }
+
+        // Grow the region breadth first through the variables of its checks.
+        frontier.extend_from_slice(region);
+        for _ in 0..self.config.growth_steps {
+            next_frontier.clear();
+            for &check in frontier.iter() {
+                for &variable in self.variables_of(check) {
+                    if visited_variable[variable] {
+                        continue;
+                    }
+                    visited_variable[variable] = true;
+                    visited.push(variable);
+                    for &neighbour in self.checks_of(variable) {
+                        if !in_region[neighbour] {
+                            in_region[neighbour] = true;
+                            next_frontier.push(neighbour);
+                        }
+                    }
+                }
+            }
+            region.extend_from_slice(next_frontier);
+            if region.len() as f64 > max_region_checks {
+                return None;
+            }
+            std::mem::swap(frontier, next_frontier);
+        }
+
+        // Union the checks of every variable that lies entirely in the region.
+        fn find(parent: &mut [usize], mut check: usize) -> usize {
+            while parent[check] != check {
+                parent[check] = parent[parent[check]];
+                check = parent[check];
+            }
+            check
+        }
+
+        for &check in region.iter() {
+            for &variable in self.variables_of(check) {
+                if is_interior[variable] {
+                    continue;
+                }
+                let checks = self.checks_of(variable);
+                if checks.iter().all(|neighbour| in_region[*neighbour]) {
+                    is_interior[variable] = true;
+                    interior.push(variable);
+                    let root = find(parent, checks[0]);
+                    for &neighbour in &checks[1..] {
+                        let neighbour_root = find(parent, neighbour);
+                        parent[neighbour_root] = root;
+                    }
+                }
+            }
+        }
+
+        // Group checks and variables by their root, keeping only clusters
+        // that hold at least one active detector.
+        region.sort_unstable();
+        interior.sort_unstable();
+        let mut groups: Vec<(Vec<usize>, Vec<usize>)> = Vec::new();
+        for &check in region.iter() {
+            let root = find(parent, check);
+            if component_of[root] == usize::MAX {
+                component_of[root] = groups.len();
+                groups.push((Vec::new(), Vec::new()));
+            }
+            groups[component_of[root]].0.push(check);
+        }
+        for &variable in interior.iter() {
+            let root = find(parent, self.checks_of(variable)[0]);
+            groups[component_of[root]].1.push(variable);
+        }
+
+        let components = groups
+            .into_iter()
+            .filter(|(checks, _)| checks.iter().any(|check| detectors[*check] == 1))
+            .map(|(checks, variables)| {
+                for (local, &variable) in variables.iter().enumerate() {
+                    local_index[variable] = local;
+                }
+                let mut indptr = Vec::with_capacity(checks.len() + 1);
+                let mut indices = Vec::new();
+                indptr.push(0);
+                for &check in checks.iter() {
+                    for &variable in self.variables_of(check) {
+                        if is_interior[variable] {
+                            indices.push(local_index[variable]);
+                        }
+                    }
+                    indptr.push(indices.len());
+                }
+                let data = vec![1; indices.len()];
+                let check_matrix =
+                    SparseBitMatrix::new((checks.len(), variables.len()), indptr, indices, data);
+                Component {
+                    checks,
+                    variables,
+                    check_matrix: Arc::new(check_matrix),
+                }
+            })
+            .collect();
+        Some(components)
+    }
+
+    /// Decode a syndrome component by component and stitch the corrections
+    /// back together.
+    ///
+    /// `decode_component` decodes the restricted syndrome of a component,
+    /// given the number of components of the syndrome to split a per-shot
+    /// budget by, and is run for all components in parallel. Returns `None`
+    /// if the syndrome could not be decomposed, or a component could not be
+    /// decoded or did not converge, in which case the caller should decode
+    /// the whole graph.
+    pub fn decode<F>(
+        &self,
+        detectors: ArrayView1<Bit>,
+        log_prior_ratios: &Array1<f64>,
+        scratch: &mut DecompositionScratch,
+        decode_component: F,
+    ) -> Option<DecodeResult>
+    where
+        F: Fn(&Component, ArrayView1<Bit>, usize) -> Option<DecodeResult> + Sync,
+    {
+        let components = self.decompose_with(detectors, scratch)?;
+        let num_components = components.len();
+        let results: Vec<DecodeResult> = components
+            .par_iter()
+            .map(|component| {
+                decode_component(
+                    component,
+                    component.detectors(detectors).view(),
+                    num_components,
+                )
+            })
+            .collect::<Option<Vec<_>>>()?;
+        if !results.iter().all(|result| result.success) {
+            return None;
+        }
+
+        let mut decoding = Array1::zeros(self.num_variables);
+        let mut decoded_detectors = Array1::zeros(self.num_checks);
+        let mut posterior_ratios = log_prior_ratios.clone();
+        let mut decoding_quality = 0.;
+        let mut iterations = 0;
+        let mut max_iter = 0;
+        let mut budget_exhausted = false;
+        for (component, result) in components.iter().zip(results) {
+            for (local, &variable) in component.variables.iter().enumerate() {
+                decoding[variable] = result.decoding[local];
+                posterior_ratios[variable] = result.posterior_ratios[local];
+            }
+            for (local, &check) in component.checks.iter().enumerate() {
+                decoded_detectors[check] = result.decoded_detectors[local];
+            }
+            decoding_quality += result.decoding_quality;
+            // Components are decoded concurrently, so report the slowest.
+            iterations = iterations.max(result.iterations);
+            max_iter = max_iter.max(result.max_iter);
+            budget_exhausted |= result.budget_exhausted;
+        }
+
+        Some(DecodeResult {
+            decoding,
+            decoded_detectors,
+            posterior_ratios,
+            success: true,
+            decoding_quality,
+            iterations,
+            max_iter,
+            budget_exhausted,
+            extra: BPExtraResult::None,
+        })
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use crate::bipartite_graph::BipartiteGraph;
+    use crate::bp::min_sum::{MinSumBPDecoder, MinSumDecoderConfig};
+    use crate::decoder::Decoder;
+    use ndarray::prelude::*;
+
+    fn repetition_code(num_variables: usize) -> SparseBitMatrix {
+        let mut dense = Array2::<Bit>::zeros((num_variables - 1, num_variables));
+        for check in 0..num_variables - 1 {
+            dense[[check, check]] = 1;
+            dense[[check, check + 1]] = 1;
+        }
+        SparseBitMatrix::from_dense(dense)
+    }
+
+    #[test]
+    fn decompose_separated_clusters() {
+        let check_matrix = repetition_code(30);
+        let decomposer = ComponentDecomposer::new(
+            &check_matrix,
+            Arc::new(ComponentDecompositionConfig {
+                growth_steps: 1,
+                max_region_fraction: 1.,
+            }),
+        );
+
+        let mut detectors = Array1::<Bit>::zeros(29);
+        detectors[4] = 1;
+        detectors[20] = 1;
+        let components = decomposer.decompose(detectors.view()).unwrap();
+
+        assert_eq!(components.len(), 2);
+        assert_eq!(components[0].checks, vec![3, 4, 5]);
+        assert_eq!(components[0].variables, vec![4, 5]);
+        assert_eq!(components[1].checks, vec![19, 20, 21]);
+        assert_eq!(components[1].variables, vec![20, 21]);
+        assert_eq!(components[0].check_matrix.shape(), (3, 2));
+
+        // Growing past the threshold falls back to the whole graph.
+        let decomposer = ComponentDecomposer::new(
+            &check_matrix,
+            Arc::new(ComponentDecompositionConfig {
+                growth_steps: 3,
+                max_region_fraction: 0.25,
+            }),
+        );
+        assert!(decomposer.decompose(detectors.view()).is_none());
+
+        // The trivial syndrome has no components.
+        let components = decomposer
+            .decompose(Array1::<Bit>::zeros(29).view())
+            .unwrap();
+        assert!(components.is_empty());
+    }
+
+    #[test]
+    fn decompose_with_reused_scratch() {
+        let check_matrix = repetition_code(30);
+        let decomposer = ComponentDecomposer::new(
+            &check_matrix,
+            Arc::new(ComponentDecompositionConfig {
+                growth_steps: 2,
+                max_region_fraction: 0.5,
+            }),
+        );
+
+        // Mix syndromes that decompose with ones that exceed the threshold
+        // part way through growing the region.
+        let syndromes: Vec<Vec<usize>> = vec![
+            vec![4, 20],
+            vec![0, 3, 6, 9, 12, 15, 18, 21],
+            vec![5],
+            vec![27, 28],
+            vec![],
+            vec![4, 20],
+        ];
+        let mut scratch = DecompositionScratch::default();
+        for active in syndromes {
+            let mut detectors = Array1::<Bit>::zeros(29);
+            for check in active {
+                detectors[check] = 1;
+            }
+            let expected = decomposer.decompose(detectors.view());
+            let components = decomposer.decompose_with(detectors.view(), &mut scratch);
+            assert_eq!(components.is_some(), expected.is_some());
+            for (component, expected) in components
+                .into_iter()
+                .flatten()
+                .zip(expected.into_iter().flatten())
+            {
+                assert_eq!(component.checks, expected.checks);
+                assert_eq!(component.variables, expected.variables);
+                assert_eq!(component.check_matrix, expected.check_matrix);
+            }
+        }
+    }
+
+    #[test]
+    fn component_decoder_cache_reuses_decoders() {
+        let check_matrix = repetition_code(30);
+        let decomposer = ComponentDecomposer::new(
+            &check_matrix,
+            Arc::new(ComponentDecompositionConfig::default()),
+        );
+        let mut detectors = Array1::<Bit>::zeros(29);
+        detectors[4] = 1;
+        detectors[20] = 1;
+        let components = decomposer.decompose(detectors.view()).unwrap();
+
+        let cache = ComponentDecoderCache::new(2);
+        assert_eq!(cache.take(&components[0]), None);
+        cache.put(&components[0], 1);
+        cache.put(&components[1], 2);
+        assert_eq!(cache.len(), 2);
+        assert_eq!(cache.take(&components[1]), Some(2));
+        assert_eq!(cache.take(&components[1]), None);
+        assert_eq!(cache.len(), 1);
+
+        // A full cache is emptied.
+        cache.put(&components[1], 3);
+        cache.put(&components[1], 4);
+        assert_eq!(cache.len(), 1);
+        assert_eq!(cache.take(&components[0]), None);
+        assert_eq!(cache.clone().len(), 0);
+    }
+
+    #[test]
+    fn decode_components_repetition_code() {
+        let check_matrix = Arc::new(repetition_code(30));
+        let bp_config = Arc::new(MinSumDecoderConfig {
+            error_priors: Array1::from_elem(30, 0.01),
+            max_iter: 50,
+            ..Default::default()
+        });
+        let mut decoder: MinSumBPDecoder<f64> =
+            MinSumBPDecoder::new(check_matrix.clone(), bp_config.clone());
+        let decomposer = ComponentDecomposer::new(
+            &check_matrix,
+            Arc::new(ComponentDecompositionConfig::default()),
+        );
+
+        let mut error = Array1::<Bit>::zeros(30);
+        error[7] = 1;
+        error[22] = 1;
+        let detectors = decoder.get_detectors(error.view());
+
+        let log_prior_ratios = decoder.log_prior_ratios();
+        let result = decomposer
+            .decode(
+                detectors.view(),
+                &log_prior_ratios,
+                &mut DecompositionScratch::default(),
+                |component, detectors, _| {
+                    let mut sub_decoder: MinSumBPDecoder<f64> = MinSumBPDecoder::new(
+                        component.check_matrix.clone(),
+                        Arc::new(MinSumDecoderConfig {
+                            error_priors: Array1::from_elem(component.variables.len(), 0.01),
+                            max_iter: 50,
+                            ..Default::default()
+                        }),
+                    );
+                    Some(sub_decoder.decode_detailed(detectors))
+                },
+            )
+            .unwrap();
+
+        assert!(result.success);
+        assert_eq!(result.decoding, error);
+        assert_eq!(result.decoded_detectors, detectors);
+        assert_eq!(
+            result.decoding_quality,
+            decoder.get_decoding_quality(error.view())
+        );
+    }
+}
@@ -9,17 +9,28 @@
 // that they have been altered from the originals.
 
 use crate::bipartite_graph::SparseBipartiteGraph;
-use ndarray::{stack, Array1, Array2, ArrayView1, ArrayView2, Axis};
+use crate::packed::{num_words, pack_bits_batch_into, unpack_bits_batch, PackedColumns, Word};
+use ndarray::{Array1, Array2, ArrayView1, ArrayView2, ArrayViewMut2, Axis};
 
 use indicatif::{ParallelProgressIterator, ProgressFinish, ProgressIterator, ProgressStyle};
 use rayon::prelude::*;
 
 use serde::{Deserialize, Serialize};
 use std::fmt::Debug;
+use std::ops::{Deref, DerefMut};
+use std::sync::Mutex;
+use std::time::Duration;
 
 pub type Bit = u8;
 pub type SparseBitMatrix = SparseBipartiteGraph<Bit>;
 
+/// Number of shots lane-batched decoders advance together.
+pub const BATCH_LANES: usize = 8;
+
+/// Number of shots handed to a worker at a time by the parallel batch methods.
+/// A multiple of the lane count so lane-batched decoders keep all lanes busy.
+pub const PAR_CHUNK_SIZE: usize = 4 * BATCH_LANES;
+
 use dyn_clone::DynClone;
 
 use std::sync::Arc;
@@ -35,9 +46,25 @@ impl Mod2Mul<&Array1<Bit>> for SparseBitMatrix {
     type Output = Array1<Bit>;
 
     fn mul_mod2(&self, rhs: &Array1<Bit>) -> Self::Output {
-        let mut detectors_u8 = self * rhs;
-        detectors_u8.map_inplace(|x| *x %= 2);
-        detectors_u8
+        // Accumulate parities with XOR directly rather than multiplying in
+        // u8 and reducing afterwards.
+        let mut product = Array1::zeros(self.rows());
+        if self.is_csr() {
+            for (row, row_vec) in self.outer_iterator().enumerate() {
+                product[row] = row_vec
+                    .iter()
+                    .fold(0, |parity, (col, value)| parity ^ (value & rhs[col] & 1));
+            }
+        } else {
+            for (col, col_vec) in self.outer_iterator().enumerate() {
+                if rhs[col] & 1 == 1 {
+                    for (row, value) in col_vec.iter() {
+                        product[row] ^= value & 1;
+                    }
+                }
+            }
+        }
+        product
     }
 }
 
@@ -50,12 +77,16 @@ pub trait Decoder: DynClone + Sync {
     }
     fn decode_detailed(&mut self, detectors: ArrayView1<Bit>) -> DecodeResult;
     fn decode_batch(&mut self, detectors: ArrayView2<Bit>) -> Array2<Bit> {
-        let arrs: Vec<Array1<Bit>> = detectors
-            .axis_iter(Axis(0))
-            .map(|row| self.decode(row))
-            .collect();
-
-        stack(Axis(0), &arrs.iter().map(|a| a.view()).collect::<Vec<_>>()).unwrap()
+        let mut decodings = Array2::zeros((detectors.nrows(), self.check_matrix().cols()));
+        self.decode_batch_into(detectors, decodings.view_mut());
+        decodings
+    }
+    /// Decode a batch writing the decoding of each row of `detectors` into
+    /// the same row of `out`, which must have one column per variable.
+    fn decode_batch_into(&mut self, detectors: ArrayView2<Bit>, mut out: ArrayViewMut2<Bit>) {
+        for (row, mut decoding) in detectors.axis_iter(Axis(0)).zip(out.axis_iter_mut(Axis(0))) {
+            decoding.assign(&self.decode(row));
+        }
     }
     fn decode_detailed_batch(&mut self, detectors: ArrayView2<Bit>) -> Vec<DecodeResult> {
         detectors
@@ -63,22 +94,70 @@ pub trait Decoder: DynClone + Sync {
             .map(|row| self.decode_detailed(row))
             .collect()
     }
+    /// Decode a batch of bit-packed detectors into bit-packed decodings.
+    /// See [`crate::packed`] for the layout.
+    fn decode_packed_batch(&mut self, detectors: ArrayView2<Word>) -> Array2<Word> {
+        let mut decodings =
+            Array2::zeros((detectors.nrows(), num_words(self.check_matrix().cols())));
+        self.decode_packed_batch_into(detectors, decodings.view_mut());
+        decodings
+    }
+    /// Decode a batch of bit-packed detectors writing the bit-packed
+    /// decodings into the rows of `out`.
+    fn decode_packed_batch_into(&mut self, detectors: ArrayView2<Word>, out: ArrayViewMut2<Word>) {
+        let detectors = unpack_bits_batch(detectors, self.check_matrix().rows());
+        pack_bits_batch_into(self.decode_batch(detectors.view()).view(), out);
+    }
+    /// Build a decoder of the same kind and configuration for the sub-problem
+    /// given by `check_matrix` over a subset of this decoder's variables.
+    /// Returns `None` for decoders that do not support restriction.
+    fn restricted_decoder(
+        &self,
+        _check_matrix: Arc<SparseBitMatrix>,
+        _variables: &[usize],
+    ) -> Option<Box<dyn Decoder + Send>> {
+        None
+    }
+    /// Decode the syndrome of one of `num_components` components of a shot
+    /// with a decoder built by [`Decoder::restricted_decoder`]. Decoders with
+    /// a per-shot budget give each component its share of the budget.
+    fn decode_component(
+        &mut self,
+        detectors: ArrayView1<Bit>,
+        _num_components: usize,
+    ) -> DecodeResult {
+        self.decode_detailed(detectors)
+    }
+    /// Merge the telemetry this decoder recorded locally into the telemetry
+    /// shared with its clones. Decoders merge it themselves at the end of
+    /// every batch and when dropped, but not after every single shot.
+    fn flush_telemetry(&mut self) {}
+    /// Decode the following batches as chunks of `batch`, a batch split
+    /// between several decoders, until [`Decoder::leave_split_batch`]. State
+    /// of a batch, such as the unused budget of a Relay decoder, then spans
+    /// the whole of `batch` instead of being reset for every chunk.
+    ///
+    /// Returns whether the decoder joined `batch`. It does not if it already
+    /// decodes the chunks of another batch, which `batch` is then part of,
+    /// and the caller must not leave it.
+    fn join_split_batch(&mut self, _batch: &Arc<SplitBatch>) -> bool {
+        false
+    }
+    /// Stop decoding batches as chunks of the batch joined with
+    /// [`Decoder::join_split_batch`].
+    fn leave_split_batch(&mut self) {}
     // Compute detectors from errors
     fn get_detectors(&self, errors: ArrayView1<Bit>) -> Array1<Bit> {
         self.check_matrix().mul_mod2(&errors.to_owned())
     }
 
     fn get_detectors_batch(&self, errors: ArrayView2<Bit>) -> Array2<Bit> {
-        let check_matrix = self.check_matrix();
-        let detectors: Vec<Array1<Bit>> = errors
-            .axis_iter(Axis(0))
-            .map(|row| check_matrix.mul_mod2(&row.to_owned()))
-            .collect();
-        stack(
-            Axis(0),
-            &detectors.iter().map(|a| a.view()).collect::<Vec<_>>(),
-        )
-        .unwrap()
+        PackedColumns::new(&self.check_matrix()).mul_bits_batch_unpacked(errors)
+    }
+
+    /// Compute bit-packed detectors from a batch of bit-packed errors.
+    fn get_detectors_packed_batch(&self, errors: ArrayView2<Word>) -> Array2<Word> {
+        PackedColumns::new(&self.check_matrix()).mul_packed_batch(errors)
     }
 
     fn get_decoding_quality(&mut self, errors: ArrayView1<u8>) -> f64 {
@@ -95,24 +174,67 @@ pub trait Decoder: DynClone + Sync {
 
 dyn_clone::clone_trait_object!(Decoder);
 
+/// A clone of `decoder` that decodes its chunks as part of `batch`.
+fn split_batch_clone<D: Decoder + Clone>(decoder: &D, batch: &Arc<SplitBatch>) -> D {
+    let mut decoder = decoder.clone();
+    decoder.join_split_batch(batch);
+    decoder
+}
+
 pub trait DecoderRunner: Decoder + Clone + Sync {
     fn par_decode_batch(&mut self, detectors: ArrayView2<Bit>) -> Array2<Bit> {
-        let arrs: Vec<Array1<Bit>> = detectors
-            .axis_iter(Axis(0))
+        let mut decodings = Array2::zeros((detectors.nrows(), self.check_matrix().cols()));
+        self.par_decode_batch_into(detectors, decodings.view_mut());
+        decodings
+    }
+
+    /// Decode a batch in parallel, each worker writing its chunk of
+    /// decodings directly into the matching rows of `out`.
+    fn par_decode_batch_into(&mut self, detectors: ArrayView2<Bit>, mut out: ArrayViewMut2<Bit>) {
+        let batch = Arc::default();
+        detectors
+            .axis_chunks_iter(Axis(0), PAR_CHUNK_SIZE)
             .into_par_iter()
-            .map_with(|| self.clone(), |decoder, row| decoder().decode(row))
-            .collect();
-        stack(Axis(0), &arrs.iter().map(|a| a.view()).collect::<Vec<_>>()).unwrap()
+            .zip(out.axis_chunks_iter_mut(Axis(0), PAR_CHUNK_SIZE))
+            .for_each_with(
+                || split_batch_clone(self, &batch),
+                |decoder, (chunk, out)| decoder().decode_batch_into(chunk, out),
+            );
+    }
+
+    fn par_decode_packed_batch(&mut self, detectors: ArrayView2<Word>) -> Array2<Word> {
+        let mut decodings =
+            Array2::zeros((detectors.nrows(), num_words(self.check_matrix().cols())));
+        self.par_decode_packed_batch_into(detectors, decodings.view_mut());
+        decodings
+    }
+
+    fn par_decode_packed_batch_into(
+        &mut self,
+        detectors: ArrayView2<Word>,
+        mut out: ArrayViewMut2<Word>,
+    ) {
+        let batch = Arc::default();
+        detectors
+            .axis_chunks_iter(Axis(0), PAR_CHUNK_SIZE)
+            .into_par_iter()
+            .zip(out.axis_chunks_iter_mut(Axis(0), PAR_CHUNK_SIZE))
+            .for_each_with(
+                || split_batch_clone(self, &batch),
+                |decoder, (chunk, out)| decoder().decode_packed_batch_into(chunk, out),
+            );
     }
 
     fn par_decode_detailed_batch(&mut self, detectors: ArrayView2<Bit>) -> Vec<DecodeResult> {
+        let batch = Arc::default();
         detectors
-            .axis_iter(Axis(0))
+            .axis_chunks_iter(Axis(0), PAR_CHUNK_SIZE)
             .into_par_iter()
             .map_with(
-                || self.clone(),
-                |decoder, row| decoder().decode_detailed(row),
+                || split_batch_clone(self, &batch),
+                |decoder, chunk| decoder().decode_detailed_batch(chunk),
             )
+            .flatten()
             .collect()
     }
 
@@ -122,18 +244,36 @@ pub trait DecoderRunner: Decoder + Clone + Sync {
         detectors: ArrayView2<Bit>,
         leave_progress_bar_on_finish: bool,
     ) -> Array2<Bit> {
+        let mut decodings = Array2::zeros((detectors.nrows(), self.check_matrix().cols()));
+        self.decode_batch_progress_bar_into(
+            detectors,
+            decodings.view_mut(),
+            leave_progress_bar_on_finish,
+        );
+        decodings
+    }
+
+    /// Decode a batch into `out` displaying a progress bar
+    fn decode_batch_progress_bar_into(
+        &mut self,
+        detectors: ArrayView2<Bit>,
+        mut out: ArrayViewMut2<Bit>,
+        leave_progress_bar_on_finish: bool,
+    ) {
         let finish_mode = match leave_progress_bar_on_finish {
             true => ProgressFinish::AndLeave,
             false => ProgressFinish::AndClear,
         };
 
-        let arrs: Vec<Array1<Bit>> = detectors
+        let style = self.get_progress_bar_style();
+        for (row, mut decoding) in detectors
             .axis_iter(Axis(0))
-            .progress_with_style(self.get_progress_bar_style())
+            .zip(out.axis_iter_mut(Axis(0)))
+            .progress_with_style(style)
             .with_finish(finish_mode)
-            .map(|row| self.decode(row))
-            .collect();
-        stack(Axis(0), &arrs.iter().map(|a| a.view()).collect::<Vec<_>>()).unwrap()
+        {
+            decoding.assign(&self.decode(row));
+        }
     }
 
     /// Decode a batch displaying a progress bar
@@ -160,20 +300,37 @@ pub trait DecoderRunner: Decoder + Clone + Sync {
         detectors: ArrayView2<Bit>,
         leave_progress_bar_on_finish: bool,
     ) -> Array2<Bit> {
+        let mut decodings = Array2::zeros((detectors.nrows(), self.check_matrix().cols()));
+        self.par_decode_batch_progress_bar_into(
+            detectors,
+            decodings.view_mut(),
+            leave_progress_bar_on_finish,
+        );
+        decodings
+    }
+
+    fn par_decode_batch_progress_bar_into(
+        &mut self,
+        detectors: ArrayView2<Bit>,
+        mut out: ArrayViewMut2<Bit>,
+        leave_progress_bar_on_finish: bool,
+    ) {
         let finish_mode = match leave_progress_bar_on_finish {
             true => ProgressFinish::AndLeave,
             false => ProgressFinish::AndClear,
         };
 
-        let arrs: Vec<Array1<Bit>> = detectors
+        let batch = Arc::default();
+        detectors
             .axis_iter(Axis(0))
             .into_par_iter()
+            .zip(out.axis_iter_mut(Axis(0)))
             .progress_with_style(self.get_progress_bar_style())
             .with_finish(finish_mode)
-            .map_with(|| self.clone(), |decoder, row| decoder().decode(row))
-            .collect();
-
-        stack(Axis(0), &arrs.iter().map(|a| a.view()).collect::<Vec<_>>()).unwrap()
+            .for_each_with(
+                || split_batch_clone(self, &batch),
+                |decoder, (row, mut decoding)| decoding.assign(&decoder().decode(row)),
+            );
     }
 
     fn par_decode_detailed_batch_progress_bar(
@@ -186,13 +343,14 @@ pub trait DecoderRunner: Decoder + Clone + Sync {
             false => ProgressFinish::AndClear,
         };
 
+        let batch = Arc::default();
         detectors
             .axis_iter(Axis(0))
             .into_par_iter()
             .progress_with_style(self.get_progress_bar_style())
             .with_finish(finish_mode)
             .map_with(
-                || self.clone(),
+                || split_batch_clone(self, &batch),
                 |decoder, row| decoder().decode_detailed(row),
             )
             .collect()
@@ -203,6 +361,127 @@ pub trait DecoderRunner: Decoder + Clone + Sync {
     }
 }
 
+/// Budget left unused by the shots of a batch split between several
+/// decoders. The entry point of the batch creates it and lends it to every
+/// decoder taking part with [`Decoder::join_split_batch`]. Decoders draw on
+/// it and pay into it once per chunk rather than once per shot.
+#[derive(Debug, Default)]
+pub struct SplitBatch {
+    unused_budget: Mutex<UnusedBudget>,
+}
+
+/// BP iterations and time left unused by the shots decoded so far.
+#[derive(Clone, Copy, Debug, Default, PartialEq)]
+pub struct UnusedBudget {
+    pub iterations: usize,
+    pub time: Duration,
+}
+
+impl SplitBatch {
+    /// Take all the budget left unused by the chunks decoded so far.
+    pub fn take_unused_budget(&self) -> UnusedBudget {
+        std::mem::take(&mut *self.unused_budget.lock().unwrap())
+    }
+
+    /// Hand the budget a chunk left unused on to the later chunks.
+    pub fn return_unused_budget(&self, budget: UnusedBudget) {
+        let mut unused_budget = self.unused_budget.lock().unwrap();
+        unused_budget.iterations += budget.iterations;
+        unused_budget.time += budget.time;
+    }
+}
+
+/// Worker decoders kept between parallel batch calls.
+///
+/// A worker is cloned from the calling decoder only when no idle worker is
+/// left and goes back to the pool when its task is done, so a runner that
+/// decodes many small batches clones one decoder per concurrent task once
+/// instead of one per chunk on every call. Clones of a pool start empty so
+/// that workers do not hold pools of their own.
+pub struct WorkerPool<D> {
+    idle: Mutex<Vec<D>>,
+}
+
+impl<D> WorkerPool<D> {
+    pub fn new() -> Self {
+        WorkerPool {
+            idle: Mutex::new(Vec::new()),
+        }
+    }
+
+    /// Take an idle worker, or a new clone of `template` if there is none.
+    pub fn get(&self, template: &D) -> PooledWorker<'_, D>
+    where
+        D: Clone,
+    {
+        let worker = self.idle.lock().unwrap().pop();
+        PooledWorker {
+            pool: self,
+            worker: Some(worker.unwrap_or_else(|| template.clone())),
+        }
+    }
+
+    /// Run `op` on every idle worker.
+    pub fn for_each_idle(&self, op: impl FnMut(&mut D)) {
+        self.idle.lock().unwrap().iter_mut().for_each(op);
+    }
+
+    /// Number of idle workers.
+    pub fn len(&self) -> usize {
+        self.idle.lock().unwrap().len()
+    }
+
+    pub fn is_empty(&self) -> bool {
+        self.len() == 0
+    }
+
+    /// Drop all idle workers, which is needed when the decoder they were
+    /// cloned from is reconfigured.
+    pub fn clear(&self) {
+        self.idle.lock().unwrap().clear();
+    }
+}
+
+impl<D> Default for WorkerPool<D> {
+    fn default() -> Self {
+        Self::new()
+    }
+}
+
+impl<D> Clone for WorkerPool<D> {
+    fn clone(&self) -> Self {
+        Self::new()
+    }
+}
+
+/// A worker taken from a [`WorkerPool`], returned to it on drop.
+pub struct PooledWorker<'p, D> {
+    pool: &'p WorkerPool<D>,
+    worker: Option<D>,
+}
+
+impl<D> Deref for PooledWorker<'_, D> {
+    type Target = D;
+
+    fn deref(&self) -> &D {
+        self.worker.as_ref().unwrap()
+    }
+}
+
+impl<D> DerefMut for PooledWorker<'_, D> {
+    fn deref_mut(&mut self) -> &mut D {
+        self.worker.as_mut().unwrap()
+    }
+}
+
+impl<D> Drop for PooledWorker<'_, D> {
+    fn drop(&mut self) {
+        if let Some(worker) = self.worker.take() {
+            self.pool.idle.lock().unwrap().push(worker);
+        }
+    }
+}
+
 #[derive(Serialize, Deserialize, Debug, Clone)]
 pub struct DecodeResult {
     pub decoding: Array1<Bit>,
@@ -212,10 +491,16 @@ pub struct DecodeResult {
     pub decoding_quality: f64,
     pub iterations: usize,
     pub max_iter: usize,
+    /// Decoding stopped early because the shot ran out of its budget, see
+    /// [`crate::bp::relay::DecodeBudgetConfig`].
+    pub budget_exhausted: bool,
     pub extra: BPExtraResult,
 }
 
 #[derive(Serialize, Deserialize, Debug, Clone)]
 pub enum BPExtraResult {
     None,
+    /// The syndrome was answered by a [`crate::lookup_table::LookupTable`]
+    /// without running the decoder.
+    LookupTable,
 }
@@ -10,7 +10,11 @@
 
 pub mod bipartite_graph;
 pub mod bp;
+pub mod components;
 pub mod decoder;
 pub mod dem;
+pub mod lookup_table;
 pub mod observable_decoder;
+pub mod packed;
+pub mod syndrome_cache;
 pub mod utilities;
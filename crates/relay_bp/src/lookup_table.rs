@@ -0,0 +1,302 @@
+// (C) Copyright IBM 2025
+//
+// This code is licensed under the Apache License, Version 2.0. You may
+// obtain a copy of this license in the LICENSE.txt file in the root directory
+// of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+//
+// Any modifications or derivative works of this code must retain this
+// copyright notice, and modified files need to carry a notice indicating
+// that they have been altered from the originals.
+
+//! Lookup decoding of low-weight syndromes.
+//!
+//! At realistic noise rates most shots are explained by no error, a single
+//! error or a pair of errors. The table maps the syndrome of every single
+//! error to the most likely error producing it. A pair of errors `(a, b)`
+//! has the syndrome `H a ^ H b` and exactly one of the two flips the first
+//! active detector, so all pairs explaining a syndrome are found by trying
+//! the errors of that detector and looking up the remainder of the syndrome
+//! as a single error. This answers pairs exactly without enumerating the
+//! quadratically many pairs of the check matrix.
+
+use crate::decoder::{BPExtraResult, Bit, DecodeResult, SparseBitMatrix};
+use ndarray::{Array1, ArrayView1, ArrayViewMut1};
+use std::collections::HashMap;
+use std::sync::atomic::{AtomicU64, Ordering};
+
+#[derive(Clone, Debug)]
+pub struct LookupTableConfig {
+    /// Explain syndromes by at most this many errors, either 1 or 2.
+    pub max_errors: usize,
+    /// Syndromes with more active detectors are left to the decoder.
+    pub max_syndrome_weight: usize,
+}
+
+impl Default for LookupTableConfig {
+    fn default() -> Self {
+        Self {
+            max_errors: 2,
+            max_syndrome_weight: 8,
+        }
+    }
+}
+
+/// Counters of a [`LookupTable`].
+#[derive(Clone, Debug, Default, PartialEq)]
+pub struct LookupTableStats {
+    /// Shots answered by the table.
+    pub hits: u64,
+    /// Shots left to the decoder.
+    pub misses: u64,
+}
+
+/// Most likely corrections of the syndromes of at most two errors.
+#[derive(Debug)]
+pub struct LookupTable {
+    config: LookupTableConfig,
+    check_indptr: Vec<usize>,
+    check_indices: Vec<usize>,
+    variable_indptr: Vec<usize>,
+    variable_indices: Vec<usize>,
+    log_prior_ratios: Array1<f64>,
+    // The most likely error of every single-error syndrome.
+    singles: HashMap<Vec<usize>, usize>,
+    hits: AtomicU64,
+    misses: AtomicU64,
+}
+
+impl LookupTable {
+    pub fn new(
+        check_matrix: &SparseBitMatrix,
+        log_prior_ratios: Array1<f64>,
+        config: LookupTableConfig,
+    ) -> Self {
+        let check_matrix_csr = check_matrix.to_csr();
+        let check_matrix_csc = check_matrix.to_csc();
+        let mut table = LookupTable {
+            config,
+            check_indptr: check_matrix_csr.indptr().raw_storage().to_vec(),
+            check_indices: check_matrix_csr.indices().to_vec(),
+            variable_indptr: check_matrix_csc.indptr().raw_storage().to_vec(),
+            variable_indices: check_matrix_csc.indices().to_vec(),
+            log_prior_ratios,
+            singles: HashMap::new(),
+            hits: AtomicU64::new(0),
+            misses: AtomicU64::new(0),
+        };
+        for variable in 0..check_matrix.cols() {
+            if !table.log_prior_ratios[variable].is_finite() {
+                continue;
+            }
+            let mut syndrome = table.checks_of(variable).to_vec();
+            if syndrome.is_empty() {
+                continue;
+            }
+            syndrome.sort_unstable();
+            let cost = table.log_prior_ratios[variable];
+            table
+                .singles
+                .entry(syndrome)
+                .and_modify(|best| {
+                    if cost < table.log_prior_ratios[*best] {
+                        *best = variable;
+                    }
+                })
+                .or_insert(variable);
+        }
+        table
+    }
+
+    fn variables_of(&self, check: usize) -> &[usize] {
+        &self.check_indices[self.check_indptr[check]..self.check_indptr[check + 1]]
+    }
+
+    fn checks_of(&self, variable: usize) -> &[usize] {
+        &self.variable_indices[self.variable_indptr[variable]..self.variable_indptr[variable + 1]]
+    }
+
+    /// Number of distinct single-error syndromes in the table.
+    pub fn len(&self) -> usize {
+        self.singles.len()
+    }
+
+    pub fn is_empty(&self) -> bool {
+        self.singles.is_empty()
+    }
+
+    /// The most likely errors explaining the sorted active detectors of a
+    /// syndrome, and the sum of their log prior ratios.
+    fn correction(&self, syndrome: &[usize]) -> Option<(Vec<usize>, f64)> {
+        if syndrome.is_empty() {
+            return Some((Vec::new(), 0.));
+        }
+        if syndrome.len() > self.config.max_syndrome_weight || self.config.max_errors == 0 {
+            return None;
+        }
+        let mut best = self
+            .singles
+            .get(syndrome)
+            .map(|&variable| (vec![variable], self.log_prior_ratios[variable]));
+        if self.config.max_errors < 2 {
+            return best;
+        }
+        for &first in self.variables_of(syndrome[0]) {
+            let first_cost = self.log_prior_ratios[first];
+            if !first_cost.is_finite() {
+                continue;
+            }
+            let mut remainder = symmetric_difference(syndrome, self.checks_of(first));
+            if remainder.is_empty() {
+                continue;
+            }
+            remainder.sort_unstable();
+            if let Some(&second) = self.singles.get(&remainder) {
+                let cost = first_cost + self.log_prior_ratios[second];
+                if best.as_ref().is_none_or(|(_, best_cost)| cost < *best_cost) {
+                    best = Some((vec![first, second], cost));
+                }
+            }
+        }
+        best
+    }
+
+    fn lookup(&self, detectors: ArrayView1<Bit>) -> Option<(Vec<usize>, f64)> {
+        let mut syndrome = Vec::new();
+        for (detector, bit) in detectors.iter().enumerate() {
+            if *bit == 1 {
+                if syndrome.len() == self.config.max_syndrome_weight {
+                    self.misses.fetch_add(1, Ordering::Relaxed);
+                    return None;
+                }
+                syndrome.push(detector);
+            }
+        }
+        let correction = self.correction(&syndrome);
+        match correction {
+            Some(_) => self.hits.fetch_add(1, Ordering::Relaxed),
+            None => self.misses.fetch_add(1, Ordering::Relaxed),
+        };
+        correction
+    }
+
+    /// Write the correction of a syndrome into `decoding` and return `true`
+    /// if the syndrome is in the table. `decoding` is left as is otherwise.
+    pub fn decode_into(
+        &self,
+        detectors: ArrayView1<Bit>,
+        mut decoding: ArrayViewMut1<Bit>,
+    ) -> bool {
+        let Some((errors, _)) = self.lookup(detectors) else {
+            return false;
+        };
+        decoding.fill(0);
+        for error in errors {
+            decoding[error] = 1;
+        }
+        true
+    }
+
+    /// The detailed result of a syndrome in the table, marked with
+    /// [`BPExtraResult::LookupTable`].
+    pub fn decode_detailed(&self, detectors: ArrayView1<Bit>) -> Option<DecodeResult> {
+        let (errors, decoding_quality) = self.lookup(detectors)?;
+        let mut decoding = Array1::zeros(self.log_prior_ratios.len());
+        for error in errors {
+            decoding[error] = 1;
+        }
+        Some(DecodeResult {
+            decoding,
+            decoded_detectors: detectors.to_owned(),
+            posterior_ratios: self.log_prior_ratios.clone(),
+            success: true,
+            decoding_quality,
+            iterations: 0,
+            max_iter: 0,
+            budget_exhausted: false,
+            extra: BPExtraResult::LookupTable,
+        })
+    }
+
+    pub fn stats(&self) -> LookupTableStats {
+        LookupTableStats {
+            hits: self.hits.load(Ordering::Relaxed),
+            misses: self.misses.load(Ordering::Relaxed),
+        }
+    }
+
+    pub fn reset_stats(&self) {
+        self.hits.store(0, Ordering::Relaxed);
+        self.misses.store(0, Ordering::Relaxed);
+    }
+}
+
+/// Symmetric difference of a sorted and an unsorted set of indices.
+fn symmetric_difference(sorted: &[usize], other: &[usize]) -> Vec<usize> {
+    let mut difference: Vec<usize> = sorted
+        .iter()
+        .filter(|index| !other.contains(index))
+        .copied()
+        .collect();
+    difference.extend(
+        other
+            .iter()
+            .filter(|index| sorted.binary_search(index).is_err()),
+    );
+    difference
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use crate::bipartite_graph::BipartiteGraph;
+    use ndarray::prelude::*;
+
+    fn repetition_code(num_variables: usize) -> SparseBitMatrix {
+        let mut dense = Array2::<Bit>::zeros((num_variables - 1, num_variables));
+        for check in 0..num_variables - 1 {
+            dense[[check, check]] = 1;
+            dense[[check, check + 1]] = 1;
+        }
+        SparseBitMatrix::from_dense(dense)
+    }
+
+    #[test]
+    fn decode_repetition_code() {
+        let check_matrix = repetition_code(5);
+        // The last error is the least likely.
+        let log_prior_ratios = array![1., 1., 1., 1., 3.];
+        let config = LookupTableConfig {
+            max_errors: 2,
+            max_syndrome_weight: 3,
+        };
+        let table = LookupTable::new(&check_matrix, log_prior_ratios, config);
+        assert_eq!(table.len(), 5);
+
+        let mut decoding = Array1::ones(5);
+        assert!(table.decode_into(array![0, 0, 0, 0].view(), decoding.view_mut()));
+        assert_eq!(decoding, array![0, 0, 0, 0, 0]);
+
+        // A single error.
+        assert!(table.decode_into(array![1, 0, 0, 0].view(), decoding.view_mut()));
+        assert_eq!(decoding, array![1, 0, 0, 0, 0]);
+
+        // Two errors next to each other.
+        assert!(table.decode_into(array![1, 0, 1, 0].view(), decoding.view_mut()));
+        assert_eq!(decoding, array![0, 1, 1, 0, 0]);
+
+        // A pair of errors is preferred over three errors.
+        let result = table.decode_detailed(array![0, 1, 0, 1].view()).unwrap();
+        assert_eq!(result.decoding, array![0, 0, 1, 1, 0]);
+
+        // Two errors far apart.
+        let result = table.decode_detailed(array![1, 0, 0, 1].view()).unwrap();
+        assert_eq!(result.decoding, array![1, 0, 0, 0, 1]);
+        assert_eq!(result.decoding_quality, 4.);
+        assert!(matches!(result.extra, BPExtraResult::LookupTable));
+
+        // Syndromes above the maximum weight are left to the decoder.
+        assert!(!table.decode_into(array![1, 1, 1, 1].view(), decoding.view_mut()));
+        assert_eq!(decoding, array![1, 0, 0, 0, 1]);
+        assert_eq!(table.stats(), LookupTableStats { hits: 5, misses: 1 });
+    }
+}
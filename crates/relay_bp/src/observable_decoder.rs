@@ -8,15 +8,41 @@
 // copyright notice, and modified files need to carry a notice indicating
 // that they have been altered from the originals.
 
-use crate::decoder::{Bit, DecodeResult, Decoder, DecoderRunner, Mod2Mul, SparseBitMatrix};
+use crate::components::{
+    ComponentDecoderCache, ComponentDecomposer, ComponentDecompositionConfig, DecompositionScratch,
+};
+use crate::decoder::{
+    BPExtraResult, Bit, DecodeResult, Decoder, DecoderRunner, Mod2Mul, PooledWorker,
+    SparseBitMatrix, SplitBatch, WorkerPool, BATCH_LANES, PAR_CHUNK_SIZE,
+};
+use crate::lookup_table::{LookupTable, LookupTableConfig};
+use crate::packed::{
+    num_bytes, num_words, pack_bytes_into, unpack_bits_batch, unpack_bytes_into, PackedColumns,
+    Word,
+};
+use crate::syndrome_cache::{write_decoding, SyndromeCache, SyndromeCacheConfig};
 use serde::{Deserialize, Serialize};
 
 use indicatif::{ParallelProgressIterator, ProgressFinish, ProgressIterator, ProgressStyle};
-use ndarray::{stack, Array1, Array2, ArrayView1, ArrayView2, Axis};
+use ndarray::{s, Array1, Array2, ArrayView1, ArrayView2, ArrayViewMut1, ArrayViewMut2, Axis};
+use num_traits::{PrimInt, Zero};
 use rayon::prelude::*;
+use rayon::{ThreadPool, ThreadPoolBuildError, ThreadPoolBuilder};
 
+use std::cmp::Reverse;
+use std::collections::HashMap;
 use std::sync::Arc;
 
+/// Number of chunks per thread that shot scheduling aims for, so that
+/// threads finishing early can steal the remaining work.
+const SCHEDULED_CHUNKS_PER_THREAD: usize = 4;
+
+/// Whether a decoding may be memoized in the syndrome cache: only decodings
+/// that converged without exhausting their budget are.
+fn is_cacheable(result: &DecodeResult) -> bool {
+    result.success && !result.budget_exhausted
+}
+
 pub trait ObservableDecoder: Decoder {
     /// The logical action matrix of the underlying trait.
     fn observable_error_matrix(&self) -> Arc<SparseBitMatrix>;
@@ -36,7 +62,29 @@ pub trait ObservableDecoder: Decoder {
 pub struct ObservableDecoderRunner<'a> {
     decoder: Box<dyn Decoder + Send + 'a>,
     observable_error_matrix: Arc<SparseBitMatrix>,
+    // Packed column patterns of the observable and check matrices for XOR
+    // evaluation.
+    observable_columns: Arc<PackedColumns>,
+    detector_columns: Arc<PackedColumns>,
     include_decode_result: bool,
+    component_decomposer: Option<Arc<ComponentDecomposer>>,
+    // Priors of the inner decoder for stitching components, and the
+    // restricted decoders and decomposition buffers reused between shots.
+    component_log_prior_ratios: Option<Arc<Array1<f64>>>,
+    component_decoders: ComponentDecoderCache<Box<dyn Decoder + Send>>,
+    decomposition_scratch: DecompositionScratch,
+    // Decodings of a chunk of rows, reused by the observable batch methods,
+    // and the unpacked detectors and observables of a chunk of byte-packed
+    // rows.
+    decoding_scratch: Array2<Bit>,
+    bytes_scratch: (Array2<Bit>, Array2<Bit>),
+    // Shared by all clones of the runner.
+    lookup_table: Option<Arc<LookupTable>>,
+    syndrome_cache: Option<Arc<SyndromeCache>>,
+    // Clones of this runner reused by the parallel batch methods.
+    workers: WorkerPool<ObservableDecoderRunner<'a>>,
+    thread_pool: Option<Arc<ThreadPool>>,
+    shot_scheduling: bool,
 }
 
 impl<'a> ObservableDecoderRunner<'a> {
@@ -45,13 +93,543 @@ impl<'a> ObservableDecoderRunner<'a> {
         observable_error_matrix: Arc<SparseBitMatrix>,
         include_decode_result: bool,
     ) -> Self {
+        let observable_columns = Arc::new(PackedColumns::new(&observable_error_matrix));
+        let detector_columns = Arc::new(PackedColumns::new(&decoder.check_matrix()));
         ObservableDecoderRunner {
             decoder,
             observable_error_matrix,
+            observable_columns,
+            detector_columns,
             include_decode_result,
+            component_decomposer: None,
+            component_log_prior_ratios: None,
+            component_decoders: ComponentDecoderCache::default(),
+            decomposition_scratch: DecompositionScratch::default(),
+            decoding_scratch: Array2::zeros((0, 0)),
+            bytes_scratch: (Array2::zeros((0, 0)), Array2::zeros((0, 0))),
+            lookup_table: None,
+            syndrome_cache: None,
+            workers: WorkerPool::new(),
+            thread_pool: None,
+            shot_scheduling: true,
+        }
+    }
+
+    /// Decode syndromes by splitting them into independent components that
+    /// are decoded as reduced sub-problems of the inner decoder. Syndromes
+    /// whose grown region exceeds the configured threshold, and inner
+    /// decoders that cannot be restricted, fall back to whole-graph decoding.
+    pub fn set_component_decomposition(&mut self, config: Option<ComponentDecompositionConfig>) {
+        self.component_decomposer = config.map(|config| {
+            Arc::new(ComponentDecomposer::new(
+                &self.decoder.check_matrix(),
+                Arc::new(config),
+            ))
+        });
+        self.component_log_prior_ratios = self
+            .component_decomposer
+            .is_some()
+            .then(|| Arc::new(self.decoder.log_prior_ratios()));
+        self.component_decoders.clear();
+        if let Some(syndrome_cache) = &self.syndrome_cache {
+            syndrome_cache.clear();
+        }
+        self.workers.clear();
+    }
+
+    /// Memoize decodings of low-weight syndromes in a bounded cache shared
+    /// by all clones and parallel workers of the runner. Only the plain and
+    /// batch decoding paths consult the cache, detailed results are always
+    /// decoded since their statistics would be meaningless for a lookup.
+    pub fn set_syndrome_cache(&mut self, config: Option<SyndromeCacheConfig>) {
+        self.syndrome_cache = config.map(|config| Arc::new(SyndromeCache::new(config)));
+        self.workers.clear();
+    }
+
+    pub fn syndrome_cache(&self) -> Option<&SyndromeCache> {
+        self.syndrome_cache.as_deref()
+    }
+
+    /// Answer syndromes explained by at most two errors from a table of
+    /// the most likely corrections built from the decoder's check matrix
+    /// and priors, and only decode the remaining shots. Detailed results
+    /// of answered shots carry [`BPExtraResult::LookupTable`].
+    pub fn set_lookup_table(&mut self, config: Option<LookupTableConfig>) {
+        self.lookup_table = config.map(|config| {
+            let check_matrix = self.decoder.check_matrix();
+            let log_prior_ratios = self.decoder.log_prior_ratios();
+            Arc::new(LookupTable::new(&check_matrix, log_prior_ratios, config))
+        });
+        self.workers.clear();
+    }
+
+    pub fn lookup_table(&self) -> Option<&LookupTable> {
+        self.lookup_table.as_deref()
+    }
+
+    /// Decode a syndrome with the component decomposer, or return `None` if
+    /// it has to be decoded on the whole graph.
+    fn decode_components(&mut self, detectors: ArrayView1<Bit>) -> Option<DecodeResult> {
+        let component_decomposer = self.component_decomposer.clone()?;
+        let log_prior_ratios = self.component_log_prior_ratios.clone()?;
+        let mut scratch = std::mem::take(&mut self.decomposition_scratch);
+        let result = component_decomposer.decode(
+            detectors,
+            &log_prior_ratios,
+            &mut scratch,
+            |component, detectors, num_components| {
+                let mut decoder = self.component_decoders.take(component).or_else(|| {
+                    self.decoder
+                        .restricted_decoder(component.check_matrix.clone(), &component.variables)
+                })?;
+                let result = decoder.decode_component(detectors, num_components);
+                self.component_decoders.put(component, decoder);
+                Some(result)
+            },
+        );
+        self.decomposition_scratch = scratch;
+        result
+    }
+
+    /// Decode a syndrome with the component decomposer or the inner decoder.
+    fn decode_detailed_inner(&mut self, detectors: ArrayView1<Bit>) -> DecodeResult {
+        match self.decode_components(detectors) {
+            Some(result) => result,
+            None => self.get_decoder_mut().decode_detailed(detectors),
+        }
+    }
+
+    /// Decode a batch with the component decomposer, decoding the shots
+    /// that fall back to the whole graph together with the inner decoder's
+    /// batch path.
+    fn decode_detailed_batch_inner(&mut self, detectors: ArrayView2<Bit>) -> Vec<DecodeResult> {
+        if self.component_decomposer.is_none() {
+            return self.get_decoder_mut().decode_detailed_batch(detectors);
+        }
+        let mut results: Vec<Option<DecodeResult>> = detectors
+            .axis_iter(Axis(0))
+            .map(|row| self.decode_components(row))
+            .collect();
+        let fallback: Vec<usize> = (0..results.len())
+            .filter(|row| results[*row].is_none())
+            .collect();
+        if !fallback.is_empty() {
+            let decoded = self
+                .get_decoder_mut()
+                .decode_detailed_batch(detectors.select(Axis(0), &fallback).view());
+            for (row, result) in fallback.into_iter().zip(decoded) {
+                results[row] = Some(result);
+            }
+        }
+        results.into_iter().map(Option::unwrap).collect()
+    }
+
+    /// Decode a batch consulting the syndrome cache if enabled.
+    fn decode_batch_memoized_into(&mut self, detectors: ArrayView2<Bit>, out: ArrayViewMut2<Bit>) {
+        match self.syndrome_cache.clone() {
+            Some(cache) => self.decode_batch_cached_into(&cache, detectors, out),
+            None => self.decode_batch_uncached_into(detectors, out),
         }
     }
 
+    /// Run the parallel batch methods on a dedicated pool of `num_threads`
+    /// threads, or on the global rayon pool if `None`. Limiting the threads
+    /// avoids oversubscribing cores when several processes decode at once.
+    pub fn set_num_threads(
+        &mut self,
+        num_threads: Option<usize>,
+    ) -> Result<(), ThreadPoolBuildError> {
+        self.thread_pool = match num_threads {
+            Some(num_threads) => Some(Arc::new(
+                ThreadPoolBuilder::new().num_threads(num_threads).build()?,
+            )),
+            None => None,
+        };
+        Ok(())
+    }
+
+    /// Number of threads used by the parallel batch methods.
+    pub fn num_threads(&self) -> usize {
+        match &self.thread_pool {
+            Some(thread_pool) => thread_pool.current_num_threads(),
+            None => rayon::current_num_threads(),
+        }
+    }
+
+    /// Enable or disable scheduling the shots of parallel batches by their
+    /// estimated cost, see [`Self::par_scheduled_into`]. Enabled by default.
+    pub fn set_shot_scheduling(&mut self, shot_scheduling: bool) {
+        self.shot_scheduling = shot_scheduling;
+    }
+
+    /// Decode a batch without consulting the syndrome cache.
+    fn decode_batch_uncached_into(
+        &mut self,
+        detectors: ArrayView2<Bit>,
+        mut out: ArrayViewMut2<Bit>,
+    ) {
+        if self.component_decomposer.is_none() {
+            return self.get_decoder_mut().decode_batch_into(detectors, out);
+        }
+        let mut fallback = Vec::new();
+        for (row, (syndrome, mut decoding)) in detectors
+            .axis_iter(Axis(0))
+            .zip(out.axis_iter_mut(Axis(0)))
+            .enumerate()
+        {
+            match self.decode_components(syndrome) {
+                Some(result) => decoding.assign(&result.decoding),
+                None => fallback.push(row),
+            }
+        }
+        if fallback.is_empty() {
+            return;
+        }
+        let mut decodings = Array2::zeros((fallback.len(), out.ncols()));
+        self.get_decoder_mut().decode_batch_into(
+            detectors.select(Axis(0), &fallback).view(),
+            decodings.view_mut(),
+        );
+        for (row, decoding) in fallback.iter().zip(decodings.axis_iter(Axis(0))) {
+            out.row_mut(*row).assign(&decoding);
+        }
+    }
+
+    /// Answer the rows of a batch found in the syndrome cache and decode
+    /// the remaining rows together, each distinct syndrome only once.
+    fn decode_batch_cached_into(
+        &mut self,
+        cache: &SyndromeCache,
+        detectors: ArrayView2<Bit>,
+        mut out: ArrayViewMut2<Bit>,
+    ) {
+        let mut misses = Vec::new();
+        let mut miss_keys = Vec::new();
+        let mut pending = HashMap::new();
+        let mut repeats = Vec::new();
+        for (row, (syndrome, decoding)) in detectors
+            .axis_iter(Axis(0))
+            .zip(out.axis_iter_mut(Axis(0)))
+            .enumerate()
+        {
+            let key = cache.key(syndrome);
+            if let Some(key) = &key {
+                if let Some(support) = cache.get(key) {
+                    write_decoding(&support, decoding);
+                    continue;
+                }
+                if let Some(&miss) = pending.get(key) {
+                    repeats.push((row, miss));
+                    continue;
+                }
+                pending.insert(key.clone(), misses.len());
+            }
+            misses.push(row);
+            miss_keys.push(key);
+        }
+        if misses.is_empty() {
+            return;
+        }
+        // Only decodings that converged within their budget are cached, so
+        // that an unlucky shot does not answer its syndrome for good.
+        let results = self.decode_detailed_batch_inner(detectors.select(Axis(0), &misses).view());
+        for ((row, key), result) in misses.iter().zip(miss_keys.iter()).zip(results.iter()) {
+            out.row_mut(*row).assign(&result.decoding);
+            if let Some(key) = key.as_ref().filter(|_| is_cacheable(result)) {
+                cache.insert(key, result.decoding.view());
+            }
+        }
+        for (row, miss) in repeats {
+            out.row_mut(row).assign(&results[miss].decoding);
+        }
+    }
+
+    /// Run `op` on the thread pool of the runner.
+    fn install<R: Send>(&self, op: impl FnOnce() -> R + Send) -> R {
+        match &self.thread_pool {
+            Some(thread_pool) => thread_pool.install(op),
+            None => op(),
+        }
+    }
+
+    /// Take a pooled worker that decodes its chunks as part of `batch`.
+    fn split_batch_worker(&self, batch: &Arc<SplitBatch>) -> PooledWorker<'_, Self> {
+        let mut worker = self.workers.get(self);
+        worker.join_split_batch(batch);
+        worker
+    }
+
+    /// Let the pooled workers leave the batch they decoded the chunks of,
+    /// merging what they recorded over the whole batch.
+    fn finish_split_batch(&self) {
+        self.workers
+            .for_each_idle(|worker| worker.leave_split_batch());
+    }
+
+    /// Run `op` on pooled workers for every chunk of rows of `input` and
+    /// the matching rows of `out`.
+    fn par_chunks_into<T: Sync, U: Send>(
+        &self,
+        input: ArrayView2<T>,
+        mut out: ArrayViewMut2<U>,
+        op: impl Fn(&mut Self, ArrayView2<T>, ArrayViewMut2<U>) + Send + Sync,
+    ) {
+        let batch = Arc::default();
+        self.install(|| {
+            input
+                .axis_chunks_iter(Axis(0), PAR_CHUNK_SIZE)
+                .into_par_iter()
+                .zip(out.axis_chunks_iter_mut(Axis(0), PAR_CHUNK_SIZE))
+                .for_each_init(
+                    || self.split_batch_worker(&batch),
+                    |worker, (chunk, out)| op(&mut **worker, chunk, out),
+                )
+        });
+        self.finish_split_batch();
+    }
+
+    /// Run `op` for every chunk of rows of `input` and the matching rows of
+    /// `out` in parallel. Unlike [`Self::par_chunks_into`] no workers are
+    /// cloned, for work that does not decode.
+    fn par_eval_into<T: Sync, U: Send>(
+        &self,
+        input: ArrayView2<T>,
+        mut out: ArrayViewMut2<U>,
+        op: impl Fn(ArrayView2<T>, ArrayViewMut2<U>) + Send + Sync,
+    ) {
+        self.install(|| {
+            input
+                .axis_chunks_iter(Axis(0), PAR_CHUNK_SIZE)
+                .into_par_iter()
+                .zip(out.axis_chunks_iter_mut(Axis(0), PAR_CHUNK_SIZE))
+                .for_each(|(chunk, out)| op(chunk, out))
+        })
+    }
+
+    /// Run `op` on pooled workers for chunks of rows of `input` and the
+    /// matching rows of `out`, scheduled by cost if shot scheduling is on.
+    /// `bias` is the syndrome bias `op` adds to every row of `input`, packed
+    /// like the rows.
+    fn par_into<T: PrimInt + Send + Sync, U: Zero + Clone + Send>(
+        &mut self,
+        input: ArrayView2<T>,
+        bias: Option<ArrayView1<T>>,
+        out: ArrayViewMut2<U>,
+        op: impl Fn(&mut Self, ArrayView2<T>, ArrayViewMut2<U>) + Send + Sync,
+    ) {
+        if self.shot_scheduling {
+            self.par_scheduled_into(input, bias, out, op);
+        } else {
+            self.par_chunks_into(input, out, op);
+        }
+    }
+
+    /// Run `op` like [`Self::par_chunks_into`], with the rows scheduled by
+    /// their syndrome weight as a cheap estimate of their decoding cost.
+    ///
+    /// The weight of a row counts the detection events left once `bias` is
+    /// added to it. Rows without any all decode alike, so one of them is
+    /// decoded on a pooled worker and its result copied to the others.
+    /// The remaining rows are dispatched heaviest first in chunks of about
+    /// equal total weight, so that expensive shots start early instead of
+    /// straggling at the end of the batch and shots of similar cost share
+    /// the lanes of a chunk. Results are written in the input order.
+    fn par_scheduled_into<T: PrimInt + Send + Sync, U: Zero + Clone + Send>(
+        &mut self,
+        input: ArrayView2<T>,
+        bias: Option<ArrayView1<T>>,
+        mut out: ArrayViewMut2<U>,
+        op: impl Fn(&mut Self, ArrayView2<T>, ArrayViewMut2<U>) + Send + Sync,
+    ) {
+        let batch = Arc::default();
+        let num_inputs = input.ncols();
+        let num_outputs = out.ncols();
+        let weights: Vec<usize> = input
+            .axis_iter(Axis(0))
+            .map(|row| {
+                row.iter()
+                    .enumerate()
+                    .map(|(index, word)| {
+                        let bias = bias.map_or(T::zero(), |bias| bias[index]);
+                        (*word ^ bias).count_ones() as usize
+                    })
+                    .sum()
+            })
+            .collect();
+        let trivial = weights.iter().position(|weight| *weight == 0);
+        let mut trivial_out = Array2::<U>::zeros((1, num_outputs));
+
+        let mut out_rows: Vec<Option<ArrayViewMut1<U>>> =
+            out.axis_iter_mut(Axis(0)).map(Some).collect();
+
+        // Heaviest first, ties in input order.
+        let mut order: Vec<usize> = (0..weights.len()).filter(|row| weights[*row] > 0).collect();
+        order.sort_by_key(|row| Reverse(weights[*row]));
+        let mut sorted_out_rows: Vec<ArrayViewMut1<U>> = order
+            .iter()
+            .map(|row| out_rows[*row].take().unwrap())
+            .collect();
+
+        // Close a chunk once it has its share of the total weight, but keep
+        // the lanes of lane-batched decoders full.
+        let total_weight: usize = order.iter().map(|row| weights[*row]).sum();
+        let chunk_weight = total_weight.div_ceil(SCHEDULED_CHUNKS_PER_THREAD * self.num_threads());
+        let mut tasks = Vec::new();
+        let mut order_rest = order.as_slice();
+        let mut out_rows_rest = sorted_out_rows.as_mut_slice();
+        while !order_rest.is_empty() {
+            let mut len = 0;
+            let mut weight = 0;
+            while len < order_rest.len()
+                && len < PAR_CHUNK_SIZE
+                && (len < BATCH_LANES || weight < chunk_weight)
+            {
+                weight += weights[order_rest[len]];
+                len += 1;
+            }
+            let (chunk_order, order_next) = order_rest.split_at(len);
+            let (chunk_out_rows, out_rows_next) =
+                std::mem::take(&mut out_rows_rest).split_at_mut(len);
+            tasks.push((chunk_order, chunk_out_rows));
+            order_rest = order_next;
+            out_rows_rest = out_rows_next;
+        }
+
+        // The rows of a chunk are gathered into buffers kept alongside each
+        // pooled worker and reused by all of its tasks.
+        let runner = &*self;
+        runner.install(|| {
+            rayon::join(
+                || {
+                    if let Some(trivial) = trivial {
+                        let mut worker = runner.split_batch_worker(&batch);
+                        op(
+                            &mut *worker,
+                            input.slice(s![trivial..=trivial, ..]),
+                            trivial_out.view_mut(),
+                        );
+                    }
+                },
+                || {
+                    tasks.into_par_iter().for_each_init(
+                        || {
+                            (
+                                runner.split_batch_worker(&batch),
+                                Array2::<T>::zeros((PAR_CHUNK_SIZE, num_inputs)),
+                                Array2::<U>::zeros((PAR_CHUNK_SIZE, num_outputs)),
+                            )
+                        },
+                        |(worker, chunk, chunk_out), (chunk_order, chunk_out_rows)| {
+                            let len = chunk_order.len();
+                            for (mut chunk_row, row) in
+                                chunk.axis_iter_mut(Axis(0)).zip(chunk_order)
+                            {
+                                chunk_row.assign(&input.row(*row));
+                            }
+                            op(
+                                &mut **worker,
+                                chunk.slice(s![..len, ..]),
+                                chunk_out.slice_mut(s![..len, ..]),
+                            );
+                            for (out_row, chunk_out_row) in
+                                chunk_out_rows.iter_mut().zip(chunk_out.axis_iter(Axis(0)))
+                            {
+                                out_row.assign(&chunk_out_row);
+                            }
+                        },
+                    )
+                },
+            )
+        });
+        self.finish_split_batch();
+        // The rows left are those without detection events.
+        for out_row in out_rows.iter_mut().flatten() {
+            out_row.assign(&trivial_out.row(0));
+        }
+    }
+
+    /// Run `op` on pooled workers for every row of `input` and write its
+    /// result into the matching row of `out`, displaying a progress bar.
+    fn par_rows_into_progress_bar<T: Sync, U: Clone + Send>(
+        &self,
+        input: ArrayView2<T>,
+        mut out: ArrayViewMut2<U>,
+        leave_progress_bar_on_finish: bool,
+        op: impl Fn(&mut Self, ArrayView1<T>) -> Array1<U> + Send + Sync,
+    ) {
+        let finish_mode = match leave_progress_bar_on_finish {
+            true => ProgressFinish::AndLeave,
+            false => ProgressFinish::AndClear,
+        };
+
+        let batch = Arc::default();
+        self.install(|| {
+            input
+                .axis_iter(Axis(0))
+                .into_par_iter()
+                .zip(out.axis_iter_mut(Axis(0)))
+                .progress_with_style(self.get_progress_bar_style())
+                .with_finish(finish_mode)
+                .for_each_init(
+                    || self.split_batch_worker(&batch),
+                    |worker, (row, mut out_row)| out_row.assign(&op(&mut **worker, row)),
+                )
+        });
+        self.finish_split_batch();
+    }
+
+    /// Map `op` over chunks of rows of `input` on pooled workers.
+    fn par_chunks_map<T: Sync, R: Send>(
+        &self,
+        input: ArrayView2<T>,
+        op: impl Fn(&mut Self, ArrayView2<T>) -> Vec<R> + Send + Sync,
+    ) -> Vec<R> {
+        let batch = Arc::default();
+        let results = self.install(|| {
+            input
+                .axis_chunks_iter(Axis(0), PAR_CHUNK_SIZE)
+                .into_par_iter()
+                .map_init(
+                    || self.split_batch_worker(&batch),
+                    |worker, chunk| op(&mut **worker, chunk),
+                )
+                .flatten()
+                .collect()
+        });
+        self.finish_split_batch();
+        results
+    }
+
+    /// Map `op` over the rows of `input` on pooled workers displaying a
+    /// progress bar.
+    fn par_rows_map_progress_bar<T: Sync, R: Send>(
+        &self,
+        input: ArrayView2<T>,
+        leave_progress_bar_on_finish: bool,
+        op: impl Fn(&mut Self, ArrayView1<T>) -> R + Send + Sync,
+    ) -> Vec<R> {
+        let finish_mode = match leave_progress_bar_on_finish {
+            true => ProgressFinish::AndLeave,
+            false => ProgressFinish::AndClear,
+        };
+
+        let batch = Arc::default();
+        let results = self.install(|| {
+            input
+                .axis_iter(Axis(0))
+                .into_par_iter()
+                .progress_with_style(self.get_progress_bar_style())
+                .with_finish(finish_mode)
+                .map_init(
+                    || self.split_batch_worker(&batch),
+                    |worker, row| op(&mut **worker, row),
+                )
+                .collect()
+        });
+        self.finish_split_batch();
+        results
+    }
+
     pub fn get_decoder(&self) -> &dyn Decoder {
         self.decoder.as_ref()
     }
@@ -70,12 +648,18 @@ impl<'a> ObservableDecoderRunner<'a> {
         detectors: ArrayView1<Bit>,
     ) -> ObservableDecodeResult {
         let decode_result = self.decode_detailed(detectors.view());
+        self.build_observable_result(decode_result)
+    }
+
+    fn build_observable_result(&self, decode_result: DecodeResult) -> ObservableDecodeResult {
         let observables = self.compute_observables(decode_result.decoding.view());
 
         ObservableDecodeResult {
             observables,
             converged: decode_result.success,
             iterations: decode_result.iterations,
+            budget_exhausted: decode_result.budget_exhausted,
+            from_lookup_table: matches!(decode_result.extra, BPExtraResult::LookupTable),
             true_decoding: None,
             physical_decode_result: if self.include_decode_result {
                 Some(decode_result)
@@ -85,12 +669,119 @@ impl<'a> ObservableDecoderRunner<'a> {
         }
     }
 
+    /// Number of observables, the columns of the observable batch outputs.
+    pub fn num_observables(&self) -> usize {
+        self.observable_error_matrix.rows()
+    }
+
+    /// An empty output for the observables of a batch of `num_shots` shots.
+    fn observables_batch_zeros(&self, num_shots: usize) -> Array2<Bit> {
+        Array2::zeros((num_shots, self.num_observables()))
+    }
+
+    /// Compute the observables of every row of a batch of errors.
+    pub fn compute_observables_batch(&self, errors: ArrayView2<Bit>) -> Array2<Bit> {
+        let mut observables = self.observables_batch_zeros(errors.nrows());
+        self.compute_observables_batch_into(errors, observables.view_mut());
+        observables
+    }
+
+    /// Compute the observables of every row of a batch of errors into the
+    /// same row of `out`, which must have one column per observable.
+    pub fn compute_observables_batch_into(&self, errors: ArrayView2<Bit>, out: ArrayViewMut2<Bit>) {
+        self.observable_columns
+            .mul_bits_batch_unpacked_into(errors, out);
+    }
+
+    pub fn par_compute_observables_batch(&self, errors: ArrayView2<Bit>) -> Array2<Bit> {
+        let mut observables = self.observables_batch_zeros(errors.nrows());
+        self.par_compute_observables_batch_into(errors, observables.view_mut());
+        observables
+    }
+
+    pub fn par_compute_observables_batch_into(
+        &self,
+        errors: ArrayView2<Bit>,
+        out: ArrayViewMut2<Bit>,
+    ) {
+        let observable_columns = &self.observable_columns;
+        self.par_eval_into(errors, out, |errors, out| {
+            observable_columns.mul_bits_batch_unpacked_into(errors, out)
+        });
+    }
+
+    /// Compute the detectors of every row of a batch of errors into the
+    /// same row of `out`, which must have one column per detector.
+    pub fn get_detectors_batch_into(&self, errors: ArrayView2<Bit>, out: ArrayViewMut2<Bit>) {
+        self.detector_columns
+            .mul_bits_batch_unpacked_into(errors, out);
+    }
+
+    pub fn par_get_detectors_batch(&self, errors: ArrayView2<Bit>) -> Array2<Bit> {
+        let mut detectors = Array2::zeros((errors.nrows(), self.detector_columns.rows()));
+        self.par_get_detectors_batch_into(errors, detectors.view_mut());
+        detectors
+    }
+
+    pub fn par_get_detectors_batch_into(&self, errors: ArrayView2<Bit>, out: ArrayViewMut2<Bit>) {
+        let detector_columns = &self.detector_columns;
+        self.par_eval_into(errors, out, |errors, out| {
+            detector_columns.mul_bits_batch_unpacked_into(errors, out)
+        });
+    }
+
     pub fn decode_observables_batch(&mut self, detectors: ArrayView2<Bit>) -> Array2<Bit> {
-        let arrs: Vec<Array1<Bit>> = detectors
-            .axis_iter(Axis(0))
-            .map(|row| self.decode_observables(row))
-            .collect();
-        stack(Axis(0), &arrs.iter().map(|a| a.view()).collect::<Vec<_>>()).unwrap()
+        let mut observables = self.observables_batch_zeros(detectors.nrows());
+        self.decode_observables_batch_into(detectors, observables.view_mut());
+        observables
+    }
+
+    /// The buffer a chunk of rows is decoded into, allocated on first use.
+    fn take_decoding_scratch(&mut self) -> Array2<Bit> {
+        let scratch = std::mem::take(&mut self.decoding_scratch);
+        if scratch.nrows() == PAR_CHUNK_SIZE {
+            return scratch;
+        }
+        Array2::zeros((PAR_CHUNK_SIZE, self.decoder.check_matrix().cols()))
+    }
+
+    /// The buffers the detectors of a chunk of byte-packed rows are unpacked
+    /// into and its observables decoded into, allocated on first use.
+    fn take_bytes_scratch(&mut self) -> (Array2<Bit>, Array2<Bit>) {
+        let scratch = std::mem::take(&mut self.bytes_scratch);
+        if scratch.0.nrows() == PAR_CHUNK_SIZE {
+            return scratch;
+        }
+        (
+            Array2::zeros((PAR_CHUNK_SIZE, self.decoder.check_matrix().rows())),
+            Array2::zeros((PAR_CHUNK_SIZE, self.num_observables())),
+        )
+    }
+
+    /// Decode a batch writing the observables of each row of `detectors`
+    /// into the same row of `out`, which must have one column per observable.
+    pub fn decode_observables_batch_into(
+        &mut self,
+        detectors: ArrayView2<Bit>,
+        mut out: ArrayViewMut2<Bit>,
+    ) {
+        // Route through the inner decoder's batch path so that lane-batched
+        // decoders can process several shots per graph traversal, a chunk
+        // of rows at a time so only a chunk of decodings is ever held.
+        let mut decodings = self.take_decoding_scratch();
+        let joined = self.decoder.join_split_batch(&Arc::default());
+        for (chunk, out_chunk) in detectors
+            .axis_chunks_iter(Axis(0), PAR_CHUNK_SIZE)
+            .zip(out.axis_chunks_iter_mut(Axis(0), PAR_CHUNK_SIZE))
+        {
+            let mut decodings = decodings.slice_mut(s![..chunk.nrows(), ..]);
+            self.decode_batch_into(chunk, decodings.view_mut());
+            self.compute_observables_batch_into(decodings.view(), out_chunk);
+        }
+        if joined {
+            self.decoder.leave_split_batch();
+        }
+        self.decoding_scratch = decodings;
     }
 
     pub fn decode_observables_batch_progress_bar(
@@ -98,40 +789,275 @@ impl<'a> ObservableDecoderRunner<'a> {
         detectors: ArrayView2<Bit>,
         leave_progress_bar_on_finish: bool,
     ) -> Array2<Bit> {
+        let mut observables = self.observables_batch_zeros(detectors.nrows());
+        self.decode_observables_batch_progress_bar_into(
+            detectors,
+            observables.view_mut(),
+            leave_progress_bar_on_finish,
+        );
+        observables
+    }
+
+    pub fn decode_observables_batch_progress_bar_into(
+        &mut self,
+        detectors: ArrayView2<Bit>,
+        mut out: ArrayViewMut2<Bit>,
+        leave_progress_bar_on_finish: bool,
+    ) {
         let finish_mode = match leave_progress_bar_on_finish {
             true => ProgressFinish::AndLeave,
             false => ProgressFinish::AndClear,
         };
 
-        let arrs: Vec<Array1<Bit>> = detectors
+        let style = self.get_progress_bar_style();
+        for (row, mut observables) in detectors
             .axis_iter(Axis(0))
-            .progress_with_style(self.get_progress_bar_style())
+            .zip(out.axis_iter_mut(Axis(0)))
+            .progress_with_style(style)
             .with_finish(finish_mode)
-            .map(|row| self.decode_observables(row))
-            .collect();
-        stack(Axis(0), &arrs.iter().map(|a| a.view()).collect::<Vec<_>>()).unwrap()
+        {
+            observables.assign(&self.decode_observables(row));
+        }
     }
 
     pub fn decode_observables_detailed_batch(
         &mut self,
         detectors: ArrayView2<Bit>,
     ) -> Vec<ObservableDecodeResult> {
-        detectors
-            .axis_iter(Axis(0))
-            .map(|row| self.decode_observables_detailed(row))
+        self.decode_detailed_batch(detectors)
+            .into_iter()
+            .map(|decode_result| self.build_observable_result(decode_result))
             .collect()
     }
 
+    /// Compute bit-packed observables from a batch of bit-packed errors.
+    pub fn compute_observables_packed_batch(&self, errors: ArrayView2<Word>) -> Array2<Word> {
+        self.observable_columns.mul_packed_batch(errors)
+    }
+
+    pub fn compute_observables_packed_batch_into(
+        &self,
+        errors: ArrayView2<Word>,
+        out: ArrayViewMut2<Word>,
+    ) {
+        self.observable_columns.mul_packed_batch_into(errors, out);
+    }
+
+    pub fn par_compute_observables_packed_batch_into(
+        &self,
+        errors: ArrayView2<Word>,
+        out: ArrayViewMut2<Word>,
+    ) {
+        let observable_columns = &self.observable_columns;
+        self.par_eval_into(errors, out, |errors, out| {
+            observable_columns.mul_packed_batch_into(errors, out)
+        });
+    }
+
+    pub fn get_detectors_packed_batch_into(
+        &self,
+        errors: ArrayView2<Word>,
+        out: ArrayViewMut2<Word>,
+    ) {
+        self.detector_columns.mul_packed_batch_into(errors, out);
+    }
+
+    pub fn par_get_detectors_packed_batch_into(
+        &self,
+        errors: ArrayView2<Word>,
+        out: ArrayViewMut2<Word>,
+    ) {
+        let detector_columns = &self.detector_columns;
+        self.par_eval_into(errors, out, |errors, out| {
+            detector_columns.mul_packed_batch_into(errors, out)
+        });
+    }
+
+    /// Decode a batch of bit-packed detectors into bit-packed observables.
+    /// See [`crate::packed`] for the layout.
+    pub fn decode_observables_packed_batch(&mut self, detectors: ArrayView2<Word>) -> Array2<Word> {
+        let mut observables = Array2::zeros((detectors.nrows(), num_words(self.num_observables())));
+        self.decode_observables_packed_batch_into(detectors, observables.view_mut());
+        observables
+    }
+
+    /// Decode a batch of bit-packed detectors writing the bit-packed
+    /// observables into the rows of `out`.
+    pub fn decode_observables_packed_batch_into(
+        &mut self,
+        detectors: ArrayView2<Word>,
+        mut out: ArrayViewMut2<Word>,
+    ) {
+        let num_detectors = self.decoder.check_matrix().rows();
+        let mut decodings = self.take_decoding_scratch();
+        let joined = self.decoder.join_split_batch(&Arc::default());
+        for (chunk, out_chunk) in detectors
+            .axis_chunks_iter(Axis(0), PAR_CHUNK_SIZE)
+            .zip(out.axis_chunks_iter_mut(Axis(0), PAR_CHUNK_SIZE))
+        {
+            let chunk = unpack_bits_batch(chunk, num_detectors);
+            let mut decodings = decodings.slice_mut(s![..chunk.nrows(), ..]);
+            self.decode_batch_into(chunk.view(), decodings.view_mut());
+            self.observable_columns
+                .mul_bits_batch_into(decodings.view(), out_chunk);
+        }
+        if joined {
+            self.decoder.leave_split_batch();
+        }
+        self.decoding_scratch = decodings;
+    }
+
+    pub fn par_decode_observables_packed_batch(
+        &mut self,
+        detectors: ArrayView2<Word>,
+    ) -> Array2<Word> {
+        let mut observables = Array2::zeros((detectors.nrows(), num_words(self.num_observables())));
+        self.par_decode_observables_packed_batch_into(detectors, observables.view_mut());
+        observables
+    }
+
+    pub fn par_decode_observables_packed_batch_into(
+        &mut self,
+        detectors: ArrayView2<Word>,
+        out: ArrayViewMut2<Word>,
+    ) {
+        self.par_into(detectors, None, out, |worker, chunk, out| {
+            worker.decode_observables_packed_batch_into(chunk, out)
+        });
+    }
+
     pub fn par_decode_observables_batch(&mut self, detectors: ArrayView2<Bit>) -> Array2<Bit> {
-        let arrs: Vec<Array1<Bit>> = detectors
-            .axis_iter(Axis(0))
-            .into_par_iter()
-            .map_with(
-                || self.clone(),
-                |decoder, row| decoder().decode_observables(row),
-            )
-            .collect();
-        stack(Axis(0), &arrs.iter().map(|a| a.view()).collect::<Vec<_>>()).unwrap()
+        let mut observables = self.observables_batch_zeros(detectors.nrows());
+        self.par_decode_observables_batch_into(detectors, observables.view_mut());
+        observables
+    }
+
+    /// Decode a batch in parallel, each worker writing the observables of
+    /// its chunk directly into the matching rows of `out`.
+    pub fn par_decode_observables_batch_into(
+        &mut self,
+        detectors: ArrayView2<Bit>,
+        out: ArrayViewMut2<Bit>,
+    ) {
+        self.par_into(detectors, None, out, |worker, chunk, out| {
+            worker.decode_observables_batch_into(chunk, out)
+        });
+    }
+
+    /// Decode a batch of byte-packed detectors into byte-packed observables,
+    /// see [`crate::packed`] for the layout. `syndrome_bias` is added to the
+    /// detectors as they are unpacked and `observables_bias` to the
+    /// observables as they are packed, a chunk of rows at a time, so only a
+    /// chunk is ever held unpacked.
+    pub fn decode_observables_bytes_batch(
+        &mut self,
+        detectors: ArrayView2<u8>,
+        syndrome_bias: Option<ArrayView1<Bit>>,
+        observables_bias: Option<ArrayView1<Bit>>,
+    ) -> Array2<u8> {
+        let mut observables = Array2::zeros((detectors.nrows(), num_bytes(self.num_observables())));
+        self.decode_observables_bytes_batch_into(
+            detectors,
+            syndrome_bias,
+            observables_bias,
+            observables.view_mut(),
+        );
+        observables
+    }
+
+    pub fn decode_observables_bytes_batch_into(
+        &mut self,
+        detectors: ArrayView2<u8>,
+        syndrome_bias: Option<ArrayView1<Bit>>,
+        observables_bias: Option<ArrayView1<Bit>>,
+        mut out: ArrayViewMut2<u8>,
+    ) {
+        let (mut bits, mut observables) = self.take_bytes_scratch();
+        let joined = self.decoder.join_split_batch(&Arc::default());
+        for (chunk, mut out_chunk) in detectors
+            .axis_chunks_iter(Axis(0), PAR_CHUNK_SIZE)
+            .zip(out.axis_chunks_iter_mut(Axis(0), PAR_CHUNK_SIZE))
+        {
+            let mut bits = bits.slice_mut(s![..chunk.nrows(), ..]);
+            let mut observables = observables.slice_mut(s![..chunk.nrows(), ..]);
+            for (bytes, bits) in chunk.axis_iter(Axis(0)).zip(bits.axis_iter_mut(Axis(0))) {
+                unpack_bytes_into(bytes, syndrome_bias, bits);
+            }
+            self.decode_observables_batch_into(bits.view(), observables.view_mut());
+            for (observables, bytes) in observables
+                .axis_iter(Axis(0))
+                .zip(out_chunk.axis_iter_mut(Axis(0)))
+            {
+                pack_bytes_into(observables, observables_bias, bytes);
+            }
+        }
+        if joined {
+            self.decoder.leave_split_batch();
+        }
+        self.bytes_scratch = (bits, observables);
+    }
+
+    pub fn par_decode_observables_bytes_batch(
+        &mut self,
+        detectors: ArrayView2<u8>,
+        syndrome_bias: Option<ArrayView1<Bit>>,
+        observables_bias: Option<ArrayView1<Bit>>,
+    ) -> Array2<u8> {
+        let mut observables = Array2::zeros((detectors.nrows(), num_bytes(self.num_observables())));
+        self.par_decode_observables_bytes_batch_into(
+            detectors,
+            syndrome_bias,
+            observables_bias,
+            observables.view_mut(),
+        );
+        observables
+    }
+
+    pub fn par_decode_observables_bytes_batch_into(
+        &mut self,
+        detectors: ArrayView2<u8>,
+        syndrome_bias: Option<ArrayView1<Bit>>,
+        observables_bias: Option<ArrayView1<Bit>>,
+        out: ArrayViewMut2<u8>,
+    ) {
+        // Shots are scheduled by the weight of their biased syndromes.
+        let bias = syndrome_bias.map(|bias| {
+            let mut bytes = Array1::zeros(detectors.ncols());
+            pack_bytes_into(bias, None, bytes.view_mut());
+            bytes
+        });
+        self.par_into(
+            detectors,
+            bias.as_ref().map(|bias| bias.view()),
+            out,
+            |worker, chunk, out| {
+                worker.decode_observables_bytes_batch_into(
+                    chunk,
+                    syndrome_bias,
+                    observables_bias,
+                    out,
+                )
+            },
+        );
+    }
+
+    /// Decode a stream of syndrome chunks in parallel, yielding the
+    /// observables of every chunk in order. The next chunk is taken from
+    /// `chunks` while the current one is decoded, so only two chunks are
+    /// held at a time however many shots the stream produces.
+    pub fn par_decode_observables_stream<I>(
+        &mut self,
+        chunks: I,
+    ) -> ObservableDecodeStream<'_, 'a, I::IntoIter>
+    where
+        I: IntoIterator<Item = Array2<Bit>>,
+        I::IntoIter: Send,
+    {
+        ObservableDecodeStream {
+            runner: self,
+            chunks: chunks.into_iter(),
+            next_chunk: None,
+        }
     }
 
     pub fn par_decode_observables_batch_progress_bar(
@@ -139,36 +1065,36 @@ impl<'a> ObservableDecoderRunner<'a> {
         detectors: ArrayView2<Bit>,
         leave_progress_bar_on_finish: bool,
     ) -> Array2<Bit> {
-        let finish_mode = match leave_progress_bar_on_finish {
-            true => ProgressFinish::AndLeave,
-            false => ProgressFinish::AndClear,
-        };
+        let mut observables = self.observables_batch_zeros(detectors.nrows());
+        self.par_decode_observables_batch_progress_bar_into(
+            detectors,
+            observables.view_mut(),
+            leave_progress_bar_on_finish,
+        );
+        observables
+    }
 
-        let arrs: Vec<Array1<Bit>> = detectors
-            .axis_iter(Axis(0))
-            .into_par_iter()
-            .progress_with_style(self.get_progress_bar_style())
-            .with_finish(finish_mode)
-            .map_with(
-                || self.clone(),
-                |decoder, row| decoder().decode_observables(row),
-            )
-            .collect();
-        stack(Axis(0), &arrs.iter().map(|a| a.view()).collect::<Vec<_>>()).unwrap()
+    pub fn par_decode_observables_batch_progress_bar_into(
+        &mut self,
+        detectors: ArrayView2<Bit>,
+        out: ArrayViewMut2<Bit>,
+        leave_progress_bar_on_finish: bool,
+    ) {
+        self.par_rows_into_progress_bar(
+            detectors,
+            out,
+            leave_progress_bar_on_finish,
+            |worker, row| worker.decode_observables(row),
+        );
     }
 
     pub fn par_decode_observables_detailed_batch(
         &mut self,
         detectors: ArrayView2<Bit>,
     ) -> Vec<ObservableDecodeResult> {
-        detectors
-            .axis_iter(Axis(0))
-            .into_par_iter()
-            .map_with(
-                || self.clone(),
-                |decoder, row| decoder().decode_observables_detailed(row),
-            )
-            .collect()
+        self.par_chunks_map(detectors, |worker, chunk| {
+            worker.decode_observables_detailed_batch(chunk)
+        })
     }
 
     /// Decode a batch displaying a progress bar
@@ -195,21 +1121,9 @@ impl<'a> ObservableDecoderRunner<'a> {
         detectors: ArrayView2<Bit>,
         leave_progress_bar_on_finish: bool,
     ) -> Vec<ObservableDecodeResult> {
-        let finish_mode = match leave_progress_bar_on_finish {
-            true => ProgressFinish::AndLeave,
-            false => ProgressFinish::AndClear,
-        };
-
-        detectors
-            .axis_iter(Axis(0))
-            .into_par_iter()
-            .progress_with_style(self.get_progress_bar_style())
-            .with_finish(finish_mode)
-            .map_with(
-                || self.clone(),
-                |decoder, row| decoder().decode_observables_detailed(row),
-            )
-            .collect()
+        self.par_rows_map_progress_bar(detectors, leave_progress_bar_on_finish, |worker, row| {
+            worker.decode_observables_detailed(row)
+        })
     }
 
     pub fn from_errors_decode_observables(&mut self, errors: ArrayView1<Bit>) -> Array1<Bit> {
@@ -240,6 +1154,8 @@ impl<'a> ObservableDecoderRunner<'a> {
             observables,
             converged: decode_result.success,
             iterations: decode_result.iterations,
+            budget_exhausted: decode_result.budget_exhausted,
+            from_lookup_table: matches!(decode_result.extra, BPExtraResult::LookupTable),
             true_decoding: Some(TrueDecodingResults {
                 error_detected,
                 error_mismatch_detected,
@@ -256,26 +1172,37 @@ impl<'a> ObservableDecoderRunner<'a> {
     }
 
     pub fn from_errors_decode_observables_batch(&mut self, errors: ArrayView2<Bit>) -> Array2<Bit> {
-        let arrs: Vec<Array1<Bit>> = errors
-            .axis_iter(Axis(0))
-            .map(|row| self.from_errors_decode_observables(row))
-            .collect();
-        stack(Axis(0), &arrs.iter().map(|a| a.view()).collect::<Vec<_>>()).unwrap()
+        let mut observables = self.observables_batch_zeros(errors.nrows());
+        self.from_errors_decode_observables_batch_into(errors, observables.view_mut());
+        observables
+    }
+
+    pub fn from_errors_decode_observables_batch_into(
+        &mut self,
+        errors: ArrayView2<Bit>,
+        out: ArrayViewMut2<Bit>,
+    ) {
+        let detectors = self.get_detectors_batch(errors);
+        self.decode_observables_batch_into(detectors.view(), out)
     }
 
     pub fn par_from_errors_decode_observables_batch(
         &mut self,
         errors: ArrayView2<Bit>,
     ) -> Array2<Bit> {
-        let arrs: Vec<Array1<Bit>> = errors
-            .axis_iter(Axis(0))
-            .into_par_iter()
-            .map_with(
-                || self.clone(),
-                |decoder, row| decoder().from_errors_decode_observables(row),
-            )
-            .collect();
-        stack(Axis(0), &arrs.iter().map(|a| a.view()).collect::<Vec<_>>()).unwrap()
+        let mut observables = self.observables_batch_zeros(errors.nrows());
+        self.par_from_errors_decode_observables_batch_into(errors, observables.view_mut());
+        observables
+    }
+
+    pub fn par_from_errors_decode_observables_batch_into(
+        &mut self,
+        errors: ArrayView2<Bit>,
+        out: ArrayViewMut2<Bit>,
+    ) {
+        self.par_chunks_into(errors, out, |worker, chunk, out| {
+            worker.from_errors_decode_observables_batch_into(chunk, out)
+        });
     }
 
     pub fn from_errors_decode_observables_batch_progress_bar(
@@ -283,18 +1210,35 @@ impl<'a> ObservableDecoderRunner<'a> {
         errors: ArrayView2<Bit>,
         leave_progress_bar_on_finish: bool,
     ) -> Array2<Bit> {
+        let mut observables = self.observables_batch_zeros(errors.nrows());
+        self.from_errors_decode_observables_batch_progress_bar_into(
+            errors,
+            observables.view_mut(),
+            leave_progress_bar_on_finish,
+        );
+        observables
+    }
+
+    pub fn from_errors_decode_observables_batch_progress_bar_into(
+        &mut self,
+        errors: ArrayView2<Bit>,
+        mut out: ArrayViewMut2<Bit>,
+        leave_progress_bar_on_finish: bool,
+    ) {
         let finish_mode = match leave_progress_bar_on_finish {
             true => ProgressFinish::AndLeave,
             false => ProgressFinish::AndClear,
         };
 
-        let arrs: Vec<Array1<Bit>> = errors
+        let style = self.get_progress_bar_style();
+        for (row, mut observables) in errors
             .axis_iter(Axis(0))
-            .progress_with_style(self.get_progress_bar_style())
+            .zip(out.axis_iter_mut(Axis(0)))
+            .progress_with_style(style)
             .with_finish(finish_mode)
-            .map(|row| self.from_errors_decode_observables(row))
-            .collect();
-        stack(Axis(0), &arrs.iter().map(|a| a.view()).collect::<Vec<_>>()).unwrap()
+        {
+            observables.assign(&self.from_errors_decode_observables(row));
+        }
     }
 
     pub fn par_from_errors_decode_observables_batch_progress_bar(
@@ -302,22 +1246,27 @@ impl<'a> ObservableDecoderRunner<'a> {
         errors: ArrayView2<Bit>,
         leave_progress_bar_on_finish: bool,
     ) -> Array2<Bit> {
-        let finish_mode = match leave_progress_bar_on_finish {
-            true => ProgressFinish::AndLeave,
-            false => ProgressFinish::AndClear,
-        };
+        let mut observables = self.observables_batch_zeros(errors.nrows());
+        self.par_from_errors_decode_observables_batch_progress_bar_into(
+            errors,
+            observables.view_mut(),
+            leave_progress_bar_on_finish,
+        );
+        observables
+    }
 
-        let arrs: Vec<Array1<Bit>> = errors
-            .axis_iter(Axis(0))
-            .into_par_iter()
-            .progress_with_style(self.get_progress_bar_style())
-            .with_finish(finish_mode)
-            .map_with(
-                || self.clone(),
-                |decoder, row| decoder().from_errors_decode_observables(row),
-            )
-            .collect();
-        stack(Axis(0), &arrs.iter().map(|a| a.view()).collect::<Vec<_>>()).unwrap()
+    pub fn par_from_errors_decode_observables_batch_progress_bar_into(
+        &mut self,
+        errors: ArrayView2<Bit>,
+        out: ArrayViewMut2<Bit>,
+        leave_progress_bar_on_finish: bool,
+    ) {
+        self.par_rows_into_progress_bar(
+            errors,
+            out,
+            leave_progress_bar_on_finish,
+            |worker, row| worker.from_errors_decode_observables(row),
+        );
     }
 
     pub fn from_errors_decode_observables_detailed_batch(
@@ -334,14 +1283,9 @@ impl<'a> ObservableDecoderRunner<'a> {
         &mut self,
         errors: ArrayView2<Bit>,
     ) -> Vec<ObservableDecodeResult> {
-        errors
-            .axis_iter(Axis(0))
-            .into_par_iter()
-            .map_with(
-                || self.clone(),
-                |decoder, row| decoder().from_errors_decode_observables_detailed(row),
-            )
-            .collect()
+        self.par_chunks_map(errors, |worker, chunk| {
+            worker.from_errors_decode_observables_detailed_batch(chunk)
+        })
     }
 
     /// Decode a batch displaying a progress bar
@@ -368,21 +1312,9 @@ impl<'a> ObservableDecoderRunner<'a> {
         errors: ArrayView2<Bit>,
         leave_progress_bar_on_finish: bool,
     ) -> Vec<ObservableDecodeResult> {
-        let finish_mode = match leave_progress_bar_on_finish {
-            true => ProgressFinish::AndLeave,
-            false => ProgressFinish::AndClear,
-        };
-
-        errors
-            .axis_iter(Axis(0))
-            .into_par_iter()
-            .progress_with_style(self.get_progress_bar_style())
-            .with_finish(finish_mode)
-            .map_with(
-                || self.clone(),
-                |decoder, row| decoder().from_errors_decode_observables_detailed(row),
-            )
-            .collect()
+        self.par_rows_map_progress_bar(errors, leave_progress_bar_on_finish, |worker, row| {
+            worker.from_errors_decode_observables_detailed(row)
+        })
     }
 
     fn get_progress_bar_style(&self) -> ProgressStyle {
@@ -390,7 +1322,54 @@ impl<'a> ObservableDecoderRunner<'a> {
     }
 }
 
-impl DecoderRunner for ObservableDecoderRunner<'_> {}
+// The parallel methods run on the runner's thread pool with pooled workers.
+impl DecoderRunner for ObservableDecoderRunner<'_> {
+    fn par_decode_batch_into(&mut self, detectors: ArrayView2<Bit>, out: ArrayViewMut2<Bit>) {
+        self.par_into(detectors, None, out, |worker, chunk, out| {
+            worker.decode_batch_into(chunk, out)
+        });
+    }
+
+    fn par_decode_packed_batch_into(
+        &mut self,
+        detectors: ArrayView2<Word>,
+        out: ArrayViewMut2<Word>,
+    ) {
+        self.par_into(detectors, None, out, |worker, chunk, out| {
+            worker.decode_packed_batch_into(chunk, out)
+        });
+    }
+
+    fn par_decode_detailed_batch(&mut self, detectors: ArrayView2<Bit>) -> Vec<DecodeResult> {
+        self.par_chunks_map(detectors, |worker, chunk| {
+            worker.decode_detailed_batch(chunk)
+        })
+    }
+
+    fn par_decode_batch_progress_bar_into(
+        &mut self,
+        detectors: ArrayView2<Bit>,
+        out: ArrayViewMut2<Bit>,
+        leave_progress_bar_on_finish: bool,
+    ) {
+        self.par_rows_into_progress_bar(
+            detectors,
+            out,
+            leave_progress_bar_on_finish,
+            |worker, row| worker.decode(row),
+        );
+    }
+
+    fn par_decode_detailed_batch_progress_bar(
+        &mut self,
+        detectors: ArrayView2<Bit>,
+        leave_progress_bar_on_finish: bool,
+    ) -> Vec<DecodeResult> {
+        self.par_rows_map_progress_bar(detectors, leave_progress_bar_on_finish, |worker, row| {
+            worker.decode_detailed(row)
+        })
+    }
+}
 
 impl Decoder for ObservableDecoderRunner<'_> {
     fn check_matrix(&self) -> Arc<SparseBitMatrix> {
@@ -400,17 +1379,147 @@ impl Decoder for ObservableDecoderRunner<'_> {
         self.get_decoder_mut().log_prior_ratios()
     }
     fn decode_detailed(&mut self, detectors: ArrayView1<Bit>) -> DecodeResult {
-        self.get_decoder_mut().decode_detailed(detectors)
+        if let Some(result) = self
+            .lookup_table
+            .as_ref()
+            .and_then(|lookup_table| lookup_table.decode_detailed(detectors))
+        {
+            return result;
+        }
+        self.decode_detailed_inner(detectors)
+    }
+    fn decode(&mut self, detectors: ArrayView1<Bit>) -> Array1<Bit> {
+        let mut decoding = Array1::zeros(self.check_matrix().cols());
+        if let Some(lookup_table) = &self.lookup_table {
+            if lookup_table.decode_into(detectors, decoding.view_mut()) {
+                return decoding;
+            }
+        }
+        let Some(cache) = self.syndrome_cache.clone() else {
+            return self.decode_detailed_inner(detectors).decoding;
+        };
+        let key = cache.key(detectors);
+        if let Some(support) = key.as_deref().and_then(|key| cache.get(key)) {
+            write_decoding(&support, decoding.view_mut());
+            return decoding;
+        }
+        let result = self.decode_detailed_inner(detectors);
+        if let Some(key) = key.filter(|_| is_cacheable(&result)) {
+            cache.insert(&key, result.decoding.view());
+        }
+        result.decoding
+    }
+    fn decode_batch_into(&mut self, detectors: ArrayView2<Bit>, mut out: ArrayViewMut2<Bit>) {
+        let Some(lookup_table) = self.lookup_table.clone() else {
+            return self.decode_batch_memoized_into(detectors, out);
+        };
+        let mut misses = Vec::new();
+        for (row, (syndrome, decoding)) in detectors
+            .axis_iter(Axis(0))
+            .zip(out.axis_iter_mut(Axis(0)))
+            .enumerate()
+        {
+            if !lookup_table.decode_into(syndrome, decoding) {
+                misses.push(row);
+            }
+        }
+        if misses.len() == detectors.nrows() {
+            return self.decode_batch_memoized_into(detectors, out);
+        }
+        if misses.is_empty() {
+            return;
+        }
+        let mut decodings = Array2::zeros((misses.len(), out.ncols()));
+        self.decode_batch_memoized_into(
+            detectors.select(Axis(0), &misses).view(),
+            decodings.view_mut(),
+        );
+        for (row, decoding) in misses.iter().zip(decodings.axis_iter(Axis(0))) {
+            out.row_mut(*row).assign(&decoding);
+        }
+    }
+    fn decode_detailed_batch(&mut self, detectors: ArrayView2<Bit>) -> Vec<DecodeResult> {
+        let Some(lookup_table) = self.lookup_table.clone() else {
+            return self.decode_detailed_batch_inner(detectors);
+        };
+        let mut results: Vec<Option<DecodeResult>> = detectors
+            .axis_iter(Axis(0))
+            .map(|syndrome| lookup_table.decode_detailed(syndrome))
+            .collect();
+        let misses: Vec<usize> = (0..results.len())
+            .filter(|row| results[*row].is_none())
+            .collect();
+        if !misses.is_empty() {
+            let decoded =
+                self.decode_detailed_batch_inner(detectors.select(Axis(0), &misses).view());
+            for (row, result) in misses.into_iter().zip(decoded) {
+                results[row] = Some(result);
+            }
+        }
+        results.into_iter().map(Option::unwrap).collect()
     }
     fn get_decoding_quality(&mut self, errors: ArrayView1<u8>) -> f64 {
         self.get_decoder_mut().get_decoding_quality(errors)
     }
+    fn get_detectors(&self, errors: ArrayView1<Bit>) -> Array1<Bit> {
+        self.detector_columns.mul_bits_unpacked(errors)
+    }
+    fn get_detectors_batch(&self, errors: ArrayView2<Bit>) -> Array2<Bit> {
+        self.detector_columns.mul_bits_batch_unpacked(errors)
+    }
+    fn get_detectors_packed_batch(&self, errors: ArrayView2<Word>) -> Array2<Word> {
+        self.detector_columns.mul_packed_batch(errors)
+    }
+    fn restricted_decoder(
+        &self,
+        check_matrix: Arc<SparseBitMatrix>,
+        variables: &[usize],
+    ) -> Option<Box<dyn Decoder + Send>> {
+        self.get_decoder()
+            .restricted_decoder(check_matrix, variables)
+    }
+    fn flush_telemetry(&mut self) {
+        self.get_decoder_mut().flush_telemetry();
+    }
+    fn join_split_batch(&mut self, batch: &Arc<SplitBatch>) -> bool {
+        self.get_decoder_mut().join_split_batch(batch)
+    }
+    fn leave_split_batch(&mut self) {
+        self.get_decoder_mut().leave_split_batch();
+    }
 }
 
 impl ObservableDecoder for ObservableDecoderRunner<'_> {
     fn observable_error_matrix(&self) -> Arc<SparseBitMatrix> {
         self.observable_error_matrix.clone()
     }
+    fn compute_observables(&self, errors: ArrayView1<Bit>) -> Array1<Bit> {
+        self.observable_columns.mul_bits_unpacked(errors)
+    }
+}
+
+/// Iterator over the observables of a stream of syndrome chunks, see
+/// [`ObservableDecoderRunner::par_decode_observables_stream`].
+pub struct ObservableDecodeStream<'r, 'a, I> {
+    runner: &'r mut ObservableDecoderRunner<'a>,
+    chunks: I,
+    next_chunk: Option<Array2<Bit>>,
+}
+
+impl<I: Iterator<Item = Array2<Bit>> + Send> Iterator for ObservableDecodeStream<'_, '_, I> {
+    type Item = Array2<Bit>;
+
+    fn next(&mut self) -> Option<Array2<Bit>> {
+        let chunk = self.next_chunk.take().or_else(|| self.chunks.next())?;
+        let runner = &mut *self.runner;
+        let chunks = &mut self.chunks;
+        let (next_chunk, observables) = rayon::join(
+            || chunks.next(),
+            || runner.par_decode_observables_batch(chunk.view()),
+        );
+        self.next_chunk = next_chunk;
+        Some(observables)
+    }
 }
 
 #[derive(Serialize, Deserialize, Debug)]
@@ -418,6 +1527,9 @@ pub struct ObservableDecodeResult {
     pub observables: Array1<Bit>,
     pub converged: bool,
     pub iterations: usize,
+    pub budget_exhausted: bool,
+    /// The shot was answered by the lookup table of the runner.
+    pub from_lookup_table: bool,
     pub true_decoding: Option<TrueDecodingResults>,
     pub physical_decode_result: Option<DecodeResult>,
 }
@@ -439,17 +1551,23 @@ mod tests {
 
     use crate::bp::min_sum::{MinSumBPDecoder, MinSumDecoderConfig};
     use crate::dem::DetectorErrorModel;
+    use crate::lookup_table::LookupTableStats;
+    use crate::packed::pack_bits_batch;
     use crate::utilities::test::get_test_data_path;
     use ndarray::Array2;
     use ndarray_npy::read_npy;
 
-    #[test]
-    fn min_sum_decode_144_12_12() {
-        let resources = get_test_data_path();
-        let code_144_12_12 =
-            DetectorErrorModel::load(resources.join("144_12_12")).expect("Unable to load the code");
-        let errors_144_12_12: Array2<Bit> =
-            read_npy(resources.join("144_12_12_errors.npy")).expect("Unable to open file");
+    /// Read the `errors` or `detectors` samples of the 144_12_12 code.
+    fn read_144_12_12(samples: &str) -> Array2<Bit> {
+        read_npy(get_test_data_path().join(format!("144_12_12_{samples}.npy")))
+            .expect("Unable to open file")
+    }
+
+    /// A runner of a min-sum decoder of the 144_12_12 code, including the
+    /// inner decode results in detailed results if `include_decode_result`.
+    fn min_sum_runner_144_12_12(include_decode_result: bool) -> ObservableDecoderRunner<'static> {
+        let code_144_12_12 = DetectorErrorModel::load(get_test_data_path().join("144_12_12"))
+            .expect("Unable to load the code");
         let bp_config_144_12_12 = MinSumDecoderConfig {
             error_priors: code_144_12_12.error_priors,
             alpha: Some(0.),
@@ -462,8 +1580,13 @@ mod tests {
             Box::new(MinSumBPDecoder::new(check_matrix, bp_config));
 
         let obs_matrix = Arc::new(code_144_12_12.observable_error_matrix);
-        let mut observable_decoder =
-            ObservableDecoderRunner::new(decoder_144_12_12, obs_matrix, true);
+        ObservableDecoderRunner::new(decoder_144_12_12, obs_matrix, include_decode_result)
+    }
+
+    #[test]
+    fn min_sum_decode_144_12_12() {
+        let errors_144_12_12 = read_144_12_12("errors");
+        let mut observable_decoder = min_sum_runner_144_12_12(true);
 
         let num_errors = 100;
         let errors_slice = errors_144_12_12.slice(s![..num_errors, ..]);
@@ -515,4 +1638,430 @@ mod tests {
 
         assert_eq!(results2.row(0), direct_results);
     }
+
+    #[test]
+    fn min_sum_decode_144_12_12_components() {
+        let errors_144_12_12 = read_144_12_12("errors");
+        let mut observable_decoder = min_sum_runner_144_12_12(true);
+        observable_decoder.set_component_decomposition(Some(Default::default()));
+
+        let num_errors = 100;
+        let errors_slice = errors_144_12_12.slice(s![..num_errors, ..]);
+        let results =
+            observable_decoder.par_from_errors_decode_observables_detailed_batch(errors_slice);
+
+        assert!(
+            results
+                .iter()
+                .map(|x| x.physical_decode_result.as_ref().unwrap().success as usize)
+                .sum::<usize>() as f64
+                >= (errors_slice.shape()[0] as f64) * 0.93
+        );
+
+        let detectors = observable_decoder.get_detectors_batch(errors_slice);
+        let decodings = observable_decoder.decode_batch(detectors.view());
+        for (result, decoding) in results.iter().zip(decodings.axis_iter(Axis(0))) {
+            assert_eq!(
+                result.physical_decode_result.as_ref().unwrap().decoding,
+                decoding
+            );
+        }
+    }
+
+    #[test]
+    fn min_sum_decode_144_12_12_packed() {
+        let errors_144_12_12 = read_144_12_12("errors");
+        let mut observable_decoder = min_sum_runner_144_12_12(false);
+
+        let num_errors = 100;
+        let errors_slice = errors_144_12_12.slice(s![..num_errors, ..]);
+        let packed_errors = pack_bits_batch(errors_slice);
+
+        let detectors = observable_decoder.get_detectors_batch(errors_slice);
+        let packed_detectors = observable_decoder.get_detectors_packed_batch(packed_errors.view());
+        assert_eq!(packed_detectors, pack_bits_batch(detectors.view()));
+
+        let observables = observable_decoder.decode_observables_batch(detectors.view());
+        let packed_observables =
+            observable_decoder.par_decode_observables_packed_batch(packed_detectors.view());
+        assert_eq!(packed_observables, pack_bits_batch(observables.view()));
+        // The batch spans several chunks of the decoding buffer.
+        assert_eq!(
+            observable_decoder.decode_observables_packed_batch(packed_detectors.view()),
+            packed_observables
+        );
+
+        let decodings = observable_decoder.decode_batch(detectors.view());
+        assert_eq!(
+            observable_decoder.compute_observables_batch(decodings.view()),
+            observables
+        );
+        assert_eq!(
+            observable_decoder.decode_packed_batch(packed_detectors.view()),
+            pack_bits_batch(decodings.view())
+        );
+        assert_eq!(
+            observable_decoder
+                .compute_observables_packed_batch(pack_bits_batch(decodings.view()).view()),
+            packed_observables
+        );
+    }
+
+    #[test]
+    fn evaluate_144_12_12_batch() {
+        let errors_144_12_12 = read_144_12_12("errors");
+        let observable_decoder = min_sum_runner_144_12_12(false);
+        let check_matrix = observable_decoder.check_matrix();
+        let obs_matrix = observable_decoder.observable_error_matrix();
+
+        let errors = errors_144_12_12.slice(s![..100, ..]);
+        let mut expected_detectors = Array2::zeros((errors.nrows(), check_matrix.rows()));
+        let mut expected_observables = Array2::zeros((errors.nrows(), obs_matrix.rows()));
+        for (row, errors_row) in errors.axis_iter(Axis(0)).enumerate() {
+            expected_detectors
+                .row_mut(row)
+                .assign(&check_matrix.mul_mod2(&errors_row.to_owned()));
+            expected_observables
+                .row_mut(row)
+                .assign(&obs_matrix.mul_mod2(&errors_row.to_owned()));
+        }
+
+        assert_eq!(
+            observable_decoder.get_detectors_batch(errors),
+            expected_detectors
+        );
+        assert_eq!(
+            observable_decoder.par_get_detectors_batch(errors),
+            expected_detectors
+        );
+        assert_eq!(
+            observable_decoder.compute_observables_batch(errors),
+            expected_observables
+        );
+        assert_eq!(
+            observable_decoder.par_compute_observables_batch(errors),
+            expected_observables
+        );
+        assert_eq!(
+            observable_decoder.compute_observables(errors.row(0)),
+            expected_observables.row(0)
+        );
+
+        let packed_errors = pack_bits_batch(errors);
+        let mut packed_detectors = Array2::ones((errors.nrows(), num_words(check_matrix.rows())));
+        observable_decoder
+            .par_get_detectors_packed_batch_into(packed_errors.view(), packed_detectors.view_mut());
+        assert_eq!(packed_detectors, pack_bits_batch(expected_detectors.view()));
+        let mut packed_observables = Array2::ones((errors.nrows(), num_words(obs_matrix.rows())));
+        observable_decoder.par_compute_observables_packed_batch_into(
+            packed_errors.view(),
+            packed_observables.view_mut(),
+        );
+        assert_eq!(
+            packed_observables,
+            pack_bits_batch(expected_observables.view())
+        );
+    }
+
+    #[test]
+    fn min_sum_decode_144_12_12_into() {
+        let errors_144_12_12 = read_144_12_12("errors");
+        let mut observable_decoder = min_sum_runner_144_12_12(false);
+
+        let num_errors = 100;
+        let errors_slice = errors_144_12_12.slice(s![..num_errors, ..]);
+        let detectors = observable_decoder.get_detectors_batch(errors_slice);
+        let decodings = observable_decoder.decode_batch(detectors.view());
+        let observables = observable_decoder.decode_observables_batch(detectors.view());
+
+        // Outputs are overwritten in place, including through strided views.
+        let mut out = Array2::from_elem((num_errors, 2 * decodings.ncols()), 1);
+        observable_decoder.par_decode_batch_into(detectors.view(), out.slice_mut(s![.., ..;2]));
+        assert_eq!(out.slice(s![.., ..;2]), decodings);
+        assert!(out.slice(s![.., 1..;2]).iter().all(|bit| *bit == 1));
+
+        let mut out = Array2::from_elem(observables.raw_dim(), 1);
+        observable_decoder.par_decode_observables_batch_into(detectors.view(), out.view_mut());
+        assert_eq!(out, observables);
+
+        out.fill(1);
+        observable_decoder.from_errors_decode_observables_batch_into(errors_slice, out.view_mut());
+        assert_eq!(out, observables);
+
+        let mut packed_out = Array2::from_elem((num_errors, 1), Word::MAX);
+        observable_decoder.par_decode_observables_packed_batch_into(
+            pack_bits_batch(detectors.view()).view(),
+            packed_out.view_mut(),
+        );
+        assert_eq!(packed_out, pack_bits_batch(observables.view()));
+    }
+
+    #[test]
+    fn min_sum_decode_144_12_12_worker_pool() {
+        let detectors_144_12_12 = read_144_12_12("detectors");
+        let mut observable_decoder = min_sum_runner_144_12_12(false);
+        observable_decoder.set_num_threads(Some(2)).unwrap();
+        assert_eq!(observable_decoder.num_threads(), 2);
+
+        let detectors = detectors_144_12_12.view();
+        let observables = observable_decoder.decode_observables_batch(detectors);
+
+        // Workers are cloned at most once per chunk and kept between calls.
+        assert!(observable_decoder.workers.is_empty());
+        for _ in 0..3 {
+            assert_eq!(
+                observable_decoder.par_decode_observables_batch(detectors),
+                observables
+            );
+            let num_workers = observable_decoder.workers.len();
+            assert!(num_workers > 0);
+            assert!(num_workers <= detectors.nrows().div_ceil(PAR_CHUNK_SIZE));
+        }
+        assert!(observable_decoder.clone().workers.is_empty());
+
+        observable_decoder.set_component_decomposition(None);
+        assert!(observable_decoder.workers.is_empty());
+    }
+
+    #[test]
+    fn min_sum_decode_144_12_12_shot_scheduling() {
+        let detectors_144_12_12 = read_144_12_12("detectors");
+        let mut observable_decoder = min_sum_runner_144_12_12(false);
+
+        // Interleave trivial shots with shots of varying weight.
+        let mut detectors = Array2::zeros((300, detectors_144_12_12.ncols()));
+        for (row, mut detectors_row) in detectors.axis_iter_mut(Axis(0)).enumerate() {
+            if row % 3 != 0 {
+                detectors_row.assign(&detectors_144_12_12.row(row % detectors_144_12_12.nrows()));
+            }
+        }
+        let decodings = observable_decoder.decode_batch(detectors.view());
+        let observables = observable_decoder.decode_observables_batch(detectors.view());
+        let packed_detectors = pack_bits_batch(detectors.view());
+
+        for shot_scheduling in [true, false] {
+            observable_decoder.set_shot_scheduling(shot_scheduling);
+            assert_eq!(
+                observable_decoder.par_decode_batch(detectors.view()),
+                decodings
+            );
+            assert_eq!(
+                observable_decoder.par_decode_observables_batch(detectors.view()),
+                observables
+            );
+            assert_eq!(
+                observable_decoder.par_decode_observables_packed_batch(packed_detectors.view()),
+                pack_bits_batch(observables.view())
+            );
+        }
+    }
+
+    #[test]
+    fn min_sum_decode_144_12_12_syndrome_cache() {
+        let detectors_144_12_12 = read_144_12_12("detectors");
+        let mut observable_decoder = min_sum_runner_144_12_12(false);
+
+        // Every syndrome appears twice in the batch.
+        let nrows = detectors_144_12_12.nrows();
+        let detectors =
+            Array2::from_shape_fn((2 * nrows, detectors_144_12_12.ncols()), |(row, col)| {
+                detectors_144_12_12[[row % nrows, col]]
+            });
+        let decodings = observable_decoder.decode_batch(detectors.view());
+        let observables = observable_decoder.decode_observables_batch(detectors.view());
+
+        observable_decoder.set_syndrome_cache(Some(SyndromeCacheConfig {
+            capacity: 1024,
+            max_weight: usize::MAX,
+        }));
+        assert_eq!(observable_decoder.decode_batch(detectors.view()), decodings);
+        let stats = observable_decoder.syndrome_cache().unwrap().stats();
+        assert_eq!(stats.hits, 0);
+        assert_eq!(stats.misses, 2 * nrows as u64);
+        assert!(stats.len <= nrows);
+
+        // Only the syndromes whose decoding converged were cached.
+        let converged = detectors
+            .axis_iter(Axis(0))
+            .zip(decodings.axis_iter(Axis(0)))
+            .filter(|(syndrome, decoding)| observable_decoder.get_detectors(*decoding) == syndrome)
+            .count();
+        assert!(converged > 0);
+        assert!(stats.len <= converged);
+
+        // Repeated syndromes are now answered from the cache, also by the
+        // parallel workers that share it, while the syndromes that did not
+        // converge are decoded again.
+        assert_eq!(observable_decoder.decode_batch(detectors.view()), decodings);
+        assert_eq!(
+            observable_decoder.par_decode_observables_batch(detectors.view()),
+            observables
+        );
+        for (row, decoding) in decodings.axis_iter(Axis(0)).enumerate() {
+            assert_eq!(observable_decoder.decode(detectors.row(row)), decoding);
+        }
+        let stats = observable_decoder.syndrome_cache().unwrap().stats();
+        assert!(stats.hits >= 2 * converged as u64);
+        assert!(stats.misses >= (2 * nrows + 2 * (2 * nrows - converged)) as u64);
+        assert_eq!(stats.evictions, 0);
+
+        // Syndromes heavier than the maximum weight bypass the cache.
+        observable_decoder.set_syndrome_cache(Some(SyndromeCacheConfig {
+            capacity: 1024,
+            max_weight: 0,
+        }));
+        assert_eq!(observable_decoder.decode_batch(detectors.view()), decodings);
+        let stats = observable_decoder.syndrome_cache().unwrap().stats();
+        let trivial = detectors
+            .axis_iter(Axis(0))
+            .filter(|row| row.iter().all(|bit| *bit == 0))
+            .count();
+        assert_eq!(stats.hits + stats.misses, trivial as u64);
+        assert!(stats.len <= 1);
+    }
+
+    #[test]
+    fn min_sum_decode_144_12_12_lookup_table() {
+        let mut observable_decoder = min_sum_runner_144_12_12(false);
+        observable_decoder.set_lookup_table(Some(LookupTableConfig {
+            max_errors: 2,
+            max_syndrome_weight: usize::MAX,
+        }));
+
+        // No error, single errors and pairs of errors.
+        let num_variables = observable_decoder.check_matrix().cols();
+        let mut errors = Array2::zeros((41, num_variables));
+        for shot in 0..20 {
+            errors[[1 + shot, 7 * shot]] = 1;
+            errors[[21 + shot, 7 * shot]] = 1;
+            errors[[21 + shot, num_variables - 1 - 11 * shot]] = 1;
+        }
+        let detectors = observable_decoder.get_detectors_batch(errors.view());
+
+        let results = observable_decoder.decode_detailed_batch(detectors.view());
+        for ((result, errors_row), detectors_row) in results
+            .iter()
+            .zip(errors.axis_iter(Axis(0)))
+            .zip(detectors.axis_iter(Axis(0)))
+        {
+            assert!(matches!(result.extra, BPExtraResult::LookupTable));
+            assert!(result.success);
+            assert_eq!(
+                observable_decoder.get_detectors(result.decoding.view()),
+                detectors_row
+            );
+            assert!(
+                result.decoding_quality
+                    <= observable_decoder.get_decoding_quality(errors_row) + 1e-9
+            );
+        }
+        let decodings = observable_decoder.decode_batch(detectors.view());
+        for (result, decoding) in results.iter().zip(decodings.axis_iter(Axis(0))) {
+            assert_eq!(result.decoding, decoding);
+        }
+        assert_eq!(
+            observable_decoder.lookup_table().unwrap().stats(),
+            LookupTableStats {
+                hits: 2 * 41,
+                misses: 0
+            }
+        );
+
+        // Heavier syndromes are decoded by the inner decoder.
+        let detectors_144_12_12 = read_144_12_12("detectors");
+        let lookup_results = observable_decoder.decode_detailed_batch(detectors_144_12_12.view());
+        observable_decoder.set_lookup_table(None);
+        let results = observable_decoder.decode_detailed_batch(detectors_144_12_12.view());
+        for (lookup_result, result) in lookup_results.iter().zip(results.iter()) {
+            if !matches!(lookup_result.extra, BPExtraResult::LookupTable) {
+                assert_eq!(lookup_result.decoding, result.decoding);
+            }
+        }
+    }
+
+    #[test]
+    fn min_sum_decode_144_12_12_stream() {
+        let detectors_144_12_12 = read_144_12_12("detectors");
+        let mut observable_decoder = min_sum_runner_144_12_12(false);
+
+        let observables = observable_decoder.decode_observables_batch(detectors_144_12_12.view());
+        let chunks: Vec<Array2<Bit>> = detectors_144_12_12
+            .axis_chunks_iter(Axis(0), 30)
+            .map(|chunk| chunk.to_owned())
+            .collect();
+        let observable_chunks: Vec<Array2<Bit>> = observable_decoder
+            .par_decode_observables_stream(chunks)
+            .collect();
+        assert_eq!(observable_chunks.len(), 4);
+        let observable_views: Vec<_> = observable_chunks.iter().map(|chunk| chunk.view()).collect();
+        assert_eq!(
+            ndarray::concatenate(Axis(0), &observable_views).unwrap(),
+            observables
+        );
+        assert_eq!(
+            observable_decoder
+                .par_decode_observables_stream(Vec::new())
+                .count(),
+            0
+        );
+    }
+
+    #[test]
+    fn min_sum_decode_144_12_12_bytes() {
+        let detectors_144_12_12 = read_144_12_12("detectors");
+        let mut observable_decoder = min_sum_runner_144_12_12(false);
+
+        let num_detectors = detectors_144_12_12.ncols();
+        let num_observables = observable_decoder.num_observables();
+        let syndrome_bias =
+            Array1::from_shape_fn(num_detectors, |detector| (detector % 5 == 0) as Bit);
+        let observables_bias =
+            Array1::from_shape_fn(num_observables, |observable| (observable % 2) as Bit);
+
+        // Add a shot without detection events, whose bytes are the bias, and
+        // one with the bias as its detection events, whose bytes are empty.
+        // Shot scheduling must tell them apart by their biased weight.
+        let detectors_144_12_12 = ndarray::concatenate![
+            Axis(0),
+            detectors_144_12_12,
+            Array2::<Bit>::zeros((1, num_detectors)),
+            syndrome_bias.view().insert_axis(Axis(0))
+        ];
+
+        // The bytes hold the biased detectors, as with decided errors pruned.
+        let unbiased = &detectors_144_12_12 ^ &syndrome_bias;
+        let mut bytes = Array2::zeros((unbiased.nrows(), num_bytes(num_detectors)));
+        for (bits, bytes) in unbiased
+            .axis_iter(Axis(0))
+            .zip(bytes.axis_iter_mut(Axis(0)))
+        {
+            pack_bytes_into(bits, None, bytes);
+        }
+        let observables = observable_decoder.decode_observables_batch(detectors_144_12_12.view())
+            ^ &observables_bias;
+        let mut expected = Array2::zeros((observables.nrows(), num_bytes(num_observables)));
+        for (bits, bytes) in observables
+            .axis_iter(Axis(0))
+            .zip(expected.axis_iter_mut(Axis(0)))
+        {
+            pack_bytes_into(bits, None, bytes);
+        }
+
+        assert_eq!(
+            observable_decoder.decode_observables_bytes_batch(
+                bytes.view(),
+                Some(syndrome_bias.view()),
+                Some(observables_bias.view())
+            ),
+            expected
+        );
+        assert_eq!(
+            observable_decoder.par_decode_observables_bytes_batch(
+                bytes.view(),
+                Some(syndrome_bias.view()),
+                Some(observables_bias.view())
+            ),
+            expected
+        );
+    }
 }
@@ -0,0 +1,369 @@
+// (C) Copyright IBM 2025
+//
+// This code is licensed under the Apache License, Version 2.0. You may
+// obtain a copy of this license in the LICENSE.txt file in the root directory
+// of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+//
+// Any modifications or derivative works of this code must retain this
+// copyright notice, and modified files need to carry a notice indicating
+// that they have been altered from the originals.
+
+//! Bit-packed GF(2) vectors.
+//!
+//! Detectors, decodings and observables are packed 64 to a word, with bit
+//! `i` of a vector stored in bit `i % 64` of word `i / 64`. Unused bits of
+//! the last word are zero. On little-endian machines this is the layout of
+//! `np.packbits(bits, axis=-1, bitorder="little")` padded to a multiple of
+//! eight bytes and viewed as `np.uint64`.
+//!
+//! Vectors may also be packed eight to a byte in the same bit order, which
+//! is stim's `b8` format and the layout of sinter's bit-packed shot data.
+
+use crate::decoder::{Bit, SparseBitMatrix};
+use ndarray::{Array1, Array2, ArrayView1, ArrayView2, ArrayViewMut1, ArrayViewMut2, Axis};
+
+pub type Word = u64;
+
+/// Number of bits stored in a [`Word`].
+pub const WORD_BITS: usize = Word::BITS as usize;
+
+/// Number of words needed to pack `num_bits` bits.
+pub fn num_words(num_bits: usize) -> usize {
+    num_bits.div_ceil(WORD_BITS)
+}
+
+/// Pack a vector of bits into words.
+pub fn pack_bits(bits: ArrayView1<Bit>) -> Array1<Word> {
+    let mut words = Array1::zeros(num_words(bits.len()));
+    pack_bits_into(bits, words.view_mut());
+    words
+}
+
+fn pack_bits_into(bits: ArrayView1<Bit>, mut words: ArrayViewMut1<Word>) {
+    for (index, bit) in bits.iter().enumerate() {
+        words[index / WORD_BITS] |= ((*bit & 1) as Word) << (index % WORD_BITS);
+    }
+}
+
+/// Pack every row of a batch of bit vectors into words.
+pub fn pack_bits_batch(bits: ArrayView2<Bit>) -> Array2<Word> {
+    let mut words = Array2::zeros((bits.nrows(), num_words(bits.ncols())));
+    pack_bits_batch_into(bits, words.view_mut());
+    words
+}
+
+/// Pack every row of a batch of bit vectors into the rows of `words`,
+/// overwriting their contents.
+pub fn pack_bits_batch_into(bits: ArrayView2<Bit>, mut words: ArrayViewMut2<Word>) {
+    words.fill(0);
+    for (bits_row, words_row) in bits.axis_iter(Axis(0)).zip(words.axis_iter_mut(Axis(0))) {
+        pack_bits_into(bits_row, words_row);
+    }
+}
+
+/// Unpack the first `num_bits` bits of a packed vector.
+pub fn unpack_bits(words: ArrayView1<Word>, num_bits: usize) -> Array1<Bit> {
+    let mut bits = Array1::zeros(num_bits);
+    unpack_bits_into(words, bits.view_mut());
+    bits
+}
+
+fn unpack_bits_into(words: ArrayView1<Word>, mut bits: ArrayViewMut1<Bit>) {
+    for (index, bit) in bits.iter_mut().enumerate() {
+        *bit = ((words[index / WORD_BITS] >> (index % WORD_BITS)) & 1) as Bit;
+    }
+}
+
+/// Unpack the first `num_bits` bits of every row of a batch of packed vectors.
+pub fn unpack_bits_batch(words: ArrayView2<Word>, num_bits: usize) -> Array2<Bit> {
+    let mut bits = Array2::zeros((words.nrows(), num_bits));
+    for (words_row, bits_row) in words.axis_iter(Axis(0)).zip(bits.axis_iter_mut(Axis(0))) {
+        unpack_bits_into(words_row, bits_row);
+    }
+    bits
+}
+
+/// Number of bytes needed to pack `num_bits` bits.
+pub fn num_bytes(num_bits: usize) -> usize {
+    num_bits.div_ceil(u8::BITS as usize)
+}
+
+/// Unpack the first `bits.len()` bits of a byte-packed vector, adding
+/// `bias` to them if given.
+pub fn unpack_bytes_into(
+    bytes: ArrayView1<u8>,
+    bias: Option<ArrayView1<Bit>>,
+    mut bits: ArrayViewMut1<Bit>,
+) {
+    for (index, bit) in bits.iter_mut().enumerate() {
+        *bit = (bytes[index / 8] >> (index % 8)) & 1;
+    }
+    if let Some(bias) = bias {
+        bits.zip_mut_with(&bias, |bit, bias| *bit ^= *bias & 1);
+    }
+}
+
+/// Pack a vector of bits into bytes, adding `bias` to them if given and
+/// overwriting the contents of `bytes`.
+pub fn pack_bytes_into(
+    bits: ArrayView1<Bit>,
+    bias: Option<ArrayView1<Bit>>,
+    mut bytes: ArrayViewMut1<u8>,
+) {
+    bytes.fill(0);
+    for (index, bit) in bits.iter().enumerate() {
+        let bias = bias.map_or(0, |bias| bias[index]);
+        bytes[index / 8] |= ((*bit ^ bias) & 1) << (index % 8);
+    }
+}
+
+/// The columns of a sparse GF(2) matrix as packed row patterns.
+///
+/// Each column stores only its non-zero words as `(word, mask)` pairs, so a
+/// matrix-vector product is the XOR of the patterns of the set bits of the
+/// vector. For matrices with at most 64 rows, such as most observable
+/// matrices, every column is a single word.
+#[derive(Clone, Debug)]
+pub struct PackedColumns {
+    num_rows: usize,
+    num_cols: usize,
+    col_indptr: Vec<usize>,
+    words: Vec<usize>,
+    masks: Vec<Word>,
+}
+
+impl PackedColumns {
+    pub fn new(matrix: &SparseBitMatrix) -> Self {
+        let matrix_csc = matrix.to_csc();
+        let mut col_indptr = Vec::with_capacity(matrix_csc.cols() + 1);
+        let mut words = Vec::new();
+        let mut masks: Vec<Word> = Vec::new();
+        col_indptr.push(0);
+        for col in matrix_csc.outer_iterator() {
+            // Rows are sorted, so bits of the same word are adjacent.
+            for (row, value) in col.iter() {
+                if *value & 1 == 0 {
+                    continue;
+                }
+                let word = row / WORD_BITS;
+                let bit = (1 as Word) << (row % WORD_BITS);
+                if words.len() > *col_indptr.last().unwrap() && *words.last().unwrap() == word {
+                    *masks.last_mut().unwrap() ^= bit;
+                } else {
+                    words.push(word);
+                    masks.push(bit);
+                }
+            }
+            col_indptr.push(words.len());
+        }
+
+        PackedColumns {
+            num_rows: matrix_csc.rows(),
+            num_cols: matrix_csc.cols(),
+            col_indptr,
+            words,
+            masks,
+        }
+    }
+
+    /// Number of rows of the matrix (bits of a product).
+    pub fn rows(&self) -> usize {
+        self.num_rows
+    }
+
+    /// Number of columns of the matrix (bits of an input vector).
+    pub fn cols(&self) -> usize {
+        self.num_cols
+    }
+
+    #[inline]
+    fn add_column(&self, col: usize, mut product: ArrayViewMut1<Word>) {
+        for index in self.col_indptr[col]..self.col_indptr[col + 1] {
+            product[self.words[index]] ^= self.masks[index];
+        }
+    }
+
+    fn mul_packed_into(&self, vector: ArrayView1<Word>, mut product: ArrayViewMut1<Word>) {
+        for (word_index, word) in vector.iter().enumerate() {
+            let mut word = *word;
+            while word != 0 {
+                let col = word_index * WORD_BITS + word.trailing_zeros() as usize;
+                // Bits past the last column are padding and ignored.
+                if col >= self.num_cols {
+                    return;
+                }
+                self.add_column(col, product.view_mut());
+                word &= word - 1;
+            }
+        }
+    }
+
+    fn mul_bits_into(&self, vector: ArrayView1<Bit>, mut product: ArrayViewMut1<Word>) {
+        for (col, bit) in vector.iter().enumerate() {
+            if *bit & 1 == 1 {
+                self.add_column(col, product.view_mut());
+            }
+        }
+    }
+
+    /// Packed product of the matrix with a packed vector.
+    pub fn mul_packed(&self, vector: ArrayView1<Word>) -> Array1<Word> {
+        let mut product = Array1::zeros(num_words(self.num_rows));
+        self.mul_packed_into(vector, product.view_mut());
+        product
+    }
+
+    /// Packed product of the matrix with an unpacked vector.
+    pub fn mul_bits(&self, vector: ArrayView1<Bit>) -> Array1<Word> {
+        let mut product = Array1::zeros(num_words(self.num_rows));
+        self.mul_bits_into(vector, product.view_mut());
+        product
+    }
+
+    /// Unpacked product of the matrix with an unpacked vector.
+    pub fn mul_bits_unpacked(&self, vector: ArrayView1<Bit>) -> Array1<Bit> {
+        unpack_bits(self.mul_bits(vector).view(), self.num_rows)
+    }
+
+    /// Packed products of the matrix with every row of a batch of packed vectors.
+    pub fn mul_packed_batch(&self, vectors: ArrayView2<Word>) -> Array2<Word> {
+        let mut products = Array2::zeros((vectors.nrows(), num_words(self.num_rows)));
+        self.mul_packed_batch_into(vectors, products.view_mut());
+        products
+    }
+
+    /// Write the packed products of the matrix with every row of a batch of
+    /// packed vectors into the rows of `products`, overwriting their contents.
+    pub fn mul_packed_batch_into(
+        &self,
+        vectors: ArrayView2<Word>,
+        mut products: ArrayViewMut2<Word>,
+    ) {
+        products.fill(0);
+        for (vector, product) in vectors
+            .axis_iter(Axis(0))
+            .zip(products.axis_iter_mut(Axis(0)))
+        {
+            self.mul_packed_into(vector, product);
+        }
+    }
+
+    /// Packed products of the matrix with every row of a batch of unpacked vectors.
+    pub fn mul_bits_batch(&self, vectors: ArrayView2<Bit>) -> Array2<Word> {
+        let mut products = Array2::zeros((vectors.nrows(), num_words(self.num_rows)));
+        self.mul_bits_batch_into(vectors, products.view_mut());
+        products
+    }
+
+    /// Write the packed products of the matrix with every row of a batch of
+    /// unpacked vectors into the rows of `products`, overwriting their contents.
+    pub fn mul_bits_batch_into(&self, vectors: ArrayView2<Bit>, mut products: ArrayViewMut2<Word>) {
+        products.fill(0);
+        for (vector, product) in vectors
+            .axis_iter(Axis(0))
+            .zip(products.axis_iter_mut(Axis(0)))
+        {
+            self.mul_bits_into(vector, product);
+        }
+    }
+
+    /// Unpacked products of the matrix with every row of a batch of unpacked vectors.
+    pub fn mul_bits_batch_unpacked(&self, vectors: ArrayView2<Bit>) -> Array2<Bit> {
+        let mut products = Array2::zeros((vectors.nrows(), self.num_rows));
+        self.mul_bits_batch_unpacked_into(vectors, products.view_mut());
+        products
+    }
+
+    /// Write the unpacked products of the matrix with every row of a batch
+    /// of unpacked vectors into the rows of `products`. Each product is
+    /// accumulated in a reused packed buffer and unpacked once, so no row is
+    /// copied and no parity is reduced bit by bit.
+    pub fn mul_bits_batch_unpacked_into(
+        &self,
+        vectors: ArrayView2<Bit>,
+        mut products: ArrayViewMut2<Bit>,
+    ) {
+        let mut product_words = Array1::zeros(num_words(self.num_rows));
+        for (vector, product) in vectors
+            .axis_iter(Axis(0))
+            .zip(products.axis_iter_mut(Axis(0)))
+        {
+            product_words.fill(0);
+            self.mul_bits_into(vector, product_words.view_mut());
+            unpack_bits_into(product_words.view(), product);
+        }
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use crate::bipartite_graph::BipartiteGraph;
+    use crate::decoder::Mod2Mul;
+    use ndarray::prelude::*;
+
+    #[test]
+    fn pack_unpack_roundtrip() {
+        let bits: Array2<Bit> = Array2::from_shape_fn((3, 130), |(row, col)| {
+            ((row * 7 + col * col) % 3 == 0) as Bit
+        });
+        let words = pack_bits_batch(bits.view());
+        assert_eq!(words.shape(), &[3, 3]);
+        assert_eq!(unpack_bits_batch(words.view(), 130), bits);
+
+        let words = pack_bits(array![1, 0, 1, 1].view());
+        assert_eq!(words, array![0b1101]);
+        assert_eq!(unpack_bits(words.view(), 4), array![1, 0, 1, 1]);
+    }
+
+    #[test]
+    fn pack_unpack_bytes_with_bias() {
+        let bits = array![1, 0, 1, 1, 0, 0, 0, 0, 1, 1];
+        let bias = array![0, 1, 1, 0, 0, 0, 0, 0, 0, 1];
+        assert_eq!(num_bytes(bits.len()), 2);
+
+        let mut bytes = Array1::from_elem(2, u8::MAX);
+        pack_bytes_into(bits.view(), None, bytes.view_mut());
+        assert_eq!(bytes, array![0b1101, 0b11]);
+        pack_bytes_into(bits.view(), Some(bias.view()), bytes.view_mut());
+        assert_eq!(bytes, array![0b1011, 0b01]);
+
+        let mut unpacked = Array1::zeros(bits.len());
+        unpack_bytes_into(bytes.view(), Some(bias.view()), unpacked.view_mut());
+        assert_eq!(unpacked, bits);
+    }
+
+    #[test]
+    fn packed_products_match_mul_mod2() {
+        let dense: Array2<Bit> = Array2::from_shape_fn((70, 90), |(row, col)| {
+            ((row * 13 + col * 29) % 11 < 2) as Bit
+        });
+        let matrix = SparseBitMatrix::from_dense(dense);
+        let columns = PackedColumns::new(&matrix);
+        assert_eq!(columns.rows(), 70);
+        assert_eq!(columns.cols(), 90);
+
+        let errors: Array2<Bit> =
+            Array2::from_shape_fn((5, 90), |(row, col)| ((row + col * 3) % 7 == 0) as Bit);
+        let expected: Vec<Array1<Bit>> = errors
+            .axis_iter(Axis(0))
+            .map(|row| matrix.mul_mod2(&row.to_owned()))
+            .collect();
+
+        let packed = columns.mul_packed_batch(pack_bits_batch(errors.view()).view());
+        let from_bits = columns.mul_bits_batch(errors.view());
+        assert_eq!(packed, from_bits);
+        let unpacked = columns.mul_bits_batch_unpacked(errors.view());
+        for (row, expected) in expected.iter().enumerate() {
+            assert_eq!(unpack_bits(packed.row(row), 70), *expected);
+            assert_eq!(columns.mul_bits(errors.row(row)), packed.row(row));
+            assert_eq!(columns.mul_bits_unpacked(errors.row(row)), *expected);
+            assert_eq!(unpacked.row(row), expected);
+        }
+
+        // Set padding bits of the last word do not contribute.
+        let mut padded = pack_bits(errors.row(0));
+        *padded.last_mut().unwrap() |= !0 << (90 % WORD_BITS);
+        assert_eq!(columns.mul_packed(padded.view()), packed.row(0));
+    }
+}
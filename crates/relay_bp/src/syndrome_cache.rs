@@ -0,0 +1,295 @@
+// (C) Copyright IBM 2025
+//
+// This code is licensed under the Apache License, Version 2.0. You may
+// obtain a copy of this license in the LICENSE.txt file in the root directory
+// of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+//
+// Any modifications or derivative works of this code must retain this
+// copyright notice, and modified files need to carry a notice indicating
+// that they have been altered from the originals.
+
+//! Memoization of decodings by syndrome.
+//!
+//! At low error rates many shots repeat the same few low-weight syndromes.
+//! The cache maps the active detectors of a syndrome to the support of its
+//! decoding so that repeated syndromes are answered by a lookup. It is
+//! split into shards behind separate locks so that the workers of parallel
+//! batches can share it, and evicts the least recently used syndromes of a
+//! shard once it is full.
+
+use crate::decoder::Bit;
+use ndarray::{ArrayView1, ArrayViewMut1};
+use std::collections::hash_map::DefaultHasher;
+use std::collections::{BTreeMap, HashMap};
+use std::hash::{Hash, Hasher};
+use std::sync::atomic::{AtomicU64, Ordering};
+use std::sync::{Arc, Mutex};
+
+/// Number of independently locked shards of a cache.
+const NUM_SHARDS: usize = 16;
+
+#[derive(Clone, Debug)]
+pub struct SyndromeCacheConfig {
+    /// Maximum number of cached syndromes.
+    pub capacity: usize,
+    /// Only syndromes with at most this many active detectors are cached.
+    /// Heavier syndromes rarely repeat and would only evict useful entries.
+    pub max_weight: usize,
+}
+
+impl Default for SyndromeCacheConfig {
+    fn default() -> Self {
+        Self {
+            capacity: 1 << 16,
+            max_weight: 16,
+        }
+    }
+}
+
+/// Counters of a [`SyndromeCache`].
+#[derive(Clone, Debug, Default, PartialEq)]
+pub struct SyndromeCacheStats {
+    /// Lookups of cacheable syndromes that found a decoding.
+    pub hits: u64,
+    /// Lookups of cacheable syndromes that did not.
+    pub misses: u64,
+    /// Entries dropped to make room for new ones.
+    pub evictions: u64,
+    /// Number of cached syndromes.
+    pub len: usize,
+}
+
+#[derive(Debug)]
+struct CacheEntry {
+    syndrome: Arc<[u32]>,
+    decoding: Arc<[u32]>,
+    last_use: u64,
+}
+
+/// One shard of the cache with least recently used eviction.
+#[derive(Debug, Default)]
+struct CacheShard {
+    entries: HashMap<Arc<[u32]>, CacheEntry>,
+    // Syndromes by the time of their last use.
+    recency: BTreeMap<u64, Arc<[u32]>>,
+    clock: u64,
+}
+
+impl CacheShard {
+    fn get(&mut self, syndrome: &[u32]) -> Option<Arc<[u32]>> {
+        let entry = self.entries.get_mut(syndrome)?;
+        self.clock += 1;
+        self.recency.remove(&entry.last_use);
+        entry.last_use = self.clock;
+        self.recency.insert(self.clock, entry.syndrome.clone());
+        Some(entry.decoding.clone())
+    }
+
+    /// Insert a decoding and return the number of evicted entries.
+    fn insert(&mut self, syndrome: &[u32], decoding: Arc<[u32]>, capacity: usize) -> u64 {
+        if let Some(entry) = self.entries.get_mut(syndrome) {
+            entry.decoding = decoding;
+            return 0;
+        }
+        let mut evictions = 0;
+        while self.entries.len() >= capacity {
+            let Some((_, oldest)) = self.recency.pop_first() else {
+                return evictions;
+            };
+            self.entries.remove(&oldest);
+            evictions += 1;
+        }
+        self.clock += 1;
+        let syndrome: Arc<[u32]> = syndrome.into();
+        self.recency.insert(self.clock, syndrome.clone());
+        self.entries.insert(
+            syndrome.clone(),
+            CacheEntry {
+                syndrome,
+                decoding,
+                last_use: self.clock,
+            },
+        );
+        evictions
+    }
+}
+
+/// A bounded, thread-safe map from syndromes to decodings.
+///
+/// Syndromes are keyed by their active detectors and decodings are stored
+/// as the indices of their flipped variables, so the memory of an entry
+/// grows with the weights rather than with the size of the code.
+#[derive(Debug)]
+pub struct SyndromeCache {
+    config: SyndromeCacheConfig,
+    shards: Vec<Mutex<CacheShard>>,
+    hits: AtomicU64,
+    misses: AtomicU64,
+    evictions: AtomicU64,
+}
+
+impl SyndromeCache {
+    pub fn new(config: SyndromeCacheConfig) -> Self {
+        SyndromeCache {
+            config,
+            shards: (0..NUM_SHARDS).map(|_| Mutex::default()).collect(),
+            hits: AtomicU64::new(0),
+            misses: AtomicU64::new(0),
+            evictions: AtomicU64::new(0),
+        }
+    }
+
+    pub fn config(&self) -> &SyndromeCacheConfig {
+        &self.config
+    }
+
+    /// The cache key of a syndrome, its active detectors, or `None` if the
+    /// syndrome is too heavy to be cached.
+    pub fn key(&self, detectors: ArrayView1<Bit>) -> Option<Vec<u32>> {
+        let mut key = Vec::new();
+        for (detector, bit) in detectors.iter().enumerate() {
+            if *bit & 1 == 1 {
+                if key.len() == self.config.max_weight {
+                    return None;
+                }
+                key.push(detector as u32);
+            }
+        }
+        Some(key)
+    }
+
+    /// Index of the shard holding the syndrome with `key`.
+    fn shard_index(&self, key: &[u32]) -> usize {
+        let mut hasher = DefaultHasher::new();
+        key.hash(&mut hasher);
+        hasher.finish() as usize % NUM_SHARDS
+    }
+
+    /// Capacity of shard `index`. The capacity of the cache is split exactly
+    /// between the shards, the first `capacity % NUM_SHARDS` shards holding
+    /// one entry more than the others.
+    fn shard_capacity(&self, index: usize) -> usize {
+        self.config.capacity / NUM_SHARDS + usize::from(index < self.config.capacity % NUM_SHARDS)
+    }
+
+    /// The support of the cached decoding of the syndrome with `key`.
+    pub fn get(&self, key: &[u32]) -> Option<Arc<[u32]>> {
+        let decoding = self.shards[self.shard_index(key)].lock().unwrap().get(key);
+        match decoding {
+            Some(_) => self.hits.fetch_add(1, Ordering::Relaxed),
+            None => self.misses.fetch_add(1, Ordering::Relaxed),
+        };
+        decoding
+    }
+
+    /// Cache the decoding of the syndrome with `key`.
+    pub fn insert(&self, key: &[u32], decoding: ArrayView1<Bit>) {
+        let index = self.shard_index(key);
+        let capacity = self.shard_capacity(index);
+        if capacity == 0 {
+            return;
+        }
+        let support: Arc<[u32]> = decoding
+            .iter()
+            .enumerate()
+            .filter(|(_, bit)| **bit & 1 == 1)
+            .map(|(variable, _)| variable as u32)
+            .collect();
+        let evictions = self.shards[index]
+            .lock()
+            .unwrap()
+            .insert(key, support, capacity);
+        if evictions > 0 {
+            self.evictions.fetch_add(evictions, Ordering::Relaxed);
+        }
+    }
+
+    pub fn stats(&self) -> SyndromeCacheStats {
+        SyndromeCacheStats {
+            hits: self.hits.load(Ordering::Relaxed),
+            misses: self.misses.load(Ordering::Relaxed),
+            evictions: self.evictions.load(Ordering::Relaxed),
+            len: self
+                .shards
+                .iter()
+                .map(|shard| shard.lock().unwrap().entries.len())
+                .sum(),
+        }
+    }
+
+    /// Drop all entries and reset the counters.
+    pub fn clear(&self) {
+        for shard in self.shards.iter() {
+            *shard.lock().unwrap() = CacheShard::default();
+        }
+        self.hits.store(0, Ordering::Relaxed);
+        self.misses.store(0, Ordering::Relaxed);
+        self.evictions.store(0, Ordering::Relaxed);
+    }
+}
+
+/// Write the decoding with the given support into `decoding`.
+pub fn write_decoding(support: &[u32], mut decoding: ArrayViewMut1<Bit>) {
+    decoding.fill(0);
+    for variable in support.iter() {
+        decoding[*variable as usize] = 1;
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use ndarray::{array, Array1};
+
+    #[test]
+    fn lookup_and_least_recently_used_eviction() {
+        // Every shard holds two entries, so [1, 3] is never the only entry
+        // of its shard to evict.
+        let cache = SyndromeCache::new(SyndromeCacheConfig {
+            capacity: 2 * NUM_SHARDS,
+            max_weight: 2,
+        });
+        assert_eq!(cache.key(array![0, 1, 0, 1].view()), Some(vec![1, 3]));
+        assert_eq!(cache.key(array![1, 1, 0, 1].view()), None);
+
+        assert_eq!(cache.get(&[1, 3]), None);
+        cache.insert(&[1, 3], array![0, 0, 1, 0, 1].view());
+        let support = cache.get(&[1, 3]).unwrap();
+        assert_eq!(support.as_ref(), &[2, 4]);
+        let mut decoding = Array1::ones(5);
+        write_decoding(&support, decoding.view_mut());
+        assert_eq!(decoding, array![0, 0, 1, 0, 1]);
+
+        // Fill the cache well beyond its capacity while keeping [1, 3] in use.
+        for detector in 0..10 * NUM_SHARDS as u32 {
+            cache.insert(&[100 + detector], array![1].view());
+            assert!(cache.get(&[1, 3]).is_some());
+        }
+        let stats = cache.stats();
+        assert!(stats.len <= 2 * NUM_SHARDS);
+        assert!(stats.evictions > 0);
+        assert_eq!(stats.misses, 1);
+        assert_eq!(stats.hits, 1 + 10 * NUM_SHARDS as u64);
+
+        cache.clear();
+        assert_eq!(cache.stats(), SyndromeCacheStats::default());
+    }
+
+    #[test]
+    fn capacity_split_between_shards() {
+        for capacity in [0, 5, NUM_SHARDS + 3] {
+            let cache = SyndromeCache::new(SyndromeCacheConfig {
+                capacity,
+                max_weight: 1,
+            });
+            let total: usize = (0..NUM_SHARDS)
+                .map(|index| cache.shard_capacity(index))
+                .sum();
+            assert_eq!(total, capacity);
+            for detector in 0..10 * NUM_SHARDS as u32 {
+                cache.insert(&[detector], array![1].view());
+            }
+            assert!(cache.stats().len <= capacity);
+        }
+    }
+}
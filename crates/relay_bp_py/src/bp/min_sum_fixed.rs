@@ -12,20 +12,24 @@ use pyo3::prelude::*;
 
 use std::sync::Arc;
 
-use crate::decoder::{get_sprs_bit_matrix_from_python, DecodeResult, DynDecoder};
+use super::min_sum::get_schedule_from_str;
+use crate::decoder::{
+    check_batch_width, get_sprs_bit_matrix_from_python, write_batch_out, DecodeResult, DynDecoder,
+};
 use numpy::{IntoPyArray, PyArray1, PyArray2, PyArrayMethods, PyReadonlyArray1, PyReadonlyArray2};
 use relay_bp::bp::min_sum::MinSumDecoderConfig;
 use relay_bp::bp::min_sum_fixed::MinSumBPDecoderFixed as MinSumBPDecoderFixedInner;
 use relay_bp::decoder::Bit;
+use relay_bp::packed::{num_words, Word};
 
-#[pyclass(extends=DynDecoder, subclass, module = "bp")]
+#[pyclass(extends=DynDecoder, frozen, subclass, module = "bp")]
 #[allow(dead_code)]
 pub struct MinSumBPDecoderFixed {}
 
 #[pymethods]
 impl MinSumBPDecoderFixed {
     #[new]
-    #[pyo3(signature = (check_matrix, error_priors, max_iter=200, alpha=None, alpha_iteration_scaling_factor=1.0, gamma0=None, data_scale_value=None, max_data_value=None, int_bits=None, frac_bits=None))]
+    #[pyo3(signature = (check_matrix, error_priors, max_iter=200, alpha=None, alpha_iteration_scaling_factor=1.0, gamma0=None, data_scale_value=None, max_data_value=None, int_bits=None, frac_bits=None, schedule="flooding".to_string()))]
     #[allow(clippy::missing_transmute_annotations, clippy::too_many_arguments)]
     pub fn new(
         py: Python<'_>,
@@ -39,6 +43,7 @@ impl MinSumBPDecoderFixed {
         max_data_value: Option<f64>,
         int_bits: Option<isize>,
         frac_bits: Option<isize>,
+        schedule: String,
     ) -> PyResult<(Self, DynDecoder)> {
         let min_sum_decoder = Self {};
 
@@ -52,6 +57,7 @@ impl MinSumBPDecoderFixed {
             max_data_value,
             int_bits,
             frac_bits,
+            schedule: get_schedule_from_str(&schedule)?,
         };
 
         let inner_decoder = MinSumBPDecoderFixedInner::new(
@@ -59,54 +65,72 @@ impl MinSumBPDecoderFixed {
             Arc::new(config),
         );
 
-        let dyn_decoder = DynDecoder(Box::new(inner_decoder));
+        let dyn_decoder = DynDecoder::new(Box::new(inner_decoder));
         Ok((min_sum_decoder, dyn_decoder))
     }
 
     pub fn decode<'py>(
-        mut self_: PyRefMut<'_, Self>,
+        self_: PyRef<'_, Self>,
         py: Python<'py>,
         detectors: PyReadonlyArray1<'_, Bit>,
     ) -> Bound<'py, PyArray1<Bit>> {
-        self_
-            .as_super()
-            .inner()
-            .decode(detectors.as_array())
+        let detectors = detectors.as_array();
+        let decoder: &DynDecoder = self_.as_super();
+        py.detach(|| decoder.lock().decode(detectors))
             .into_pyarray(py)
     }
 
     pub fn decode_detailed(
-        mut self_: PyRefMut<'_, Self>,
+        self_: PyRef<'_, Self>,
+        py: Python<'_>,
         detectors: PyReadonlyArray1<'_, Bit>,
     ) -> DecodeResult {
-        DecodeResult::new(
-            self_
-                .as_super()
-                .inner()
-                .decode_detailed(detectors.as_array()),
-        )
+        let detectors = detectors.as_array();
+        let decoder: &DynDecoder = self_.as_super();
+        DecodeResult::new(py.detach(|| decoder.lock().decode_detailed(detectors)))
     }
 
+    #[pyo3(signature = (detectors, out=None))]
     pub fn decode_batch<'py>(
-        mut self_: PyRefMut<'_, Self>,
+        self_: PyRef<'_, Self>,
         py: Python<'py>,
         detectors: PyReadonlyArray2<'_, Bit>,
-    ) -> Bound<'py, PyArray2<Bit>> {
-        self_
-            .as_super()
-            .inner()
-            .decode_batch(detectors.as_array())
-            .into_pyarray(py)
+        out: Option<Bound<'py, PyArray2<Bit>>>,
+    ) -> PyResult<Bound<'py, PyArray2<Bit>>> {
+        let detectors = detectors.as_array();
+        let decoder: &DynDecoder = self_.as_super();
+        let shape = (detectors.nrows(), decoder.check_matrix().cols());
+        write_batch_out(py, out, shape, |out| {
+            decoder.lock().decode_batch_into(detectors, out)
+        })
+    }
+
+    #[pyo3(signature = (detectors, out=None))]
+    pub fn decode_packed_batch<'py>(
+        self_: PyRef<'_, Self>,
+        py: Python<'py>,
+        detectors: PyReadonlyArray2<'_, Word>,
+        out: Option<Bound<'py, PyArray2<Word>>>,
+    ) -> PyResult<Bound<'py, PyArray2<Word>>> {
+        let decoder: &DynDecoder = self_.as_super();
+        let detectors = check_batch_width(
+            detectors.as_array(),
+            num_words(decoder.check_matrix().rows()),
+        )?;
+        let shape = (detectors.nrows(), num_words(decoder.check_matrix().cols()));
+        write_batch_out(py, out, shape, |out| {
+            decoder.lock().decode_packed_batch_into(detectors, out)
+        })
     }
 
     pub fn decode_detailed_batch(
-        mut self_: PyRefMut<'_, Self>,
+        self_: PyRef<'_, Self>,
+        py: Python<'_>,
         detectors: PyReadonlyArray2<'_, Bit>,
     ) -> Vec<DecodeResult> {
-        self_
-            .as_super()
-            .inner()
-            .decode_detailed_batch(detectors.as_array())
+        let detectors = detectors.as_array();
+        let decoder: &DynDecoder = self_.as_super();
+        py.detach(|| decoder.lock().decode_detailed_batch(detectors))
             .into_iter()
             .map(DecodeResult::new)
             .collect()
@@ -16,7 +16,7 @@ use pyo3::prelude::*;
 use pyo3::{Bound, PyResult};
 
 /// A Python module implemented in Rust.
-#[pymodule]
+#[pymodule(gil_used = false)]
 pub fn _bp<'py>(_py: Python<'py>, m: &Bound<'py, PyModule>) -> PyResult<()> {
     m.add_class::<min_sum::MinSumBPDecoderF32>()?;
     m.add_class::<min_sum::MinSumBPDecoderF64>()?;
@@ -27,14 +27,19 @@ pub fn _bp<'py>(_py: Python<'py>, m: &Bound<'py, PyModule>) -> PyResult<()> {
     m.add_class::<min_sum_fixed::MinSumBPDecoderFixed>()?;
     m.add_class::<relay::RelayDecoderF32>()?;
     m.add_class::<relay::RelayDecoderF64>()?;
+    m.add_class::<relay::RelayDecoderI8>()?;
+    m.add_class::<relay::RelayDecoderI16>()?;
     m.add_class::<relay::RelayDecoderI32>()?;
     m.add_class::<relay::RelayDecoderI64>()?;
+    m.add_class::<relay::RelayTelemetry>()?;
+    m.add_function(wrap_pyfunction!(min_sum::calibrate_integer_scaling, m)?)?;
     Ok(())
 }
 
 pub fn init_bp<'py>(_py: Python<'py>, m: &Bound<'py, PyModule>) -> PyResult<()> {
     // Workaround for https://github.com/PyO3/pyo3/issues/759
     let bp_module = PyModule::new(_py, "_relay_bp._bp")?;
+    bp_module.gil_used(false)?;
 
     _bp(_py, &bp_module)?;
 
@@ -11,24 +11,98 @@ use std::sync::Arc;
 
 use pyo3::prelude::*;
 
-use crate::decoder::{get_sprs_bit_matrix_from_python, DecodeResult, DynDecoder};
+use super::min_sum::get_schedule_from_str;
+use crate::decoder::{
+    check_batch_width, get_sprs_bit_matrix_from_python, write_batch_out, DecodeResult, DynDecoder,
+};
 use numpy::{IntoPyArray, PyArray1, PyArray2, PyArrayMethods, PyReadonlyArray1, PyReadonlyArray2};
 use relay_bp::bp::min_sum::MinSumDecoderConfig;
-use relay_bp::bp::relay::{RelayDecoder, RelayDecoderConfig, StoppingCriterion};
+use relay_bp::bp::relay::{
+    DecodeBudgetConfig, ParallelLegsConfig, RelayDecoder, RelayDecoderConfig, StallDetectionConfig,
+    StoppingCriterion,
+};
+use relay_bp::bp::telemetry::{RelayTelemetry as RelayTelemetryInner, TelemetryHandle};
+use relay_bp::components::ComponentDecompositionConfig;
 use relay_bp::decoder::Bit;
+use relay_bp::packed::{num_words, Word};
+use std::path::PathBuf;
+use std::time::Duration;
+
+/// Statistics of the legs of the Relay schedule accumulated over the decoded
+/// shots. Leg 0 is the pre-iteration stage.
+#[pyclass(module = "bp")]
+pub struct RelayTelemetry {
+    inner: RelayTelemetryInner,
+}
+
+#[pymethods]
+impl RelayTelemetry {
+    #[getter]
+    pub fn num_shots(&self) -> usize {
+        self.inner.num_shots
+    }
+
+    #[getter]
+    pub fn leg_runs<'py>(&self, py: Python<'py>) -> Bound<'py, PyArray1<usize>> {
+        PyArray1::from_array(py, &self.inner.leg_runs)
+    }
+
+    #[getter]
+    pub fn leg_iterations<'py>(&self, py: Python<'py>) -> Bound<'py, PyArray1<usize>> {
+        PyArray1::from_array(py, &self.inner.leg_iterations)
+    }
+
+    #[getter]
+    pub fn leg_converged<'py>(&self, py: Python<'py>) -> Bound<'py, PyArray1<usize>> {
+        PyArray1::from_array(py, &self.inner.leg_converged)
+    }
+
+    #[getter]
+    pub fn leg_quality_sum<'py>(&self, py: Python<'py>) -> Bound<'py, PyArray1<f64>> {
+        PyArray1::from_array(py, &self.inner.leg_quality_sum)
+    }
+
+    #[getter]
+    pub fn leg_unique_best<'py>(&self, py: Python<'py>) -> Bound<'py, PyArray1<usize>> {
+        PyArray1::from_array(py, &self.inner.leg_unique_best)
+    }
+
+    #[getter]
+    pub fn converged_iterations<'py>(&self, py: Python<'py>) -> Bound<'py, PyArray1<usize>> {
+        PyArray1::from_array(py, &self.inner.converged_iterations)
+    }
+
+    #[getter]
+    pub fn budget_exhausted(&self) -> usize {
+        self.inner.budget_exhausted
+    }
+
+    /// Write the statistics to an `.npz` file with one array per field.
+    pub fn save(&self, path: PathBuf) -> PyResult<()> {
+        self.inner
+            .write_npz(path)
+            .map_err(|err| pyo3::exceptions::PyIOError::new_err(err.to_string()))
+    }
+}
 
 macro_rules! create_bp_interface {
     ($name: ident, $type: ident) => {
-        #[pyclass(extends=DynDecoder, subclass, module = "bp")]
+        #[pyclass(extends=DynDecoder, frozen, subclass, module = "bp")]
         #[allow(dead_code)]
-        pub struct $name {}
+        pub struct $name {
+            telemetry: Option<TelemetryHandle>,
+        }
 
         #[pymethods]
         impl $name {
             #[new]
             #[pyo3(signature = (check_matrix, error_priors, alpha=None, alpha_iteration_scaling_factor=1.0, gamma0=0.1, data_scale_value=None, max_data_value=None, pre_iter=80, num_sets=300,
                 set_max_iter=60, gamma_dist_interval=(-0.24, 0.66), explicit_gammas=None, stop_nconv=1,
-                stopping_criterion="nconv".to_string(), logging=false, seed=0))]
+                stopping_criterion="nconv".to_string(), logging=false, seed=0, schedule="flooding".to_string(),
+                component_decomposition=false, component_growth_steps=1, component_max_region_fraction=0.25,
+                stall_detection=false, stall_window=10, stall_max_period=4, stall_abort_on_repeat=true,
+                parallel_legs=false, parallel_legs_workers=0, precompute_gammas=false,
+                budget_max_iterations=None, budget_deadline=None, budget_share_unused=false))]
             #[allow(clippy::missing_transmute_annotations, clippy::too_many_arguments)]
             pub fn new(
                 py: Python<'_>,
@@ -48,9 +122,21 @@ macro_rules! create_bp_interface {
                 stopping_criterion: String,
                 logging: bool,
                 seed: u64,
+                schedule: String,
+                component_decomposition: bool,
+                component_growth_steps: usize,
+                component_max_region_fraction: f64,
+                stall_detection: bool,
+                stall_window: usize,
+                stall_max_period: usize,
+                stall_abort_on_repeat: bool,
+                parallel_legs: bool,
+                parallel_legs_workers: usize,
+                precompute_gammas: bool,
+                budget_max_iterations: Option<usize>,
+                budget_deadline: Option<f64>,
+                budget_share_unused: bool,
             ) -> PyResult<(Self, DynDecoder)> {
-                let min_sum_decoder = Self {};
-
                 let min_sum_config = MinSumDecoderConfig {
                     error_priors: unsafe { error_priors.as_array() }.to_owned(),
                     max_iter: pre_iter, // pre_iter is equal to max_iter for a single bp run.
@@ -60,7 +146,8 @@ macro_rules! create_bp_interface {
                     data_scale_value,
                     max_data_value,
                     int_bits: None,
-                    frac_bits: None
+                    frac_bits: None,
+                    schedule: get_schedule_from_str(&schedule)?,
                 };
 
                 let stopping_criterion = match stopping_criterion.as_str() {
@@ -72,6 +159,12 @@ macro_rules! create_bp_interface {
                     _ => StoppingCriterion::default(),
                 };
 
+                if budget_deadline.is_some_and(|deadline| !deadline.is_finite() || deadline < 0.) {
+                    return Err(pyo3::exceptions::PyValueError::new_err(
+                        "budget_deadline must be a finite, non-negative number of seconds",
+                    ));
+                }
+
                 let relay_config = RelayDecoderConfig {
                     pre_iter,
                     num_sets,
@@ -79,9 +172,30 @@ macro_rules! create_bp_interface {
                     gamma_dist_interval,
                     explicit_gammas: explicit_gammas
                         .map(|explicit_gammas| unsafe { explicit_gammas.as_array() }.to_owned()),
+                    precompute_gammas,
                     stopping_criterion,
                     logging,
                     seed,
+                    component_decomposition: component_decomposition.then_some(
+                        ComponentDecompositionConfig {
+                            growth_steps: component_growth_steps,
+                            max_region_fraction: component_max_region_fraction,
+                        },
+                    ),
+                    stall_detection: stall_detection.then_some(StallDetectionConfig {
+                        window: stall_window,
+                        max_period: stall_max_period,
+                        abort_on_repeat: stall_abort_on_repeat,
+                    }),
+                    parallel_legs: parallel_legs.then_some(ParallelLegsConfig {
+                        num_workers: parallel_legs_workers,
+                    }),
+                    budget: (budget_max_iterations.is_some() || budget_deadline.is_some())
+                        .then(|| DecodeBudgetConfig {
+                            max_iterations: budget_max_iterations,
+                            deadline: budget_deadline.map(Duration::from_secs_f64),
+                            share_unused: budget_share_unused,
+                        }),
                 };
 
                 let inner_decoder = RelayDecoder::<$type>::new(
@@ -90,56 +204,96 @@ macro_rules! create_bp_interface {
                     Arc::new(relay_config),
                 );
 
-                let dyn_decoder = DynDecoder(Box::new(inner_decoder));
-                Ok((min_sum_decoder, dyn_decoder))
+                let relay_decoder = Self {
+                    telemetry: inner_decoder.telemetry_handle(),
+                };
+                let dyn_decoder = DynDecoder::new(Box::new(inner_decoder));
+                Ok((relay_decoder, dyn_decoder))
+            }
+
+            /// Telemetry of the shots decoded so far, or `None` unless
+            /// `logging` is enabled.
+            pub fn telemetry(self_: PyRef<'_, Self>, py: Python<'_>) -> Option<RelayTelemetry> {
+                let telemetry = self_.telemetry.as_ref()?;
+                let decoder: &DynDecoder = self_.as_super();
+                py.detach(|| decoder.lock().flush_telemetry());
+                Some(RelayTelemetry {
+                    inner: telemetry.snapshot(),
+                })
+            }
+
+            /// Reset the telemetry of the decoder.
+            pub fn reset_telemetry(self_: PyRef<'_, Self>, py: Python<'_>) {
+                if let Some(telemetry) = self_.telemetry.as_ref() {
+                    let decoder: &DynDecoder = self_.as_super();
+                    py.detach(|| decoder.lock().flush_telemetry());
+                    telemetry.reset();
+                }
             }
 
             pub fn decode<'py>(
-                mut self_: PyRefMut<'_, Self>,
+                self_: PyRef<'_, Self>,
                 py: Python<'py>,
                 detectors: PyReadonlyArray1<'_, Bit>,
             ) -> Bound<'py, PyArray1<Bit>> {
-                self_
-                    .as_super()
-                    .inner()
-                    .decode(detectors.as_array())
-                    .into_pyarray(py)
+                let detectors = detectors.as_array();
+                let decoder: &DynDecoder = self_.as_super();
+                py.detach(|| decoder.lock().decode(detectors)).into_pyarray(py)
             }
 
             pub fn decode_detailed(
-                mut self_: PyRefMut<'_, Self>,
+                self_: PyRef<'_, Self>,
+                py: Python<'_>,
                 detectors: PyReadonlyArray1<'_, Bit>,
             ) -> DecodeResult {
-                DecodeResult::new(
-                    self_
-                        .as_super()
-                        .inner()
-                        .decode_detailed(detectors.as_array()),
-                )
+                let detectors = detectors.as_array();
+                let decoder: &DynDecoder = self_.as_super();
+                DecodeResult::new(py.detach(|| decoder.lock().decode_detailed(detectors)))
             }
 
+            #[pyo3(signature = (detectors, out=None))]
             pub fn decode_batch<'py>(
-                mut self_: PyRefMut<'_, Self>,
+                self_: PyRef<'_, Self>,
                 py: Python<'py>,
                 detectors: PyReadonlyArray2<'_, Bit>,
-            ) -> Bound<'py, PyArray2<Bit>> {
-                self_
-                    .as_super()
-                    .inner()
-                    .decode_batch(detectors.as_array())
-                    .into_pyarray(py)
+                out: Option<Bound<'py, PyArray2<Bit>>>,
+            ) -> PyResult<Bound<'py, PyArray2<Bit>>> {
+                let detectors = detectors.as_array();
+                let decoder: &DynDecoder = self_.as_super();
+                let shape = (detectors.nrows(), decoder.check_matrix().cols());
+                write_batch_out(py, out, shape, |out| {
+                    decoder.lock().decode_batch_into(detectors, out)
+                })
+            }
+
+            #[pyo3(signature = (detectors, out=None))]
+            pub fn decode_packed_batch<'py>(
+                self_: PyRef<'_, Self>,
+                py: Python<'py>,
+                detectors: PyReadonlyArray2<'_, Word>,
+                out: Option<Bound<'py, PyArray2<Word>>>,
+            ) -> PyResult<Bound<'py, PyArray2<Word>>> {
+                let decoder: &DynDecoder = self_.as_super();
+                let detectors = check_batch_width(
+                    detectors.as_array(),
+                    num_words(decoder.check_matrix().rows()),
+                )?;
+                let shape = (detectors.nrows(), num_words(decoder.check_matrix().cols()));
+                write_batch_out(py, out, shape, |out| {
+                    decoder.lock().decode_packed_batch_into(detectors, out)
+                })
             }
 
             pub fn decode_detailed_batch(
-                mut self_: PyRefMut<'_, Self>,
+                self_: PyRef<'_, Self>,
+                py: Python<'_>,
                 detectors: PyReadonlyArray2<'_, Bit>,
             ) -> Vec<DecodeResult> {
-                self_
-                    .as_super()
-                    .inner()
-                    .decode_detailed_batch(detectors.as_array())
+                let detectors = detectors.as_array();
+                let decoder: &DynDecoder = self_.as_super();
+                py.detach(|| decoder.lock().decode_detailed_batch(detectors))
                     .into_iter()
-                    .map(|result| DecodeResult::new(result))
+                    .map(DecodeResult::new)
                     .collect()
             }
         }
@@ -148,5 +302,7 @@ macro_rules! create_bp_interface {
 
 create_bp_interface!(RelayDecoderF32, f32);
 create_bp_interface!(RelayDecoderF64, f64);
+create_bp_interface!(RelayDecoderI8, i8);
+create_bp_interface!(RelayDecoderI16, i16);
 create_bp_interface!(RelayDecoderI32, i32);
 create_bp_interface!(RelayDecoderI64, i64);
@@ -8,15 +8,20 @@
 // copyright notice, and modified files need to carry a notice indicating
 // that they have been altered from the originals.
 
+use std::sync::{Arc, Mutex, MutexGuard, PoisonError};
+
+use pyo3::marker::Ungil;
 use pyo3::prelude::*;
 use pyo3::types::PyAnyMethods;
 use pyo3::{Bound, PyResult};
 
-use numpy::{PyArray1, PyArray2, PyArrayMethods};
+use ndarray::{ArrayView2, ArrayViewMut2};
+use numpy::{Element, IntoPyArray, PyArray1, PyArray2, PyArrayMethods, PyReadonlyArray2};
 use relay_bp::bipartite_graph::BipartiteGraph;
 use relay_bp::decoder::{
-    Bit, DecodeResult as DecodeResultInner, Decoder as DecoderInner, SparseBitMatrix,
+    BPExtraResult, Bit, DecodeResult as DecodeResultInner, Decoder as DecoderInner, SparseBitMatrix,
 };
+use relay_bp::packed::{pack_bits_batch, unpack_bits_batch, Word};
 
 pub fn get_sprs_bit_matrix_from_python(
     py: Python<'_>,
@@ -70,13 +75,85 @@ pub fn get_sprs_bit_matrix_from_python(
     }
 }
 
-#[pyclass(from_py_object, subclass, module = "decoder")]
-#[derive(Clone)]
-pub struct DynDecoder(pub Box<dyn DecoderInner + Send + 'static>);
+/// Write a batch output of `shape` with the GIL released and return it.
+///
+/// The output is the caller-provided `out` array when one is given, so that
+/// rows are decoded straight into its memory, and a new array otherwise.
+pub fn write_batch_out<'py, T, F>(
+    py: Python<'py>,
+    out: Option<Bound<'py, PyArray2<T>>>,
+    shape: (usize, usize),
+    write: F,
+) -> PyResult<Bound<'py, PyArray2<T>>>
+where
+    T: Element + Send,
+    F: Ungil + FnOnce(ArrayViewMut2<T>),
+{
+    let out = match out {
+        Some(out) => {
+            if out.shape() != [shape.0, shape.1] {
+                return Err(pyo3::exceptions::PyValueError::new_err(format!(
+                    "Expected out to have shape {:?}, got {:?}",
+                    shape,
+                    out.shape()
+                )));
+            }
+            out
+        }
+        None => PyArray2::zeros(py, [shape.0, shape.1], false),
+    };
+    {
+        let mut out_array = out
+            .try_readwrite()
+            .map_err(|err| pyo3::exceptions::PyValueError::new_err(err.to_string()))?;
+        let out_view = out_array.as_array_mut();
+        py.detach(move || write(out_view));
+    }
+    Ok(out)
+}
+
+pub type BoxedDecoder = Box<dyn DecoderInner + Send + 'static>;
+
+/// A decoder shared by the Python objects wrapping it.
+///
+/// The class is frozen and the decoder sits behind a mutex that is only
+/// locked once the GIL has been released, so Python threads sharing one
+/// decoder wait for each other instead of failing to borrow it.
+#[pyclass(from_py_object, frozen, subclass, module = "decoder")]
+pub struct DynDecoder {
+    decoder: Mutex<BoxedDecoder>,
+    check_matrix: Arc<SparseBitMatrix>,
+}
 
 impl DynDecoder {
-    pub fn inner(&mut self) -> &mut dyn DecoderInner {
-        self.0.as_mut()
+    pub fn new(decoder: BoxedDecoder) -> Self {
+        let check_matrix = decoder.check_matrix();
+        DynDecoder {
+            decoder: Mutex::new(decoder),
+            check_matrix,
+        }
+    }
+
+    /// The check matrix of the decoder, available without taking the lock.
+    pub fn check_matrix(&self) -> &SparseBitMatrix {
+        &self.check_matrix
+    }
+
+    /// Lock the wrapped decoder, waiting for calls from other threads to
+    /// finish. Call this with the GIL released.
+    pub fn lock(&self) -> MutexGuard<'_, BoxedDecoder> {
+        self.decoder.lock().unwrap_or_else(PoisonError::into_inner)
+    }
+
+    /// A copy of the wrapped decoder.
+    pub fn to_boxed(&self) -> BoxedDecoder {
+        self.lock().clone()
+    }
+}
+
+impl Clone for DynDecoder {
+    fn clone(&self) -> Self {
+        DynDecoder::new(self.to_boxed())
     }
 }
 
@@ -121,19 +198,74 @@ impl DecodeResult {
     pub fn max_iter(&self) -> usize {
         self.inner.max_iter
     }
+
+    #[getter]
+    pub fn budget_exhausted(&self) -> bool {
+        self.inner.budget_exhausted
+    }
+
+    /// The shot was answered by a lookup table without running the decoder.
+    #[getter]
+    pub fn from_lookup_table(&self) -> bool {
+        matches!(self.inner.extra, BPExtraResult::LookupTable)
+    }
+}
+
+/// Pack every row of a batch of bits into 64-bit words, with bit `i` of a
+/// row stored in bit `i % 64` of word `i / 64`.
+#[pyfunction]
+pub fn pack_bits<'py>(
+    py: Python<'py>,
+    bits: PyReadonlyArray2<'_, Bit>,
+) -> Bound<'py, PyArray2<Word>> {
+    let bits = bits.as_array();
+    py.detach(|| pack_bits_batch(bits)).into_pyarray(py)
+}
+
+/// Unpack the first `num_bits` bits of every row of a batch of packed words.
+#[pyfunction]
+pub fn unpack_bits<'py>(
+    py: Python<'py>,
+    words: PyReadonlyArray2<'_, Word>,
+    num_bits: usize,
+) -> PyResult<Bound<'py, PyArray2<Bit>>> {
+    if num_bits > words.as_array().ncols() * Word::BITS as usize {
+        return Err(pyo3::exceptions::PyValueError::new_err(format!(
+            "Cannot unpack {num_bits} bits from {} words per row",
+            words.as_array().ncols()
+        )));
+    }
+    let words = words.as_array();
+    Ok(py
+        .detach(|| unpack_bits_batch(words, num_bits))
+        .into_pyarray(py))
+}
+
+/// Check that every row of a batch has `width` columns.
+pub fn check_batch_width<T>(batch: ArrayView2<'_, T>, width: usize) -> PyResult<ArrayView2<'_, T>> {
+    if batch.ncols() != width {
+        return Err(pyo3::exceptions::PyValueError::new_err(format!(
+            "Expected {width} columns per row, got {}",
+            batch.ncols()
+        )));
+    }
+    Ok(batch)
 }
 
 /// A Python module implemented in Rust.
-#[pymodule]
+#[pymodule(gil_used = false)]
 pub fn _decoder<'py>(_py: Python<'py>, m: &Bound<'py, PyModule>) -> PyResult<()> {
     m.add_class::<DecodeResult>()?;
     m.add_class::<DynDecoder>()?;
+    m.add_function(wrap_pyfunction!(pack_bits, m)?)?;
+    m.add_function(wrap_pyfunction!(unpack_bits, m)?)?;
     Ok(())
 }
 
 pub fn init_decoder<'py>(_py: Python<'py>, m: &Bound<'py, PyModule>) -> PyResult<()> {
     // Workaround for https://github.com/PyO3/pyo3/issues/759
     let decoder_module = PyModule::new(_py, "_relay_bp._decoder")?;
+    decoder_module.gil_used(false)?;
 
     _decoder(_py, &decoder_module)?;
 
@@ -15,7 +15,7 @@ pub mod observable_decoder;
 use pyo3::prelude::*;
 
 /// A Python module implemented in Rust.
-#[pymodule]
+#[pymodule(gil_used = false)]
 fn _relay_bp<'py>(_py: Python<'py>, m: &Bound<'py, PyModule>) -> PyResult<()> {
     decoder::init_decoder(_py, m)?;
     observable_decoder::init_observable_decoder(_py, m)?;
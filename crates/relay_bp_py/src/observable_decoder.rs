@@ -8,19 +8,31 @@
 // copyright notice, and modified files need to carry a notice indicating
 // that they have been altered from the originals.
 
-use std::sync::Arc;
+use std::sync::{Arc, Mutex, MutexGuard, PoisonError};
 
-use crate::decoder::{get_sprs_bit_matrix_from_python, DecodeResult, DynDecoder};
-use relay_bp::decoder::{Bit, Decoder as DecoderInner, DecoderRunner};
+use crate::decoder::{
+    check_batch_width, get_sprs_bit_matrix_from_python, write_batch_out, DecodeResult, DynDecoder,
+};
+use relay_bp::components::ComponentDecompositionConfig;
+use relay_bp::decoder::{Bit, Decoder as DecoderInner, DecoderRunner, SparseBitMatrix};
+use relay_bp::lookup_table::{LookupTableConfig, LookupTableStats as LookupTableStatsInner};
 use relay_bp::observable_decoder::{
     ObservableDecodeResult as ObservableDecodeResultInner, ObservableDecoder,
     ObservableDecoderRunner as ObservableDecoderRunnerInner,
 };
+use relay_bp::packed::{num_bytes, num_words, Word};
+use relay_bp::syndrome_cache::{
+    SyndromeCacheConfig, SyndromeCacheStats as SyndromeCacheStatsInner,
+};
 
-use numpy::{IntoPyArray, PyArray1, PyArray2, PyReadonlyArray1, PyReadonlyArray2};
+use ndarray::{Array2, ArrayView2, Axis};
+use numpy::{IntoPyArray, PyArray1, PyArray2, PyArrayMethods, PyReadonlyArray1, PyReadonlyArray2};
 use pyo3::prelude::*;
+use pyo3::types::PyIterator;
 use pyo3::{Bound, PyResult};
+use std::collections::VecDeque;
 use std::mem;
+use std::thread;
 
 #[pyclass(module = "observable_decoder")]
 pub struct ObservableDecodeResult {
@@ -61,6 +73,16 @@ impl ObservableDecodeResult {
         self.inner.iterations
     }
 
+    #[getter]
+    pub fn budget_exhausted(&self) -> bool {
+        self.inner.budget_exhausted
+    }
+
+    #[getter]
+    pub fn from_lookup_table(&self) -> bool {
+        self.inner.from_lookup_table
+    }
+
     #[getter]
     pub fn unconverged_no_error(&self) -> Option<bool> {
         let true_decoding = self.inner.true_decoding.as_ref()?;
@@ -88,26 +110,224 @@ impl ObservableDecodeResult {
     }
 }
 
+/// Counters of the syndrome cache of an `ObservableDecoderRunner`.
+#[pyclass(module = "observable_decoder")]
+pub struct SyndromeCacheStats {
+    inner: SyndromeCacheStatsInner,
+}
+
+#[pymethods]
+impl SyndromeCacheStats {
+    #[getter]
+    pub fn hits(&self) -> u64 {
+        self.inner.hits
+    }
+
+    #[getter]
+    pub fn misses(&self) -> u64 {
+        self.inner.misses
+    }
+
+    #[getter]
+    pub fn evictions(&self) -> u64 {
+        self.inner.evictions
+    }
+
+    #[getter]
+    pub fn size(&self) -> usize {
+        self.inner.len
+    }
+
+    /// Fraction of cacheable lookups that found a decoding.
+    #[getter]
+    pub fn hit_rate(&self) -> f64 {
+        let lookups = self.inner.hits + self.inner.misses;
+        if lookups == 0 {
+            return 0.;
+        }
+        self.inner.hits as f64 / lookups as f64
+    }
+}
+
+/// Counters of the lookup table of an `ObservableDecoderRunner`.
 #[pyclass(module = "observable_decoder")]
+pub struct LookupTableStats {
+    inner: LookupTableStatsInner,
+}
+
+#[pymethods]
+impl LookupTableStats {
+    /// Shots answered by the table.
+    #[getter]
+    pub fn hits(&self) -> u64 {
+        self.inner.hits
+    }
+
+    /// Shots sent to the decoder.
+    #[getter]
+    pub fn misses(&self) -> u64 {
+        self.inner.misses
+    }
+}
+
+/// Source of the syndromes of an `ObservableDecodeStream`.
+enum ShotSource {
+    /// An iterator over arrays of detectors.
+    Chunks(Py<PyIterator>),
+    /// A callable returning the detectors of the given number of shots,
+    /// such as the `sample` method of a stim sampler.
+    Sampler { sample: Py<PyAny>, remaining: usize },
+}
+
+/// Iterator over the observables of a stream of syndromes, see
+/// `ObservableDecoderRunner.decode_observables_stream`.
+#[pyclass(module = "observable_decoder")]
+pub struct ObservableDecodeStream {
+    runner: Py<ObservableDecoderRunner>,
+    source: ShotSource,
+    chunk_size: usize,
+    parallel: bool,
+    // Chunks taken from the source and not decoded yet.
+    pending: VecDeque<Array2<Bit>>,
+    // Raised once the chunks taken before it are decoded.
+    error: Option<PyErr>,
+}
+
+impl ObservableDecodeStream {
+    /// Take the next array from the source split into chunks of at most
+    /// `chunk_size` shots.
+    fn fetch(&mut self, py: Python<'_>) -> PyResult<()> {
+        let detectors = match &mut self.source {
+            ShotSource::Chunks(chunks) => match chunks.bind(py).clone().next() {
+                Some(detectors) => detectors?,
+                None => return Ok(()),
+            },
+            ShotSource::Sampler { sample, remaining } => {
+                if *remaining == 0 {
+                    return Ok(());
+                }
+                let num_shots = (*remaining).min(self.chunk_size);
+                *remaining -= num_shots;
+                sample.bind(py).call1((num_shots,))?
+            }
+        };
+        // Samplers commonly return boolean arrays.
+        let detectors = if detectors.cast::<PyArray2<Bit>>().is_ok() {
+            detectors
+        } else {
+            detectors.call_method1("astype", ("uint8",))?
+        };
+        let detectors = detectors.cast::<PyArray2<Bit>>()?.readonly();
+        for chunk in detectors
+            .as_array()
+            .axis_chunks_iter(Axis(0), self.chunk_size)
+        {
+            self.pending.push_back(chunk.to_owned());
+        }
+        Ok(())
+    }
+}
+
+#[pymethods]
+impl ObservableDecodeStream {
+    fn __iter__(slf: PyRef<'_, Self>) -> PyRef<'_, Self> {
+        slf
+    }
+
+    fn __next__<'py>(&mut self, py: Python<'py>) -> PyResult<Option<Bound<'py, PyArray2<Bit>>>> {
+        if self.pending.is_empty() {
+            if let Some(error) = self.error.take() {
+                return Err(error);
+            }
+            self.fetch(py)?;
+        }
+        let Some(chunk) = self.pending.pop_front() else {
+            return Ok(None);
+        };
+
+        let runner = self.runner.clone_ref(py);
+        let runner = runner.get();
+        let parallel = self.parallel;
+        // Decode the chunk on a separate thread while the source produces
+        // the next one, which may need the interpreter.
+        let observables = thread::scope(|scope| {
+            let decoding = scope.spawn(move || {
+                let mut inner = runner.lock();
+                if parallel {
+                    inner.par_decode_observables_batch(chunk.view())
+                } else {
+                    inner.decode_observables_batch(chunk.view())
+                }
+            });
+            if self.pending.is_empty() {
+                if let Err(error) = self.fetch(py) {
+                    self.error = Some(error);
+                }
+            }
+            py.detach(|| decoding.join())
+        })
+        .unwrap_or_else(|panic| std::panic::resume_unwind(panic));
+        Ok(Some(observables.into_pyarray(py)))
+    }
+}
+
+/// The class is frozen and the runner sits behind a mutex that is only locked
+/// once the GIL has been released, so Python threads sharing one runner wait
+/// for each other instead of failing to borrow it.
+#[pyclass(frozen, module = "observable_decoder")]
 #[allow(dead_code)]
 pub struct ObservableDecoderRunner {
     // Static lifetime to workaround lifetime issue referenced above.
-    inner: ObservableDecoderRunnerInner<'static>,
+    inner: Mutex<ObservableDecoderRunnerInner<'static>>,
+    // Shapes of the batches, available without taking the lock.
+    check_matrix: Arc<SparseBitMatrix>,
+    num_observables: usize,
+}
+
+impl ObservableDecoderRunner {
+    /// Lock the runner, waiting for calls from other threads to finish. Call
+    /// this with the GIL released.
+    fn lock(&self) -> MutexGuard<'_, ObservableDecoderRunnerInner<'static>> {
+        self.inner.lock().unwrap_or_else(PoisonError::into_inner)
+    }
 }
 
 #[pymethods]
 impl ObservableDecoderRunner {
     #[new]
-    #[pyo3(signature = (decoder, observable_error_matrix, include_decode_result=false))]
+    #[pyo3(signature = (decoder, observable_error_matrix, include_decode_result=false,
+        component_decomposition=false, component_growth_steps=1, component_max_region_fraction=0.25,
+        num_threads=None, shot_scheduling=true, syndrome_cache=false,
+        syndrome_cache_capacity=65536, syndrome_cache_max_weight=16, lookup_table=false,
+        lookup_table_max_errors=2, lookup_table_max_syndrome_weight=8))]
+    #[allow(clippy::too_many_arguments)]
     pub fn new(
         py: Python<'_>,
-        decoder: DynDecoder,
+        decoder: PyRef<'_, DynDecoder>,
         observable_error_matrix: &Bound<'_, PyAny>,
         include_decode_result: bool,
+        component_decomposition: bool,
+        component_growth_steps: usize,
+        component_max_region_fraction: f64,
+        num_threads: Option<usize>,
+        shot_scheduling: bool,
+        syndrome_cache: bool,
+        syndrome_cache_capacity: usize,
+        syndrome_cache_max_weight: usize,
+        lookup_table: bool,
+        lookup_table_max_errors: usize,
+        lookup_table_max_syndrome_weight: usize,
     ) -> PyResult<Self> {
-        let inner: relay_bp::observable_decoder::ObservableDecoderRunner<'_> = unsafe {
+        if lookup_table && !(1..=2).contains(&lookup_table_max_errors) {
+            return Err(pyo3::exceptions::PyValueError::new_err(format!(
+                "lookup_table_max_errors must be 1 or 2, got {lookup_table_max_errors}"
+            )));
+        }
+        let decoder: &DynDecoder = &decoder;
+        let decoder = py.detach(|| decoder.to_boxed());
+        let mut inner: relay_bp::observable_decoder::ObservableDecoderRunner<'_> = unsafe {
             mem::transmute(ObservableDecoderRunnerInner::new(
-                decoder.0,
+                decoder,
                 Arc::new(get_sprs_bit_matrix_from_python(
                     py,
                     observable_error_matrix,
@@ -115,177 +335,466 @@ impl ObservableDecoderRunner {
                 include_decode_result,
             ))
         };
-        Ok(Self { inner })
+        inner.set_component_decomposition(component_decomposition.then_some(
+            ComponentDecompositionConfig {
+                growth_steps: component_growth_steps,
+                max_region_fraction: component_max_region_fraction,
+            },
+        ));
+        inner
+            .set_num_threads(num_threads)
+            .map_err(|err| pyo3::exceptions::PyValueError::new_err(err.to_string()))?;
+        inner.set_shot_scheduling(shot_scheduling);
+        inner.set_syndrome_cache(syndrome_cache.then_some(SyndromeCacheConfig {
+            capacity: syndrome_cache_capacity,
+            max_weight: syndrome_cache_max_weight,
+        }));
+        inner.set_lookup_table(lookup_table.then_some(LookupTableConfig {
+            max_errors: lookup_table_max_errors,
+            max_syndrome_weight: lookup_table_max_syndrome_weight,
+        }));
+        Ok(Self {
+            check_matrix: inner.check_matrix(),
+            num_observables: inner.num_observables(),
+            inner: Mutex::new(inner),
+        })
+    }
+
+    /// Counts of the shots answered by the lookup table and of those sent
+    /// to the decoder, or `None` if disabled.
+    pub fn lookup_table_stats(&self, py: Python<'_>) -> Option<LookupTableStats> {
+        let inner = py.detach(|| Some(self.lock().lookup_table()?.stats()))?;
+        Some(LookupTableStats { inner })
+    }
+
+    /// Hit and miss counters of the syndrome cache, or `None` if disabled.
+    pub fn syndrome_cache_stats(&self, py: Python<'_>) -> Option<SyndromeCacheStats> {
+        let inner = py.detach(|| Some(self.lock().syndrome_cache()?.stats()))?;
+        Some(SyndromeCacheStats { inner })
+    }
+
+    /// Drop all cached decodings and reset the counters.
+    pub fn clear_syndrome_cache(&self, py: Python<'_>) {
+        py.detach(|| {
+            if let Some(syndrome_cache) = self.lock().syndrome_cache() {
+                syndrome_cache.clear();
+            }
+        })
+    }
+
+    /// Number of threads used by the parallel batch methods.
+    #[getter]
+    pub fn num_threads(&self, py: Python<'_>) -> usize {
+        py.detach(|| self.lock().num_threads())
     }
 
     pub fn decode<'py>(
-        &mut self,
+        &self,
         py: Python<'py>,
         detectors: PyReadonlyArray1<'_, Bit>,
     ) -> Bound<'py, PyArray1<Bit>> {
-        self.inner.decode(detectors.as_array()).into_pyarray(py)
+        let detectors = detectors.as_array();
+        py.detach(|| self.lock().decode(detectors)).into_pyarray(py)
     }
 
-    pub fn decode_detailed(&mut self, detectors: PyReadonlyArray1<'_, Bit>) -> DecodeResult {
-        DecodeResult::new(self.inner.decode_detailed(detectors.as_array()))
+    pub fn decode_detailed(
+        &self,
+        py: Python<'_>,
+        detectors: PyReadonlyArray1<'_, Bit>,
+    ) -> DecodeResult {
+        let detectors = detectors.as_array();
+        DecodeResult::new(py.detach(|| self.lock().decode_detailed(detectors)))
     }
 
     pub fn compute_observables<'py>(
-        &mut self,
+        &self,
         py: Python<'py>,
         errors: PyReadonlyArray1<'_, Bit>,
     ) -> Bound<'py, PyArray1<Bit>> {
-        PyArray1::from_array(py, &self.inner.compute_observables(errors.as_array()))
+        let errors = errors.as_array();
+        py.detach(|| self.lock().compute_observables(errors))
+            .into_pyarray(py)
     }
 
     pub fn decode_observables<'py>(
-        &mut self,
+        &self,
         py: Python<'py>,
         detectors: PyReadonlyArray1<'_, Bit>,
     ) -> Bound<'py, PyArray1<Bit>> {
-        PyArray1::from_array(py, &self.inner.decode_observables(detectors.as_array()))
+        let detectors = detectors.as_array();
+        py.detach(|| self.lock().decode_observables(detectors))
+            .into_pyarray(py)
     }
 
     pub fn from_errors_decode_observables_detailed(
-        &mut self,
+        &self,
+        py: Python<'_>,
         errors: PyReadonlyArray1<'_, Bit>,
     ) -> ObservableDecodeResult {
+        let errors = errors.as_array();
         ObservableDecodeResult::new(
-            self.inner
-                .from_errors_decode_observables_detailed(errors.as_array()),
+            py.detach(|| self.lock().from_errors_decode_observables_detailed(errors)),
         )
     }
 
-    #[pyo3(signature = (detectors, parallel=false, progress_bar=true, leave_progress_bar_on_finish=false))]
+    #[pyo3(signature = (detectors, parallel=false, progress_bar=true, leave_progress_bar_on_finish=false, out=None))]
     pub fn decode_batch<'py>(
-        &mut self,
+        &self,
         py: Python<'py>,
         detectors: PyReadonlyArray2<'_, Bit>,
         parallel: bool,
         progress_bar: bool,
         leave_progress_bar_on_finish: bool,
-    ) -> Bound<'py, PyArray2<Bit>> {
-        let results = match (parallel, progress_bar) {
-            (false, false) => self.inner.decode_batch(detectors.as_array()),
-            (true, false) => self.inner.par_decode_batch(detectors.as_array()),
-            (false, true) => self
-                .inner
-                .decode_batch_progress_bar(detectors.as_array(), leave_progress_bar_on_finish),
-            (true, true) => self
-                .inner
-                .par_decode_batch_progress_bar(detectors.as_array(), leave_progress_bar_on_finish),
-        };
-        results.into_pyarray(py)
+        out: Option<Bound<'py, PyArray2<Bit>>>,
+    ) -> PyResult<Bound<'py, PyArray2<Bit>>> {
+        let detectors = detectors.as_array();
+        let shape = (detectors.nrows(), self.check_matrix.cols());
+        write_batch_out(py, out, shape, |out| {
+            let mut inner = self.lock();
+            match (parallel, progress_bar) {
+                (false, false) => inner.decode_batch_into(detectors, out),
+                (true, false) => inner.par_decode_batch_into(detectors, out),
+                (false, true) => inner.decode_batch_progress_bar_into(
+                    detectors,
+                    out,
+                    leave_progress_bar_on_finish,
+                ),
+                (true, true) => inner.par_decode_batch_progress_bar_into(
+                    detectors,
+                    out,
+                    leave_progress_bar_on_finish,
+                ),
+            }
+        })
     }
 
     #[pyo3(signature = (detectors, parallel=false, progress_bar=true, leave_progress_bar_on_finish=false))]
     pub fn decode_detailed_batch(
-        &mut self,
+        &self,
+        py: Python<'_>,
         detectors: PyReadonlyArray2<'_, Bit>,
         parallel: bool,
         progress_bar: bool,
         leave_progress_bar_on_finish: bool,
     ) -> Vec<DecodeResult> {
-        let results = match (parallel, progress_bar) {
-            (false, false) => self.inner.decode_detailed_batch(detectors.as_array()),
-            (true, false) => self.inner.par_decode_detailed_batch(detectors.as_array()),
-            (false, true) => self.inner.decode_detailed_batch_progress_bar(
-                detectors.as_array(),
-                leave_progress_bar_on_finish,
-            ),
-            (true, true) => self.inner.par_decode_detailed_batch_progress_bar(
-                detectors.as_array(),
-                leave_progress_bar_on_finish,
-            ),
-        };
+        let detectors = detectors.as_array();
+        let results = py.detach(|| {
+            let mut inner = self.lock();
+            match (parallel, progress_bar) {
+                (false, false) => inner.decode_detailed_batch(detectors),
+                (true, false) => inner.par_decode_detailed_batch(detectors),
+                (false, true) => inner
+                    .decode_detailed_batch_progress_bar(detectors, leave_progress_bar_on_finish),
+                (true, true) => inner.par_decode_detailed_batch_progress_bar(
+                    detectors,
+                    leave_progress_bar_on_finish,
+                ),
+            }
+        });
         results.into_iter().map(DecodeResult::new).collect()
     }
 
-    #[pyo3(signature = (detectors, parallel=false, progress_bar=true, leave_progress_bar_on_finish=false))]
+    #[pyo3(signature = (detectors, parallel=false, out=None))]
+    pub fn decode_packed_batch<'py>(
+        &self,
+        py: Python<'py>,
+        detectors: PyReadonlyArray2<'_, Word>,
+        parallel: bool,
+        out: Option<Bound<'py, PyArray2<Word>>>,
+    ) -> PyResult<Bound<'py, PyArray2<Word>>> {
+        let detectors =
+            check_batch_width(detectors.as_array(), num_words(self.check_matrix.rows()))?;
+        let shape = (detectors.nrows(), num_words(self.check_matrix.cols()));
+        write_batch_out(py, out, shape, |out| {
+            let mut inner = self.lock();
+            match parallel {
+                false => inner.decode_packed_batch_into(detectors, out),
+                true => inner.par_decode_packed_batch_into(detectors, out),
+            }
+        })
+    }
+
+    #[pyo3(signature = (detectors, parallel=false, out=None))]
+    pub fn decode_observables_packed_batch<'py>(
+        &self,
+        py: Python<'py>,
+        detectors: PyReadonlyArray2<'_, Word>,
+        parallel: bool,
+        out: Option<Bound<'py, PyArray2<Word>>>,
+    ) -> PyResult<Bound<'py, PyArray2<Word>>> {
+        let detectors =
+            check_batch_width(detectors.as_array(), num_words(self.check_matrix.rows()))?;
+        let shape = (detectors.nrows(), num_words(self.num_observables));
+        write_batch_out(py, out, shape, |out| {
+            let mut inner = self.lock();
+            match parallel {
+                false => inner.decode_observables_packed_batch_into(detectors, out),
+                true => inner.par_decode_observables_packed_batch_into(detectors, out),
+            }
+        })
+    }
+
+    /// Decode bit-packed `uint8` detectors, as sampled by stim with
+    /// `bit_packed=True` or packed by `np.packbits(bits, axis=1,
+    /// bitorder="little")`, into bit-packed observables in the same layout.
+    /// The biases are added to the detectors and observables while packing.
+    #[pyo3(signature = (detectors, syndrome_bias=None, observables_bias=None, parallel=false, out=None))]
+    pub fn decode_observables_bytes_batch<'py>(
+        &self,
+        py: Python<'py>,
+        detectors: PyReadonlyArray2<'_, u8>,
+        syndrome_bias: Option<PyReadonlyArray1<'_, Bit>>,
+        observables_bias: Option<PyReadonlyArray1<'_, Bit>>,
+        parallel: bool,
+        out: Option<Bound<'py, PyArray2<u8>>>,
+    ) -> PyResult<Bound<'py, PyArray2<u8>>> {
+        let num_detectors = self.check_matrix.rows();
+        let num_observables = self.num_observables;
+        let detectors = detectors.as_array();
+        if detectors.ncols() != num_bytes(num_detectors) {
+            return Err(pyo3::exceptions::PyValueError::new_err(format!(
+                "Expected {} bytes per shot for {num_detectors} detectors, got {}",
+                num_bytes(num_detectors),
+                detectors.ncols()
+            )));
+        }
+        let syndrome_bias = syndrome_bias.as_ref().map(|bias| bias.as_array());
+        let observables_bias = observables_bias.as_ref().map(|bias| bias.as_array());
+        for (name, bias, len) in [
+            ("syndrome_bias", syndrome_bias, num_detectors),
+            ("observables_bias", observables_bias, num_observables),
+        ] {
+            if let Some(bias) = bias {
+                if bias.len() != len {
+                    return Err(pyo3::exceptions::PyValueError::new_err(format!(
+                        "Expected {name} of length {len}, got {}",
+                        bias.len()
+                    )));
+                }
+            }
+        }
+        let shape = (detectors.nrows(), num_bytes(num_observables));
+        write_batch_out(py, out, shape, |out| {
+            let mut inner = self.lock();
+            match parallel {
+                false => inner.decode_observables_bytes_batch_into(
+                    detectors,
+                    syndrome_bias,
+                    observables_bias,
+                    out,
+                ),
+                true => inner.par_decode_observables_bytes_batch_into(
+                    detectors,
+                    syndrome_bias,
+                    observables_bias,
+                    out,
+                ),
+            }
+        })
+    }
+
+    /// Compute the observables of every row of a batch of errors, such as
+    /// stored decodings, without decoding.
+    #[pyo3(signature = (errors, parallel=false, out=None))]
+    pub fn compute_observables_batch<'py>(
+        &self,
+        py: Python<'py>,
+        errors: PyReadonlyArray2<'_, Bit>,
+        parallel: bool,
+        out: Option<Bound<'py, PyArray2<Bit>>>,
+    ) -> PyResult<Bound<'py, PyArray2<Bit>>> {
+        let errors = check_batch_width(errors.as_array(), self.check_matrix.cols())?;
+        let shape = (errors.nrows(), self.num_observables);
+        write_batch_out(py, out, shape, |out| {
+            let inner = self.lock();
+            match parallel {
+                false => inner.compute_observables_batch_into(errors, out),
+                true => inner.par_compute_observables_batch_into(errors, out),
+            }
+        })
+    }
+
+    /// Compute the detectors of every row of a batch of errors.
+    #[pyo3(signature = (errors, parallel=false, out=None))]
+    pub fn get_detectors_batch<'py>(
+        &self,
+        py: Python<'py>,
+        errors: PyReadonlyArray2<'_, Bit>,
+        parallel: bool,
+        out: Option<Bound<'py, PyArray2<Bit>>>,
+    ) -> PyResult<Bound<'py, PyArray2<Bit>>> {
+        let errors = check_batch_width(errors.as_array(), self.check_matrix.cols())?;
+        let shape = (errors.nrows(), self.check_matrix.rows());
+        write_batch_out(py, out, shape, |out| {
+            let inner = self.lock();
+            match parallel {
+                false => inner.get_detectors_batch_into(errors, out),
+                true => inner.par_get_detectors_batch_into(errors, out),
+            }
+        })
+    }
+
+    #[pyo3(signature = (errors, parallel=false, out=None))]
+    pub fn compute_observables_packed_batch<'py>(
+        &self,
+        py: Python<'py>,
+        errors: PyReadonlyArray2<'_, Word>,
+        parallel: bool,
+        out: Option<Bound<'py, PyArray2<Word>>>,
+    ) -> PyResult<Bound<'py, PyArray2<Word>>> {
+        let errors = check_batch_width(errors.as_array(), num_words(self.check_matrix.cols()))?;
+        let shape = (errors.nrows(), num_words(self.num_observables));
+        write_batch_out(py, out, shape, |out| {
+            let inner = self.lock();
+            match parallel {
+                false => inner.compute_observables_packed_batch_into(errors, out),
+                true => inner.par_compute_observables_packed_batch_into(errors, out),
+            }
+        })
+    }
+
+    #[pyo3(signature = (errors, parallel=false, out=None))]
+    pub fn get_detectors_packed_batch<'py>(
+        &self,
+        py: Python<'py>,
+        errors: PyReadonlyArray2<'_, Word>,
+        parallel: bool,
+        out: Option<Bound<'py, PyArray2<Word>>>,
+    ) -> PyResult<Bound<'py, PyArray2<Word>>> {
+        let errors = check_batch_width(errors.as_array(), num_words(self.check_matrix.cols()))?;
+        let shape = (errors.nrows(), num_words(self.check_matrix.rows()));
+        write_batch_out(py, out, shape, |out| {
+            let inner = self.lock();
+            match parallel {
+                false => inner.get_detectors_packed_batch_into(errors, out),
+                true => inner.par_get_detectors_packed_batch_into(errors, out),
+            }
+        })
+    }
+
+    /// Decode a stream of syndromes chunk by chunk, returning an iterator
+    /// over the observables of every chunk. `source` is either an iterable
+    /// of detector arrays, or with `num_shots` a callable sampling the given
+    /// number of shots such as `stim.CompiledDetectorSampler.sample`. At
+    /// most `chunk_size` shots are decoded at once, and the next chunk is
+    /// produced while the current one is decoded.
+    #[pyo3(signature = (source, num_shots=None, chunk_size=16384, parallel=true))]
+    pub fn decode_observables_stream(
+        slf: Bound<'_, Self>,
+        source: Bound<'_, PyAny>,
+        num_shots: Option<usize>,
+        chunk_size: usize,
+        parallel: bool,
+    ) -> PyResult<ObservableDecodeStream> {
+        if chunk_size == 0 {
+            return Err(pyo3::exceptions::PyValueError::new_err(
+                "chunk_size must be positive",
+            ));
+        }
+        let source = match num_shots {
+            Some(num_shots) => ShotSource::Sampler {
+                sample: source.unbind(),
+                remaining: num_shots,
+            },
+            None => ShotSource::Chunks(source.try_iter()?.unbind()),
+        };
+        Ok(ObservableDecodeStream {
+            runner: slf.unbind(),
+            source,
+            chunk_size,
+            parallel,
+            pending: VecDeque::new(),
+            error: None,
+        })
+    }
+
+    #[pyo3(signature = (detectors, parallel=false, progress_bar=true, leave_progress_bar_on_finish=false, out=None))]
     pub fn decode_observables_batch<'py>(
-        &mut self,
+        &self,
         py: Python<'py>,
         detectors: PyReadonlyArray2<'_, Bit>,
         parallel: bool,
         progress_bar: bool,
         leave_progress_bar_on_finish: bool,
-    ) -> Bound<'py, PyArray2<Bit>> {
-        let results = match (parallel, progress_bar) {
-            (false, false) => self.inner.decode_observables_batch(detectors.as_array()),
-            (true, false) => self
-                .inner
-                .par_decode_observables_batch(detectors.as_array()),
-            (false, true) => self.inner.decode_observables_batch_progress_bar(
-                detectors.as_array(),
-                leave_progress_bar_on_finish,
-            ),
-            (true, true) => self.inner.par_decode_observables_batch_progress_bar(
-                detectors.as_array(),
-                leave_progress_bar_on_finish,
-            ),
-        };
-        results.into_pyarray(py)
+        out: Option<Bound<'py, PyArray2<Bit>>>,
+    ) -> PyResult<Bound<'py, PyArray2<Bit>>> {
+        let detectors = detectors.as_array();
+        let shape = (detectors.nrows(), self.num_observables);
+        write_batch_out(py, out, shape, |out| {
+            let mut inner = self.lock();
+            match (parallel, progress_bar) {
+                (false, false) => inner.decode_observables_batch_into(detectors, out),
+                (true, false) => inner.par_decode_observables_batch_into(detectors, out),
+                (false, true) => inner.decode_observables_batch_progress_bar_into(
+                    detectors,
+                    out,
+                    leave_progress_bar_on_finish,
+                ),
+                (true, true) => inner.par_decode_observables_batch_progress_bar_into(
+                    detectors,
+                    out,
+                    leave_progress_bar_on_finish,
+                ),
+            }
+        })
     }
 
-    #[pyo3(signature = (errors, parallel=false, progress_bar=true, leave_progress_bar_on_finish=false))]
+    #[pyo3(signature = (errors, parallel=false, progress_bar=true, leave_progress_bar_on_finish=false, out=None))]
     pub fn from_errors_decode_observables_batch<'py>(
-        &mut self,
+        &self,
         py: Python<'py>,
         errors: PyReadonlyArray2<'_, Bit>,
         parallel: bool,
         progress_bar: bool,
         leave_progress_bar_on_finish: bool,
-    ) -> Bound<'py, PyArray2<Bit>> {
-        let results = match (parallel, progress_bar) {
-            (false, false) => self
-                .inner
-                .from_errors_decode_observables_batch(errors.as_array()),
-            (true, false) => self
-                .inner
-                .par_from_errors_decode_observables_batch(errors.as_array()),
-            (false, true) => self
-                .inner
-                .from_errors_decode_observables_batch_progress_bar(
-                    errors.as_array(),
+        out: Option<Bound<'py, PyArray2<Bit>>>,
+    ) -> PyResult<Bound<'py, PyArray2<Bit>>> {
+        let errors = errors.as_array();
+        let shape = (errors.nrows(), self.num_observables);
+        write_batch_out(py, out, shape, |out| {
+            let mut inner = self.lock();
+            match (parallel, progress_bar) {
+                (false, false) => inner.from_errors_decode_observables_batch_into(errors, out),
+                (true, false) => inner.par_from_errors_decode_observables_batch_into(errors, out),
+                (false, true) => inner.from_errors_decode_observables_batch_progress_bar_into(
+                    errors,
+                    out,
                     leave_progress_bar_on_finish,
                 ),
-            (true, true) => self
-                .inner
-                .par_from_errors_decode_observables_batch_progress_bar(
-                    errors.as_array(),
+                (true, true) => inner.par_from_errors_decode_observables_batch_progress_bar_into(
+                    errors,
+                    out,
                     leave_progress_bar_on_finish,
                 ),
-        };
-
-        results.into_pyarray(py)
+            }
+        })
     }
 
     #[pyo3(signature = (detectors, parallel=false, progress_bar=true, leave_progress_bar_on_finish=false))]
     pub fn decode_observables_detailed_batch(
-        &mut self,
+        &self,
+        py: Python<'_>,
         detectors: PyReadonlyArray2<'_, Bit>,
         parallel: bool,
         progress_bar: bool,
         leave_progress_bar_on_finish: bool,
     ) -> Vec<ObservableDecodeResult> {
-        let results = match (parallel, progress_bar) {
-            (false, false) => self
-                .inner
-                .decode_observables_detailed_batch(detectors.as_array()),
-            (true, false) => self
-                .inner
-                .par_decode_observables_detailed_batch(detectors.as_array()),
-            (false, true) => self.inner.decode_observables_detailed_batch_progress_bar(
-                detectors.as_array(),
-                leave_progress_bar_on_finish,
-            ),
-            (true, true) => self
-                .inner
-                .par_decode_observables_detailed_batch_progress_bar(
-                    detectors.as_array(),
+        let detectors = detectors.as_array();
+        let results = py.detach(|| {
+            let mut inner = self.lock();
+            match (parallel, progress_bar) {
+                (false, false) => inner.decode_observables_detailed_batch(detectors),
+                (true, false) => inner.par_decode_observables_detailed_batch(detectors),
+                (false, true) => inner.decode_observables_detailed_batch_progress_bar(
+                    detectors,
                     leave_progress_bar_on_finish,
                 ),
-        };
+                (true, true) => inner.par_decode_observables_detailed_batch_progress_bar(
+                    detectors,
+                    leave_progress_bar_on_finish,
+                ),
+            }
+        });
         results
             .into_iter()
             .map(ObservableDecodeResult::new)
@@ -294,32 +803,30 @@ impl ObservableDecoderRunner {
 
     #[pyo3(signature = (errors, parallel=false, progress_bar=true, leave_progress_bar_on_finish=false))]
     pub fn from_errors_decode_observables_detailed_batch(
-        &mut self,
+        &self,
+        py: Python<'_>,
         errors: PyReadonlyArray2<'_, Bit>,
         parallel: bool,
         progress_bar: bool,
         leave_progress_bar_on_finish: bool,
     ) -> Vec<ObservableDecodeResult> {
-        let results = match (parallel, progress_bar) {
-            (false, false) => self
-                .inner
-                .from_errors_decode_observables_detailed_batch(errors.as_array()),
-            (true, false) => self
-                .inner
-                .par_from_errors_decode_observables_detailed_batch(errors.as_array()),
-            (false, true) => self
-                .inner
-                .from_errors_decode_observables_detailed_batch_progress_bar(
-                    errors.as_array(),
-                    leave_progress_bar_on_finish,
-                ),
-            (true, true) => self
-                .inner
-                .par_from_errors_decode_observables_detailed_batch_progress_bar(
-                    errors.as_array(),
+        let errors = errors.as_array();
+        let results = py.detach(|| {
+            let mut inner = self.lock();
+            match (parallel, progress_bar) {
+                (false, false) => inner.from_errors_decode_observables_detailed_batch(errors),
+                (true, false) => inner.par_from_errors_decode_observables_detailed_batch(errors),
+                (false, true) => inner.from_errors_decode_observables_detailed_batch_progress_bar(
+                    errors,
                     leave_progress_bar_on_finish,
                 ),
-        };
+                (true, true) => inner
+                    .par_from_errors_decode_observables_detailed_batch_progress_bar(
+                        errors,
+                        leave_progress_bar_on_finish,
+                    ),
+            }
+        });
 
         results
             .into_iter()
@@ -329,16 +836,20 @@ impl ObservableDecoderRunner {
 }
 
 /// A Python module implemented in Rust.
-#[pymodule]
+#[pymodule(gil_used = false)]
 pub fn _observable_decoder<'py>(_py: Python<'py>, m: &Bound<'py, PyModule>) -> PyResult<()> {
     m.add_class::<ObservableDecoderRunner>()?;
     m.add_class::<ObservableDecodeResult>()?;
+    m.add_class::<SyndromeCacheStats>()?;
+    m.add_class::<LookupTableStats>()?;
+    m.add_class::<ObservableDecodeStream>()?;
     Ok(())
 }
 
 pub fn init_observable_decoder<'py>(_py: Python<'py>, m: &Bound<'py, PyModule>) -> PyResult<()> {
     // Workaround for https://github.com/PyO3/pyo3/issues/759
     let decoder_module = PyModule::new(_py, "_relay_bp._observable_decoder")?;
+    decoder_module.gil_used(false)?;
 
     _observable_decoder(_py, &decoder_module)?;
 
@@ -12,3 +12,4 @@
 from .bp import *
 from .decoder import *
 from .observable_decoder import *
+from .async_decoder import *
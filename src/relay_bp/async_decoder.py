@@ -0,0 +1,183 @@
+# (C) Copyright IBM 2025
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""Asyncio front end micro-batching decode requests."""
+
+from __future__ import annotations
+
+__all__ = ["AsyncObservableDecoder"]
+
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import functools
+
+import numpy as np
+
+from .observable_decoder import ObservableDecoderRunner
+
+
+class _MicroBatcher:
+    """Collects the requests of one batch method into micro-batches."""
+
+    def __init__(self, owner: AsyncObservableDecoder, method: str):
+        self.owner = owner
+        self.method = method
+        self.pending: deque[tuple[np.ndarray, asyncio.Future]] = deque()
+        self.num_pending_shots = 0
+        self.wakeup: asyncio.Event | None = None
+        self.full: asyncio.Event | None = None
+        self.task: asyncio.Task | None = None
+
+    async def submit(self, detectors: np.ndarray) -> np.ndarray:
+        loop = asyncio.get_running_loop()
+        if self.task is None or self.task.done():
+            # Events are bound to the loop of the batching task.
+            self.wakeup = asyncio.Event()
+            self.full = asyncio.Event()
+            self.task = loop.create_task(self.run(self.wakeup, self.full))
+        assert self.wakeup is not None and self.full is not None
+        future = loop.create_future()
+        self.pending.append((detectors, future))
+        self.num_pending_shots += len(detectors)
+        if self.num_pending_shots >= self.owner.max_batch_size:
+            self.full.set()
+        self.wakeup.set()
+        return await future
+
+    def take_batch(
+        self, full: asyncio.Event
+    ) -> list[tuple[np.ndarray, asyncio.Future]]:
+        batch = []
+        num_shots = 0
+        while self.pending and num_shots < self.owner.max_batch_size:
+            detectors, future = self.pending.popleft()
+            self.num_pending_shots -= len(detectors)
+            # Skip requests cancelled while waiting.
+            if not future.done():
+                batch.append((detectors, future))
+                num_shots += len(detectors)
+        if self.num_pending_shots < self.owner.max_batch_size:
+            full.clear()
+        return batch
+
+    async def run(self, wakeup: asyncio.Event, full: asyncio.Event):
+        loop = asyncio.get_running_loop()
+        decode_batch = getattr(self.owner.runner, self.method)
+        while True:
+            await wakeup.wait()
+            wakeup.clear()
+            # Give concurrent requests a short window to join the batch.
+            if not full.is_set():
+                try:
+                    await asyncio.wait_for(full.wait(), self.owner.max_delay)
+                except asyncio.TimeoutError:
+                    pass
+            # Requests arriving while a batch decodes join the next one.
+            while batch := self.take_batch(full):
+                try:
+                    detectors = np.concatenate([detectors for detectors, _ in batch])
+                    results = await loop.run_in_executor(
+                        self.owner.executor,
+                        functools.partial(
+                            decode_batch,
+                            detectors,
+                            parallel=self.owner.parallel,
+                            progress_bar=False,
+                        ),
+                    )
+                except asyncio.CancelledError:
+                    # Closed while the batch decodes, see `close`.
+                    for _, future in batch:
+                        future.cancel()
+                    raise
+                except Exception as error:  # pylint: disable=broad-except
+                    for _, future in batch:
+                        if not future.done():
+                            future.set_exception(error)
+                    continue
+                start = 0
+                for shots, future in batch:
+                    if not future.done():
+                        future.set_result(results[start : start + len(shots)])
+                    start += len(shots)
+
+    def close(self):
+        """Cancel the batching task and the requests waiting for a batch."""
+        if self.task is not None:
+            self.task.cancel()
+        while self.pending:
+            _, future = self.pending.popleft()
+            future.cancel()
+        self.num_pending_shots = 0
+
+
+class AsyncObservableDecoder:
+    """Asyncio front end to an `ObservableDecoderRunner`.
+
+    Requests awaited concurrently are collected for up to `max_delay` seconds,
+    or until `max_batch_size` shots are pending, and decoded together by the
+    runner's batch methods. Batches are decoded one at a time on a background
+    thread that releases the GIL, so the event loop keeps running, and
+    requests arriving meanwhile are batched for the next decode.
+    """
+
+    def __init__(
+        self,
+        runner: ObservableDecoderRunner,
+        max_batch_size: int = 4096,
+        max_delay: float = 0.0005,
+        parallel: bool = True,
+    ):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be positive")
+        if max_delay < 0:
+            raise ValueError("max_delay must be non-negative")
+        self.runner = runner
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self.parallel = parallel
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="relay_bp")
+        self._observables = _MicroBatcher(self, "decode_observables_batch")
+        self._decodings = _MicroBatcher(self, "decode_batch")
+
+    async def decode_observables(self, detectors: np.ndarray) -> np.ndarray:
+        """Decode the observables of a single syndrome."""
+        detectors = np.asarray(detectors, dtype=np.uint8)
+        return (await self._observables.submit(detectors[np.newaxis]))[0]
+
+    async def decode_observables_batch(self, detectors: np.ndarray) -> np.ndarray:
+        """Decode the observables of a batch of syndromes, one per row."""
+        return await self._observables.submit(np.asarray(detectors, dtype=np.uint8))
+
+    async def decode(self, detectors: np.ndarray) -> np.ndarray:
+        """Decode the errors of a single syndrome."""
+        detectors = np.asarray(detectors, dtype=np.uint8)
+        return (await self._decodings.submit(detectors[np.newaxis]))[0]
+
+    async def decode_batch(self, detectors: np.ndarray) -> np.ndarray:
+        """Decode the errors of a batch of syndromes, one per row."""
+        return await self._decodings.submit(np.asarray(detectors, dtype=np.uint8))
+
+    def close(self):
+        """Cancel the batching tasks and shut down the decoding thread.
+
+        Requests that have not been answered yet, including those of the batch
+        being decoded, are cancelled.
+        """
+        for batcher in (self._observables, self._decodings):
+            batcher.close()
+        self.executor.shutdown(wait=False)
+
+    async def __aenter__(self) -> AsyncObservableDecoder:
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
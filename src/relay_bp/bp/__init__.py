@@ -14,8 +14,11 @@ from __future__ import annotations
 __all__ = [
     "RelayDecoderF32",
     "RelayDecoderF64",
+    "RelayDecoderI8",
+    "RelayDecoderI16",
     "RelayDecoderI32",
     "RelayDecoderI64",
+    "RelayTelemetry",
     "MinSumBPDecoderF32",
     "MinSumBPDecoderF64",
     "MinSumBPDecoderI8",
@@ -23,14 +26,18 @@ __all__ = [
     "MinSumBPDecoderI32",
     "MinSumBPDecoderI64",
     "MinSumBPDecoderFixed",
+    "calibrate_integer_scaling",
 ]
 
 from .._relay_bp import _bp  # pylint: disable=E0611
 
 RelayDecoderF32 = _bp.RelayDecoderF32
 RelayDecoderF64 = _bp.RelayDecoderF64
+RelayDecoderI8 = _bp.RelayDecoderI8
+RelayDecoderI16 = _bp.RelayDecoderI16
 RelayDecoderI32 = _bp.RelayDecoderI32
 RelayDecoderI64 = _bp.RelayDecoderI64
+RelayTelemetry = _bp.RelayTelemetry
 MinSumBPDecoderF32 = _bp.MinSumBPDecoderF32
 MinSumBPDecoderF64 = _bp.MinSumBPDecoderF64
 MinSumBPDecoderI8 = _bp.MinSumBPDecoderI8
@@ -38,3 +45,4 @@ MinSumBPDecoderI16 = _bp.MinSumBPDecoderI16
 MinSumBPDecoderI32 = _bp.MinSumBPDecoderI32
 MinSumBPDecoderI64 = _bp.MinSumBPDecoderI64
 MinSumBPDecoderFixed = _bp.MinSumBPDecoderFixed
+calibrate_integer_scaling = _bp.calibrate_integer_scaling
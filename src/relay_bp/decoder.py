@@ -13,8 +13,12 @@ from __future__ import annotations
 
 __all__ = [
     "DecodeResult",
+    "pack_bits",
+    "unpack_bits",
 ]
 
 from ._relay_bp import _decoder  # pylint: disable=E0611
 
 DecodeResult = _decoder.DecodeResult
+pack_bits = _decoder.pack_bits
+unpack_bits = _decoder.unpack_bits
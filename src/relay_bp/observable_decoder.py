@@ -11,9 +11,18 @@
 
 from __future__ import annotations
 
-__all__ = ["ObservableDecoderRunner", "ObservableDecodeResult"]
+__all__ = [
+    "ObservableDecoderRunner",
+    "ObservableDecodeResult",
+    "ObservableDecodeStream",
+    "SyndromeCacheStats",
+    "LookupTableStats",
+]
 
 from ._relay_bp import _observable_decoder
 
 ObservableDecoderRunner = _observable_decoder.ObservableDecoderRunner
 ObservableDecodeResult = _observable_decoder.ObservableDecodeResult
+ObservableDecodeStream = _observable_decoder.ObservableDecodeStream
+SyndromeCacheStats = _observable_decoder.SyndromeCacheStats
+LookupTableStats = _observable_decoder.LookupTableStats
@@ -42,30 +42,67 @@ class SinterCompiledDecoder_BP(CompiledDecoder):
         *,
         bit_packed_detection_event_data: "np.ndarray",
     ) -> "np.ndarray":
-
-        num_detectors = self.check_matrices.check_matrix.shape[0]
-        syndromes = np.unpackbits(
+        return decode_bit_packed(
+            self.observable_decoder,
+            self.check_matrices,
             bit_packed_detection_event_data,
-            bitorder="little",
-            axis=1,
-            count=num_detectors,
-        ).astype(np.uint8)
-
-        if self.check_matrices.syndrome_bias is not None:
-            syndromes = (syndromes + self.check_matrices.syndrome_bias) % 2
-
-        predictions = self.observable_decoder.decode_observables_batch(
-            syndromes,
             parallel=self.parallel,
-            progress_bar=self.show_progress,
+            show_progress=self.show_progress,
             leave_progress_bar_on_finish=self.leave_progress_bar_on_finish,
         )
 
-        if self.check_matrices.observables_bias is not None:
-            predictions = (predictions + self.check_matrices.observables_bias) % 2
 
-        outputs = np.packbits(predictions, axis=1, bitorder="little")
-        return outputs
+def decode_bit_packed(
+    observable_decoder: relay_bp.ObservableDecoderRunner,
+    check_matrices: CheckMatrices,
+    bit_packed_detectors: np.ndarray,
+    parallel: bool = False,
+    show_progress: bool = False,
+    leave_progress_bar_on_finish: bool = False,
+) -> np.ndarray:
+    """Decode bit-packed detection events into bit-packed observable predictions.
+
+    Without a progress bar the events are unpacked, biased, decoded and packed
+    again in Rust without intermediate arrays.
+    """
+    syndrome_bias = _as_bits(check_matrices.syndrome_bias)
+    observables_bias = _as_bits(check_matrices.observables_bias)
+    if not show_progress:
+        return observable_decoder.decode_observables_bytes_batch(
+            np.ascontiguousarray(bit_packed_detectors, dtype=np.uint8),
+            syndrome_bias=syndrome_bias,
+            observables_bias=observables_bias,
+            parallel=parallel,
+        )
+
+    num_detectors = check_matrices.check_matrix.shape[0]
+    syndromes = np.unpackbits(
+        bit_packed_detectors,
+        bitorder="little",
+        axis=1,
+        count=num_detectors,
+    ).astype(np.uint8)
+
+    if syndrome_bias is not None:
+        syndromes ^= syndrome_bias
+
+    predictions = observable_decoder.decode_observables_batch(
+        syndromes,
+        parallel=parallel,
+        progress_bar=show_progress,
+        leave_progress_bar_on_finish=leave_progress_bar_on_finish,
+    )
+
+    if observables_bias is not None:
+        predictions ^= observables_bias
+
+    return np.packbits(predictions, axis=1, bitorder="little")
+
+
+def _as_bits(bias: np.ndarray | None) -> np.ndarray | None:
+    if bias is None:
+        return None
+    return np.asarray(bias, dtype=np.uint8).reshape(-1)
 
 
 class SinterDecoder_BaseBP(Decoder):
@@ -77,9 +114,11 @@ class SinterDecoder_BaseBP(Decoder):
         threshold: float = 0.0,
         show_progress: bool = False,
         leave_progress_bar_on_finish: bool = False,
+        num_threads: int | None = None,
     ):
         f"""Class for decoding stim circuits with sinter and relay-bp."""
         self.parallel = parallel
+        self.num_threads = num_threads
         self.decomposed_hyperedges = decomposed_hyperedges
         self.prune_decided_errors = prune_decided_errors
         self.threshold = threshold
@@ -131,28 +170,24 @@ class SinterDecoder_BaseBP(Decoder):
 
         observable_decoder = self.build_observable_decoder(check_matrices)
 
-        syndromes = stim.read_shot_data_file(
+        bit_packed_detectors = stim.read_shot_data_file(
             path=dets_b8_in_path,
             format="b8",
             num_detectors=dem.num_detectors,
-            bit_packed=False,
-        ).astype(np.uint8)
-
-        if check_matrices.syndrome_bias is not None:
-            syndromes = (syndromes + check_matrices.syndrome_bias) % 2
+            bit_packed=True,
+        )
 
-        predictions = observable_decoder.decode_observables_batch(
-            syndromes,
+        predictions = decode_bit_packed(
+            observable_decoder,
+            check_matrices,
+            bit_packed_detectors,
             parallel=self.parallel,
-            progress_bar=self.show_progress,
+            show_progress=self.show_progress,
             leave_progress_bar_on_finish=self.leave_progress_bar_on_finish,
         )
 
-        if check_matrices.observables_bias is not None:
-            predictions = (predictions + check_matrices.observables_bias) % 2
-
         stim.write_shot_data_file(
-            data=np.packbits(predictions, axis=1, bitorder="little"),
+            data=predictions,
             path=obs_predictions_b8_out_path,
             format="b8",
             num_observables=dem.num_observables,
@@ -176,6 +211,8 @@ class SinterDecoder_RelayBP(SinterDecoder_BaseBP):
         decomposed_hyperedges: bool | None = None,
         prune_decided_errors: bool = True,
         threshold: float = 0.0,
+        num_threads: int | None = None,
+        schedule: str = "flooding",
     ):
         f"""Class for decoding stim circuits with sinter and relay-bp."""
         self.alpha = alpha
@@ -188,11 +225,13 @@ class SinterDecoder_RelayBP(SinterDecoder_BaseBP):
         self.stop_nconv = stop_nconv
         self.stopping_criterion = stopping_criterion
         self.logging = logging
+        self.schedule = schedule
         super().__init__(
             parallel=parallel,
             decomposed_hyperedges=decomposed_hyperedges,
             prune_decided_errors=prune_decided_errors,
             threshold=threshold,
+            num_threads=num_threads,
         )
 
     def build_observable_decoder(
@@ -212,12 +251,14 @@ class SinterDecoder_RelayBP(SinterDecoder_BaseBP):
             stop_nconv=self.stop_nconv,
             stopping_criterion=self.stopping_criterion,
             logging=self.logging,
+            schedule=self.schedule,
         )
 
         observable_decoder = relay_bp.ObservableDecoderRunner(
             decoder,
             check_matrices.observables_matrix,
             include_decode_result=False,
+            num_threads=self.num_threads,
         )
         return observable_decoder
 
@@ -232,16 +273,20 @@ class SinterDecoder_MemBP(SinterDecoder_BaseBP):
         decomposed_hyperedges: bool | None = None,
         prune_decided_errors: bool = True,
         threshold: float = 0.0,
+        num_threads: int | None = None,
+        schedule: str = "flooding",
     ):
         f"""Class for decoding stim circuits with sinter and mem-bp."""
         self.max_iter = max_iter
         self.alpha = alpha
         self.gamma0 = gamma0
+        self.schedule = schedule
         super().__init__(
             parallel=parallel,
             decomposed_hyperedges=decomposed_hyperedges,
             prune_decided_errors=prune_decided_errors,
             threshold=threshold,
+            num_threads=num_threads,
         )
 
     def build_observable_decoder(
@@ -254,12 +299,14 @@ class SinterDecoder_MemBP(SinterDecoder_BaseBP):
             max_iter=self.max_iter,
             alpha=None if self.alpha == 0.0 else self.alpha,
             gamma0=self.gamma0,
+            schedule=self.schedule,
         )
 
         observable_decoder = relay_bp.ObservableDecoderRunner(
             decoder,
             check_matrices.observables_matrix,
             include_decode_result=False,
+            num_threads=self.num_threads,
         )
         return observable_decoder
 
@@ -274,6 +321,7 @@ class SinterDecoder_MSLBP(SinterDecoder_BaseBP):
         decomposed_hyperedges: bool | None = None,
         prune_decided_errors: bool = True,
         threshold: float = 0.0,
+        num_threads: int | None = None,
     ):
         f"""Class for decoding stim circuits with sinter and relay-bp."""
         self.max_iter = max_iter
@@ -283,6 +331,7 @@ class SinterDecoder_MSLBP(SinterDecoder_BaseBP):
             decomposed_hyperedges=decomposed_hyperedges,
             prune_decided_errors=prune_decided_errors,
             threshold=threshold,
+            num_threads=num_threads,
         )
 
     def build_observable_decoder(
@@ -302,6 +351,7 @@ class SinterDecoder_MSLBP(SinterDecoder_BaseBP):
             decoder,
             check_matrices.observables_matrix,
             include_decode_result=False,
+            num_threads=self.num_threads,
         )
         return observable_decoder
 
@@ -8,6 +8,7 @@
 # copyright notice, and modified files need to carry a notice indicating
 # that they have been altered from the originals.
 import numpy as np
+import pytest
 
 import relay_bp
 
@@ -97,3 +98,21 @@ def test_decode_detailed_batch_int(repetition_code_config_int):
     result2 = results[2]
     assert result2.success
     assert np.all(result2.decoding == np.array([0, 0, 1]))
+
+
+def test_decode_detailed_batch_layered(repetition_code_config):
+    decoder = relay_bp.MinSumBPDecoderF32(**repetition_code_config, schedule="layered")
+
+    detectors = np.array([[1, 0], [1, 1], [0, 1]], dtype=np.uint8)
+
+    results = decoder.decode_detailed_batch(detectors)
+
+    assert all(result.success for result in results)
+    assert np.all(results[0].decoding == np.array([1, 0, 0]))
+    assert np.all(results[1].decoding == np.array([0, 1, 0]))
+    assert np.all(results[2].decoding == np.array([0, 0, 1]))
+
+
+def test_invalid_schedule(repetition_code_config):
+    with pytest.raises(ValueError):
+        relay_bp.MinSumBPDecoderF32(**repetition_code_config, schedule="unknown")
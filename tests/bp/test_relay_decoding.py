@@ -8,6 +8,7 @@
 # copyright notice, and modified files need to carry a notice indicating
 # that they have been altered from the originals.
 import numpy as np
+import pytest
 
 import relay_bp
 
@@ -60,3 +61,346 @@ def test_decode_detailed_batch(repetition_code_config):
     result2 = results[2]
     assert result2.success
     assert np.all(result2.decoding == np.array([0, 0, 1]))
+
+
+def test_decode_detailed_batch_layered(repetition_code_config):
+    repetition_code_config.pop("max_iter", None)
+    decoder = relay_bp.RelayDecoderF32(
+        **repetition_code_config,
+        pre_iter=120,
+        num_sets=40,
+        set_max_iter=60,
+        stop_nconv=3,
+        schedule="layered",
+    )
+
+    detectors = np.array([[1, 0], [1, 1], [0, 1]], dtype=np.uint8)
+
+    results = decoder.decode_detailed_batch(detectors)
+
+    assert all(result.success for result in results)
+    assert np.all(results[0].decoding == np.array([1, 0, 0]))
+    assert np.all(results[1].decoding == np.array([0, 1, 0]))
+    assert np.all(results[2].decoding == np.array([0, 0, 1]))
+
+
+def test_decode_detailed_batch_stall_detection(repetition_code_error_priors):
+    # No error flips the last detector, so no leg converges and the hard
+    # decision never leaves zero.
+    config = dict(
+        check_matrix=np.array([[1, 1, 0], [0, 1, 1], [0, 0, 0]], dtype=np.uint8),
+        error_priors=repetition_code_error_priors,
+        alpha=1.0,
+        pre_iter=20,
+        num_sets=10,
+        set_max_iter=20,
+        stop_nconv=3,
+        logging=True,
+    )
+    detectors = np.array([0, 0, 1], dtype=np.uint8)
+
+    result = relay_bp.RelayDecoderF32(**config).decode_detailed(detectors)
+    assert not result.success
+    assert result.iterations == 20 + 10 * 20
+
+    decoder = relay_bp.RelayDecoderF32(
+        **config,
+        stall_detection=True,
+        stall_window=5,
+        stall_max_period=2,
+    )
+
+    # The pre-iteration stalls once its hard decision has repeated for the
+    # window, and every leg after it on its first iteration as it repeats
+    # the decision the pre-iteration stalled on.
+    result = decoder.decode_detailed(detectors)
+    assert not result.success
+    assert result.iterations == 6 + 10
+    telemetry = decoder.telemetry()
+    assert telemetry.leg_iterations[0] == 6
+    assert np.all(telemetry.leg_iterations[1:] == 1)
+
+    results = decoder.decode_detailed_batch(np.array([detectors] * 3))
+    assert all(not result.success for result in results)
+    assert all(result.iterations == 6 + 10 for result in results)
+
+
+def test_decode_detailed_parallel_legs(long_repetition_code):
+    config, errors, detectors = long_repetition_code
+    num_workers = 4
+    decoder = relay_bp.RelayDecoderF32(
+        **config,
+        pre_iter=1,
+        num_sets=40,
+        set_max_iter=60,
+        stop_nconv=3,
+        parallel_legs=True,
+        parallel_legs_workers=num_workers,
+        logging=True,
+    )
+
+    for error, shot in zip(errors, detectors):
+        decoder.reset_telemetry()
+        result = decoder.decode_detailed(shot)
+        assert result.success
+        assert np.all(result.decoding == error)
+
+        # The pre-iteration does not converge, so the legs run. The workers
+        # stop together once three legs have converged, so only the legs
+        # already running when the last of them converged may add to them.
+        telemetry = decoder.telemetry()
+        assert telemetry.leg_converged[0] == 0
+        assert 3 <= telemetry.leg_converged.sum() <= 3 + num_workers - 1
+        assert telemetry.leg_runs[1:].sum() < 40
+        assert result.iterations == telemetry.leg_iterations.sum()
+
+
+def test_decode_detailed_batch_precomputed_gammas(long_repetition_code):
+    config, errors, detectors = long_repetition_code
+    config = dict(
+        config,
+        pre_iter=1,
+        num_sets=40,
+        set_max_iter=60,
+        stop_nconv=3,
+        precompute_gammas=True,
+    )
+    decoder = relay_bp.RelayDecoderF32(**config)
+
+    results = [decoder.decode_detailed(shot) for shot in detectors]
+    assert all(result.success for result in results)
+    assert all(
+        np.all(result.decoding == error) for result, error in zip(results, errors)
+    )
+    assert all(result.iterations > 1 for result in results)
+
+    def summary(results):
+        return [(result.decoding.tolist(), result.iterations) for result in results]
+
+    # Every shot sees the same gammas, so its result does not depend on the
+    # shots decoded before it, on the decoder or on the number of threads.
+    reversed_results = [decoder.decode_detailed(shot) for shot in detectors[::-1]]
+    assert summary(reversed_results[::-1]) == summary(results)
+    fresh_results = [
+        relay_bp.RelayDecoderF32(**config).decode_detailed(shot) for shot in detectors
+    ]
+    assert summary(fresh_results) == summary(results)
+
+    batch = np.concatenate([detectors] * 20)
+    batch_results = summary(decoder.decode_detailed_batch(batch))
+    assert batch_results == batch_results[: len(detectors)] * 20
+    for num_threads in [1, 4]:
+        runner = relay_bp.ObservableDecoderRunner(
+            relay_bp.RelayDecoderF32(**config),
+            np.eye(1, len(errors[0]), dtype=np.uint8),
+            include_decode_result=True,
+            num_threads=num_threads,
+        )
+        runner_results = runner.decode_observables_detailed_batch(
+            batch, parallel=True, progress_bar=False
+        )
+        assert [
+            (
+                result.physical_decode_result.decoding.tolist(),
+                result.physical_decode_result.iterations,
+            )
+            for result in runner_results
+        ] == batch_results
+
+
+def test_decode_detailed_batch_telemetry(repetition_code_config, tmp_path):
+    repetition_code_config.pop("max_iter", None)
+    decoder = relay_bp.RelayDecoderF32(
+        **repetition_code_config,
+        pre_iter=1,
+        num_sets=40,
+        set_max_iter=60,
+        stop_nconv=3,
+        logging=True,
+    )
+
+    detectors = np.array([[1, 0], [1, 1], [0, 1]], dtype=np.uint8)
+
+    results = decoder.decode_detailed_batch(detectors)
+
+    telemetry = decoder.telemetry()
+    assert telemetry.num_shots == 3
+    assert telemetry.leg_runs.shape == (41,)
+    assert telemetry.leg_runs[0] == 3
+    assert telemetry.leg_iterations.sum() == sum(
+        result.iterations for result in results
+    )
+    assert telemetry.leg_converged.sum() == telemetry.converged_iterations.sum()
+
+    path = tmp_path / "telemetry.npz"
+    telemetry.save(str(path))
+    with np.load(path) as saved:
+        assert np.all(saved["leg_runs"] == telemetry.leg_runs)
+
+    decoder.reset_telemetry()
+    assert decoder.telemetry().num_shots == 0
+    assert relay_bp.RelayDecoderF32(**repetition_code_config).telemetry() is None
+
+
+def test_decode_detailed_batch_budget(repetition_code_config):
+    repetition_code_config.pop("max_iter", None)
+    decoder = relay_bp.RelayDecoderF32(
+        **repetition_code_config,
+        pre_iter=60,
+        num_sets=40,
+        set_max_iter=60,
+        stop_nconv=3,
+        budget_deadline=0.0,
+    )
+
+    detectors = np.array([[1, 0], [1, 1], [0, 1]], dtype=np.uint8)
+
+    results = decoder.decode_detailed_batch(detectors)
+
+    # A deadline that has already passed stops every shot after one iteration.
+    for result in results:
+        assert result.iterations == 1
+        assert result.budget_exhausted == (not result.success)
+
+    decoder = relay_bp.RelayDecoderF32(
+        **repetition_code_config,
+        pre_iter=60,
+        num_sets=40,
+        set_max_iter=60,
+        stop_nconv=3,
+        budget_max_iterations=100,
+        budget_share_unused=True,
+    )
+    results = decoder.decode_detailed_batch(detectors)
+    assert all(result.success for result in results)
+    assert not any(result.budget_exhausted for result in results)
+
+    with pytest.raises(ValueError):
+        relay_bp.RelayDecoderF32(**repetition_code_config, budget_deadline=-1.0)
+
+
+def test_decode_detailed_batch_shared_budget(repetition_code_error_priors):
+    # No error flips the last check, so shots setting it are never explained
+    # and spend their whole budget, which is less than the pre-iterations.
+    config = dict(
+        check_matrix=np.array([[1, 1, 0], [0, 1, 1], [0, 0, 0]], dtype=np.uint8),
+        error_priors=repetition_code_error_priors,
+        alpha=1.0,
+        pre_iter=20,
+        num_sets=10,
+        set_max_iter=20,
+        budget_max_iterations=5,
+        logging=True,
+    )
+    unexplained = np.array([[0, 0, 1]], dtype=np.uint8)
+    detectors = np.concatenate([np.zeros((8, 3), dtype=np.uint8), unexplained])
+
+    for share_unused in [False, True]:
+        decoder = relay_bp.RelayDecoderF32(**config, budget_share_unused=share_unused)
+        results = decoder.decode_detailed_batch(detectors)
+        assert [result.budget_exhausted for result in results] == [False] * 8 + [True]
+        assert [result.iterations for result in results[:8]] == [1] * 8
+        if share_unused:
+            # Iterations left unused by the trivial shots only add to the
+            # budget of the later, unexplained shot.
+            assert 5 < results[8].iterations <= 5 + 8 * 4
+        else:
+            assert results[8].iterations == 5
+        assert decoder.telemetry().budget_exhausted == 1
+
+        # Every batch starts with its own budget.
+        assert decoder.decode_detailed_batch(unexplained)[0].iterations == 5
+
+    # The budget is shared across the chunks of a batch split between the
+    # workers of a runner, here decoded one after the other on one thread.
+    decoder = relay_bp.RelayDecoderF32(**config, budget_share_unused=True)
+    observable_decoder = relay_bp.ObservableDecoderRunner(
+        decoder, np.eye(1, 3, dtype=np.uint8), num_threads=1
+    )
+    results = observable_decoder.decode_observables_detailed_batch(
+        np.concatenate([np.zeros((32, 3), dtype=np.uint8), unexplained]),
+        parallel=True,
+        progress_bar=False,
+    )
+    assert [result.budget_exhausted for result in results] == [False] * 32 + [True]
+    assert 5 < results[32].iterations <= 5 + 32 * 4
+
+
+def test_decode_batch_threads(repetition_code_config):
+    from concurrent.futures import ThreadPoolExecutor
+
+    repetition_code_config.pop("max_iter", None)
+    decoders = [
+        relay_bp.RelayDecoderF32(**repetition_code_config, pre_iter=1, num_sets=40)
+        for _ in range(4)
+    ]
+
+    detectors = np.array([[1, 0], [1, 1], [0, 1]] * 100, dtype=np.uint8)
+    expected = decoders[0].decode_batch(detectors)
+
+    with ThreadPoolExecutor(max_workers=len(decoders)) as executor:
+        decodings = list(
+            executor.map(lambda decoder: decoder.decode_batch(detectors), decoders)
+        )
+
+    for decoding in decodings:
+        assert np.all(decoding == expected)
+
+
+def test_decode_shared_decoder_threads(repetition_code_config):
+    from concurrent.futures import ThreadPoolExecutor
+
+    repetition_code_config.pop("max_iter", None)
+    decoder = relay_bp.RelayDecoderF32(
+        **repetition_code_config, pre_iter=1, num_sets=40
+    )
+
+    detectors = np.array([[1, 0], [1, 1], [0, 1]] * 100, dtype=np.uint8)
+    expected = decoder.decode_batch(detectors)
+
+    # Calls from threads sharing the decoder wait for each other.
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        decodings = list(
+            executor.map(lambda _: decoder.decode_batch(detectors), range(16))
+        )
+        results = list(
+            executor.map(lambda shot: decoder.decode_detailed(shot), detectors[:16])
+        )
+
+    for decoding in decodings:
+        assert np.all(decoding == expected)
+    for result, decoding in zip(results, expected):
+        assert np.all(result.decoding == decoding)
+
+
+def test_decode_detailed_batch_i8(repetition_code_config):
+    repetition_code_config.pop("max_iter", None)
+    data_scale_value, max_data_value = relay_bp.calibrate_integer_scaling(
+        repetition_code_config["error_priors"], bits=8
+    )
+    assert data_scale_value * max_data_value <= np.iinfo(np.int8).max
+    decoder = relay_bp.RelayDecoderI8(
+        **repetition_code_config,
+        data_scale_value=data_scale_value,
+        max_data_value=max_data_value,
+        pre_iter=120,
+        num_sets=40,
+        set_max_iter=60,
+        stop_nconv=3,
+    )
+
+    detectors = np.array([[1, 0], [1, 1], [0, 1]], dtype=np.uint8)
+
+    results = decoder.decode_detailed_batch(detectors)
+
+    assert all(result.success for result in results)
+    assert np.all(results[0].decoding == np.array([1, 0, 0]))
+    assert np.all(results[1].decoding == np.array([0, 1, 0]))
+    assert np.all(results[2].decoding == np.array([0, 0, 1]))
+
+
+def test_calibrate_integer_scaling_rejects_unsupported_bits(
+    repetition_code_error_priors,
+):
+    with pytest.raises(ValueError):
+        relay_bp.calibrate_integer_scaling(repetition_code_error_priors, bits=12)
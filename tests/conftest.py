@@ -75,3 +75,22 @@ def repetition_code_config_fixed(
         "int_bits": 5,
         "frac_bits": 2,
     }
+
+
+@pytest.fixture
+def long_repetition_code():
+    """A 16 bit repetition code and shots of adjacent error pairs, which the
+    first BP iteration does not decode."""
+    num_variables = 16
+    check_matrix = np.zeros((num_variables - 1, num_variables), dtype=np.uint8)
+    for check in range(num_variables - 1):
+        check_matrix[check, check : check + 2] = 1
+    errors = np.zeros((6, num_variables), dtype=np.uint8)
+    for shot, variable in enumerate([2, 4, 6, 8, 10, 12]):
+        errors[shot, variable : variable + 2] = 1
+    config = {
+        "check_matrix": check_matrix,
+        "error_priors": np.full(num_variables, 0.003),
+        "alpha": 1.0,
+    }
+    return config, errors, (errors @ check_matrix.T % 2).astype(np.uint8)
@@ -0,0 +1,99 @@
+# (C) Copyright IBM 2025
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+import asyncio
+import time
+
+import numpy as np
+import pytest
+
+import relay_bp
+
+
+@pytest.fixture
+def repetition_code_runner(repetition_code_config):
+    physical_decoder = relay_bp.MinSumBPDecoderF32(**repetition_code_config)
+    observable_error_matrix = np.array([[1, 1, 1]])
+
+    return relay_bp.ObservableDecoderRunner(physical_decoder, observable_error_matrix)
+
+
+def test_async_decode_observables(repetition_code_runner):
+    detectors = np.array([[0, 0], [1, 0], [1, 1], [0, 1]] * 50, dtype=np.uint8)
+    expected_observables = repetition_code_runner.decode_observables_batch(
+        detectors, progress_bar=False
+    )
+    expected_decodings = repetition_code_runner.decode_batch(
+        detectors, progress_bar=False
+    )
+
+    async def decode_concurrently():
+        async with relay_bp.AsyncObservableDecoder(
+            repetition_code_runner, max_batch_size=64, max_delay=0.01
+        ) as decoder:
+            observables = await asyncio.gather(
+                *(decoder.decode_observables(row) for row in detectors)
+            )
+            decodings = await asyncio.gather(
+                *(decoder.decode(row) for row in detectors)
+            )
+            batch = await decoder.decode_observables_batch(detectors[:10])
+        return np.array(observables), np.array(decodings), batch
+
+    observables, decodings, batch = asyncio.run(decode_concurrently())
+    assert np.all(observables == expected_observables)
+    assert np.all(decodings == expected_decodings)
+    assert np.all(batch == expected_observables[:10])
+
+
+def test_async_decode_observables_error(repetition_code_runner):
+    class FailingRunner:
+        def decode_observables_batch(self, detectors, parallel, progress_bar):
+            raise ValueError("Invalid detectors")
+
+    async def decode_failing():
+        async with relay_bp.AsyncObservableDecoder(FailingRunner()) as decoder:
+            # Every request of a failing batch raises the error.
+            return await asyncio.gather(
+                decoder.decode_observables(np.zeros(2, dtype=np.uint8)),
+                decoder.decode_observables(np.zeros(2, dtype=np.uint8)),
+                return_exceptions=True,
+            )
+
+    results = asyncio.run(decode_failing())
+    assert all(isinstance(result, ValueError) for result in results)
+
+    with pytest.raises(ValueError):
+        relay_bp.AsyncObservableDecoder(repetition_code_runner, max_batch_size=0)
+
+
+def test_async_decode_observables_close():
+    class SlowRunner:
+        def decode_observables_batch(self, detectors, parallel, progress_bar):
+            time.sleep(0.2)
+            return np.zeros((len(detectors), 1), dtype=np.uint8)
+
+    async def close_while_decoding():
+        decoder = relay_bp.AsyncObservableDecoder(SlowRunner(), max_batch_size=1)
+        requests = [
+            asyncio.ensure_future(
+                decoder.decode_observables(np.zeros(2, dtype=np.uint8))
+            )
+            for _ in range(2)
+        ]
+        # The first request is decoding while the second one waits for a batch.
+        await asyncio.sleep(0.05)
+        decoder.close()
+        return await asyncio.wait_for(
+            asyncio.gather(*requests, return_exceptions=True), timeout=1.0
+        )
+
+    results = asyncio.run(close_while_decoding())
+    assert all(isinstance(result, asyncio.CancelledError) for result in results)
@@ -46,3 +46,388 @@ def test_observable_decoder_evaluator(repetition_code_logical_evaluator):
         np.all(
             logical_decode_results_detailed[i].observables == logical_decode_results[i]
         )
+
+
+def test_observable_decoder_component_decomposition(repetition_code_config):
+    physical_decoder = relay_bp.MinSumBPDecoderF32(**repetition_code_config)
+    observable_error_matrix = np.array([[1, 1, 1]])
+    observable_decoder = relay_bp.ObservableDecoderRunner(
+        physical_decoder,
+        observable_error_matrix,
+        component_decomposition=True,
+        component_max_region_fraction=1.0,
+    )
+
+    detectors = np.array([[1, 0], [1, 1], [0, 1], [0, 0]], dtype=np.uint8)
+    decodings = observable_decoder.decode_batch(detectors)
+
+    assert np.all(decodings[0] == np.array([1, 0, 0]))
+    assert np.all(decodings[1] == np.array([0, 1, 0]))
+    assert np.all(decodings[2] == np.array([0, 0, 1]))
+    assert np.all(decodings[3] == np.array([0, 0, 0]))
+
+
+def test_observable_decoder_packed(repetition_code_logical_evaluator):
+    detectors = np.array([[1, 0], [1, 1], [0, 1], [0, 0]], dtype=np.uint8)
+    packed_detectors = relay_bp.pack_bits(detectors)
+    assert packed_detectors.dtype == np.uint64
+    assert np.all(packed_detectors[:, 0] == np.array([1, 3, 2, 0]))
+    assert np.all(relay_bp.unpack_bits(packed_detectors, 2) == detectors)
+
+    decodings = repetition_code_logical_evaluator.decode_batch(detectors)
+    packed_decodings = repetition_code_logical_evaluator.decode_packed_batch(
+        packed_detectors, parallel=True
+    )
+    assert np.all(relay_bp.unpack_bits(packed_decodings, 3) == decodings)
+
+    observables = repetition_code_logical_evaluator.decode_observables_batch(detectors)
+    packed_observables = (
+        repetition_code_logical_evaluator.decode_observables_packed_batch(
+            packed_detectors
+        )
+    )
+    assert np.all(relay_bp.unpack_bits(packed_observables, 1) == observables)
+    assert np.all(
+        repetition_code_logical_evaluator.compute_observables_packed_batch(
+            packed_decodings
+        )
+        == packed_observables
+    )
+
+    # Padding bits past the last variable are ignored.
+    padded_decodings = packed_decodings | np.uint64(1 << 63)
+    assert np.all(
+        repetition_code_logical_evaluator.compute_observables_packed_batch(
+            padded_decodings
+        )
+        == packed_observables
+    )
+
+    wide_detectors = np.zeros((len(detectors), 2), dtype=np.uint64)
+    for method in (
+        repetition_code_logical_evaluator.decode_packed_batch,
+        repetition_code_logical_evaluator.decode_observables_packed_batch,
+    ):
+        with pytest.raises(ValueError):
+            method(wide_detectors)
+
+
+def test_observable_decoder_out(repetition_code_logical_evaluator):
+    detectors = np.array([[1, 0], [1, 1], [0, 1], [0, 0]] * 50, dtype=np.uint8)
+    decodings = repetition_code_logical_evaluator.decode_batch(detectors)
+    observables = repetition_code_logical_evaluator.decode_observables_batch(detectors)
+
+    out = np.ones((len(detectors), 3), dtype=np.uint8)
+    result = repetition_code_logical_evaluator.decode_batch(
+        detectors, parallel=True, progress_bar=False, out=out
+    )
+    assert result is out
+    assert np.all(out == decodings)
+
+    # Rows are written in place through strided views of a larger buffer.
+    buffer = np.ones((len(detectors), 2), dtype=np.uint8)
+    repetition_code_logical_evaluator.decode_observables_batch(
+        detectors, parallel=True, out=buffer[:, :1]
+    )
+    assert np.all(buffer[:, :1] == observables)
+    assert np.all(buffer[:, 1] == 1)
+
+    packed_out = np.zeros((len(detectors), 1), dtype=np.uint64)
+    repetition_code_logical_evaluator.decode_observables_packed_batch(
+        relay_bp.pack_bits(detectors), out=packed_out
+    )
+    assert np.all(relay_bp.unpack_bits(packed_out, 1) == observables)
+
+    with pytest.raises(ValueError):
+        repetition_code_logical_evaluator.decode_batch(
+            detectors, out=np.zeros((len(detectors), 2), dtype=np.uint8)
+        )
+
+
+def test_observable_decoder_num_threads(repetition_code_config):
+    physical_decoder = relay_bp.MinSumBPDecoderF32(**repetition_code_config)
+    observable_error_matrix = np.array([[1, 1, 1]])
+    observable_decoder = relay_bp.ObservableDecoderRunner(
+        physical_decoder, observable_error_matrix, num_threads=2
+    )
+    assert observable_decoder.num_threads == 2
+
+    detectors = np.array([[1, 0], [1, 1], [0, 1], [0, 0]] * 50, dtype=np.uint8)
+    observables = observable_decoder.decode_observables_batch(
+        detectors, progress_bar=False
+    )
+    # Repeated parallel calls reuse the same worker decoders.
+    for _ in range(3):
+        assert np.all(
+            observable_decoder.decode_observables_batch(
+                detectors, parallel=True, progress_bar=False
+            )
+            == observables
+        )
+
+
+def test_observable_decoder_shared_threads(repetition_code_config):
+    from concurrent.futures import ThreadPoolExecutor
+
+    physical_decoder = relay_bp.MinSumBPDecoderF32(**repetition_code_config)
+    observable_error_matrix = np.array([[1, 1, 1]])
+    observable_decoder = relay_bp.ObservableDecoderRunner(
+        physical_decoder, observable_error_matrix, num_threads=2
+    )
+
+    detectors = np.array([[1, 0], [1, 1], [0, 1], [0, 0]] * 50, dtype=np.uint8)
+    expected = observable_decoder.decode_observables_batch(
+        detectors, progress_bar=False
+    )
+
+    # Calls from threads sharing the runner wait for each other.
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        observables = list(
+            executor.map(
+                lambda parallel: observable_decoder.decode_observables_batch(
+                    detectors, parallel=parallel, progress_bar=False
+                ),
+                [False, True] * 8,
+            )
+        )
+
+    for observable in observables:
+        assert np.all(observable == expected)
+
+
+def test_observable_decoder_shot_scheduling(repetition_code_config):
+    physical_decoder = relay_bp.MinSumBPDecoderF32(**repetition_code_config)
+    observable_error_matrix = np.array([[1, 1, 1]])
+    detectors = np.array([[0, 0], [1, 1], [0, 0], [1, 0], [0, 1]] * 40, dtype=np.uint8)
+
+    results = []
+    for shot_scheduling in [True, False]:
+        observable_decoder = relay_bp.ObservableDecoderRunner(
+            physical_decoder,
+            observable_error_matrix,
+            shot_scheduling=shot_scheduling,
+        )
+        results.append(
+            observable_decoder.decode_batch(
+                detectors, parallel=True, progress_bar=False
+            )
+        )
+
+    # Shots are reordered for decoding but returned in the input order.
+    assert np.all(results[0] == results[1])
+    assert np.all(results[0][0::5] == 0)
+    assert np.all(results[0][1::5] == np.array([0, 1, 0]))
+
+
+def test_observable_decoder_syndrome_cache(repetition_code_config):
+    physical_decoder = relay_bp.MinSumBPDecoderF32(**repetition_code_config)
+    observable_error_matrix = np.array([[1, 1, 1]])
+    detectors = np.array([[1, 0], [1, 1], [0, 1]] * 20, dtype=np.uint8)
+
+    observable_decoder = relay_bp.ObservableDecoderRunner(
+        physical_decoder, observable_error_matrix, syndrome_cache=True
+    )
+    expected = relay_bp.ObservableDecoderRunner(
+        physical_decoder, observable_error_matrix
+    ).decode_observables_batch(detectors, progress_bar=False)
+
+    assert np.all(
+        observable_decoder.decode_observables_batch(detectors, progress_bar=False)
+        == expected
+    )
+    stats = observable_decoder.syndrome_cache_stats()
+    assert stats.size == 3
+    assert stats.hits == 0
+
+    assert np.all(
+        observable_decoder.decode_observables_batch(
+            detectors, parallel=True, progress_bar=False
+        )
+        == expected
+    )
+    stats = observable_decoder.syndrome_cache_stats()
+    # Every row of the first batch missed, every row of the second hit.
+    assert stats.hits == len(detectors)
+    assert stats.misses == len(detectors)
+
+    observable_decoder.clear_syndrome_cache()
+    assert observable_decoder.syndrome_cache_stats().size == 0
+    assert (
+        relay_bp.ObservableDecoderRunner(
+            physical_decoder, observable_error_matrix
+        ).syndrome_cache_stats()
+        is None
+    )
+
+
+def test_observable_decoder_lookup_table(repetition_code_config):
+    physical_decoder = relay_bp.MinSumBPDecoderF32(**repetition_code_config)
+    observable_error_matrix = np.array([[1, 1, 1]])
+    detectors = np.array([[0, 0], [1, 0], [1, 1], [0, 1]], dtype=np.uint8)
+
+    observable_decoder = relay_bp.ObservableDecoderRunner(
+        physical_decoder, observable_error_matrix, lookup_table=True
+    )
+    expected = relay_bp.ObservableDecoderRunner(
+        physical_decoder, observable_error_matrix
+    ).decode_batch(detectors, progress_bar=False)
+
+    assert np.all(
+        observable_decoder.decode_batch(detectors, progress_bar=False) == expected
+    )
+    results = observable_decoder.decode_observables_detailed_batch(
+        detectors, progress_bar=False
+    )
+    assert all(result.from_lookup_table for result in results)
+    assert all(result.iterations == 0 for result in results)
+    stats = observable_decoder.lookup_table_stats()
+    assert stats.hits == 2 * len(detectors)
+    assert stats.misses == 0
+
+    observable_decoder = relay_bp.ObservableDecoderRunner(
+        physical_decoder,
+        observable_error_matrix,
+        lookup_table=True,
+        lookup_table_max_syndrome_weight=1,
+    )
+    result = observable_decoder.decode_detailed(np.array([1, 1], dtype=np.uint8))
+    assert not result.from_lookup_table
+    assert np.all(result.decoding == np.array([0, 1, 0]))
+    assert observable_decoder.lookup_table_stats().misses == 1
+
+    with pytest.raises(ValueError):
+        relay_bp.ObservableDecoderRunner(
+            physical_decoder,
+            observable_error_matrix,
+            lookup_table=True,
+            lookup_table_max_errors=3,
+        )
+
+
+def test_observable_decoder_evaluate_batch(
+    repetition_code_logical_evaluator, repetition_code_dense
+):
+    errors = np.array(
+        [[0, 0, 0], [1, 0, 0], [0, 1, 0], [1, 1, 0], [1, 1, 1]] * 20, dtype=np.uint8
+    )
+    expected_detectors = (errors @ repetition_code_dense.T) % 2
+    expected_observables = errors.sum(axis=1, keepdims=True) % 2
+
+    for parallel in (False, True):
+        assert np.all(
+            repetition_code_logical_evaluator.get_detectors_batch(
+                errors, parallel=parallel
+            )
+            == expected_detectors
+        )
+        out = np.ones((len(errors), 1), dtype=np.uint8)
+        observables = repetition_code_logical_evaluator.compute_observables_batch(
+            errors, parallel=parallel, out=out
+        )
+        assert observables is out
+        assert np.all(out == expected_observables)
+
+        packed_errors = relay_bp.pack_bits(errors)
+        assert np.all(
+            repetition_code_logical_evaluator.get_detectors_packed_batch(
+                packed_errors, parallel=parallel
+            )
+            == relay_bp.pack_bits(expected_detectors)
+        )
+        assert np.all(
+            repetition_code_logical_evaluator.compute_observables_packed_batch(
+                packed_errors, parallel=parallel
+            )
+            == relay_bp.pack_bits(expected_observables)
+        )
+
+    with pytest.raises(ValueError):
+        repetition_code_logical_evaluator.compute_observables_batch(
+            np.zeros((2, 4), dtype=np.uint8)
+        )
+
+
+def test_observable_decoder_bytes(repetition_code_logical_evaluator):
+    detectors = np.array([[0, 0], [1, 0], [1, 1], [0, 1]] * 25, dtype=np.uint8)
+    syndrome_bias = np.array([1, 0], dtype=np.uint8)
+    observables_bias = np.array([1], dtype=np.uint8)
+    expected = (
+        repetition_code_logical_evaluator.decode_observables_batch(
+            detectors ^ syndrome_bias, progress_bar=False
+        )
+        ^ observables_bias
+    )
+    packed_detectors = np.packbits(detectors, axis=1, bitorder="little")
+
+    for parallel in (False, True):
+        packed_observables = (
+            repetition_code_logical_evaluator.decode_observables_bytes_batch(
+                packed_detectors,
+                syndrome_bias=syndrome_bias,
+                observables_bias=observables_bias,
+                parallel=parallel,
+            )
+        )
+        assert packed_observables.shape == (len(detectors), 1)
+        observables = np.unpackbits(
+            packed_observables, axis=1, bitorder="little", count=1
+        )
+        assert np.all(observables == expected)
+
+    # Without biases the bytes hold the plain decoding.
+    packed_observables = (
+        repetition_code_logical_evaluator.decode_observables_bytes_batch(
+            packed_detectors
+        )
+    )
+    assert np.all(
+        np.unpackbits(packed_observables, axis=1, bitorder="little", count=1)
+        == repetition_code_logical_evaluator.decode_observables_batch(
+            detectors, progress_bar=False
+        )
+    )
+
+    with pytest.raises(ValueError):
+        repetition_code_logical_evaluator.decode_observables_bytes_batch(
+            np.zeros((4, 2), dtype=np.uint8)
+        )
+    with pytest.raises(ValueError):
+        repetition_code_logical_evaluator.decode_observables_bytes_batch(
+            packed_detectors, syndrome_bias=np.zeros(3, dtype=np.uint8)
+        )
+
+
+def test_observable_decoder_stream(repetition_code_logical_evaluator):
+    detectors = np.array([[0, 0], [1, 0], [1, 1], [0, 1]] * 25, dtype=np.uint8)
+    expected = repetition_code_logical_evaluator.decode_observables_batch(
+        detectors, progress_bar=False
+    )
+
+    # Chunks of an iterable larger than the chunk size are split.
+    chunks = list(
+        repetition_code_logical_evaluator.decode_observables_stream(
+            (detectors[start : start + 40] for start in range(0, len(detectors), 40)),
+            chunk_size=16,
+        )
+    )
+    assert max(len(chunk) for chunk in chunks) <= 16
+    assert np.all(np.concatenate(chunks) == expected)
+
+    # A sampler is called for at most the chunk size until num_shots are drawn.
+    requests = []
+
+    def sample(num_shots):
+        start = sum(requests)
+        requests.append(num_shots)
+        return detectors[start : start + num_shots].astype(bool)
+
+    chunks = list(
+        repetition_code_logical_evaluator.decode_observables_stream(
+            sample, num_shots=len(detectors), chunk_size=30, parallel=False
+        )
+    )
+    assert requests == [30, 30, 30, 10]
+    assert np.all(np.concatenate(chunks) == expected)
+
+    with pytest.raises(ValueError):
+        repetition_code_logical_evaluator.decode_observables_stream([], chunk_size=0)